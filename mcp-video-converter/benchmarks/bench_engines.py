@@ -0,0 +1,82 @@
+"""
+Benchmarks the subprocess FFmpeg engine against the in-process PyAV engine on
+generated clips of increasing length and reports where the crossover lies.
+
+Usage:
+    python benchmarks/bench_engines.py [--format mp4] [--runs 3] [--durations 0.04,0.5,1,2,5,10]
+
+Requires ffmpeg on PATH and PyAV installed (pip install -e ".[pyav]").
+A duration of 0.04 is a single frame at 25 fps.
+"""
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mcp_video_converter.encoding import build_encoding_args
+from mcp_video_converter.engines import PYAV_ENGINE, SUBPROCESS_ENGINE, av
+from mcp_video_converter.resources import get_resource_policy
+
+
+def make_clip(directory: Path, duration: float) -> Path:
+    path = directory / f"clip_{duration:g}s.mp4"
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-v", "error",
+            "-f", "lavfi", "-i", f"testsrc2=size=640x360:rate=25:duration={duration}",
+            "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+            "-c:v", "libx264", "-c:a", "aac", "-shortest", str(path),
+        ],
+        check=True,
+    )
+    return path
+
+
+async def time_engine(engine, clip: Path, output_format: str, runs: int) -> float:
+    encoding_args = build_encoding_args(output_format, "medium")
+    policy = get_resource_policy("medium")
+    timings = []
+    for i in range(runs):
+        output = clip.with_name(f"{clip.stem}_{engine.name}_{i}.{output_format}")
+        started = time.perf_counter()
+        result = await engine.run(clip, output, output_format, encoding_args, policy)
+        timings.append(time.perf_counter() - started)
+        if result["returncode"] != 0:
+            raise RuntimeError(f"{engine.name} failed: {result['stderr'].decode(errors='replace')}")
+    return statistics.median(timings)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", default="mp4")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--durations", default="0.04,0.5,1,2,5,10")
+    args = parser.parse_args()
+    if av is None:
+        sys.exit("PyAV is not installed")
+
+    durations = [float(d) for d in args.durations.split(",")]
+    crossover = None
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'duration':>9} {'bytes':>10} {'subprocess':>11} {'pyav':>8} {'speedup':>8}")
+        for duration in durations:
+            clip = make_clip(Path(tmp), duration)
+            sub = await time_engine(SUBPROCESS_ENGINE, clip, args.format, args.runs)
+            inproc = await time_engine(PYAV_ENGINE, clip, args.format, args.runs)
+            print(f"{duration:>8g}s {clip.stat().st_size:>10} {sub:>10.3f}s {inproc:>7.3f}s {sub / inproc:>7.2f}x")
+            if crossover is None and inproc >= sub:
+                crossover = (duration, clip.stat().st_size)
+
+    if crossover:
+        print(f"\nPyAV stops winning at about {crossover[0]:g}s ({crossover[1]} bytes); "
+              f"set MCP_INPROCESS_MAX_BYTES just below that size.")
+    else:
+        print("\nPyAV was faster at every tested duration; try longer clips.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Compares still-image throughput (images/sec) of the batched in-process path with
+one FFmpeg process per image.
+
+Usage:
+    python benchmarks/bench_images.py [--count 200] [--size 1280x720] [--format webp]
+
+Requires Pillow (pip install -e ".[images]") and ffmpeg on PATH.
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from mcp_video_converter.encoding import build_encoding_args
+from mcp_video_converter.engines import SUBPROCESS_ENGINE
+from mcp_video_converter.images import Image, convert_images_batch
+from mcp_video_converter.resources import get_resource_policy
+
+
+def make_screenshots(directory: Path, count: int, width: int, height: int) -> list:
+    paths = []
+    for i in range(count):
+        image = Image.new("RGB", (width, height), (random.randrange(256), 40, 90))
+        # A few solid blocks so the encoders have some structure to work with
+        for _ in range(8):
+            x, y = random.randrange(width - 64), random.randrange(height - 64)
+            image.paste((random.randrange(256), random.randrange(256), 255), (x, y, x + 64, y + 64))
+        path = directory / f"screenshot_{i:04d}.png"
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+async def ffmpeg_per_image(paths: list, output_format: str) -> None:
+    policy = get_resource_policy("medium")
+    encoding_args = build_encoding_args(output_format, "medium")
+    await asyncio.gather(*(
+        SUBPROCESS_ENGINE.run(path, path.with_name(f"{path.stem}_ffmpeg.{output_format}"), output_format, encoding_args, policy)
+        for path in paths
+    ))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--format", default="webp")
+    args = parser.parse_args()
+    if Image is None:
+        raise SystemExit("Pillow is not installed")
+    width, height = (int(v) for v in args.size.split("x"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_screenshots(Path(tmp), args.count, width, height)
+
+        started = time.perf_counter()
+        results = await convert_images_batch(paths, args.format, "medium")
+        batched = time.perf_counter() - started
+        assert all(r["success"] for r in results), [r for r in results if not r["success"]][:3]
+
+        started = time.perf_counter()
+        await ffmpeg_per_image(paths, args.format)
+        per_process = time.perf_counter() - started
+
+    print(f"{args.count} {args.size} PNG -> {args.format}")
+    print(f"  batched in-process: {args.count / batched:8.1f} images/sec")
+    print(f"  FFmpeg per image:   {args.count / per_process:8.1f} images/sec")
+    print(f"  speedup:            {per_process / batched:8.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,213 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional, Set, Tuple
+
+from .concat import write_concat_list
+from .resources import get_resource_policy, job_slot, make_policy_applier
+from .supervisor import run_supervised
+from .waveform import input_fingerprint
+
+# Seconds of media per checkpointed segment: the most work an interruption can lose
+CHECKPOINT_SEGMENT_SECONDS = float(os.environ.get("MCP_CHECKPOINT_SEGMENT_SECONDS", "120"))
+# Output formats whose segments concat can join by stream copy
+CHECKPOINT_OUTPUT_FORMATS = ["mp4", "mkv", "webm", "mov"]
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# Manifest fields that must match for its segments to be reused
+MANIFEST_KEYS = ("version", "input", "output_format", "encoding_args", "segment_seconds", "duration")
+
+# Checkpoint directories with a conversion writing to them
+ACTIVE_CHECKPOINTS: Set[str] = set()
+
+
+def checkpoint_dir_for(output_dir: Path, input_path: Path, output_format: str) -> Path:
+    """The checkpoint of an input and format sits next to its outputs, so a restart finds it."""
+    return output_dir / f".{input_path.stem}.{output_format}.checkpoint"
+
+
+def input_identity(path: Path) -> Dict[str, Any]:
+    stat = path.stat()
+    return {"fingerprint": input_fingerprint(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def plan_segments(duration: float, segment_seconds: float) -> List[Tuple[float, float]]:
+    """Splits [0, duration) into (start, end) spans of segment_seconds; the last may be shorter."""
+    count = max(1, int(-(-duration // segment_seconds)))
+    return [(i * segment_seconds, min(duration, (i + 1) * segment_seconds)) for i in range(count)]
+
+
+def new_manifest(
+    identity: Dict[str, Any],
+    output_format: str,
+    encoding_args: List[str],
+    duration: float,
+    segment_seconds: float
+) -> Dict[str, Any]:
+    return {
+        "version": MANIFEST_VERSION,
+        "input": identity,
+        "output_format": output_format,
+        "encoding_args": list(encoding_args),
+        "segment_seconds": segment_seconds,
+        "duration": duration,
+        "segments": [
+            {"index": i, "start": start, "end": end, "file": f"segment_{i:05d}.{output_format}", "size": None, "done": False}
+            for i, (start, end) in enumerate(plan_segments(duration, segment_seconds))
+        ],
+    }
+
+
+def save_manifest(checkpoint_dir: Path, manifest: Dict[str, Any]) -> None:
+    """Writes the manifest atomically, so an interruption leaves the previous version."""
+    fd, temp_path = tempfile.mkstemp(dir=checkpoint_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, checkpoint_dir / MANIFEST_NAME)
+
+
+def load_manifest(checkpoint_dir: Path, expected: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Returns the saved manifest if it was made for the same input and encoding
+    parameters as `expected`, or None. Finished segments whose file is missing or
+    has a different size are marked unfinished.
+    """
+    try:
+        manifest = json.loads((checkpoint_dir / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or any(manifest.get(key) != expected[key] for key in MANIFEST_KEYS):
+        return None
+    for segment in manifest["segments"]:
+        if segment["done"]:
+            try:
+                segment["done"] = (checkpoint_dir / segment["file"]).stat().st_size == segment["size"]
+            except OSError:
+                segment["done"] = False
+    return manifest
+
+
+def build_segment_command(
+    input_path: Path,
+    output_path: Path,
+    start: float,
+    end: float,
+    encoding_args: List[str]
+) -> List[str]:
+    """Encodes [start, end) of the input; seeking on the input decodes from the keyframe before start."""
+    return [
+        "ffmpeg", "-y", "-ss", f"{start:.6f}", "-i", str(input_path), "-t", f"{end - start:.6f}",
+        *encoding_args, str(output_path),
+    ]
+
+
+async def resumable_convert(
+    input_path: Path,
+    output_path: Path,
+    output_format: str,
+    encoding_args: List[str],
+    duration: float,
+    quality: Optional[str] = None,
+    segment_seconds: float = CHECKPOINT_SEGMENT_SECONDS,
+    on_progress: Optional[Any] = None,
+    on_segment: Optional[Callable[[int, int], Any]] = None
+) -> Dict[str, Any]:
+    """
+    Converts an input as independently encoded time segments, checkpointing each.
+
+    Segments are encoded one at a time into a checkpoint directory next to the
+    output and renamed into place when complete; the manifest is rewritten after
+    each one. A later call for the same input and format reuses the finished
+    segments if the manifest matches the input's fingerprint, size and mtime and
+    the encoding parameters, and starts over otherwise. Once all segments exist
+    they are joined into output_path by stream copy and the checkpoint is removed.
+
+    Returns:
+        A dictionary with 'success', 'output_file_path', the 'checkpoint' state
+        ("new", "resumed" or "discarded"), segment counts and phase timings. A failed
+        conversion keeps its 'checkpoint_dir' for the next attempt.
+    """
+    checkpoint_dir = checkpoint_dir_for(output_path.parent, input_path, output_format)
+    if str(checkpoint_dir) in ACTIVE_CHECKPOINTS:
+        return {"success": False, "error": f"A resumable conversion of {input_path.name} to {output_format} is already running"}
+    ACTIVE_CHECKPOINTS.add(str(checkpoint_dir))
+    try:
+        expected = new_manifest(input_identity(input_path), output_format, encoding_args, duration, segment_seconds)
+        manifest = load_manifest(checkpoint_dir, expected)
+        if manifest is not None:
+            state = "resumed"
+        else:
+            state = "discarded" if checkpoint_dir.exists() else "new"
+            # A checkpoint for another input version or other parameters is never reused
+            shutil.rmtree(checkpoint_dir, ignore_errors=True)
+            checkpoint_dir.mkdir(parents=True)
+            manifest = expected
+            save_manifest(checkpoint_dir, manifest)
+
+        segments = manifest["segments"]
+        reused = sum(segment["done"] for segment in segments)
+        if on_segment:
+            on_segment(reused, len(segments))
+        policy = get_resource_policy(quality)
+        started = time.monotonic()
+        for segment in segments:
+            if segment["done"]:
+                continue
+            final = checkpoint_dir / segment["file"]
+            partial = checkpoint_dir / f"{final.stem}.partial{final.suffix}"
+            command = build_segment_command(input_path, partial, segment["start"], segment["end"], encoding_args)
+            async with job_slot(policy) as slot:
+                command[-1:-1] = ["-threads", str(slot["threads"])]
+                run = await run_supervised(command, apply_policy=make_policy_applier(policy, slot["cpus"]), on_progress=on_progress)
+            if run["stalled"] or run["returncode"] != 0 or not partial.exists():
+                error = "stalled" if run["stalled"] else run["stderr"].decode(errors="replace").strip()
+                return {
+                    "success": False,
+                    "error": f"Encoding segment {segment['index']} failed: {error}",
+                    "command": " ".join(command),
+                    "checkpoint_dir": str(checkpoint_dir),
+                    "segments_completed": sum(s["done"] for s in segments),
+                }
+            os.replace(partial, final)
+            segment.update(done=True, size=final.stat().st_size)
+            save_manifest(checkpoint_dir, manifest)
+            if on_segment:
+                on_segment(sum(s["done"] for s in segments), len(segments))
+        encode_seconds = time.monotonic() - started
+
+        started = time.monotonic()
+        list_path = checkpoint_dir / "segments.ffconcat"
+        write_concat_list(list_path, [checkpoint_dir / segment["file"] for segment in segments])
+        command = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", str(list_path), "-map", "0", "-c", "copy"]
+        if output_format in ("mp4", "mov"):
+            command += ["-movflags", "+faststart"]
+        command.append(str(output_path))
+        join = await run_supervised(command)
+        join_seconds = time.monotonic() - started
+        if join["stalled"] or join["returncode"] != 0:
+            error = "stalled" if join["stalled"] else join["stderr"].decode(errors="replace").strip()
+            return {
+                "success": False,
+                "error": f"Joining segments failed: {error}",
+                "command": " ".join(command),
+                "checkpoint_dir": str(checkpoint_dir),
+                "segments_completed": len(segments),
+            }
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    finally:
+        ACTIVE_CHECKPOINTS.discard(str(checkpoint_dir))
+
+    return {
+        "success": True,
+        "output_file_path": str(output_path),
+        "message": "Video converted successfully from checkpointed segments.",
+        "checkpoint": state,
+        "segments": len(segments),
+        "segments_reused": reused,
+        "segments_encoded": len(segments) - reused,
+        "encode_seconds": round(encode_seconds, 3),
+        "join_seconds": round(join_seconds, 3),
+    }
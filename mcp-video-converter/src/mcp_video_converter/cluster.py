@@ -0,0 +1,748 @@
+import argparse
+import asyncio
+import base64
+import hmac
+import json
+import logging
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Any, BinaryIO, Callable, Iterable, List, Optional, Set
+
+from .engines import SUBPROCESS_ENGINE, ConversionEngine
+from .resources import CPU_COUNT, MAX_CONCURRENT_JOBS
+from .tuning import FORMAT_ENCODERS
+
+logger = logging.getLogger(__name__)
+
+# The coordinator listens on MCP_CLUSTER_HOST:MCP_CLUSTER_PORT; cluster mode is off without a port
+CLUSTER_HOST = os.environ.get("MCP_CLUSTER_HOST", "127.0.0.1")
+CLUSTER_PORT = int(os.environ["MCP_CLUSTER_PORT"]) if os.environ.get("MCP_CLUSTER_PORT") else None
+# Shared secret every worker must present when registering; cluster mode stays off without it
+CLUSTER_TOKEN = os.environ.get("MCP_CLUSTER_TOKEN") or None
+HEARTBEAT_SECONDS = float(os.environ.get("MCP_CLUSTER_HEARTBEAT_SECONDS", "5"))
+# A worker silent for this many heartbeat intervals is considered dead
+MISSED_HEARTBEATS = 3
+# Attempts per job before it fails instead of moving to another worker
+MAX_ATTEMPTS = int(os.environ.get("MCP_CLUSTER_MAX_ATTEMPTS", "3"))
+# Input and output bytes per chunk message for workers without shared storage
+TRANSFER_CHUNK_BYTES = 512 * 1024
+# Longest message line; a base64 chunk plus its envelope fits comfortably
+STREAM_LIMIT = 4 * 1024 * 1024
+RECONNECT_SECONDS = 2.0
+
+# Worker agent settings
+WORKER_SHARED_STORAGE = os.environ.get("MCP_WORKER_SHARED_STORAGE", "1").lower() in ("true", "1", "yes")
+WORKER_SCRATCH_DIR = os.environ.get("MCP_WORKER_SCRATCH_DIR") or None
+
+# Flags that name an encoder explicitly
+CODEC_FLAGS = ("-c:v", "-vcodec", "-c:a", "-acodec")
+# Audio encoder the ffmpeg CLI picks for each output format when none is named
+FORMAT_AUDIO_ENCODERS = {
+    "mp4": "aac", "mov": "aac", "m4a": "aac", "aac": "aac",
+    "mkv": "libvorbis", "ogg": "libvorbis",
+    "webm": "libopus",
+    "mp3": "libmp3lame", "avi": "libmp3lame", "flv": "libmp3lame",
+    "wav": "pcm_s16le",
+}
+
+_COORDINATOR: Optional["Coordinator"] = None
+
+
+def required_encoders(output_format: str, encoding_args: List[str]) -> Set[str]:
+    """
+    Returns the FFmpeg encoders a job needs: those named in its arguments, else the
+    format's default video and audio encoders.
+    """
+    named = {value for flag, value in zip(encoding_args, encoding_args[1:]) if flag in CODEC_FLAGS}
+    named.discard("copy")
+    if not any(flag in ("-c:v", "-vcodec", "-vn") for flag in encoding_args) and output_format in FORMAT_ENCODERS:
+        named.add(FORMAT_ENCODERS[output_format])
+    if not any(flag in ("-c:a", "-acodec", "-an") for flag in encoding_args) and output_format in FORMAT_AUDIO_ENCODERS:
+        named.add(FORMAT_AUDIO_ENCODERS[output_format])
+    return named
+
+
+def detect_encoders() -> List[str]:
+    """Lists the encoders of the local ffmpeg build, or none when ffmpeg is missing."""
+    try:
+        listing = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"], capture_output=True, text=True, timeout=30
+        ).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return []
+    # Entries follow a "------" separator, e.g. " V....D libx264   libx264 H.264 ..."
+    _, _, entries = listing.partition("------")
+    return [line.split()[1] for line in entries.splitlines() if len(line.split()) > 1]
+
+
+# Workers and the coordinator exchange newline-delimited JSON messages over one TCP
+# connection. Workers send register, heartbeat, one pull per free slot, then progress
+# and result for each job; the coordinator answers with registered (or rejected for a
+# wrong token), job and cancel. Workers without shared storage also send fetch for each
+# input chunk, answered by input, and stream their output back as chunk messages.
+async def _read_message(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+    """Reads one JSON message line; None at end of stream."""
+    line = await reader.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def _encode_message(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+def _failed_run(error: str) -> Dict[str, Any]:
+    return {
+        "returncode": 1,
+        "stdout": b"",
+        "stderr": error.encode(),
+        "stalled": False,
+        "progress": {},
+        "resource_usage": {},
+    }
+
+
+def _read_chunk(path: str, offset: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(TRANSFER_CHUNK_BYTES)
+
+
+def _attempt_path(output_path: Path, job_id: str, attempt: int) -> Path:
+    """
+    Each attempt writes beside the final output and is renamed into place on success,
+    so an FFmpeg left running by a lost worker can never overwrite a finished file.
+    """
+    return output_path.with_name(f".{output_path.stem}.{job_id[:8]}-{attempt}{output_path.suffix}")
+
+
+class Coordinator:
+    """Accepts worker agents, queues jobs and places each on a capable worker."""
+
+    def __init__(
+        self,
+        token: Optional[str] = CLUSTER_TOKEN,
+        heartbeat_seconds: float = HEARTBEAT_SECONDS,
+        max_attempts: int = MAX_ATTEMPTS
+    ):
+        if not token:
+            raise ValueError("The cluster coordinator needs a shared token (MCP_CLUSTER_TOKEN)")
+        self.token = token
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_attempts = max_attempts
+        # worker_id -> registration, free pulls and held jobs of a connected worker
+        self.workers: Dict[str, Dict[str, Any]] = {}
+        # job_id -> submitted job; pending holds the unplaced ones in order
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.pending: List[Dict[str, Any]] = []
+        self.stats = {
+            "workers_registered": 0,
+            "registrations_rejected": 0,
+            "workers_lost": 0,
+            "dispatched": 0,
+            "reassigned": 0,
+            "completed": 0,
+            "failed": 0,
+        }
+        self.address: Optional[tuple] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._monitor_task: Optional[asyncio.Task] = None
+        self._input_tasks: Set[asyncio.Task] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self, host: str = CLUSTER_HOST, port: int = 0) -> None:
+        self.loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle, host, port, limit=STREAM_LIMIT)
+        self.address = self._server.sockets[0].getsockname()[:2]
+        self._monitor_task = asyncio.create_task(self._monitor())
+        logger.info(f"Cluster coordinator listening on {self.address[0]}:{self.address[1]}")
+
+    async def close(self) -> None:
+        if self._monitor_task:
+            self._monitor_task.cancel()
+            await asyncio.gather(self._monitor_task, return_exceptions=True)
+        for task in list(self._input_tasks):
+            task.cancel()
+        await asyncio.gather(*self._input_tasks, return_exceptions=True)
+        for job in list(self.jobs.values()):
+            self._finish(job, _failed_run("Cluster coordinator shut down"))
+        for worker in list(self.workers.values()):
+            worker["writer"].close()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def can_place(self, required: Iterable[str]) -> bool:
+        """True when a connected worker has every encoder in `required`."""
+        required = set(required)
+        return any(required <= worker["encoders"] for worker in self.workers.values())
+
+    async def submit(
+        self,
+        spec: Dict[str, Any],
+        required: Iterable[str],
+        on_progress: Optional[Callable[[Dict[str, str]], Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Runs one conversion on a worker and waits for it.
+
+        Args:
+            spec: 'input', 'output', 'output_format', 'encoding_args', 'policy' and 'video'.
+            required: Encoders the placing worker must have.
+            on_progress: Optional callback with the FFmpeg progress blocks the worker streams.
+
+        Returns:
+            The worker's run in the shape of run_supervised, with 'worker_id' and
+            'attempts' added to its resource usage.
+        """
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "spec": spec,
+            "required": set(required),
+            "on_progress": on_progress,
+            "future": asyncio.get_running_loop().create_future(),
+            "worker_id": None,
+            "attempts": 0,
+            "attempt_path": None,
+            "transfer": None,
+            "received": 0,
+        }
+        if not self.can_place(job["required"]):
+            return _failed_run(f"No cluster worker has the encoders {sorted(job['required'])}")
+        self.jobs[job["job_id"]] = job
+        self.pending.append(job)
+        self._dispatch()
+        try:
+            return await job["future"]
+        finally:
+            if not job["future"].done():
+                # The caller gave up (the MCP job was cancelled): stop the worker's FFmpeg
+                worker = self.workers.get(job["worker_id"])
+                if worker:
+                    worker["jobs"].discard(job["job_id"])
+                    self._post(worker, {"type": "cancel", "job_id": job["job_id"]})
+                self._abandon_attempt(job)
+            self.jobs.pop(job["job_id"], None)
+            if job in self.pending:
+                self.pending.remove(job)
+
+    def status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "address": f"{self.address[0]}:{self.address[1]}" if self.address else None,
+            "heartbeat_seconds": self.heartbeat_seconds,
+            "workers": [
+                {
+                    "worker_id": worker["worker_id"],
+                    "host": worker["host"],
+                    "cores": worker["cores"],
+                    "slots": worker["slots"],
+                    "free_slots": worker["pulls"],
+                    "running_jobs": len(worker["jobs"]),
+                    "shared_storage": worker["shared_storage"],
+                    "encoders": len(worker["encoders"]),
+                    "last_seen_seconds": round(now - worker["last_seen"], 2),
+                }
+                for worker in self.workers.values()
+            ],
+            "pending_jobs": len(self.pending),
+            "running_jobs": sum(len(worker["jobs"]) for worker in self.workers.values()),
+            **self.stats,
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        worker = None
+        try:
+            message = await _read_message(reader)
+            if not message or message.get("type") != "register":
+                return
+            if not hmac.compare_digest(str(message.get("token") or "").encode(), self.token.encode()):
+                self.stats["registrations_rejected"] += 1
+                logger.warning(f"Rejected cluster registration from {writer.get_extra_info('peername')}: bad token")
+                writer.write(_encode_message({"type": "rejected", "error": "invalid cluster token"}))
+                return
+            worker = self._register(message, writer)
+            self._post(worker, {
+                "type": "registered",
+                "worker_id": worker["worker_id"],
+                "heartbeat_seconds": self.heartbeat_seconds,
+            })
+            while True:
+                message = await _read_message(reader)
+                if message is None:
+                    break
+                worker["last_seen"] = time.monotonic()
+                self._on_message(worker, message)
+        except (ConnectionError, ValueError, KeyError) as e:
+            logger.warning(f"Dropping cluster connection: {e}")
+        finally:
+            if worker:
+                self._drop_worker(worker, "disconnected")
+            writer.close()
+
+    def _register(self, message: Dict[str, Any], writer: asyncio.StreamWriter) -> Dict[str, Any]:
+        worker_id = str(message.get("worker_id") or uuid.uuid4().hex[:12])
+        previous = self.workers.get(worker_id)
+        if previous:
+            # A worker reconnecting under its old id: its earlier connection is stale
+            previous["writer"].close()
+            self._drop_worker(previous, "replaced")
+        worker = {
+            "worker_id": worker_id,
+            "host": (writer.get_extra_info("peername") or ("?",))[0],
+            "cores": max(1, int(message.get("cores", 1))),
+            "slots": max(1, int(message.get("slots", 1))),
+            "encoders": set(message.get("encoders", [])),
+            "shared_storage": bool(message.get("shared_storage", True)),
+            "pulls": 0,
+            "jobs": set(),
+            "last_seen": time.monotonic(),
+            "writer": writer,
+        }
+        self.workers[worker_id] = worker
+        self.stats["workers_registered"] += 1
+        logger.info(f"Cluster worker {worker_id} registered: {worker['cores']} cores, {worker['slots']} slots")
+        return worker
+
+    def _on_message(self, worker: Dict[str, Any], message: Dict[str, Any]) -> None:
+        kind = message.get("type")
+        if kind == "heartbeat":
+            return
+        if kind == "pull":
+            worker["pulls"] = min(worker["slots"], worker["pulls"] + 1)
+            self._dispatch()
+            return
+        # The rest concern a job this worker holds; reports about reassigned jobs are dropped
+        job = self.jobs.get(message.get("job_id"))
+        if job is None or job["worker_id"] != worker["worker_id"]:
+            return
+        if kind == "progress":
+            if job["on_progress"]:
+                job["on_progress"](message["progress"])
+        elif kind == "fetch":
+            task = asyncio.create_task(self._send_input(worker, job, int(message["offset"])))
+            self._input_tasks.add(task)
+            task.add_done_callback(self._input_tasks.discard)
+        elif kind == "chunk":
+            self._write_chunk(job, message["offset"], base64.b64decode(message["data"]))
+        elif kind == "result":
+            worker["jobs"].discard(job["job_id"])
+            self._complete(job, worker, message["result"])
+
+    def _dispatch(self) -> None:
+        """
+        Places pending jobs in order on workers with a free pull and the required
+        encoders, preferring the most cores per slot.
+        """
+        for job in list(self.pending):
+            candidates = [
+                worker for worker in self.workers.values()
+                if worker["pulls"] > 0 and job["required"] <= worker["encoders"]
+            ]
+            if not candidates:
+                continue
+            worker = max(candidates, key=lambda w: (w["cores"] / w["slots"], w["pulls"]))
+            self.pending.remove(job)
+            worker["pulls"] -= 1
+            worker["jobs"].add(job["job_id"])
+            job["worker_id"] = worker["worker_id"]
+            job["attempts"] += 1
+            job["attempt_path"] = _attempt_path(Path(job["spec"]["output"]), job["job_id"], job["attempts"])
+            self.stats["dispatched"] += 1
+            self._post(worker, {
+                "type": "job",
+                "job_id": job["job_id"],
+                **job["spec"],
+                "output": str(job["attempt_path"]),
+                "transfer": not worker["shared_storage"],
+            })
+
+    async def _send_input(self, worker: Dict[str, Any], job: Dict[str, Any], offset: int) -> None:
+        """
+        Answers a worker's fetch with the input chunk at `offset`. Workers ask for one
+        chunk at a time, so at most one chunk per job is buffered here.
+        """
+        reply = {"type": "input", "job_id": job["job_id"], "offset": offset}
+        try:
+            data = await asyncio.get_running_loop().run_in_executor(None, _read_chunk, job["spec"]["input"], offset)
+        except OSError as e:
+            reply["error"] = str(e)
+        else:
+            reply.update(data=base64.b64encode(data).decode(), eof=len(data) < TRANSFER_CHUNK_BYTES)
+        self._post(worker, reply)
+
+    def _write_chunk(self, job: Dict[str, Any], offset: int, data: bytes) -> None:
+        # Chunks arrive in order on one connection, so each must start where the last ended;
+        # anything else would let a worker seek the write far past the data it sent
+        if offset != job["received"]:
+            raise ValueError(f"chunk for job {job['job_id']} at offset {offset}, expected {job['received']}")
+        if job["transfer"] is None:
+            job["transfer"] = open(job["attempt_path"], "wb")
+        transfer: BinaryIO = job["transfer"]
+        transfer.write(data)
+        job["received"] += len(data)
+
+    def _complete(self, job: Dict[str, Any], worker: Dict[str, Any], result: Dict[str, Any]) -> None:
+        if job["transfer"] is not None:
+            job["transfer"].close()
+            job["transfer"] = None
+        run = {
+            "returncode": result["returncode"],
+            "stdout": b"",
+            "stderr": result.get("stderr", "").encode(),
+            "stalled": result.get("stalled", False),
+            "progress": result.get("progress", {}),
+            "resource_usage": {
+                **result.get("resource_usage", {}),
+                "worker_id": worker["worker_id"],
+                "attempts": job["attempts"],
+            },
+            "command": result.get("command"),
+        }
+        if run["returncode"] == 0:
+            try:
+                os.replace(job["attempt_path"], job["spec"]["output"])
+            except OSError as e:
+                run.update(returncode=1, stderr=f"Worker output is missing: {e}".encode())
+        else:
+            self._abandon_attempt(job)
+        self._finish(job, run)
+
+    def _finish(self, job: Dict[str, Any], run: Dict[str, Any]) -> None:
+        if job["transfer"] is not None:
+            job["transfer"].close()
+            job["transfer"] = None
+        if job in self.pending:
+            self.pending.remove(job)
+        if not job["future"].done():
+            self.stats["completed" if run["returncode"] == 0 else "failed"] += 1
+            job["future"].set_result(run)
+
+    def _abandon_attempt(self, job: Dict[str, Any]) -> None:
+        job["received"] = 0
+        if job["transfer"] is not None:
+            job["transfer"].close()
+            job["transfer"] = None
+        if job["attempt_path"] is not None:
+            Path(job["attempt_path"]).unlink(missing_ok=True)
+
+    def _drop_worker(self, worker: Dict[str, Any], reason: str) -> None:
+        """Forgets a worker and hands its jobs to the others, or fails them after MAX_ATTEMPTS."""
+        if self.workers.get(worker["worker_id"]) is not worker:
+            return
+        del self.workers[worker["worker_id"]]
+        self.stats["workers_lost"] += 1
+        logger.warning(f"Cluster worker {worker['worker_id']} {reason}; {len(worker['jobs'])} jobs to reassign")
+        for job_id in sorted(worker["jobs"]):
+            job = self.jobs.get(job_id)
+            if job is None:
+                continue
+            self._abandon_attempt(job)
+            job["worker_id"] = None
+            if job["attempts"] >= self.max_attempts:
+                self._finish(job, _failed_run(
+                    f"Job lost with {job['attempts']} workers ({reason}); giving up"
+                ))
+            else:
+                self.stats["reassigned"] += 1
+                self.pending.insert(0, job)
+        worker["jobs"].clear()
+        # Jobs no remaining worker can run would otherwise wait forever
+        for job in list(self.pending):
+            if not self.can_place(job["required"]):
+                self._finish(job, _failed_run(f"No cluster worker has the encoders {sorted(job['required'])}"))
+        self._dispatch()
+
+    def _post(self, worker: Dict[str, Any], message: Dict[str, Any]) -> None:
+        try:
+            worker["writer"].write(_encode_message(message))
+        except (ConnectionError, RuntimeError):
+            pass
+
+    async def _monitor(self) -> None:
+        """Drops workers whose heartbeats stopped, e.g. a hung or partitioned process."""
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds / 2)
+            deadline = time.monotonic() - self.heartbeat_seconds * MISSED_HEARTBEATS
+            for worker in list(self.workers.values()):
+                if worker["last_seen"] < deadline:
+                    worker["writer"].close()
+                    self._drop_worker(worker, "missed its heartbeats")
+
+
+async def start_coordinator(host: Optional[str] = None, port: Optional[int] = None) -> Optional[Coordinator]:
+    """
+    Starts the process's coordinator on the running loop, once. Returns None when
+    cluster mode is off (no MCP_CLUSTER_PORT and no port given, or no MCP_CLUSTER_TOKEN).
+    """
+    global _COORDINATOR
+    if _COORDINATOR is not None and _COORDINATOR.loop is asyncio.get_running_loop():
+        return _COORDINATOR
+    port = port if port is not None else CLUSTER_PORT
+    if port is None:
+        return None
+    if not CLUSTER_TOKEN:
+        logger.error("MCP_CLUSTER_PORT is set but MCP_CLUSTER_TOKEN is not; cluster mode stays off")
+        return None
+    coordinator = Coordinator()
+    await coordinator.start(host or CLUSTER_HOST, port)
+    _COORDINATOR = coordinator
+    return coordinator
+
+
+def get_coordinator() -> Optional[Coordinator]:
+    return _COORDINATOR
+
+
+def cluster_can_place(output_format: str, encoding_args: List[str]) -> bool:
+    """True when cluster mode is on and a connected worker can run this conversion."""
+    return _COORDINATOR is not None and _COORDINATOR.can_place(required_encoders(output_format, encoding_args))
+
+
+def get_cluster_status() -> Optional[Dict[str, Any]]:
+    return _COORDINATOR.status() if _COORDINATOR is not None else None
+
+
+class ClusterEngine(ConversionEngine):
+    """Hands the FFmpeg run to a worker agent through the coordinator."""
+
+    name = "cluster"
+
+    async def run(self, input_path, output_path, output_format, encoding_args, policy, video=None, on_progress=None):
+        if _COORDINATOR is None:
+            return _failed_run("Cluster mode is not running")
+        spec = {
+            "input": str(input_path),
+            "output": str(output_path),
+            "output_format": output_format,
+            "encoding_args": encoding_args,
+            "policy": policy,
+            "video": video,
+        }
+        return await _COORDINATOR.submit(spec, required_encoders(output_format, encoding_args), on_progress)
+
+
+CLUSTER_ENGINE = ClusterEngine()
+
+
+class WorkerAgent:
+    """
+    A worker process: runs the jobs the coordinator hands it with the local
+    subprocess engine, one per job slot.
+    """
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        encoders: Optional[List[str]] = None,
+        shared_storage: bool = WORKER_SHARED_STORAGE,
+        scratch_dir: Optional[str] = WORKER_SCRATCH_DIR,
+        slots: int = MAX_CONCURRENT_JOBS,
+        token: Optional[str] = CLUSTER_TOKEN
+    ):
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.token = token
+        self.encoders = detect_encoders() if encoders is None else list(encoders)
+        self.shared_storage = shared_storage
+        self.scratch_dir = scratch_dir
+        self.slots = slots
+        self.tasks: Dict[str, asyncio.Task] = {}
+        # job_id -> replies to the fetches of a job whose input is being streamed in
+        self.inputs: Dict[str, asyncio.Queue] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def serve(self, host: str, port: int) -> None:
+        """Registers with the coordinator and runs jobs until the connection ends."""
+        reader, self._writer = await asyncio.open_connection(host, port, limit=STREAM_LIMIT)
+        heartbeat_task = None
+        try:
+            await self._send({
+                "type": "register",
+                "token": self.token,
+                "worker_id": self.worker_id,
+                "cores": CPU_COUNT,
+                "slots": self.slots,
+                "encoders": self.encoders,
+                "shared_storage": self.shared_storage,
+            })
+            registered = await _read_message(reader)
+            if not registered or registered.get("type") != "registered":
+                reason = (registered or {}).get("error", "no reply")
+                raise ConnectionError(f"Coordinator refused the registration: {reason}")
+            logger.info(f"Registered with coordinator {host}:{port} as {self.worker_id}")
+            heartbeat_task = asyncio.create_task(self._heartbeat(registered["heartbeat_seconds"]))
+            for _ in range(self.slots):
+                await self._send({"type": "pull"})
+            while True:
+                message = await _read_message(reader)
+                if message is None:
+                    break
+                if message["type"] == "job":
+                    self.tasks[message["job_id"]] = asyncio.create_task(self._run_job(message))
+                elif message["type"] == "input" and message["job_id"] in self.inputs:
+                    self.inputs[message["job_id"]].put_nowait(message)
+                elif message["type"] == "cancel" and message["job_id"] in self.tasks:
+                    self.tasks[message["job_id"]].cancel()
+        finally:
+            # Without a coordinator nobody wants the results; stop the FFmpeg processes
+            for task in list(self.tasks.values()):
+                task.cancel()
+            await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+            if heartbeat_task:
+                heartbeat_task.cancel()
+            self._writer.close()
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        self._writer.write(_encode_message(message))
+        await self._writer.drain()
+
+    async def _heartbeat(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self._send({"type": "heartbeat", "running": len(self.tasks)})
+
+    async def _run_job(self, message: Dict[str, Any]) -> None:
+        job_id = message["job_id"]
+        # Without shared storage the input is streamed into scratch and the output streamed back
+        scratch = Path(tempfile.mkdtemp(prefix="mcp-worker-", dir=self.scratch_dir)) if message["transfer"] else None
+        output_path = scratch / Path(message["output"]).name if scratch else Path(message["output"])
+        input_path = scratch / f"input{Path(message['input']).suffix}" if scratch else Path(message["input"])
+
+        def on_progress(progress: Dict[str, str]) -> None:
+            self._writer.write(_encode_message({"type": "progress", "job_id": job_id, "progress": progress}))
+
+        try:
+            error = await self._fetch_input(job_id, input_path) if scratch else None
+            if error:
+                run = _failed_run(error)
+            else:
+                try:
+                    run = await SUBPROCESS_ENGINE.run(
+                        input_path, output_path, message["output_format"], message["encoding_args"],
+                        message["policy"], message.get("video"), on_progress=on_progress
+                    )
+                except FileNotFoundError:
+                    run = _failed_run(f"FFmpeg not found on worker {self.worker_id}")
+            if scratch and run["returncode"] == 0:
+                await self._send_file(job_id, output_path)
+            await self._send({
+                "type": "result",
+                "job_id": job_id,
+                "result": {
+                    "returncode": run["returncode"],
+                    "stderr": run["stderr"].decode(errors="replace"),
+                    "stalled": run["stalled"],
+                    "progress": run.get("progress", {}),
+                    "resource_usage": run["resource_usage"],
+                    "command": run.get("command"),
+                },
+            })
+        except (ConnectionError, OSError) as e:
+            logger.warning(f"Job {job_id} could not be reported: {e}")
+        finally:
+            self.tasks.pop(job_id, None)
+            if scratch:
+                shutil.rmtree(scratch, ignore_errors=True)
+            if not self._writer.is_closing():
+                self._writer.write(_encode_message({"type": "pull"}))
+
+    async def _fetch_input(self, job_id: str, path: Path) -> Optional[str]:
+        """Copies a job's input from the coordinator chunk by chunk; returns an error or None."""
+        replies = self.inputs[job_id] = asyncio.Queue()
+        try:
+            with open(path, "wb") as f:
+                while True:
+                    await self._send({"type": "fetch", "job_id": job_id, "offset": f.tell()})
+                    reply = await replies.get()
+                    if "error" in reply:
+                        return f"Coordinator could not read the input: {reply['error']}"
+                    f.write(base64.b64decode(reply["data"]))
+                    if reply["eof"]:
+                        return None
+        finally:
+            self.inputs.pop(job_id, None)
+
+    async def _send_file(self, job_id: str, path: Path) -> None:
+        """Streams an output back in chunks; the final chunk is short, possibly empty."""
+        offset = 0
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(TRANSFER_CHUNK_BYTES)
+                await self._send({
+                    "type": "chunk",
+                    "job_id": job_id,
+                    "offset": offset,
+                    "data": base64.b64encode(data).decode(),
+                })
+                offset += len(data)
+                if len(data) < TRANSFER_CHUNK_BYTES:
+                    return
+
+
+async def run_worker(host: str, port: int, agent: WorkerAgent, reconnect: bool = True) -> None:
+    """Keeps a worker agent connected, re-registering after the coordinator restarts."""
+    while True:
+        try:
+            await agent.serve(host, port)
+            logger.warning("Coordinator closed the connection")
+        except (ConnectionError, OSError, ValueError) as e:
+            logger.warning(f"Coordinator {host}:{port} unavailable: {e}")
+        if not reconnect:
+            return
+        await asyncio.sleep(RECONNECT_SECONDS)
+
+
+def worker_main() -> None:
+    """Entry point for a worker agent (mcp-video-worker)."""
+    parser = argparse.ArgumentParser(
+        description="Run a conversion worker for a cluster-mode MCP video server. "
+                    "The coordinator's shared token is read from MCP_CLUSTER_TOKEN."
+    )
+    parser.add_argument(
+        "--coordinator",
+        default=os.environ.get("MCP_CLUSTER_COORDINATOR", f"{CLUSTER_HOST}:{CLUSTER_PORT or 8765}"),
+        help="Coordinator address as HOST:PORT (default MCP_CLUSTER_COORDINATOR)"
+    )
+    parser.add_argument("--worker-id", help="Stable worker name (default hostname-pid)")
+    parser.add_argument("--slots", type=int, default=MAX_CONCURRENT_JOBS, help="Concurrent jobs on this worker")
+    parser.add_argument("--encoders", help="Comma-separated encoders to advertise instead of probing ffmpeg")
+    parser.add_argument(
+        "--no-shared-storage", action="store_true",
+        help="Stream inputs from and outputs back to the coordinator instead of using shared storage"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    host, _, port = args.coordinator.rpartition(":")
+    agent = WorkerAgent(
+        worker_id=args.worker_id,
+        encoders=args.encoders.split(",") if args.encoders else None,
+        shared_storage=WORKER_SHARED_STORAGE and not args.no_shared_storage,
+        slots=max(1, args.slots)
+    )
+
+    async def main() -> None:
+        task = asyncio.create_task(run_worker(host or CLUSTER_HOST, int(port), agent))
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, task.cancel)
+            except NotImplementedError:
+                pass
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    worker_main()
@@ -0,0 +1,214 @@
+import asyncio
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from .encoding import build_encoding_args
+from .probe import get_stream
+from .resources import get_resource_policy, job_slot, make_policy_applier
+from .supervisor import run_supervised
+
+# Output format -> (video codec, audio codec) that normalized inputs are encoded to,
+# as (FFmpeg encoder, codec name reported by ffprobe)
+CONCAT_PROFILES = {
+    "mp4": (("libx264", "h264"), ("aac", "aac")),
+    "mov": (("libx264", "h264"), ("aac", "aac")),
+    "mkv": (("libx264", "h264"), ("aac", "aac")),
+    "webm": (("libvpx-vp9", "vp9"), ("libopus", "opus")),
+}
+# Stream properties that must match for the concat demuxer to join inputs by stream copy
+SIGNATURE_FIELDS = (
+    "video_codec", "width", "height", "pix_fmt", "frame_rate", "time_base",
+    "audio_codec", "sample_rate", "channels",
+)
+
+
+def stream_signature(probe: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns the properties of an input's first video and audio streams that joining depends on."""
+    video = get_stream(probe, "video") or {}
+    audio = get_stream(probe, "audio") or {}
+    return {
+        "video_codec": video.get("codec_name"),
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "pix_fmt": video.get("pix_fmt"),
+        "frame_rate": video.get("r_frame_rate"),
+        "time_base": video.get("time_base"),
+        "audio_codec": audio.get("codec_name"),
+        "sample_rate": audio.get("sample_rate"),
+        "channels": audio.get("channels"),
+    }
+
+
+def plan_concat(signatures: List[Dict[str, Any]], output_format: str) -> Tuple[Dict[str, Any], Dict[int, List[str]]]:
+    """
+    Picks the profile all inputs are joined in and which inputs must be normalized to it.
+
+    The reference is the first input already in the output format's codecs; every input
+    that differs from it in any SIGNATURE_FIELDS is normalized. When any input has
+    audio, only an input with audio can be the reference, so silent inputs get silence
+    added rather than every input losing its audio. Without such an input the
+    reference takes the first input's geometry and frame rate, the first audio
+    input's layout and the format's codecs, and all inputs are normalized.
+
+    Returns:
+        The reference signature and, for each input to normalize, the differing fields.
+    """
+    (_, video_codec), (_, audio_codec) = CONCAT_PROFILES[output_format]
+    with_audio = [signature for signature in signatures if signature["audio_codec"]]
+    reference = next(
+        (
+            signature for signature in with_audio or signatures
+            if signature["video_codec"] == video_codec and signature["audio_codec"] in (audio_codec, None)
+        ),
+        None,
+    )
+    if reference is not None:
+        mismatches = {}
+        for i, signature in enumerate(signatures):
+            fields = [f for f in SIGNATURE_FIELDS if signature[f] != reference[f]]
+            if fields:
+                mismatches[i] = fields
+        return reference, mismatches
+    audio_source = with_audio[0] if with_audio else {}
+    reference = dict(
+        signatures[0], video_codec=video_codec, pix_fmt="yuv420p", time_base=None,
+        audio_codec=audio_codec if with_audio else None,
+        sample_rate=audio_source.get("sample_rate"), channels=audio_source.get("channels"),
+    )
+    if with_audio and audio_codec == "opus":
+        # libopus only encodes at 48 kHz and a few lower rates
+        reference["sample_rate"] = "48000"
+    # No input has the reference's timestamps, so every input is re-encoded
+    return reference, {
+        i: [f for f in SIGNATURE_FIELDS if f != "time_base" and signature[f] != reference[f]] or ["time_base"]
+        for i, signature in enumerate(signatures)
+    }
+
+
+def build_normalize_command(
+    input_path: Path,
+    output_path: Path,
+    reference: Dict[str, Any],
+    output_format: str,
+    has_audio: bool,
+    quality: Optional[str] = None
+) -> List[str]:
+    """
+    Builds the command that re-encodes one input to the reference profile: same frame
+    size (letterboxed to keep the aspect ratio), pixel format, frame rate, codecs and
+    audio layout. Inputs without audio get silence when the reference has audio.
+    """
+    (video_encoder, _), (audio_encoder, _) = CONCAT_PROFILES[output_format]
+    width, height = reference["width"], reference["height"]
+    command = ["ffmpeg", "-y", "-i", str(input_path)]
+    needs_silence = reference["audio_codec"] and not has_audio
+    if needs_silence:
+        layout = "mono" if reference["channels"] == 1 else "stereo"
+        command += ["-f", "lavfi", "-i", f"anullsrc=r={reference['sample_rate']}:cl={layout}"]
+    video_filters = [
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease",
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2",
+        "setsar=1",
+    ]
+    if reference["frame_rate"]:
+        video_filters.append(f"fps={reference['frame_rate']}")
+    command += ["-map", "0:v:0", "-vf", ",".join(video_filters), "-pix_fmt", reference["pix_fmt"] or "yuv420p"]
+    command += ["-c:v", video_encoder]
+    command += build_encoding_args(output_format, quality or "high")
+    if reference["audio_codec"]:
+        command += ["-map", "1:a:0" if needs_silence else "0:a:0", "-c:a", audio_encoder]
+        command += ["-ar", str(reference["sample_rate"]), "-ac", str(reference["channels"])]
+        if needs_silence:
+            command.append("-shortest")
+    else:
+        command.append("-an")
+    time_base = reference.get("time_base") or ""
+    if output_format in ("mp4", "mov") and "/" in time_base:
+        # Match the reference's track timescale so joined timestamps stay exact
+        command += ["-video_track_timescale", time_base.split("/")[1]]
+    command.append(str(output_path))
+    return command
+
+
+def write_concat_list(list_path: Path, parts: List[Path]) -> None:
+    lines = ["ffconcat version 1.0"]
+    for part in parts:
+        escaped = str(part).replace("'", "'\\''")
+        lines.append(f"file '{escaped}'")
+    list_path.write_text("\n".join(lines) + "\n")
+
+
+async def concat_media(
+    inputs: List[Path],
+    signatures: List[Dict[str, Any]],
+    output_path: Path,
+    output_format: str,
+    quality: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Joins inputs into output_path by stream copy, normalizing incompatible inputs first.
+
+    Normalizations run concurrently, each in its own job slot, so their number in
+    flight is bounded by MCP_MAX_CONCURRENT_JOBS. The join itself reads and writes
+    the streams without decoding.
+
+    Returns:
+        A dictionary with 'success', the 'normalized' inputs and why, and the
+        'normalize_seconds' and 'join_seconds' phase timings.
+    """
+    reference, mismatches = plan_concat(signatures, output_format)
+    work_dir = output_path.parent / f"{output_path.stem}_parts"
+    work_dir.mkdir(parents=True, exist_ok=True)
+    policy = get_resource_policy(quality)
+    parts = list(inputs)
+
+    async def normalize(i: int) -> Dict[str, Any]:
+        part = work_dir / f"part_{i:04d}.{output_format}"
+        command = build_normalize_command(
+            inputs[i], part, reference, output_format, signatures[i]["audio_codec"] is not None, quality
+        )
+        async with job_slot(policy) as slot:
+            command[-1:-1] = ["-threads", str(slot["threads"])]
+            run = await run_supervised(command, apply_policy=make_policy_applier(policy, slot["cpus"]))
+        parts[i] = part
+        return {"index": i, "run": run, "command": command}
+
+    try:
+        started = time.monotonic()
+        runs = await asyncio.gather(*(normalize(i) for i in sorted(mismatches)))
+        normalize_seconds = time.monotonic() - started
+        for item in runs:
+            run = item["run"]
+            if run["stalled"] or run["returncode"] != 0:
+                error = "stalled" if run["stalled"] else run["stderr"].decode(errors="replace").strip()
+                return {
+                    "success": False,
+                    "error": f"Normalizing {inputs[item['index']]} failed: {error}",
+                    "command": " ".join(item["command"]),
+                }
+
+        started = time.monotonic()
+        list_path = work_dir / "inputs.ffconcat"
+        write_concat_list(list_path, parts)
+        command = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", str(list_path), "-map", "0", "-c", "copy"]
+        if output_format in ("mp4", "mov"):
+            command += ["-movflags", "+faststart"]
+        command.append(str(output_path))
+        join = await run_supervised(command)
+        join_seconds = time.monotonic() - started
+        if join["stalled"] or join["returncode"] != 0:
+            error = "stalled" if join["stalled"] else join["stderr"].decode(errors="replace").strip()
+            return {"success": False, "error": f"Joining inputs failed: {error}", "command": " ".join(command)}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "success": True,
+        "output_file_path": str(output_path),
+        "normalized": [{"input_file_path": str(inputs[i]), "differs_in": fields} for i, fields in sorted(mismatches.items())],
+        "stream_copied": [str(inputs[i]) for i in range(len(inputs)) if i not in mismatches],
+        "normalize_seconds": round(normalize_seconds, 3),
+        "join_seconds": round(join_seconds, 3),
+    }
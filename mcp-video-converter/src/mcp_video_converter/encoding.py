@@ -0,0 +1,48 @@
+from typing import List, Optional
+
+# Output formats whose default video encoders accept -crf
+CRF_VIDEO_FORMATS = ["mp4", "mkv", "webm", "mov"]
+# Output formats whose audio encoders take a target bitrate
+BITRATE_AUDIO_FORMATS = ["mp3", "ogg", "m4a"]
+# Output formats that honour an explicit output framerate
+FRAMERATE_FORMATS = ["mp4", "mkv", "webm", "mov", "avi", "flv"]
+
+QUALITY_CRF = {"high": "18", "medium": "23", "low": "28"}
+QUALITY_AUDIO_BITRATE = {"high": "320k", "medium": "192k", "low": "128k"}
+
+def build_encoding_args(
+    output_format: str,
+    quality: Optional[str] = None,
+    framerate: Optional[int] = None,
+    crf: Optional[int] = None
+) -> List[str]:
+    """
+    Builds the FFmpeg encoding arguments for an output format and quality preset.
+
+    Args:
+        output_format: The lowercase output format (e.g., "mp4").
+        quality: Optional quality setting ("low", "medium", "high").
+        framerate: Optional framerate for video output.
+        crf: Optional explicit CRF value; overrides the quality preset for video formats.
+
+    Returns:
+        A list of FFmpeg arguments to place between the inputs and the output path.
+    """
+    args: List[str] = []
+
+    if crf is not None and output_format in CRF_VIDEO_FORMATS:
+        args.extend(["-crf", str(crf)])
+        if output_format == "webm":
+            # libvpx-vp9 only runs in constant quality mode with a zero bitrate target
+            args.extend(["-b:v", "0"])
+    elif quality in QUALITY_CRF:
+        # Lower CRF means higher quality; higher audio bitrate means higher quality
+        if output_format in CRF_VIDEO_FORMATS:
+            args.extend(["-crf", QUALITY_CRF[quality]])
+        elif output_format in BITRATE_AUDIO_FORMATS:
+            args.extend(["-b:a", QUALITY_AUDIO_BITRATE[quality]])
+
+    if framerate and output_format in FRAMERATE_FORMATS:
+        args.extend(["-r", str(framerate)])
+
+    return args
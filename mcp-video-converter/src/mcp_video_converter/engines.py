@@ -0,0 +1,277 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional
+
+try:
+    import av
+except ImportError:  # PyAV is optional; everything falls back to the FFmpeg subprocess
+    av = None
+
+from .resources import MAX_CONCURRENT_JOBS, job_slot, make_policy_applier
+from .supervisor import run_supervised
+from .tuning import tuned_encoder_args
+
+logger = logging.getLogger(__name__)
+
+# Inputs up to this size are cheap enough to convert in-process when PyAV is available
+INPROCESS_MAX_BYTES = int(os.environ.get("MCP_INPROCESS_MAX_BYTES", str(4 * 1024 * 1024)))
+# "auto" routes by estimated cost; "subprocess" or "pyav" forces one engine
+ENGINE_MODE = os.environ.get("MCP_ENGINE", "auto").lower()
+
+# Output formats the in-process engine handles, with the encoders the ffmpeg CLI picks
+# for them by default so both engines produce the same streams
+PYAV_CODECS = {
+    "mp4": {"video": "libx264", "audio": "aac"},
+    "mov": {"video": "libx264", "audio": "aac"},
+    "webm": {"video": "libvpx-vp9", "audio": "libopus"},
+    "png": {"video": "png", "audio": None},
+    "jpg": {"video": "mjpeg", "audio": None},
+    "webp": {"video": "libwebp", "audio": None},
+    "bmp": {"video": "bmp", "audio": None},
+    "tiff": {"video": "tiff", "audio": None},
+}
+STILL_IMAGE_FORMATS = ["png", "jpg", "webp", "bmp", "tiff"]
+# Encoding arguments the in-process engine can reproduce
+PYAV_FLAGS = ["-crf", "-b:v", "-b:a"]
+
+# In-process encodes share the job slots with subprocess ones; this pool only runs them
+_INPROCESS_POOL = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_JOBS, thread_name_prefix="mcp-pyav")
+
+
+def build_ffmpeg_command(input_path: Path, encoding_args: List[str], output_path: Path) -> List[str]:
+    """Builds the ffmpeg CLI command for a single-input conversion."""
+    return ["ffmpeg", "-y", "-i", str(input_path), *encoding_args, str(output_path)]
+
+
+def pyav_options(encoding_args: List[str]) -> Dict[str, Any]:
+    """
+    Translates the CLI encoding arguments from build_encoding_args into PyAV settings,
+    so both engines encode from the same profile.
+
+    Returns:
+        A dictionary with 'video_options' and 'audio_options' (codec private options),
+        'video_bit_rate', 'audio_bit_rate' and 'framerate'.
+    """
+    settings: Dict[str, Any] = {
+        "video_options": {},
+        "audio_options": {},
+        "video_bit_rate": None,
+        "audio_bit_rate": None,
+        "framerate": None,
+    }
+    pairs = zip(encoding_args[::2], encoding_args[1::2])
+    for flag, value in pairs:
+        if flag == "-crf":
+            settings["video_options"]["crf"] = value
+        elif flag == "-b:v":
+            settings["video_bit_rate"] = _parse_bitrate(value)
+        elif flag == "-b:a":
+            settings["audio_bit_rate"] = _parse_bitrate(value)
+        elif flag == "-r":
+            settings["framerate"] = int(value)
+        else:
+            raise ValueError(f"Encoding argument not supported in-process: {flag}")
+    return settings
+
+
+def nearest_sample_rate(rate: Optional[int], supported: Optional[List[int]]) -> int:
+    """
+    Picks the output sample rate for an audio encoder: the input rate when the encoder
+    accepts it, else the closest rate it does (libopus only takes 48/24/16/12/8 kHz).
+    """
+    rate = rate or 48000
+    if not supported or rate in supported:
+        return rate
+    return min(supported, key=lambda candidate: (abs(candidate - rate), -candidate))
+
+
+def _parse_bitrate(value: str) -> int:
+    multipliers = {"k": 1000, "m": 1000 * 1000}
+    suffix = value[-1].lower()
+    if suffix in multipliers:
+        return int(float(value[:-1]) * multipliers[suffix])
+    return int(value)
+
+
+class ConversionEngine:
+    """
+    Runs one conversion. run() returns the same shape as run_supervised:
+    'returncode', 'stderr', 'stalled' and 'resource_usage'.
+    """
+
+    name = "base"
+
+    async def run(
+        self,
+        input_path: Path,
+        output_path: Path,
+        output_format: str,
+        encoding_args: List[str],
+        policy: Dict[str, Any],
+        video: Optional[Dict[str, Any]] = None,
+        on_progress: Optional[Callable[[Dict[str, str]], Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Args:
+            video: Optional probed 'width', 'height' and 'fps' of the input, used to
+                tune encoder parallelism.
+            on_progress: Optional callback with FFmpeg progress blocks while running.
+        """
+        raise NotImplementedError
+
+
+class SubprocessEngine(ConversionEngine):
+    """Spawns the ffmpeg CLI under the supervisor and the job's resource policy."""
+
+    name = "subprocess"
+
+    async def run(self, input_path, output_path, output_format, encoding_args, policy, video=None, on_progress=None):
+        command = build_ffmpeg_command(input_path, encoding_args, output_path)
+        async with job_slot(policy) as slot:
+            # Cap encoder threads at this job's share of the cores and size the
+            # encoder's own parallelism (tiles, row-mt, frame threads) to match
+            tuning = tuned_encoder_args(
+                output_format, video["width"], video["height"], slot["threads"], video.get("fps")
+            ) if video else []
+            command[-1:-1] = ["-threads", str(slot["threads"]), *tuning]
+            run = await run_supervised(
+                command, apply_policy=make_policy_applier(policy, slot["cpus"]), on_progress=on_progress
+            )
+            run["resource_usage"].update({
+                "threads": slot["threads"],
+                "cpus": slot["cpus"],
+                "nice": policy.get("nice"),
+                "encoder_tuning": tuning,
+            })
+        run["command"] = " ".join(command)
+        return run
+
+
+class PyAVEngine(ConversionEngine):
+    """
+    Decodes and encodes in-process with PyAV on a thread pool, avoiding process
+    start-up for small jobs. Only handles the formats in PYAV_CODECS without a
+    framerate change.
+    """
+
+    name = "pyav"
+
+    async def run(self, input_path, output_path, output_format, encoding_args, policy, video=None, on_progress=None):
+        settings = pyav_options(encoding_args)
+        async with job_slot(policy) as slot:
+            loop = asyncio.get_running_loop()
+            started = time.monotonic()
+            try:
+                cpu_seconds = await loop.run_in_executor(
+                    _INPROCESS_POOL, _transcode, input_path, output_path, output_format, settings, slot["threads"]
+                )
+            except (av.error.FFmpegError, ValueError, OSError) as e:
+                error = e
+            else:
+                error = None
+        if error is not None:
+            # Anything the in-process path can't handle still converts on the CLI
+            logger.warning("In-process transcode of %s failed (%s); retrying with ffmpeg", input_path, error)
+            run = await SUBPROCESS_ENGINE.run(
+                input_path, output_path, output_format, encoding_args, policy, video, on_progress
+            )
+            run["resource_usage"]["fallback_from"] = self.name
+            run["resource_usage"]["fallback_reason"] = str(error)
+            return run
+        wall = time.monotonic() - started
+        return {
+            "returncode": 0,
+            "stdout": b"",
+            "stderr": b"",
+            "stalled": False,
+            "progress": {},
+            "resource_usage": {
+                "cpu_seconds": round(cpu_seconds, 2),
+                "wall_seconds": round(wall, 2),
+                "threads": slot["threads"],
+            },
+            "command": f"pyav: {input_path} -> {output_path}",
+        }
+
+
+def _transcode(input_path: Path, output_path: Path, output_format: str, settings: Dict[str, Any], threads: int) -> float:
+    """Blocking PyAV transcode run on the in-process pool; returns the thread's CPU time."""
+    cpu_started = time.thread_time()
+    codecs = PYAV_CODECS[output_format]
+    still = output_format in STILL_IMAGE_FORMATS
+    with av.open(str(input_path)) as source, av.open(str(output_path), "w", format="image2" if still else None) as target:
+        in_video = source.streams.video[0] if source.streams.video else None
+        in_audio = source.streams.audio[0] if source.streams.audio and codecs["audio"] else None
+        if in_video is None:
+            raise ValueError("Input has no video stream")
+
+        out_video = target.add_stream(codecs["video"], rate=in_video.average_rate or Fraction(25))
+        out_video.width = in_video.codec_context.width
+        out_video.height = in_video.codec_context.height
+        if still:
+            # Keep the source pixel format when the image encoder accepts it, as the CLI does
+            supported = [f.name for f in av.Codec(codecs["video"], "w").video_formats or []]
+            source_format = in_video.codec_context.pix_fmt
+            out_video.pix_fmt = source_format if source_format in supported or not supported else supported[0]
+        else:
+            out_video.pix_fmt = "yuv420p"
+            out_video.thread_count = threads
+        out_video.options = dict(settings["video_options"])
+        if settings["video_bit_rate"] is not None:
+            out_video.bit_rate = settings["video_bit_rate"]
+
+        out_audio = None
+        if in_audio is not None:
+            rate = nearest_sample_rate(in_audio.codec_context.sample_rate, av.Codec(codecs["audio"], "w").audio_rates)
+            out_audio = target.add_stream(codecs["audio"], rate=rate)
+            if settings["audio_bit_rate"]:
+                out_audio.bit_rate = settings["audio_bit_rate"]
+
+        streams = [s for s in (in_video, in_audio) if s is not None]
+        done = False
+        for packet in source.demux(*streams):
+            for frame in packet.decode():
+                if packet.stream is in_video:
+                    target.mux(out_video.encode(frame))
+                    # Still images keep only the first frame, like the CLI's image2 muxer
+                    done = still
+                else:
+                    frame.pts = None
+                    target.mux(out_audio.encode(frame))
+                if done:
+                    break
+            if done:
+                break
+
+        target.mux(out_video.encode())
+        if out_audio is not None:
+            target.mux(out_audio.encode())
+    return time.thread_time() - cpu_started
+
+
+SUBPROCESS_ENGINE = SubprocessEngine()
+PYAV_ENGINE = PyAVEngine()
+
+
+def select_engine(input_path: Path, output_format: str, encoding_args: List[str]) -> ConversionEngine:
+    """
+    Routes a job by estimated cost: small inputs in formats PyAV handles go to the
+    in-process engine, everything else to the FFmpeg subprocess.
+    """
+    if ENGINE_MODE == "subprocess" or av is None or output_format not in PYAV_CODECS:
+        return SUBPROCESS_ENGINE
+    if any(flag not in PYAV_FLAGS for flag in encoding_args[::2]):
+        # Framerate conversion and muxer options (fragmenting, faststart) stay on the CLI
+        return SUBPROCESS_ENGINE
+    if ENGINE_MODE == "pyav":
+        return PYAV_ENGINE
+    try:
+        size = input_path.stat().st_size
+    except OSError:
+        return SUBPROCESS_ENGINE
+    return PYAV_ENGINE if size <= INPROCESS_MAX_BYTES else SUBPROCESS_ENGINE
@@ -0,0 +1,153 @@
+import os
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from .encoding import build_encoding_args
+from .resources import get_resource_policy, job_slot, make_policy_applier
+from .supervisor import STALL_TIMEOUT_SECONDS, run_supervised
+
+# Seconds of media per output segment while following a growing input
+FOLLOW_SEGMENT_SECONDS = float(os.environ.get("MCP_FOLLOW_SEGMENT_SECONDS", "10"))
+# The writer is considered finished once the input has not grown for this long
+FOLLOW_IDLE_SECONDS = float(os.environ.get("MCP_FOLLOW_IDLE_SECONDS", "15"))
+
+# Input containers FFmpeg can demux while they are still being written
+FOLLOWABLE_CONTAINERS = ["webm", "matroska", "mpegts", "mpegps", "flv", "ogg"]
+# Output formats the segment muxer can write and concat can join by stream copy
+FOLLOW_OUTPUT_FORMATS = ["mp4", "mkv", "webm", "mov"]
+
+
+def read_segment_list(list_path: Path) -> List[str]:
+    """Returns the segment file names FFmpeg has completed, from its ffconcat list."""
+    try:
+        text = list_path.read_text()
+    except OSError:
+        return []
+    return [line[len("file "):].strip().strip("'") for line in text.splitlines() if line.startswith("file ")]
+
+
+def build_follow_command(
+    input_path: Path,
+    segment_dir: Path,
+    list_path: Path,
+    output_format: str,
+    encoding_args: List[str],
+    segment_seconds: float,
+    idle_seconds: float
+) -> List[str]:
+    """
+    Builds the FFmpeg command that tails a growing input and writes fixed-length segments.
+
+    The file protocol's follow mode keeps reading past the current end of file;
+    rw_timeout ends the read once nothing new has arrived for idle_seconds. Keyframes
+    are forced on segment boundaries so every segment starts cleanly and the segments
+    can be joined later by stream copy.
+    """
+    return [
+        "ffmpeg", "-y",
+        "-follow", "1", "-rw_timeout", str(int(idle_seconds * 1_000_000)),
+        "-i", f"file:{input_path}",
+        *encoding_args,
+        "-force_key_frames", f"expr:gte(t,n_forced*{segment_seconds:g})",
+        "-f", "segment",
+        "-segment_time", f"{segment_seconds:g}",
+        "-segment_format", "matroska" if output_format == "mkv" else output_format,
+        "-segment_list", str(list_path),
+        "-segment_list_type", "ffconcat",
+        "-reset_timestamps", "0",
+        str(segment_dir / f"segment_%05d.{output_format}"),
+    ]
+
+
+async def follow_convert(
+    input_path: Path,
+    output_path: Path,
+    output_format: str,
+    quality: Optional[str] = None,
+    framerate: Optional[int] = None,
+    ctx: Optional[Any] = None,
+    segment_seconds: float = FOLLOW_SEGMENT_SECONDS,
+    idle_seconds: float = FOLLOW_IDLE_SECONDS
+) -> Dict[str, Any]:
+    """
+    Converts an input that is still being recorded.
+
+    One FFmpeg process follows the file as it grows, encoding newly appended media into
+    segments next to the output. When the writer stops (no growth for idle_seconds),
+    the segments are joined by stream copy into output_path, so the work left at the
+    end of a recording is the last segment plus a copy.
+
+    Returns:
+        A dictionary with 'success', 'output_file_path', the number of 'segments',
+        'segment_dir', and timings for the 'follow_seconds' and 'finalize_seconds' phases.
+    """
+    segment_dir = output_path.parent / f"{output_path.stem}_segments"
+    segment_dir.mkdir(parents=True, exist_ok=True)
+    list_path = segment_dir / "segments.ffconcat"
+    encoding_args = build_encoding_args(output_format, quality, framerate)
+    command = build_follow_command(
+        input_path, segment_dir, list_path, output_format, encoding_args, segment_seconds, idle_seconds
+    )
+    policy = get_resource_policy(quality)
+    reported = 0
+
+    async def on_progress(progress: Dict[str, str]) -> None:
+        nonlocal reported
+        completed = len(read_segment_list(list_path))
+        if ctx and completed != reported:
+            reported = completed
+            await ctx.info(f"Follow mode: {completed} segments encoded ({progress.get('out_time', '?')})")
+
+    started = time.monotonic()
+    async with job_slot(policy) as slot:
+        command[-1:-1] = ["-threads", str(slot["threads"])]
+        run = await run_supervised(
+            command,
+            apply_policy=make_policy_applier(policy, slot["cpus"]),
+            # Waiting for the recorder is not a stall; only outlast the idle timeout
+            stall_timeout=max(STALL_TIMEOUT_SECONDS, idle_seconds * 2),
+            on_progress=on_progress
+        )
+    follow_seconds = time.monotonic() - started
+    segments = read_segment_list(list_path)
+    if run["stalled"] or run["returncode"] != 0 or not segments:
+        error = run["stderr"].decode(errors="replace").strip() or "no segments were written"
+        return {
+            "success": False,
+            "error": f"Follow-mode encoding failed: {error}",
+            "command": " ".join(command),
+            "segments": len(segments),
+            "segment_dir": str(segment_dir),
+        }
+
+    # The writer is done: join the segments without re-encoding
+    started = time.monotonic()
+    concat_command = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", str(list_path), "-c", "copy", str(output_path)]
+    concat = await run_supervised(concat_command)
+    finalize_seconds = time.monotonic() - started
+    if concat["returncode"] != 0:
+        return {
+            "success": False,
+            "error": f"Joining segments failed: {concat['stderr'].decode(errors='replace').strip()}",
+            "command": " ".join(concat_command),
+            "segments": len(segments),
+            "segment_dir": str(segment_dir),
+        }
+
+    for name in segments:
+        (segment_dir / name).unlink(missing_ok=True)
+    list_path.unlink(missing_ok=True)
+    try:
+        segment_dir.rmdir()
+    except OSError:
+        pass
+    return {
+        "success": True,
+        "output_file_path": str(output_path),
+        "message": "Growing input followed and converted successfully.",
+        "segments": len(segments),
+        "follow_seconds": round(follow_seconds, 2),
+        "finalize_seconds": round(finalize_seconds, 2),
+        "resource_usage": run["resource_usage"],
+    }
@@ -0,0 +1,162 @@
+import ast
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from .resources import get_resource_policy, job_slot, make_policy_applier
+from .supervisor import run_supervised
+
+# Pixel formats FFmpeg can emit as packed uint8 frames -> channels per pixel
+FRAME_PIXEL_FORMATS = {"rgb24": 3, "gray": 1}
+FRAME_TARGETS = ["npy", "shm"]
+SHM_DIR = Path("/dev/shm")
+
+# The .npy header is written with a fixed size so the frame count can be filled
+# in after FFmpeg finishes without moving the data (NPY format 1.0, 64-byte aligned)
+NPY_HEADER_SIZE = 128
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+
+
+def npy_header(shape: Tuple[int, ...]) -> bytes:
+    """Returns a NPY_HEADER_SIZE-byte .npy v1.0 header for a C-ordered uint8 array."""
+    text = f"{{'descr': '|u1', 'fortran_order': False, 'shape': {shape}, }}"
+    padding = NPY_HEADER_SIZE - len(NPY_MAGIC) - 2 - len(text) - 1
+    if padding < 0:
+        raise ValueError(f"Shape {shape} does not fit in the .npy header")
+    text = text + " " * padding + "\n"
+    return NPY_MAGIC + len(text).to_bytes(2, "little") + text.encode("latin1")
+
+
+def read_npy_header(header: bytes) -> Dict[str, Any]:
+    """Parses a .npy v1.0 header as written by npy_header."""
+    if not header.startswith(NPY_MAGIC):
+        raise ValueError("Not a .npy v1.0 file")
+    length = int.from_bytes(header[8:10], "little")
+    return ast.literal_eval(header[10:10 + length].decode("latin1"))
+
+
+def display_size(stream: Dict[str, Any]) -> Tuple[int, int]:
+    """Returns a video stream's (width, height) after FFmpeg applies its rotation metadata."""
+    width, height = int(stream["width"]), int(stream["height"])
+    rotation = stream.get("tags", {}).get("rotate")
+    for side_data in stream.get("side_data_list", []):
+        rotation = side_data.get("rotation", rotation)
+    try:
+        if int(float(rotation or 0)) % 180:
+            return height, width
+    except ValueError:
+        pass
+    return width, height
+
+
+def output_size(source: Tuple[int, int], width: Optional[int] = None, height: Optional[int] = None) -> Tuple[int, int]:
+    """Resolves a requested resize against the source size; a missing side keeps the aspect ratio."""
+    src_w, src_h = source
+    if width and height:
+        return width, height
+    if width:
+        return width, max(2, round(src_h * width / src_w / 2) * 2)
+    if height:
+        return max(2, round(src_w * height / src_h / 2) * 2), height
+    return src_w, src_h
+
+
+def build_frames_command(
+    input_path: Path,
+    size: Tuple[int, int],
+    pixel_format: str,
+    fps: Optional[float] = None,
+    stride: Optional[int] = None,
+    max_frames: Optional[int] = None
+) -> List[str]:
+    """
+    Builds the FFmpeg command that samples, resizes and converts frames in one
+    filtergraph and writes them as packed raw frames to stdout.
+    """
+    filters = []
+    if fps:
+        filters.append(f"fps={fps:g}")
+    if stride and stride > 1:
+        filters.append(f"select=not(mod(n\\,{stride}))")
+    filters.append(f"scale={size[0]}:{size[1]}")
+    command = ["ffmpeg", "-y", "-i", str(input_path), "-an", "-sn", "-vf", ",".join(filters)]
+    if stride and stride > 1:
+        # Keep only the selected frames instead of duplicating to fill the gaps
+        command += ["-fps_mode", "passthrough"]
+    if max_frames:
+        command += ["-frames:v", str(max_frames)]
+    command += ["-pix_fmt", pixel_format, "-f", "rawvideo", "pipe:1"]
+    return command
+
+
+async def extract_frames_to(
+    input_path: Path,
+    target_path: Path,
+    source_size: Tuple[int, int],
+    pixel_format: str = "rgb24",
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fps: Optional[float] = None,
+    stride: Optional[int] = None,
+    max_frames: Optional[int] = None,
+    on_progress: Optional[Any] = None
+) -> Dict[str, Any]:
+    """
+    Streams raw frames from FFmpeg into a .npy file at target_path.
+
+    FFmpeg's stdout is the target file itself, positioned after the header, so frames
+    go from the decoder to the page cache without passing through Python and memory
+    stays bounded however long the input is. Once FFmpeg exits, the frame count is
+    written into the header. The result loads zero-copy with
+    numpy.load(path, mmap_mode="r"); in /dev/shm it is a POSIX shared-memory segment.
+
+    Returns:
+        A dictionary with 'success', 'frames', 'shape', 'dtype' and 'header_bytes'.
+    """
+    channels = FRAME_PIXEL_FORMATS[pixel_format]
+    frame_w, frame_h = output_size(source_size, width, height)
+    frame_shape = (frame_h, frame_w, channels) if channels > 1 else (frame_h, frame_w)
+    frame_bytes = frame_w * frame_h * channels
+    command = build_frames_command(input_path, (frame_w, frame_h), pixel_format, fps, stride, max_frames)
+    policy = get_resource_policy(None)
+
+    fd = os.open(target_path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        with os.fdopen(fd, "r+b") as target:
+            target.write(npy_header((0, *frame_shape)))
+            target.flush()
+            async with job_slot(policy) as slot:
+                command[-1:-1] = ["-threads", str(slot["threads"])]
+                run = await run_supervised(
+                    command, apply_policy=make_policy_applier(policy, slot["cpus"]), on_progress=on_progress, stdout=target
+                )
+            # A killed job can leave a partial frame at the end; keep whole frames only
+            data_bytes = os.fstat(target.fileno()).st_size - NPY_HEADER_SIZE
+            frames = max(0, data_bytes) // frame_bytes
+            target.truncate(NPY_HEADER_SIZE + frames * frame_bytes)
+            target.seek(0)
+            target.write(npy_header((frames, *frame_shape)))
+    except BaseException:
+        target_path.unlink(missing_ok=True)
+        raise
+
+    if run["stalled"] or run["returncode"] != 0:
+        target_path.unlink(missing_ok=True)
+        error = "stalled" if run["stalled"] else run["stderr"].decode(errors="replace").strip()
+        return {"success": False, "error": f"Frame extraction failed: {error}", "command": " ".join(command)}
+    return {
+        "success": True,
+        "frames": frames,
+        "shape": [frames, *frame_shape],
+        "dtype": "uint8",
+        "pixel_format": pixel_format,
+        "header_bytes": NPY_HEADER_SIZE,
+        "command": " ".join(command),
+        "resource_usage": run["resource_usage"],
+    }
+
+
+def new_shm_path() -> Path:
+    """Returns an unused /dev/shm path for a shared-memory frame segment."""
+    return SHM_DIR / f"mcp_frames_{uuid.uuid4().hex[:16]}"
@@ -0,0 +1,178 @@
+import json
+import logging
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from .encoding import BITRATE_AUDIO_FORMATS, CRF_VIDEO_FORMATS, QUALITY_AUDIO_BITRATE
+from .probe import get_duration, get_video_geometry
+from .tuning import resolution_bucket
+
+logger = logging.getLogger(__name__)
+
+HISTORY_FILE = os.path.expanduser(os.environ.get("MCP_HISTORY_FILE", "~/.mcp-video-converter/history.json"))
+
+# Two-sided ~90% interval on the log scale
+Z_SCORE = 1.645
+# How many completed jobs the prior is worth when blending it with history
+PRIOR_WEIGHT = 3
+# Log-scale spread assumed for the prior (roughly x/÷ 2.7 at 90%)
+PRIOR_LOG_SD = 0.6
+
+# Prior output bits per pixel per frame for CRF video at each quality preset
+PRIOR_BITS_PER_PIXEL = {"high": 0.15, "medium": 0.08, "low": 0.04}
+# Prior encode throughput in pixels per second per thread, by output format
+PRIOR_PIXELS_PER_SECOND = {"webm": 2_000_000, "default": 12_000_000}
+# Prior audio encode speed in input seconds per wall second
+PRIOR_AUDIO_SPEED = 200.0
+PRIOR_AUDIO_BITRATE = 192_000
+
+
+class ConversionHistory:
+    """
+    Running statistics of completed conversions per (format, quality, resolution
+    bucket): count, mean and sum of squared deviations (Welford) of log output bytes
+    per input second and log wall seconds per input second. Each update is O(1) and
+    the file stays a few hundred bytes per key.
+    """
+
+    def __init__(self, path: str = HISTORY_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, Dict[str, float]]] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.stats = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable conversion history {self.path}: {e}")
+
+    @staticmethod
+    def key(output_format: str, quality: Optional[str], bucket: str) -> str:
+        return f"{output_format}/{quality or 'default'}/{bucket}"
+
+    def record(self, key: str, bytes_per_second: float, wall_per_second: float) -> None:
+        with self._lock:
+            entry = self.stats.setdefault(key, {})
+            for metric, value in (("bytes", bytes_per_second), ("wall", wall_per_second)):
+                if value <= 0:
+                    continue
+                stat = entry.setdefault(metric, {"n": 0, "mean": 0.0, "m2": 0.0})
+                x = math.log(value)
+                stat["n"] += 1
+                delta = x - stat["mean"]
+                stat["mean"] += delta / stat["n"]
+                stat["m2"] += delta * (x - stat["mean"])
+            self._save()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.stats, f)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str, metric: str) -> Optional[Dict[str, float]]:
+        return self.stats.get(key, {}).get(metric)
+
+
+_history: Optional[ConversionHistory] = None
+
+
+def get_history() -> ConversionHistory:
+    global _history
+    if _history is None or str(_history.path) != HISTORY_FILE:
+        _history = ConversionHistory(HISTORY_FILE)
+    return _history
+
+
+def history_bucket(probe: Dict[str, Any]) -> str:
+    """Resolution bucket of a probed input; audio-only inputs share one bucket."""
+    video = get_video_geometry(probe)
+    return resolution_bucket(video["width"], video["height"]) if video else "audio"
+
+
+def _prior(probe: Dict[str, Any], output_format: str, quality: Optional[str], threads: int) -> Dict[str, float]:
+    """Rule-of-thumb log bytes/second and log wall/second before any history exists."""
+    video = get_video_geometry(probe)
+    if video and output_format in CRF_VIDEO_FORMATS:
+        pixel_rate = video["width"] * video["height"] * (video["fps"] or 30)
+        bytes_per_second = pixel_rate * PRIOR_BITS_PER_PIXEL.get(quality or "medium", PRIOR_BITS_PER_PIXEL["medium"]) / 8
+        throughput = PRIOR_PIXELS_PER_SECOND.get(output_format, PRIOR_PIXELS_PER_SECOND["default"]) * max(1, threads)
+        wall_per_second = pixel_rate / throughput
+    else:
+        bitrate = PRIOR_AUDIO_BITRATE
+        if output_format in BITRATE_AUDIO_FORMATS and quality in QUALITY_AUDIO_BITRATE:
+            bitrate = int(QUALITY_AUDIO_BITRATE[quality].rstrip("k")) * 1000
+        elif output_format == "wav":
+            bitrate = 1_411_200
+        bytes_per_second = bitrate / 8
+        wall_per_second = 1 / PRIOR_AUDIO_SPEED
+    return {"bytes": math.log(bytes_per_second), "wall": math.log(wall_per_second)}
+
+
+def _blend(prior_mean: float, stat: Optional[Dict[str, float]]) -> Dict[str, float]:
+    """
+    Combines the prior with observed log values; the prior's weight shrinks as
+    samples accumulate and the spread narrows toward the observed deviation.
+    """
+    n = stat["n"] if stat else 0
+    if n == 0:
+        return {"mean": prior_mean, "sd": PRIOR_LOG_SD, "n": 0}
+    mean = (prior_mean * PRIOR_WEIGHT + stat["mean"] * n) / (PRIOR_WEIGHT + n)
+    observed_var = stat["m2"] / (n - 1) if n > 1 else PRIOR_LOG_SD ** 2
+    # Pool the prior variance in as PRIOR_WEIGHT pseudo-observations
+    var = (PRIOR_LOG_SD ** 2 * PRIOR_WEIGHT + observed_var * n) / (PRIOR_WEIGHT + n)
+    # Prediction interval: spread of a new job plus uncertainty in the mean
+    sd = math.sqrt(var * (1 + 1 / (PRIOR_WEIGHT + n)))
+    return {"mean": mean, "sd": sd, "n": n}
+
+
+def _bounds(estimate: Dict[str, float], scale: float) -> Dict[str, float]:
+    return {
+        "expected": math.exp(estimate["mean"]) * scale,
+        "low": math.exp(estimate["mean"] - Z_SCORE * estimate["sd"]) * scale,
+        "high": math.exp(estimate["mean"] + Z_SCORE * estimate["sd"]) * scale,
+    }
+
+
+def estimate(probe: Dict[str, Any], output_format: str, quality: Optional[str], threads: int) -> Dict[str, Any]:
+    """
+    Predicts output bytes and encode wall time for a probed input.
+
+    Returns:
+        A dictionary with 'output_bytes' and 'wall_seconds' ({'expected', 'low', 'high'}),
+        the number of 'history_samples' behind them, and the 'history_key'.
+    """
+    duration = get_duration(probe)
+    if not duration:
+        raise ValueError("Input duration is unknown")
+    key = ConversionHistory.key(output_format, quality, history_bucket(probe))
+    history = get_history()
+    prior = _prior(probe, output_format, quality, threads)
+    size = _blend(prior["bytes"], history.get(key, "bytes"))
+    wall = _blend(prior["wall"], history.get(key, "wall"))
+    output_bytes = {k: int(v) for k, v in _bounds(size, duration).items()}
+    wall_seconds = {k: round(v, 2) for k, v in _bounds(wall, duration).items()}
+    return {
+        "output_bytes": output_bytes,
+        "wall_seconds": wall_seconds,
+        "history_samples": size["n"],
+        "history_key": key,
+        "input_duration": duration,
+    }
+
+
+def record_conversion(probe: Dict[str, Any], output_format: str, quality: Optional[str], output_bytes: int, wall_seconds: float) -> None:
+    """Adds a completed conversion to the history."""
+    duration = get_duration(probe)
+    if not duration:
+        return
+    key = ConversionHistory.key(output_format, quality, history_bucket(probe))
+    try:
+        get_history().record(key, output_bytes / duration, wall_seconds / duration)
+    except OSError as e:
+        logger.warning(f"Could not update conversion history: {e}")
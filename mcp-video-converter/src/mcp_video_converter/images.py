@@ -0,0 +1,147 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Set
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; images then go through FFmpeg one by one
+    Image = None
+
+from .resources import MAX_CONCURRENT_JOBS
+from .sniff import MEDIA_KINDS, identify
+
+IMAGE_OUTPUT_FORMATS = ["webp", "jpg", "png", "bmp", "tiff"]
+
+PILLOW_FORMATS = {"webp": "WEBP", "jpg": "JPEG", "png": "PNG", "bmp": "BMP", "tiff": "TIFF"}
+# Encoder options per output format and quality preset; "medium" is the default
+IMAGE_QUALITY_OPTIONS = {
+    "webp": {"high": {"quality": 90, "method": 6}, "medium": {"quality": 80, "method": 4}, "low": {"quality": 60, "method": 2}},
+    "jpg": {"high": {"quality": 95, "subsampling": 0}, "medium": {"quality": 85}, "low": {"quality": 65}},
+    "png": {"high": {"compress_level": 9}, "medium": {"compress_level": 6}, "low": {"compress_level": 1}},
+    "tiff": {"high": {"compression": "tiff_lzw"}, "medium": {"compression": "tiff_lzw"}, "low": {"compression": "tiff_deflate"}},
+    "bmp": {"high": {}, "medium": {}, "low": {}},
+}
+# Formats that cannot store an alpha channel
+NO_ALPHA_FORMATS = ["jpg", "bmp"]
+
+# Images handed to one worker at a time, to amortize scheduling over cheap conversions
+IMAGE_BATCH_SIZE = 16
+_IMAGE_POOL = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_JOBS, thread_name_prefix="mcp-image")
+
+
+def sniff_image(header: bytes) -> Optional[str]:
+    """Identifies a still-image format from the first bytes of a file, or returns None."""
+    container = identify(header)
+    return container if MEDIA_KINDS.get(container) == "image" else None
+
+
+def sniff_image_file(path: Path) -> Optional[str]:
+    """Reads a file's header and identifies it as a still image, or returns None."""
+    try:
+        with open(path, "rb") as f:
+            return sniff_image(f.read(16))
+    except OSError:
+        return None
+
+
+def image_save_options(output_format: str, quality: Optional[str] = None) -> Dict[str, Any]:
+    """Returns the Pillow encoder options for an output format and quality preset."""
+    presets = IMAGE_QUALITY_OPTIONS[output_format]
+    return dict(presets.get(quality or "medium", presets["medium"]))
+
+
+def convert_image_file(input_path: Path, output_path: Path, output_format: str, quality: Optional[str] = None) -> None:
+    """
+    Decodes and encodes one still image in-process.
+
+    Raises:
+        ValueError: If the input is animated; those need the FFmpeg path.
+        OSError: If the image cannot be read or written.
+    """
+    with Image.open(input_path) as image:
+        if getattr(image, "is_animated", False):
+            raise ValueError("Animated images are not still images")
+        if output_format in NO_ALPHA_FORMATS and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(output_path, PILLOW_FORMATS[output_format], **image_save_options(output_format, quality))
+
+
+def _convert_batch(jobs: List[Dict[str, Any]], output_format: str, quality: Optional[str]) -> List[Dict[str, Any]]:
+    results = []
+    for job in jobs:
+        try:
+            convert_image_file(job["input"], job["output"], output_format, quality)
+            results.append({"input_file_path": str(job["input"]), "output_file_path": str(job["output"]), "success": True})
+        except (OSError, ValueError) as e:
+            results.append({"input_file_path": str(job["input"]), "success": False, "error": str(e)})
+    return results
+
+
+def _plan_outputs(inputs: List[Path], output_format: str) -> List[Dict[str, Any]]:
+    """
+    Picks a unique output path for each input with one directory listing per output
+    directory, instead of an exists() call per candidate name.
+    """
+    taken: Dict[Path, Set[str]] = {}
+    jobs = []
+    for input_path in inputs:
+        output_dir = input_path.parent / "converted_videos"
+        if output_dir not in taken:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            with os.scandir(output_dir) as entries:
+                taken[output_dir] = {entry.name for entry in entries}
+        names = taken[output_dir]
+        name = f"{input_path.stem}_converted.{output_format}"
+        counter = 1
+        while name in names:
+            name = f"{input_path.stem}_converted_{counter}.{output_format}"
+            counter += 1
+        names.add(name)
+        jobs.append({"input": input_path, "output": output_dir / name})
+    return jobs
+
+
+def collect_images(input_paths: Iterable[str] = (), input_directory: Optional[str] = None) -> List[Path]:
+    """Returns the still images among the given paths and the files of a directory."""
+    candidates = [Path(p).resolve() for p in input_paths]
+    if input_directory:
+        with os.scandir(Path(input_directory).resolve()) as entries:
+            candidates.extend(sorted(Path(e.path) for e in entries if e.is_file(follow_symlinks=False)))
+    return [path for path in candidates if sniff_image_file(path)]
+
+
+async def convert_images_batch(inputs: List[Path], output_format: str, quality: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Converts still images in-process, IMAGE_BATCH_SIZE at a time per pool worker."""
+    jobs = _plan_outputs(inputs, output_format)
+    loop = asyncio.get_running_loop()
+    batches = [jobs[i:i + IMAGE_BATCH_SIZE] for i in range(0, len(jobs), IMAGE_BATCH_SIZE)]
+    done = await asyncio.gather(*(
+        loop.run_in_executor(_IMAGE_POOL, _convert_batch, batch, output_format, quality) for batch in batches
+    ))
+    return [result for batch in done for result in batch]
+
+
+async def convert_image_single(input_path: Path, output_path: Path, output_format: str, quality: Optional[str] = None) -> Dict[str, Any]:
+    """Converts one still image on the image pool."""
+    loop = asyncio.get_running_loop()
+    [result] = await loop.run_in_executor(
+        _IMAGE_POOL, _convert_batch, [{"input": input_path, "output": output_path}], output_format, quality
+    )
+    return result
+
+
+def summarize_batch(results: List[Dict[str, Any]], started: float) -> Dict[str, Any]:
+    """Adds counts and throughput to a list of per-image results."""
+    elapsed = time.monotonic() - started
+    converted = sum(1 for r in results if r["success"])
+    return {
+        "success": converted == len(results),
+        "results": results,
+        "converted": converted,
+        "failed": len(results) - converted,
+        "elapsed_seconds": round(elapsed, 3),
+        "images_per_second": round(len(results) / elapsed, 1) if elapsed > 0 else None,
+    }
@@ -0,0 +1,53 @@
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+
+# Finished jobs kept for status queries; older ones are dropped first
+MAX_FINISHED_JOBS = 200
+
+# job_id -> status record of conversions started by this server
+JOBS: Dict[str, Dict[str, Any]] = {}
+
+
+def create_job(kind: str, input_path: str, output_format: str, job_id: Optional[str] = None) -> Dict[str, Any]:
+    """Registers a running job; callers may choose the id so they can poll it while it runs."""
+    job_id = job_id or uuid.uuid4().hex[:12]
+    if job_id in JOBS and JOBS[job_id]["status"] == "running":
+        raise ValueError(f"Job {job_id} is already running")
+    job = {
+        "job_id": job_id,
+        "kind": kind,
+        "status": "running",
+        "input_file_path": input_path,
+        "output_format": output_format,
+        "started_at": time.time(),
+        "finished_at": None,
+    }
+    JOBS[job_id] = job
+    return job
+
+
+def update_job(job: Dict[str, Any], **fields: Any) -> None:
+    job.update(fields)
+
+
+def finish_job(job: Dict[str, Any], result: Dict[str, Any]) -> None:
+    """Records a job's outcome and prunes the oldest finished jobs."""
+    job.update({
+        "status": "succeeded" if result.get("success") else "failed",
+        "finished_at": time.time(),
+        "output_file_path": result.get("output_file_path", job.get("output_file_path")),
+        "resource_uri": result.get("resource_uri"),
+        "error": result.get("error"),
+    })
+    finished = [j for j in JOBS.values() if j["status"] != "running"]
+    for old in sorted(finished, key=lambda j: j["finished_at"])[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        JOBS.pop(old["job_id"], None)
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    return JOBS.get(job_id)
+
+
+def list_jobs(status: Optional[str] = None) -> List[Dict[str, Any]]:
+    return [dict(job) for job in JOBS.values() if status is None or job["status"] == status]
@@ -0,0 +1,307 @@
+import asyncio
+import hashlib
+import mmap
+import os
+import struct
+import subprocess
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+INDEX_DIR = os.path.expanduser(os.environ.get("MCP_INDEX_DIR", "~/.mcp-video-converter/index"))
+
+INDEX_MAGIC = b"MCPKIDX2"
+# magic, indexed size, indexed mtime_ns, packet count, keyframe count, indexed tail digest
+INDEX_HEADER = struct.Struct("<8sQQQQ16s")
+HEAD_FINGERPRINT_BYTES = 1 << 16
+# Bytes just before the indexed size that must be unchanged for an index to be extended
+TAIL_FINGERPRINT_BYTES = 1 << 16
+# Stop waiting for ffprobe after this long without a packet
+INDEX_READ_TIMEOUT = 120.0
+
+
+def _copy(code: str, values: Any) -> array:
+    """Copies an array or memory-mapped view into a new array in one block copy."""
+    copied = array(code)
+    copied.frombytes(memoryview(values).cast("B"))
+    return copied
+
+
+def head_fingerprint(path: Path) -> str:
+    """
+    Fingerprints a file by its first 64 KiB. Appending to a file keeps its
+    fingerprint, so a growing recording keeps its index and can extend it.
+    """
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read(HEAD_FINGERPRINT_BYTES)).hexdigest()[:32]
+
+
+def tail_fingerprint(path: Path, size: int) -> bytes:
+    """
+    Digest of the 64 KiB ending at `size`. A file that was only appended to still
+    matches at its old size; one rewritten in place almost never does.
+    """
+    start = max(0, size - TAIL_FINGERPRINT_BYTES)
+    with open(path, "rb") as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(size - start)).digest()[:16]
+
+
+def index_path_for(input_path: Path) -> Path:
+    return Path(INDEX_DIR) / f"{head_fingerprint(input_path)}.kidx"
+
+
+class KeyframeIndex:
+    """
+    Keyframe and packet index of a file's first video stream, backed by flat arrays.
+
+    Keyframes: presentation time (float64 seconds), byte offset (int64) and the
+    keyframe's packet number (int64). Packets, in decode order: presentation time
+    (float64) and size (uint32). GOP sizes are the gaps between keyframe packet numbers.
+
+    Loaded indexes are memory-mapped, so opening one costs nothing more than the
+    pages a lookup touches.
+    """
+
+    def __init__(
+        self,
+        indexed_size: int = 0,
+        indexed_mtime_ns: int = 0,
+        keyframe_times: Any = None,
+        keyframe_offsets: Any = None,
+        keyframe_packets: Any = None,
+        packet_times: Any = None,
+        packet_sizes: Any = None,
+        mapped: Optional[mmap.mmap] = None,
+        indexed_tail: bytes = b""
+    ):
+        self.indexed_size = indexed_size
+        self.indexed_mtime_ns = indexed_mtime_ns
+        self.indexed_tail = indexed_tail
+        self.keyframe_times = keyframe_times if keyframe_times is not None else array("d")
+        self.keyframe_offsets = keyframe_offsets if keyframe_offsets is not None else array("q")
+        self.keyframe_packets = keyframe_packets if keyframe_packets is not None else array("q")
+        self.packet_times = packet_times if packet_times is not None else array("d")
+        self.packet_sizes = packet_sizes if packet_sizes is not None else array("I")
+        self._mapped = mapped
+        self._view: Optional[memoryview] = None
+
+    @property
+    def keyframe_count(self) -> int:
+        return len(self.keyframe_times)
+
+    @property
+    def packet_count(self) -> int:
+        return len(self.packet_times)
+
+    def keyframe_at_or_before(self, seconds: float) -> Optional[Tuple[float, int]]:
+        """Returns (time, byte offset) of the last keyframe at or before `seconds`."""
+        i = bisect_right(self.keyframe_times, seconds) - 1
+        return (self.keyframe_times[i], self.keyframe_offsets[i]) if i >= 0 else None
+
+    def keyframe_at_or_after(self, seconds: float) -> Optional[Tuple[float, int]]:
+        """Returns (time, byte offset) of the first keyframe at or after `seconds`."""
+        i = bisect_left(self.keyframe_times, seconds)
+        return (self.keyframe_times[i], self.keyframe_offsets[i]) if i < self.keyframe_count else None
+
+    def gop_sizes(self) -> array:
+        """Packets per GOP; the last GOP runs to the end of the indexed packets."""
+        bounds = list(self.keyframe_packets) + [self.packet_count]
+        return array("q", (bounds[i + 1] - bounds[i] for i in range(self.keyframe_count)))
+
+    def summary(self) -> Dict[str, Any]:
+        gops = self.gop_sizes()
+        return {
+            "keyframes": self.keyframe_count,
+            "packets": self.packet_count,
+            "gop_max": max(gops) if gops else None,
+            "gop_mean": round(sum(gops) / len(gops), 2) if gops else None,
+            "first_keyframe": self.keyframe_times[0] if self.keyframe_count else None,
+            "last_keyframe": self.keyframe_times[-1] if self.keyframe_count else None,
+        }
+
+    def to_bytes(self) -> bytes:
+        header = INDEX_HEADER.pack(
+            INDEX_MAGIC, self.indexed_size, self.indexed_mtime_ns, self.packet_count, self.keyframe_count,
+            self.indexed_tail
+        )
+        arrays = (
+            self.keyframe_times, self.keyframe_offsets, self.keyframe_packets, self.packet_times, self.packet_sizes
+        )
+        return header + b"".join(bytes(memoryview(a).cast("B")) for a in arrays)
+
+    def save(self, path: Path) -> None:
+        """Writes the index atomically, replacing any previous version."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["KeyframeIndex"]:
+        """Memory-maps a saved index, or returns None if it is missing or malformed."""
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(mapped) < INDEX_HEADER.size:
+            mapped.close()
+            return None
+        magic, size, mtime_ns, packets, keyframes, tail = INDEX_HEADER.unpack_from(mapped)
+        expected = INDEX_HEADER.size + keyframes * 24 + packets * 12
+        if magic != INDEX_MAGIC or len(mapped) != expected:
+            mapped.close()
+            return None
+        view = memoryview(mapped)
+        offset = INDEX_HEADER.size
+        fields = []
+        for count, code, width in ((keyframes, "d", 8), (keyframes, "q", 8), (keyframes, "q", 8), (packets, "d", 8), (packets, "I", 4)):
+            fields.append(view[offset:offset + count * width].cast(code))
+            offset += count * width
+        index = cls(size, mtime_ns, *fields, mapped=mapped, indexed_tail=tail)
+        index._view = view
+        return index
+
+    def extend(self, packets: "array", sizes: "array", keyframes: Dict[str, "array"]) -> "KeyframeIndex":
+        """Returns an in-memory index with new packets appended after this one's."""
+        base = self.packet_count
+        return KeyframeIndex(
+            self.indexed_size, self.indexed_mtime_ns,
+            _copy("d", self.keyframe_times) + keyframes["times"],
+            _copy("q", self.keyframe_offsets) + keyframes["offsets"],
+            _copy("q", self.keyframe_packets) + array("q", (base + p for p in keyframes["packets"])),
+            _copy("d", self.packet_times) + packets,
+            _copy("I", self.packet_sizes) + sizes,
+            indexed_tail=self.indexed_tail,
+        )
+
+    def close(self) -> None:
+        if self._mapped is not None:
+            for name in ("keyframe_times", "keyframe_offsets", "keyframe_packets", "packet_times", "packet_sizes"):
+                view = getattr(self, name)
+                if isinstance(view, memoryview):
+                    view.release()
+            if self._view is not None:
+                self._view.release()
+            self._mapped.close()
+            self._mapped = None
+
+
+def parse_packet_line(line: str) -> Optional[Tuple[float, int, int, bool]]:
+    """Parses one ffprobe compact packet line into (time, byte offset, size, keyframe)."""
+    fields = dict(item.partition("=")[::2] for item in line.strip().split("|"))
+    time = fields.get("pts_time")
+    if time in (None, "", "N/A"):
+        time = fields.get("dts_time")
+    try:
+        return (
+            float(time),
+            int(fields["pos"]) if fields.get("pos", "N/A") != "N/A" else -1,
+            int(fields.get("size") or 0),
+            "K" in fields.get("flags", ""),
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+async def _scan_packets(input_path: Path, after: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Streams the first video stream's packets from ffprobe into compact arrays.
+    With `after`, ffprobe seeks close to that time and packets are kept from the first
+    keyframe later than it.
+    """
+    command = ["ffprobe", "-v", "error", "-select_streams", "v:0"]
+    if after is not None:
+        command += ["-read_intervals", f"{after:.6f}%"]
+    command += [
+        "-show_entries", "packet=pts_time,dts_time,pos,size,flags",
+        "-of", "compact=p=0", str(input_path),
+    ]
+    process = await asyncio.create_subprocess_exec(
+        *command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    times, sizes = array("d"), array("I")
+    keyframes = {"times": array("d"), "offsets": array("q"), "packets": array("q")}
+    # When resuming, packets before the resume keyframe (in decode order) are already indexed
+    started = after is None
+    try:
+        while True:
+            line = await asyncio.wait_for(process.stdout.readline(), timeout=INDEX_READ_TIMEOUT)
+            if not line:
+                break
+            packet = parse_packet_line(line.decode(errors="replace"))
+            if packet is None:
+                continue
+            time, offset, size, key = packet
+            if not started:
+                if not (key and time > after):
+                    continue
+                started = True
+            if key:
+                keyframes["times"].append(time)
+                keyframes["offsets"].append(offset)
+                keyframes["packets"].append(len(times))
+            times.append(time)
+            sizes.append(min(size, 0xFFFFFFFF))
+        stderr = await process.stderr.read()
+        returncode = await process.wait()
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        process.kill()
+        await process.wait()
+        raise
+    if returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {stderr.decode(errors='replace').strip()}")
+    return {"times": times, "sizes": sizes, "keyframes": keyframes}
+
+
+async def build_index(input_path: Path, index_path: Optional[Path] = None) -> Tuple[KeyframeIndex, str]:
+    """
+    Returns an up-to-date index for a file and how it was obtained: "cached" when
+    the saved index still matches the file, "extended" when the file grew and only
+    the new packets were scanned, or "built" for a full scan.
+
+    Raises:
+        RuntimeError: If ffprobe fails.
+        FileNotFoundError: If ffprobe is not installed.
+    """
+    index_path = index_path or index_path_for(input_path)
+    stat = input_path.stat()
+    existing = KeyframeIndex.load(index_path)
+    if existing is not None:
+        if (existing.indexed_size, existing.indexed_mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+            return existing, "cached"
+        # Only an append keeps the indexed prefix valid; anything else is rebuilt from scratch
+        if (
+            existing.indexed_size < stat.st_size and existing.keyframe_count
+            and tail_fingerprint(input_path, existing.indexed_size) == existing.indexed_tail
+        ):
+            # Rescan from the last keyframe so a GOP cut off by the previous scan is completed
+            last_key = existing.keyframe_count - 1
+            resume = existing.keyframe_times[last_key]
+            kept_packets = existing.keyframe_packets[last_key]
+            base = KeyframeIndex(
+                keyframe_times=_copy("d", existing.keyframe_times[:last_key]),
+                keyframe_offsets=_copy("q", existing.keyframe_offsets[:last_key]),
+                keyframe_packets=_copy("q", existing.keyframe_packets[:last_key]),
+                packet_times=_copy("d", existing.packet_times[:kept_packets]),
+                packet_sizes=_copy("I", existing.packet_sizes[:kept_packets]),
+            )
+            existing.close()
+            scan = await _scan_packets(input_path, after=resume - 1e-6)
+            index = base.extend(scan["times"], scan["sizes"], scan["keyframes"])
+            index.indexed_size, index.indexed_mtime_ns = stat.st_size, stat.st_mtime_ns
+            index.indexed_tail = tail_fingerprint(input_path, stat.st_size)
+            index.save(index_path)
+            return index, "extended"
+        existing.close()
+
+    scan = await _scan_packets(input_path)
+    index = KeyframeIndex(stat.st_size, stat.st_mtime_ns).extend(scan["times"], scan["sizes"], scan["keyframes"])
+    index.indexed_size, index.indexed_mtime_ns = stat.st_size, stat.st_mtime_ns
+    index.indexed_tail = tail_fingerprint(input_path, stat.st_size)
+    index.save(index_path)
+    return index, "built"
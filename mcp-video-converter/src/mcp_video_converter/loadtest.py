@@ -0,0 +1,233 @@
+"""
+Load-test harness for the MCP server.
+
+Replays a weighted mix of tool calls from many concurrent clients and reports
+per-tool latency percentiles, throughput, error rates and event-loop lag.
+
+Usage:
+    python -m mcp_video_converter.loadtest --concurrency 1,10,50 --calls 200
+    python -m mcp_video_converter.loadtest --url http://127.0.0.1:8000/sse --concurrency 50
+
+Without --url the server runs in-process through FastMCP's in-memory transport,
+so the measured loop lag is the server's own and shows head-of-line blocking
+caused by conversions. With --url the lag is the harness's loop only.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, AsyncContextManager, Callable, List, Optional
+
+DEFAULT_MIX = {"convert_video": 1, "check_ffmpeg_installed": 5, "get_supported_formats": 10}
+LAG_INTERVAL = 0.01
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(-(-pct * len(ordered) // 100)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parses 'tool=weight,tool=weight' into a weight mapping."""
+    mix = {}
+    for item in text.split(","):
+        tool, _, weight = item.partition("=")
+        mix[tool.strip()] = float(weight or 1)
+    if not mix or any(w < 0 for w in mix.values()) or sum(mix.values()) <= 0:
+        raise ValueError(f"Invalid mix: {text}")
+    return mix
+
+
+class LagMonitor:
+    """Measures how late a periodic timer fires; lateness is time the loop was blocked."""
+
+    def __init__(self, interval: float = LAG_INTERVAL):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self) -> "LagMonitor":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def stop(self) -> Dict[str, Optional[float]]:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        return {
+            "p50_ms": _ms(percentile(self.samples, 50)),
+            "p99_ms": _ms(percentile(self.samples, 99)),
+            "max_ms": _ms(max(self.samples) if self.samples else None),
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def _is_error(result: Any) -> bool:
+    """Tool results report failure as 'success': False or 'installed': False in their JSON."""
+    for item in result or []:
+        text = getattr(item, "text", None)
+        if not isinstance(text, str):
+            continue
+        try:
+            payload = json.loads(text)
+        except ValueError:
+            continue
+        if isinstance(payload, dict) and (payload.get("success") is False or payload.get("installed") is False):
+            return True
+    return False
+
+
+def build_arguments(tool: str, media: List[Path], rng: random.Random, output_format: str) -> Dict[str, Any]:
+    if tool == "convert_video":
+        return {"input_file_path": str(rng.choice(media)), "output_format": output_format, "quality": "low"}
+    return {}
+
+
+async def run_load(
+    client_factory: Callable[[], AsyncContextManager],
+    mix: Dict[str, float],
+    concurrency: int,
+    calls: int,
+    media: List[Path],
+    output_format: str = "mp4",
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Runs `calls` tool calls spread over `concurrency` clients, each with its own session.
+
+    Returns:
+        A report with per-tool 'count', 'errors', 'error_rate' and p50/p95/p99/max
+        latency in milliseconds, overall 'throughput_per_second', and 'loop_lag'.
+    """
+    tools = list(mix)
+    weights = [mix[t] for t in tools]
+    latencies: Dict[str, List[float]] = {tool: [] for tool in tools}
+    errors: Dict[str, int] = {tool: 0 for tool in tools}
+    remaining = [calls]
+
+    async def agent(index: int) -> None:
+        rng = random.Random(seed * 1000 + index)
+        async with client_factory() as client:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                tool = rng.choices(tools, weights)[0]
+                started = time.perf_counter()
+                try:
+                    result = await client.call_tool(tool, build_arguments(tool, media, rng, output_format))
+                    failed = _is_error(result)
+                except Exception:
+                    failed = True
+                latencies[tool].append(time.perf_counter() - started)
+                errors[tool] += failed
+
+    monitor = LagMonitor().start()
+    started = time.perf_counter()
+    await asyncio.gather(*(agent(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    lag = await monitor.stop()
+
+    per_tool = {}
+    for tool in tools:
+        samples = latencies[tool]
+        if not samples:
+            continue
+        per_tool[tool] = {
+            "count": len(samples),
+            "errors": errors[tool],
+            "error_rate": round(errors[tool] / len(samples), 4),
+            "p50_ms": _ms(percentile(samples, 50)),
+            "p95_ms": _ms(percentile(samples, 95)),
+            "p99_ms": _ms(percentile(samples, 99)),
+            "max_ms": _ms(max(samples)),
+        }
+    total = sum(len(v) for v in latencies.values())
+    return {
+        "concurrency": concurrency,
+        "calls": total,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_per_second": round(total / elapsed, 2) if elapsed > 0 else None,
+        "tools": per_tool,
+        "loop_lag": lag,
+    }
+
+
+def generate_media(directory: Path, count: int, seconds: float) -> List[Path]:
+    """Generates small webm test clips with FFmpeg's lavfi sources."""
+    paths = []
+    for i in range(count):
+        path = directory / f"load_{i}.webm"
+        subprocess.run(
+            [
+                "ffmpeg", "-y", "-v", "error",
+                "-f", "lavfi", "-i", f"testsrc2=size=320x240:rate=25:duration={seconds}",
+                "-f", "lavfi", "-i", f"sine=frequency={220 + 20 * i}:duration={seconds}",
+                "-c:v", "libvpx-vp9", "-deadline", "realtime", "-c:a", "libopus", "-shortest", str(path),
+            ],
+            check=True,
+        )
+        paths.append(path)
+    return paths
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"concurrency={report['concurrency']} calls={report['calls']} "
+        f"throughput={report['throughput_per_second']}/s "
+        f"loop lag p50={report['loop_lag']['p50_ms']}ms p99={report['loop_lag']['p99_ms']}ms max={report['loop_lag']['max_ms']}ms"
+    ]
+    for tool, stats in report["tools"].items():
+        lines.append(
+            f"  {tool:<24} n={stats['count']:<5} err={stats['error_rate']:<6} "
+            f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms"
+        )
+    return "\n".join(lines)
+
+
+async def main() -> None:
+    from fastmcp import Client
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Server URL for HTTP mode (e.g. http://127.0.0.1:8000/sse)")
+    parser.add_argument("--concurrency", default="1,10,50", help="Comma-separated concurrency levels")
+    parser.add_argument("--calls", type=int, default=200, help="Tool calls per concurrency level")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()))
+    parser.add_argument("--media-count", type=int, default=4)
+    parser.add_argument("--media-seconds", type=float, default=2.0)
+    parser.add_argument("--output-format", default="mp4")
+    parser.add_argument("--json", action="store_true", help="Print JSON reports")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    if args.url:
+        client_factory = lambda: Client(args.url)  # noqa: E731
+    else:
+        from .server import mcp_video_server
+        client_factory = lambda: Client(mcp_video_server)  # noqa: E731
+
+    with tempfile.TemporaryDirectory() as tmp:
+        media = generate_media(Path(tmp), args.media_count, args.media_seconds) if mix.get("convert_video") else []
+        for level in (int(c) for c in args.concurrency.split(",")):
+            report = await run_load(client_factory, mix, level, args.calls, media, args.output_format)
+            print(json.dumps(report) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,142 @@
+import asyncio
+import hashlib
+import mimetypes
+import mmap
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+# How long finished outputs stay readable as resources; with MCP_OUTPUT_RETENTION_DELETE
+# the files themselves are removed when they expire
+OUTPUT_RETENTION_SECONDS = float(os.environ.get("MCP_OUTPUT_RETENTION_SECONDS", "86400"))
+OUTPUT_RETENTION_DELETE = os.environ.get("MCP_OUTPUT_RETENTION_DELETE", "").lower() in ("true", "1", "yes")
+MAX_OUTPUTS = 1000
+# Bytes per resource chunk, sized for one stdio message after base64
+RESOURCE_CHUNK_BYTES = int(os.environ.get("MCP_RESOURCE_CHUNK_BYTES", str(1 << 20)))
+OUTPUT_URI_SCHEME = "video-output"
+OUTPUT_HTTP_PATH = "/outputs"
+
+# output_id -> registered output file
+OUTPUTS: Dict[str, Dict[str, Any]] = {}
+
+
+def register_output(path: Path) -> Dict[str, Any]:
+    """
+    Makes a finished output readable as a resource until it expires. The id is
+    random, so it also works as an unguessable capability for the HTTP route.
+
+    Returns:
+        The 'output_id' and 'resource_uri' to add to a tool result.
+    """
+    prune_outputs(keep=MAX_OUTPUTS - 1)
+    stat = path.stat()
+    now = time.time()
+    output_id = uuid.uuid4().hex
+    OUTPUTS[output_id] = {
+        "output_id": output_id,
+        "path": str(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "etag": None,
+        "registered_at": now,
+        "expires_at": now + OUTPUT_RETENTION_SECONDS,
+    }
+    return {"output_id": output_id, "resource_uri": f"{OUTPUT_URI_SCHEME}://{output_id}"}
+
+
+def prune_outputs(now: Optional[float] = None, keep: int = MAX_OUTPUTS) -> None:
+    """Drops expired outputs, and the oldest live ones beyond `keep`."""
+    now = now or time.time()
+    live = sorted((o for o in OUTPUTS.values() if o["expires_at"] > now), key=lambda o: o["registered_at"])
+    expired = [o for o in OUTPUTS.values() if o["expires_at"] <= now] + live[:max(0, len(live) - keep)]
+    for output in expired:
+        OUTPUTS.pop(output["output_id"], None)
+        if OUTPUT_RETENTION_DELETE:
+            Path(output["path"]).unlink(missing_ok=True)
+
+
+def get_output(output_id: str) -> Dict[str, Any]:
+    """
+    Returns a registered output, refreshing its size if the file changed.
+
+    Raises:
+        ValueError: If the id is unknown, expired, or its file is gone.
+    """
+    prune_outputs()
+    output = OUTPUTS.get(output_id)
+    if output is None:
+        raise ValueError(f"Unknown or expired output: {output_id}")
+    try:
+        stat = os.stat(output["path"])
+    except OSError:
+        OUTPUTS.pop(output_id, None)
+        raise ValueError(f"Output file no longer exists: {output['path']}")
+    if (stat.st_size, stat.st_mtime_ns) != (output["size"], output["mtime_ns"]):
+        output.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns, etag=None)
+    return output
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def content_etag(output: Dict[str, Any]) -> str:
+    """Returns the output's strong ETag, a content hash computed off the event loop once per file version."""
+    if output["etag"] is None:
+        digest = await asyncio.get_running_loop().run_in_executor(None, _hash_file, output["path"])
+        output["etag"] = f'"{digest[:32]}"'
+    return output["etag"]
+
+
+def _read_range(path: str, start: int, length: int) -> bytes:
+    """Copies one byte range out of a read-only mapping of the file."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if start >= size or length <= 0:
+            return b""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[start:min(size, start + length)]
+
+
+async def describe_output(output_id: str) -> Dict[str, Any]:
+    output = get_output(output_id)
+    return {
+        "output_id": output_id,
+        "uri": f"{OUTPUT_URI_SCHEME}://{output_id}",
+        "file_name": Path(output["path"]).name,
+        "mime_type": mimetypes.guess_type(output["path"])[0] or "application/octet-stream",
+        "size": output["size"],
+        "etag": await content_etag(output),
+        "chunk_bytes": RESOURCE_CHUNK_BYTES,
+        "chunks": -(-output["size"] // RESOURCE_CHUNK_BYTES),
+        "chunk_uri_template": f"{OUTPUT_URI_SCHEME}://{output_id}/chunks/{{index}}",
+        "range_uri_template": f"{OUTPUT_URI_SCHEME}://{output_id}/bytes/{{start}}/{{length}}",
+        "http_path": f"{OUTPUT_HTTP_PATH}/{output_id}",
+        "expires_at": output["expires_at"],
+    }
+
+
+async def read_output_range(output_id: str, start: int, length: int) -> bytes:
+    """
+    Reads bytes [start, start + length) of an output, clipped to its size.
+
+    Raises:
+        ValueError: If the output is unknown or the range is invalid.
+    """
+    if start < 0 or length < 0:
+        raise ValueError("start and length must not be negative")
+    output = get_output(output_id)
+    length = min(length, RESOURCE_CHUNK_BYTES)
+    return await asyncio.get_running_loop().run_in_executor(None, _read_range, output["path"], start, length)
+
+
+async def read_output_chunk(output_id: str, index: int) -> bytes:
+    if index < 0:
+        raise ValueError("Chunk index must not be negative")
+    return await read_output_range(output_id, index * RESOURCE_CHUNK_BYTES, RESOURCE_CHUNK_BYTES)
@@ -0,0 +1,201 @@
+import os
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from .probe import get_stream
+from .resources import get_resource_policy, job_slot, make_policy_applier
+from .supervisor import run_supervised
+
+# Target media duration of each HLS/DASH segment
+PACKAGE_SEGMENT_SECONDS = float(os.environ.get("MCP_PACKAGE_SEGMENT_SECONDS", "4"))
+
+PACKAGE_PROTOCOLS = ["hls", "dash", "both"]
+HLS_SEGMENT_TYPES = ["ts", "fmp4"]
+
+# Rendition name -> (height, video bitrate, max bitrate)
+RENDITION_LADDER = {
+    "1080p": (1080, "5000k", "5350k"),
+    "720p": (720, "2800k", "3000k"),
+    "480p": (480, "1400k", "1500k"),
+    "360p": (360, "800k", "856k"),
+}
+DEFAULT_RENDITIONS = 3
+PACKAGE_AUDIO_BITRATE = "128k"
+
+# Codecs each segment container can carry, for packaging by stream copy
+COPY_VIDEO_CODECS = {"ts": ["h264", "hevc"], "fmp4": ["h264", "hevc", "av1", "vp9"]}
+COPY_AUDIO_CODECS = {"ts": ["aac", "mp3", "ac3"], "fmp4": ["aac", "ac3", "eac3", "opus", "flac"]}
+
+
+def plan_renditions(source_height: int, names: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Picks the renditions to encode, highest first. Renditions taller than the source
+    are dropped so nothing is upscaled; a source below the whole ladder gets a single
+    rendition at its own height.
+
+    Raises:
+        ValueError: If a rendition name is not in RENDITION_LADDER.
+    """
+    unknown = [name for name in names or [] if name not in RENDITION_LADDER]
+    if unknown:
+        raise ValueError(f"Unknown renditions: {', '.join(unknown)}. Available: {', '.join(RENDITION_LADDER)}")
+    candidates = names or list(RENDITION_LADDER)
+    fitting = sorted(
+        (name for name in candidates if RENDITION_LADDER[name][0] <= source_height),
+        key=lambda name: -RENDITION_LADDER[name][0],
+    )
+    if not names:
+        fitting = fitting[:DEFAULT_RENDITIONS]
+    if not fitting:
+        _, bitrate, maxrate = RENDITION_LADDER["360p"]
+        height = source_height - source_height % 2
+        return [{"name": f"{height}p", "height": height, "bitrate": bitrate, "maxrate": maxrate}]
+    return [
+        {"name": name, "height": RENDITION_LADDER[name][0], "bitrate": RENDITION_LADDER[name][1], "maxrate": RENDITION_LADDER[name][2]}
+        for name in fitting
+    ]
+
+
+def copy_compatible(probe: Dict[str, Any], segment_type: str) -> Optional[str]:
+    """Returns why the input's streams cannot be packaged by stream copy, or None if they can."""
+    video = get_stream(probe, "video")
+    audio = get_stream(probe, "audio")
+    if not video or video.get("codec_name") not in COPY_VIDEO_CODECS[segment_type]:
+        codec = video.get("codec_name") if video else "none"
+        return f"video codec {codec} cannot be stored in {segment_type} segments"
+    if audio and audio.get("codec_name") not in COPY_AUDIO_CODECS[segment_type]:
+        return f"audio codec {audio.get('codec_name')} cannot be stored in {segment_type} segments"
+    return None
+
+
+def build_package_command(
+    input_path: Path,
+    output_dir: Path,
+    protocol: str,
+    renditions: List[Dict[str, Any]],
+    has_audio: bool,
+    segment_type: str = "ts",
+    copy: bool = False,
+    segment_seconds: float = PACKAGE_SEGMENT_SECONDS
+) -> List[str]:
+    """
+    Builds one FFmpeg command that writes every rendition of an HLS and/or DASH package.
+
+    The input is decoded once and split into one scaled branch per rendition, so all
+    renditions encode concurrently from the same frames. Keyframes are forced on
+    segment boundaries so every rendition's segments align. In copy mode the streams
+    are segmented as they are, on the input's own keyframes.
+
+    Segments and playlists become visible atomically: the HLS muxer writes each file
+    under a temporary name and renames it into place (temp_file), and the DASH muxer
+    does the same for local files, so a server can read a package while it is written.
+    """
+    command = ["ffmpeg", "-y", "-i", str(input_path)]
+    if copy:
+        command += ["-map", "0:v:0"] + (["-map", "0:a:0"] if has_audio else []) + ["-c", "copy"]
+        video_count = 1
+    else:
+        video_count = len(renditions)
+        labels = "".join(f"[s{i}]" for i in range(video_count))
+        graph = [f"[0:v]split={video_count}{labels}"]
+        graph += [f"[s{i}]scale=-2:{r['height']}[v{i}]" for i, r in enumerate(renditions)]
+        command += ["-filter_complex", ";".join(graph)]
+        for i in range(video_count):
+            command += ["-map", f"[v{i}]"]
+        if has_audio:
+            command += ["-map", "0:a:0", "-c:a", "aac", "-b:a", PACKAGE_AUDIO_BITRATE]
+        command += ["-c:v", "libx264", "-pix_fmt", "yuv420p", "-sc_threshold", "0"]
+        command += ["-force_key_frames", f"expr:gte(t,n_forced*{segment_seconds:g})"]
+        for i, rendition in enumerate(renditions):
+            bufsize = f"{int(rendition['maxrate'][:-1]) * 2}k"
+            command += [
+                f"-b:v:{i}", rendition["bitrate"], f"-maxrate:v:{i}", rendition["maxrate"], f"-bufsize:v:{i}", bufsize,
+            ]
+
+    if protocol == "hls":
+        streams = [f"v:{i},agroup:audio" if has_audio else f"v:{i}" for i in range(video_count)]
+        if has_audio:
+            streams.insert(0, "a:0,agroup:audio")
+        extension = "m4s" if segment_type == "fmp4" else "ts"
+        command += [
+            "-f", "hls",
+            "-hls_time", f"{segment_seconds:g}",
+            "-hls_playlist_type", "vod",
+            "-hls_segment_type", "fmp4" if segment_type == "fmp4" else "mpegts",
+            "-hls_flags", "independent_segments+temp_file",
+            "-hls_segment_filename", str(output_dir / "stream_%v" / f"segment_%05d.{extension}"),
+            "-master_pl_name", "master.m3u8",
+            "-var_stream_map", " ".join(streams),
+        ]
+        if segment_type == "fmp4":
+            command += ["-hls_fmp4_init_filename", "init.mp4"]
+        command.append(str(output_dir / "stream_%v" / "playlist.m3u8"))
+        return command
+
+    # DASH; "both" adds HLS playlists over the same fMP4 segments
+    command += [
+        "-f", "dash",
+        "-seg_duration", f"{segment_seconds:g}",
+        "-use_template", "1",
+        "-use_timeline", "1",
+        "-init_seg_name", "init_$RepresentationID$.m4s",
+        "-media_seg_name", "chunk_$RepresentationID$_$Number%05d$.m4s",
+        "-adaptation_sets", "id=0,streams=v id=1,streams=a" if has_audio else "id=0,streams=v",
+    ]
+    if protocol == "both":
+        command += ["-hls_playlist", "1"]
+    command.append(str(output_dir / "manifest.mpd"))
+    return command
+
+
+def package_outputs(output_dir: Path, protocol: str) -> Dict[str, str]:
+    """Returns the entry-point playlists a finished package of the given protocol has."""
+    outputs = {}
+    if protocol in ("hls", "both"):
+        outputs["hls_master_playlist"] = str(output_dir / "master.m3u8")
+    if protocol in ("dash", "both"):
+        outputs["dash_manifest"] = str(output_dir / "manifest.mpd")
+    return outputs
+
+
+async def package_media(
+    input_path: Path,
+    output_dir: Path,
+    protocol: str,
+    renditions: List[Dict[str, Any]],
+    has_audio: bool,
+    segment_type: str = "ts",
+    copy: bool = False,
+    quality: Optional[str] = None,
+    segment_seconds: float = PACKAGE_SEGMENT_SECONDS,
+    on_progress: Optional[Any] = None
+) -> Dict[str, Any]:
+    """
+    Runs the packaging command in one job slot under the stall watchdog.
+
+    Returns:
+        A dictionary with 'success', the 'output_dir', its entry-point playlists,
+        the number of 'segments' written, and 'resource_usage'.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    command = build_package_command(
+        input_path, output_dir, protocol, renditions, has_audio, segment_type, copy, segment_seconds
+    )
+    policy = get_resource_policy(quality)
+    async with job_slot(policy) as slot:
+        command[-1:-1] = ["-threads", str(slot["threads"])]
+        run = await run_supervised(command, apply_policy=make_policy_applier(policy, slot["cpus"]), on_progress=on_progress)
+    if run["stalled"] or run["returncode"] != 0:
+        error = "stalled" if run["stalled"] else run["stderr"].decode(errors="replace").strip()
+        return {"success": False, "error": f"Packaging failed: {error}", "command": " ".join(command)}
+    segments = sum(
+        1 for path in output_dir.rglob("*")
+        if path.suffix in (".ts", ".m4s") and not path.name.startswith("init")
+    )
+    return {
+        "success": True,
+        "output_dir": str(output_dir),
+        **package_outputs(output_dir, protocol),
+        "segments": segments,
+        "resource_usage": run["resource_usage"],
+    }
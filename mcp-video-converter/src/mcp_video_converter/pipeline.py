@@ -0,0 +1,197 @@
+import json
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from .encoding import build_encoding_args
+from .resources import get_resource_policy, job_slot, make_policy_applier
+from .supervisor import run_supervised
+
+PIPELINE_OUTPUT_FORMATS = ["mp4", "mkv", "webm", "mov", "avi", "flv", "gif", "mp3", "ogg", "m4a", "wav"]
+AUDIO_ONLY_FORMATS = ["mp3", "ogg", "m4a", "wav"]
+
+# Operation -> (required parameters, optional parameters)
+PIPELINE_OPERATIONS = {
+    "trim": ((), ("start", "end")),
+    "scale": ((), ("width", "height")),
+    "crop": (("width", "height"), ("x", "y")),
+    "fps": (("fps",), ()),
+    "rotate": (("degrees",), ()),
+    "audio_resample": (("sample_rate",), ()),
+    "format": (("format",), ("quality",)),
+}
+ROTATIONS = {90: "transpose=1", 180: "hflip,vflip", 270: "transpose=2"}
+# Output formats whose default audio encoder is libopus, and the only rates it encodes at
+OPUS_OUTPUT_FORMATS = ["webm"]
+OPUS_SAMPLE_RATES = [48000, 24000, 16000, 12000, 8000]
+
+# Compiled plans, keyed by the operation list as JSON; oldest entries go first
+PLAN_CACHE_SIZE = 256
+_PLAN_CACHE: Dict[str, Dict[str, Any]] = {}
+
+
+def _number(op: Dict[str, Any], name: str, minimum: float = 0, integer: bool = False) -> Any:
+    value = op[name]
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < minimum:
+        raise ValueError(f"{op['op']}: '{name}' must be a number >= {minimum}")
+    if integer:
+        if value != int(value):
+            raise ValueError(f"{op['op']}: '{name}' must be a whole number")
+        return int(value)
+    return value
+
+
+def validate_pipeline(operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Checks an ordered list of operations and returns them normalized.
+
+    Each operation is a dict with an 'op' key and its parameters. Trim may appear
+    once and 'format' must be the last operation.
+
+    Raises:
+        ValueError: Describing the first invalid operation.
+    """
+    if not operations:
+        raise ValueError("The pipeline has no operations")
+    normalized = []
+    for index, op in enumerate(operations):
+        name = op.get("op") if isinstance(op, dict) else None
+        if name not in PIPELINE_OPERATIONS:
+            raise ValueError(f"Operation {index}: unknown op {name!r}. Available: {', '.join(PIPELINE_OPERATIONS)}")
+        required, optional = PIPELINE_OPERATIONS[name]
+        missing = [p for p in required if p not in op]
+        unexpected = [p for p in op if p != "op" and p not in required + optional]
+        if missing or unexpected:
+            raise ValueError(f"Operation {index} ({name}): missing {missing or 'nothing'}, unexpected {unexpected or 'nothing'}")
+
+        if name == "trim":
+            if "start" not in op and "end" not in op:
+                raise ValueError("trim: give 'start' and/or 'end' in seconds")
+            if any(o["op"] == "trim" for o in normalized):
+                raise ValueError("trim may only appear once")
+            clean = {"op": name, **{k: float(_number(op, k)) for k in ("start", "end") if k in op}}
+            if clean.get("end") is not None and clean["end"] <= clean.get("start", 0):
+                raise ValueError("trim: 'end' must be after 'start'")
+        elif name == "scale":
+            if "width" not in op and "height" not in op:
+                raise ValueError("scale: give 'width' and/or 'height'")
+            # A missing side keeps the aspect ratio, rounded to an even size
+            clean = {"op": name, "width": -2, "height": -2}
+            clean.update({k: _number(op, k, 2, integer=True) for k in ("width", "height") if k in op})
+        elif name == "crop":
+            if ("x" in op) != ("y" in op):
+                raise ValueError("crop: give both 'x' and 'y', or neither to crop from the center")
+            clean = {"op": name, **{k: _number(op, k, 2 if k in ("width", "height") else 0, integer=True)
+                                    for k in ("width", "height", "x", "y") if k in op}}
+        elif name == "fps":
+            clean = {"op": name, "fps": _number(op, "fps", 1)}
+        elif name == "rotate":
+            if op["degrees"] not in ROTATIONS:
+                raise ValueError(f"rotate: 'degrees' must be one of {sorted(ROTATIONS)}")
+            clean = {"op": name, "degrees": op["degrees"]}
+        elif name == "audio_resample":
+            clean = {"op": name, "sample_rate": _number(op, "sample_rate", 8000, integer=True)}
+        else:
+            fmt = str(op["format"]).lower()
+            if fmt not in PIPELINE_OUTPUT_FORMATS:
+                raise ValueError(f"format: unsupported output format {fmt}. Supported: {', '.join(PIPELINE_OUTPUT_FORMATS)}")
+            if index != len(operations) - 1:
+                raise ValueError("format must be the last operation")
+            clean = {"op": name, "format": fmt, "quality": op.get("quality")}
+        normalized.append(clean)
+
+    if normalized[-1]["op"] != "format":
+        raise ValueError("The pipeline must end with a format operation")
+    if normalized[-1]["format"] in OPUS_OUTPUT_FORMATS:
+        for op in normalized:
+            if op["op"] == "audio_resample" and op["sample_rate"] not in OPUS_SAMPLE_RATES:
+                raise ValueError(
+                    f"audio_resample: {normalized[-1]['format']} audio is Opus, which only encodes at "
+                    f"{', '.join(str(r) for r in OPUS_SAMPLE_RATES)} Hz; got {op['sample_rate']}"
+                )
+    return normalized
+
+
+def _compile(operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    input_args: List[str] = []
+    video_filters: List[str] = []
+    audio_filters: List[str] = []
+    for op in operations:
+        name = op["op"]
+        if name == "trim":
+            # Seeking on the input skips decoding everything before the start
+            if "start" in op:
+                input_args += ["-ss", f"{op['start']:g}"]
+            if "end" in op:
+                input_args += ["-to", f"{op['end']:g}"]
+        elif name == "scale":
+            video_filters.append(f"scale={op['width']}:{op['height']}")
+        elif name == "crop":
+            position = f":{op['x']}:{op['y']}" if "x" in op else ""
+            video_filters.append(f"crop={op['width']}:{op['height']}{position}")
+        elif name == "fps":
+            video_filters.append(f"fps={op['fps']:g}")
+        elif name == "rotate":
+            video_filters.append(ROTATIONS[op["degrees"]])
+        elif name == "audio_resample":
+            audio_filters.append(f"aresample={op['sample_rate']}")
+
+    fmt = operations[-1]["format"]
+    output_args: List[str] = []
+    if fmt in AUDIO_ONLY_FORMATS:
+        output_args.append("-vn")
+    elif video_filters:
+        output_args += ["-vf", ",".join(video_filters)]
+    if audio_filters:
+        output_args += ["-af", ",".join(audio_filters)]
+    output_args += build_encoding_args(fmt, operations[-1]["quality"])
+    return {"input_args": input_args, "output_args": output_args, "format": fmt, "quality": operations[-1]["quality"]}
+
+
+def plan_pipeline(operations: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+    """
+    Validates and compiles a pipeline into FFmpeg input and output arguments.
+
+    Plans are cached by the pipeline's JSON form, so a repeated pipeline skips
+    validation and planning.
+
+    Returns:
+        The plan ('input_args', 'output_args', 'format', 'quality') and whether it came from the cache.
+
+    Raises:
+        ValueError: If the pipeline is invalid.
+    """
+    try:
+        key = json.dumps(operations, sort_keys=True)
+    except (TypeError, ValueError):
+        raise ValueError("Operations must be JSON objects")
+    plan = _PLAN_CACHE.get(key)
+    if plan is not None:
+        return plan, True
+    plan = _compile(validate_pipeline(operations))
+    if len(_PLAN_CACHE) >= PLAN_CACHE_SIZE:
+        _PLAN_CACHE.pop(next(iter(_PLAN_CACHE)))
+    _PLAN_CACHE[key] = plan
+    return plan, False
+
+
+def build_pipeline_command(plan: Dict[str, Any], input_path: Path, output_path: Path) -> List[str]:
+    """Builds the single FFmpeg invocation for a compiled plan."""
+    return ["ffmpeg", "-y", *plan["input_args"], "-i", str(input_path), *plan["output_args"], str(output_path)]
+
+
+async def run_pipeline_command(
+    plan: Dict[str, Any],
+    input_path: Path,
+    output_path: Path,
+    on_progress: Optional[Any] = None
+) -> Dict[str, Any]:
+    """
+    Runs a compiled pipeline as one FFmpeg process in a job slot. Every operation
+    happens inside that process, so no intermediate file is written.
+    """
+    command = build_pipeline_command(plan, input_path, output_path)
+    policy = get_resource_policy(plan["quality"])
+    async with job_slot(policy) as slot:
+        command[-1:-1] = ["-threads", str(slot["threads"])]
+        run = await run_supervised(command, apply_policy=make_policy_applier(policy, slot["cpus"]), on_progress=on_progress)
+    return {**run, "command": " ".join(command)}
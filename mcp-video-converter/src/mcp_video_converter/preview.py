@@ -0,0 +1,50 @@
+import os
+from pathlib import Path
+from typing import List, Optional
+
+# Preview frame height (never upscaled), encoded for speed rather than size
+PREVIEW_HEIGHT = int(os.environ.get("MCP_PREVIEW_HEIGHT", "360"))
+PREVIEW_CRF = 32
+# Encoder threads of the preview process, which runs outside the job slots
+PREVIEW_THREADS = int(os.environ.get("MCP_PREVIEW_THREADS", "2"))
+# Keyframe and fragment interval of the preview; the first fragment makes it playable
+PREVIEW_FRAGMENT_SECONDS = 1.0
+# Longest convert_video waits for the preview before returning with the job still running
+PREVIEW_WAIT_SECONDS = float(os.environ.get("MCP_PREVIEW_WAIT_SECONDS", "60"))
+PREVIEW_OUTPUT_FORMATS = ["mp4", "webm", "mov", "avi", "mkv", "flv"]
+
+
+def preview_path_for(output_path: Path) -> Path:
+    return output_path.with_name(f"{output_path.stem}_preview.mp4")
+
+
+def preview_output_args(preview_path: Path, seconds: Optional[float] = None) -> List[str]:
+    """
+    FFmpeg output options for the preview: a downscaled, ultrafast H.264/AAC
+    fragmented MP4 of the first video and audio streams, optionally cut after
+    `seconds`.
+
+    The preview is fragmented so it can be played as soon as its first fragment
+    is written, long before the full encode finishes.
+    """
+    args = [
+        "-map", "0:v:0", "-map", "0:a:0?",
+        "-vf", f"scale=-2:min({PREVIEW_HEIGHT}\\,ih)",
+        "-c:v", "libx264", "-preset", "ultrafast", "-crf", str(PREVIEW_CRF), "-pix_fmt", "yuv420p",
+        "-threads", str(PREVIEW_THREADS),
+        "-force_key_frames", f"expr:gte(t,n_forced*{PREVIEW_FRAGMENT_SECONDS:g})",
+        "-c:a", "aac", "-b:a", "96k", "-ac", "2",
+    ]
+    if seconds:
+        args += ["-t", f"{seconds:g}"]
+    args += ["-movflags", "+frag_keyframe+empty_moov+default_base_moof", "-f", "mp4", str(preview_path)]
+    return args
+
+
+def build_preview_command(input_path: Path, preview_path: Path, seconds: Optional[float] = None) -> List[str]:
+    """
+    The preview's own FFmpeg command. It runs beside the conversion rather than as
+    a second output of it, so a slow main encoder (VP9 or high quality) can't
+    hold the preview back.
+    """
+    return ["ffmpeg", "-y", "-i", str(input_path), *preview_output_args(preview_path, seconds)]
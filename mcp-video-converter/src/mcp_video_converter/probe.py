@@ -0,0 +1,74 @@
+import json
+from pathlib import Path
+from typing import Dict, Any, Optional, Union
+
+from .process import run_command
+
+
+async def probe_media(input_path: Union[str, Path], timeout: Optional[float] = 30.0) -> Dict[str, Any]:
+    """
+    Runs ffprobe on a media file and returns its format and stream information.
+
+    Args:
+        input_path: Path to the media file.
+        timeout: Optional timeout in seconds for the ffprobe call.
+
+    Returns:
+        A dictionary with 'success', and on success the parsed 'format' and 'streams'.
+    """
+    command = [
+        "ffprobe", "-v", "error",
+        "-show_format", "-show_streams",
+        "-of", "json",
+        str(input_path)
+    ]
+    try:
+        returncode, stdout, stderr = await run_command(command, timeout=timeout)
+    except FileNotFoundError:
+        return {"success": False, "error": "ffprobe not found. Please ensure FFmpeg is installed and in PATH."}
+    except Exception as e:
+        return {"success": False, "error": f"ffprobe failed: {str(e)}"}
+
+    if returncode != 0:
+        return {"success": False, "error": f"ffprobe failed: {stderr.decode(errors='replace').strip()}"}
+
+    try:
+        data = json.loads(stdout.decode(errors="replace") or "{}")
+    except json.JSONDecodeError as e:
+        return {"success": False, "error": f"Could not parse ffprobe output: {str(e)}"}
+
+    return {
+        "success": True,
+        "format": data.get("format", {}),
+        "streams": data.get("streams", []),
+    }
+
+
+def get_duration(probe: Dict[str, Any]) -> Optional[float]:
+    """Returns the container duration in seconds from a probe result, if known."""
+    try:
+        return float(probe["format"]["duration"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def get_stream(probe: Dict[str, Any], codec_type: str) -> Optional[Dict[str, Any]]:
+    """Returns the first stream of the given type ('video', 'audio') from a probe result."""
+    for stream in probe.get("streams", []):
+        if stream.get("codec_type") == codec_type:
+            return stream
+    return None
+
+
+def get_video_geometry(probe: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Returns the first video stream's 'width', 'height' and 'fps' from a probe result."""
+    stream = get_stream(probe, "video")
+    if not stream or not stream.get("width") or not stream.get("height"):
+        return None
+    fps = None
+    num, _, den = str(stream.get("avg_frame_rate") or stream.get("r_frame_rate") or "").partition("/")
+    try:
+        fps = float(num) / float(den or 1) or None
+    except (ValueError, ZeroDivisionError):
+        pass
+    return {"width": int(stream["width"]), "height": int(stream["height"]), "fps": fps}
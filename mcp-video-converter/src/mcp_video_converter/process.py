@@ -0,0 +1,30 @@
+import asyncio
+import subprocess
+from typing import List, Optional, Tuple
+
+
+async def run_command(command: List[str], timeout: Optional[float] = None) -> Tuple[int, bytes, bytes]:
+    """
+    Runs an FFmpeg/FFprobe helper command and collects its output.
+
+    Args:
+        command: The command and its arguments.
+        timeout: Optional timeout in seconds; the process is killed when it expires
+            or when the awaiting task is cancelled.
+
+    Returns:
+        A tuple of (return code, stdout bytes, stderr bytes).
+    """
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        # Never leave a helper process running once nobody is waiting for it
+        process.kill()
+        await process.wait()
+        raise
+    return process.returncode, stdout, stderr
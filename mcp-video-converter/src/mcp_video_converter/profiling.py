@@ -0,0 +1,237 @@
+import asyncio
+import cProfile
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+PROFILE_MODES = ["cprofile", "sample"]
+PROFILE_DIR = os.path.expanduser(os.environ.get("MCP_PROFILE_DIR", "~/.mcp-video-converter/profiles"))
+# Sampling interval of the "sample" mode
+SAMPLE_INTERVAL_SECONDS = 0.005
+# Slow event-loop callbacks and written profiles kept for diagnostics
+SLOW_CALLBACK_HISTORY = 50
+PROFILE_HISTORY = 20
+
+
+def _env_mode() -> Optional[str]:
+    mode = os.environ.get("MCP_PROFILE", "").lower()
+    return mode if mode in PROFILE_MODES else None
+
+
+def collapse_stack(frame: Any) -> str:
+    """Formats a frame and its callers root first, ';'-separated, as in collapsed-stack files."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """Samples one thread's Python stack from a background thread into collapsed-stack counts."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mcp-stack-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: Path) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class LoopLagMonitor:
+    """
+    Detects event-loop callbacks that block for longer than a threshold.
+
+    A timer on the loop records when it was due; a watchdog thread notices when it
+    is overdue and captures the loop thread's stack at that moment, which is the
+    callback holding the loop. When the timer finally runs, the lag is recorded with
+    that stack.
+    """
+
+    def __init__(self, threshold_seconds: float):
+        self.threshold = threshold_seconds
+        self.interval = max(0.01, threshold_seconds / 2)
+        self.events: deque = deque(maxlen=SLOW_CALLBACK_HISTORY)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._due = 0.0
+        self._blocked_stack: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self._schedule()
+        self._thread = threading.Thread(target=self._watch, name="mcp-loop-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _schedule(self) -> None:
+        self._due = time.monotonic() + self.interval
+        self._handle = self._loop.call_later(self.interval, self._tick)
+
+    def _tick(self) -> None:
+        lag = time.monotonic() - self._due
+        if lag >= self.threshold:
+            self.events.append({"lag_ms": round(lag * 1000, 1), "at": time.time(), "stack": self._blocked_stack})
+        self._blocked_stack = None
+        self._schedule()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            if self._blocked_stack is None and time.monotonic() - self._due >= self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is not None:
+                    self._blocked_stack = collapse_stack(frame)
+
+
+class Profiler:
+    """
+    Per-invocation profiling of tool calls. While mode is None, profiled() wrappers
+    only check one attribute and call the tool directly.
+
+    Only one invocation is profiled at a time, since a profile covers everything the
+    event loop runs while it is recorded, including other concurrent calls.
+    """
+
+    def __init__(self):
+        self.mode: Optional[str] = _env_mode()
+        self.every = max(1, int(os.environ.get("MCP_PROFILE_EVERY", "1")))
+        self.directory = Path(PROFILE_DIR)
+        self.calls = 0
+        self.profiled = 0
+        self.skipped_busy = 0
+        self.recent: deque = deque(maxlen=PROFILE_HISTORY)
+        lag_ms = float(os.environ.get("MCP_LOOP_LAG_MS", "0"))
+        self.monitor: Optional[LoopLagMonitor] = LoopLagMonitor(lag_ms / 1000) if lag_ms > 0 else None
+        self._busy = False
+
+    @property
+    def hooked(self) -> bool:
+        return self.mode is not None or (self.monitor is not None and not self.monitor.running)
+
+    def configure(
+        self,
+        mode: Optional[str],
+        every: int = 1,
+        directory: Optional[str] = None,
+        loop_lag_ms: Optional[float] = None
+    ) -> None:
+        """
+        Raises:
+            ValueError: If the mode is unknown or every is not positive.
+        """
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}. Use one of: {', '.join(PROFILE_MODES)}, or off")
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        self.mode, self.every = mode, every
+        if directory:
+            self.directory = Path(directory).expanduser()
+        if loop_lag_ms is not None:
+            if self.monitor is not None:
+                self.monitor.stop()
+            self.monitor = LoopLagMonitor(loop_lag_ms / 1000) if loop_lag_ms > 0 else None
+            if self.monitor is not None:
+                self.monitor.start(asyncio.get_running_loop())
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode or "off",
+            "every": self.every,
+            "directory": str(self.directory),
+            "calls": self.calls,
+            "profiled": self.profiled,
+            "skipped_busy": self.skipped_busy,
+            "recent_profiles": list(self.recent),
+            "loop_lag_threshold_ms": round(self.monitor.threshold * 1000, 1) if self.monitor else None,
+            "slow_callbacks": list(self.monitor.events) if self.monitor else [],
+        }
+
+    async def run(self, name: str, fn: Callable[..., Awaitable[Any]], args: Any, kwargs: Any) -> Any:
+        if self.monitor is not None and not self.monitor.running:
+            self.monitor.start(asyncio.get_running_loop())
+        mode = self.mode
+        if mode is None:
+            return await fn(*args, **kwargs)
+        self.calls += 1
+        if self.calls % self.every:
+            return await fn(*args, **kwargs)
+        if self._busy:
+            self.skipped_busy += 1
+            return await fn(*args, **kwargs)
+
+        self._busy = True
+        self.profiled += 1
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}_{name}_{self.profiled}"
+        started = time.perf_counter()
+        if mode == "cprofile":
+            recorder = cProfile.Profile()
+            recorder.enable()
+        else:
+            recorder = StackSampler(threading.get_ident())
+            recorder.start()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            if mode == "cprofile":
+                recorder.disable()
+                path = self.directory / f"{stem}.pstats"
+                recorder.dump_stats(str(path))
+            else:
+                recorder.stop()
+                path = self.directory / f"{stem}.collapsed"
+                recorder.write(path)
+            self._busy = False
+            self.recent.append({"tool": name, "path": str(path), "seconds": round(time.perf_counter() - started, 4)})
+
+
+PROFILER = Profiler()
+
+
+def profiled(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Wraps a tool so PROFILER can record its invocations; the signature is kept for tool registration."""
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if not PROFILER.hooked:
+            return await fn(*args, **kwargs)
+        return await PROFILER.run(fn.__name__, fn, args, kwargs)
+    return wrapper
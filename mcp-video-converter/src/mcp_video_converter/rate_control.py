@@ -0,0 +1,416 @@
+import math
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from .encoding import build_encoding_args
+from .probe import probe_media, get_duration, get_stream
+from .resources import accumulate_usage, get_resource_policy, job_slot, make_policy_applier
+from .supervisor import run_supervised
+
+# Number and length of the representative windows encoded per candidate CRF
+SAMPLE_WINDOWS = 3
+SAMPLE_SECONDS = 2.0
+
+# Usable CRF range and initial candidates per output format (libx264 vs libvpx-vp9)
+CRF_RANGES = {"webm": (4, 63)}
+DEFAULT_CRF_RANGE = (0, 51)
+CANDIDATE_CRFS = {"webm": [24, 36, 48]}
+DEFAULT_CANDIDATE_CRFS = [20, 28, 36]
+
+# Extra sample rounds encoded at the interpolated CRF to tighten the estimate
+REFINEMENT_ROUNDS = 1
+
+# Audio bitrate assumed for the default audio encoder of each container (bits/s)
+AUDIO_BITRATE_ESTIMATES = {"webm": 96000}
+DEFAULT_AUDIO_BITRATE_ESTIMATE = 128000
+
+# Container overhead and safety margin applied to size budgets
+CONTAINER_OVERHEAD = 0.02
+
+SSIM_PATTERN = re.compile(r"SSIM .*All:([\d.]+)")
+PSNR_PATTERN = re.compile(r"PSNR .*average:([\d.]+|inf)")
+
+
+async def _run_governed(
+    command: List[str],
+    policy: Dict[str, Any],
+    usage_totals: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Runs a sample encode or measurement in a job slot under the job's resource policy,
+    so rate search children get the same thread cap, priority and limits as the full
+    encode and count toward its usage.
+    """
+    async with job_slot(policy) as slot:
+        command = command[:-1] + ["-threads", str(slot["threads"])] + command[-1:]
+        run = await run_supervised(command, apply_policy=make_policy_applier(policy, slot["cpus"]))
+    accumulate_usage(usage_totals, run["resource_usage"])
+    return run
+
+
+def interpolate_crf(points: List[Tuple[float, float]], target: float, log_scale: bool = False) -> float:
+    """
+    Interpolates the CRF at which a measured value (size or SSIM) reaches the target.
+
+    The measured value is assumed to fall as CRF rises. Sizes are interpolated in log
+    space, where they are close to linear in CRF. Targets outside the sampled range are
+    extrapolated along the nearest segment.
+
+    Args:
+        points: (crf, value) pairs from sample encodes.
+        target: The target value.
+        log_scale: Interpolate on log(value) instead of value.
+
+    Returns:
+        The (fractional) CRF expected to hit the target.
+    """
+    pts = sorted(points)
+    if len(pts) == 1:
+        return pts[0][0]
+
+    def scale(v: float) -> float:
+        return math.log(max(v, 1e-9)) if log_scale else v
+
+    xs = [p[0] for p in pts]
+    ys = [scale(p[1]) for p in pts]
+    t = scale(target)
+
+    seg = None
+    for i in range(len(pts) - 1):
+        if ys[i] >= t >= ys[i + 1]:
+            seg = i
+            break
+    if seg is None:
+        seg = 0 if t > ys[0] else len(pts) - 2
+
+    x0, x1, y0, y1 = xs[seg], xs[seg + 1], ys[seg], ys[seg + 1]
+    if y0 == y1:
+        return x1 if t <= y1 else x0
+    return x0 + (t - y0) * (x1 - x0) / (y1 - y0)
+
+
+def interpolate_value(points: List[Tuple[float, float]], crf: float, log_scale: bool = False) -> float:
+    """Predicts the measured value (size or SSIM) at a CRF from sample points."""
+    pts = sorted(points)
+    if len(pts) == 1:
+        return pts[0][1]
+
+    def scale(v: float) -> float:
+        return math.log(max(v, 1e-9)) if log_scale else v
+
+    seg = len(pts) - 2
+    for i in range(len(pts) - 1):
+        if crf <= pts[i + 1][0]:
+            seg = i
+            break
+    x0, x1 = pts[seg][0], pts[seg + 1][0]
+    y0, y1 = scale(pts[seg][1]), scale(pts[seg + 1][1])
+    y = y0 + (crf - x0) * (y1 - y0) / (x1 - x0)
+    return math.exp(y) if log_scale else y
+
+
+def sample_windows(duration: float) -> List[Tuple[float, float]]:
+    """Returns (start, length) windows spread evenly through a file of the given duration."""
+    if duration <= SAMPLE_WINDOWS * SAMPLE_SECONDS:
+        return [(0.0, duration)]
+    windows = []
+    for i in range(SAMPLE_WINDOWS):
+        center = duration * (i + 1) / (SAMPLE_WINDOWS + 1)
+        windows.append((max(0.0, center - SAMPLE_SECONDS / 2), SAMPLE_SECONDS))
+    return windows
+
+
+async def measure_quality(
+    encoded_path: Path,
+    reference_path: Path,
+    start: float,
+    length: float,
+    framerate: Optional[int] = None,
+    encoded_offset: Optional[float] = None,
+    policy: Optional[Dict[str, Any]] = None,
+    usage_totals: Optional[Dict[str, Any]] = None
+) -> Dict[str, Optional[float]]:
+    """
+    Measures SSIM and PSNR of an encoded clip against a window of the reference input.
+
+    Args:
+        encoded_path: The encoded file.
+        reference_path: The original input file.
+        start: Start of the reference window in seconds.
+        length: Length of the window in seconds.
+        framerate: Output framerate, applied to the reference so frames line up.
+        encoded_offset: Seek into the encoded file (for full outputs); None for samples.
+        policy: Resource policy for the measurement run (defaults to the default tier).
+        usage_totals: Optional accumulator for the run's resource usage.
+
+    Returns:
+        A dictionary with 'ssim' and 'psnr' (None when they could not be parsed).
+    """
+    ref_filter = f"fps={framerate}" if framerate else "null"
+    command = ["ffmpeg", "-hide_banner", "-nostats"]
+    if encoded_offset is not None:
+        command.extend(["-ss", f"{encoded_offset:.3f}", "-t", f"{length:.3f}"])
+    command.extend([
+        "-i", str(encoded_path),
+        "-ss", f"{start:.3f}", "-t", f"{length:.3f}", "-i", str(reference_path),
+        "-lavfi",
+        f"[1:v]{ref_filter}[ref];[0:v]split[a][b];[ref]split[r1][r2];[a][r1]ssim;[b][r2]psnr",
+        "-f", "null", "-"
+    ])
+    run = await _run_governed(
+        command, policy or get_resource_policy(None), usage_totals if usage_totals is not None else {}
+    )
+    text = run["stderr"].decode(errors="replace")
+
+    ssim_match = SSIM_PATTERN.search(text)
+    psnr_match = PSNR_PATTERN.search(text)
+    psnr = None
+    if psnr_match:
+        psnr = float("inf") if psnr_match.group(1) == "inf" else float(psnr_match.group(1))
+    return {
+        "ssim": float(ssim_match.group(1)) if ssim_match else None,
+        "psnr": psnr,
+    }
+
+
+async def _encode_samples(
+    input_path: Path,
+    output_format: str,
+    crf: int,
+    windows: List[Tuple[float, float]],
+    work_dir: Path,
+    framerate: Optional[int],
+    measure: bool,
+    policy: Dict[str, Any],
+    usage_totals: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Encodes every sample window at one CRF and returns its bitrate and quality."""
+    total_bytes = 0
+    total_seconds = 0.0
+    ssims: List[float] = []
+    psnrs: List[float] = []
+
+    for index, (start, length) in enumerate(windows):
+        sample_path = work_dir / f"sample_crf{crf}_{index}.{output_format}"
+        command = [
+            "ffmpeg", "-y", "-hide_banner", "-nostats",
+            "-ss", f"{start:.3f}", "-t", f"{length:.3f}", "-i", str(input_path),
+            "-an",
+        ]
+        command.extend(build_encoding_args(output_format, None, framerate, crf))
+        command.append(str(sample_path))
+
+        run = await _run_governed(command, policy, usage_totals)
+        if run["returncode"] != 0 or not sample_path.exists():
+            raise RuntimeError(
+                f"Sample encode at CRF {crf} failed: {run['stderr'].decode(errors='replace').strip()[-500:]}"
+            )
+        total_bytes += sample_path.stat().st_size
+        total_seconds += length
+
+        if measure:
+            quality = await measure_quality(
+                sample_path, input_path, start, length, framerate,
+                policy=policy, usage_totals=usage_totals
+            )
+            if quality["ssim"] is not None:
+                ssims.append(quality["ssim"])
+            if quality["psnr"] is not None:
+                psnrs.append(quality["psnr"])
+
+    return {
+        "crf": crf,
+        "video_bytes_per_second": total_bytes / total_seconds if total_seconds else 0.0,
+        "ssim": sum(ssims) / len(ssims) if ssims else None,
+        "psnr": sum(psnrs) / len(psnrs) if psnrs else None,
+    }
+
+
+def _estimate_audio_bytes(probe: Dict[str, Any], output_format: str, duration: float) -> float:
+    """Estimates the audio track size of the full output in bytes."""
+    if get_stream(probe, "audio") is None:
+        return 0.0
+    bitrate = AUDIO_BITRATE_ESTIMATES.get(output_format, DEFAULT_AUDIO_BITRATE_ESTIMATE)
+    return bitrate / 8 * duration
+
+
+async def search_crf(
+    input_path: Path,
+    output_format: str,
+    framerate: Optional[int] = None,
+    target_size_bytes: Optional[int] = None,
+    target_ssim: Optional[float] = None,
+    policy: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Finds the CRF that meets a size budget or SSIM floor using short sample encodes.
+
+    A few representative windows of the input are encoded at candidate CRFs, their
+    size (and SSIM/PSNR for quality targets) is measured, and the CRF for the full
+    encode is interpolated from those points.
+
+    Args:
+        input_path: The input video file.
+        output_format: The lowercase output format.
+        framerate: Optional output framerate.
+        target_size_bytes: Maximum output size in bytes.
+        target_ssim: Minimum average SSIM (0-1).
+        policy: Resource policy of the job; sample encodes run in job slots under it.
+
+    Returns:
+        A dictionary with 'success', the chosen 'crf', the number of 'sample_encodes',
+        the sample windows and points, the predicted size or SSIM, and the summed
+        'resource_usage' of the sample runs.
+    """
+    if target_size_bytes is not None and target_size_bytes <= 0:
+        return {"success": False, "error": "target_size_bytes must be positive."}
+    if target_ssim is not None and not 0 < target_ssim < 1:
+        return {"success": False, "error": "target_ssim must be between 0 and 1."}
+
+    probe = await probe_media(input_path)
+    if not probe["success"]:
+        return probe
+    duration = get_duration(probe)
+    if not duration:
+        return {"success": False, "error": "Could not determine input duration for sample-based rate search."}
+    if get_stream(probe, "video") is None:
+        return {"success": False, "error": "Input has no video stream to rate-control."}
+
+    crf_min, crf_max = CRF_RANGES.get(output_format, DEFAULT_CRF_RANGE)
+    candidates = CANDIDATE_CRFS.get(output_format, DEFAULT_CANDIDATE_CRFS)
+    windows = sample_windows(duration)
+    measure = target_ssim is not None
+
+    video_budget = None
+    if target_size_bytes is not None:
+        audio_bytes = _estimate_audio_bytes(probe, output_format, duration)
+        video_budget = target_size_bytes * (1 - CONTAINER_OVERHEAD) - audio_bytes
+        if video_budget <= 0:
+            return {
+                "success": False,
+                "error": f"target_size_bytes is too small to fit the estimated audio track ({int(audio_bytes)} bytes).",
+            }
+
+    policy = policy or get_resource_policy(None)
+    usage_totals: Dict[str, Any] = {}
+    samples: List[Dict[str, Any]] = []
+    sample_encodes = 0
+
+    def choose() -> Tuple[int, float]:
+        if video_budget is not None:
+            points = [(s["crf"], s["video_bytes_per_second"] * duration) for s in samples]
+            # Round towards higher CRF so the prediction stays under the budget
+            crf = math.ceil(interpolate_crf(points, video_budget, log_scale=True) - 1e-6)
+            crf = min(max(crf, crf_min), crf_max)
+            return crf, interpolate_value(points, crf, log_scale=True)
+        points = [(s["crf"], s["ssim"]) for s in samples if s["ssim"] is not None]
+        if not points:
+            raise RuntimeError("SSIM could not be measured on the sample encodes")
+        # Round towards lower CRF so the prediction stays above the SSIM floor
+        crf = math.floor(interpolate_crf(points, target_ssim) + 1e-6)
+        crf = min(max(crf, crf_min), crf_max)
+        return crf, interpolate_value(points, crf)
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="mcp_rate_search_") as tmp:
+            work_dir = Path(tmp)
+            for crf in candidates:
+                samples.append(await _encode_samples(
+                    input_path, output_format, crf, windows, work_dir, framerate, measure, policy, usage_totals
+                ))
+                sample_encodes += len(windows)
+
+            chosen, predicted = choose()
+            for _ in range(REFINEMENT_ROUNDS):
+                if any(s["crf"] == chosen for s in samples):
+                    break
+                samples.append(await _encode_samples(
+                    input_path, output_format, chosen, windows, work_dir, framerate, measure, policy, usage_totals
+                ))
+                sample_encodes += len(windows)
+                chosen, predicted = choose()
+    except FileNotFoundError:
+        return {"success": False, "error": "FFmpeg not found. Please ensure it's installed and in PATH."}
+    except Exception as e:
+        return {"success": False, "error": f"Rate search failed: {str(e)}"}
+
+    result: Dict[str, Any] = {
+        "success": True,
+        "mode": "size" if video_budget is not None else "ssim",
+        "crf": chosen,
+        "sample_encodes": sample_encodes,
+        "sample_windows": [{"start": start, "duration": length} for start, length in windows],
+        "samples": sorted(samples, key=lambda s: s["crf"]),
+        "duration": duration,
+        "resource_usage": usage_totals,
+    }
+    if video_budget is not None:
+        result["target_size_bytes"] = target_size_bytes
+        result["predicted_size_bytes"] = int(target_size_bytes - video_budget + predicted)
+    else:
+        result["target_ssim"] = target_ssim
+        result["predicted_ssim"] = predicted
+    return result
+
+
+async def report_rate_search(
+    rate_search: Dict[str, Any],
+    input_path: Path,
+    output_path: Path,
+    framerate: Optional[int] = None,
+    policy: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Summarises a rate search against the finished full encode, including achieved error.
+
+    Args:
+        rate_search: The result of search_crf.
+        input_path: The input file.
+        output_path: The finished output file.
+        framerate: Optional output framerate.
+        policy: Resource policy for the SSIM measurement runs.
+
+    Returns:
+        A dictionary with the chosen CRF, the sample encode count, the achieved error,
+        and the resource usage of the search and measurement runs.
+    """
+    report = {
+        "mode": rate_search["mode"],
+        "crf": rate_search["crf"],
+        "sample_encodes": rate_search["sample_encodes"],
+        "resource_usage": dict(rate_search.get("resource_usage", {})),
+    }
+    if rate_search["mode"] == "size":
+        achieved = output_path.stat().st_size
+        target = rate_search["target_size_bytes"]
+        report.update({
+            "target_size_bytes": target,
+            "predicted_size_bytes": rate_search["predicted_size_bytes"],
+            "achieved_size_bytes": achieved,
+            "size_error_pct": round((achieved - target) / target * 100, 2),
+        })
+        return report
+
+    # Measure the full output on the same windows the search sampled
+    ssims = []
+    for window in rate_search["sample_windows"]:
+        try:
+            quality = await measure_quality(
+                output_path, input_path, window["start"], window["duration"],
+                framerate, encoded_offset=window["start"],
+                policy=policy, usage_totals=report["resource_usage"]
+            )
+        except Exception:
+            continue
+        if quality["ssim"] is not None:
+            ssims.append(quality["ssim"])
+    achieved_ssim = sum(ssims) / len(ssims) if ssims else None
+    report.update({
+        "target_ssim": rate_search["target_ssim"],
+        "predicted_ssim": rate_search["predicted_ssim"],
+        "achieved_ssim": achieved_ssim,
+        "ssim_error": None if achieved_ssim is None else round(achieved_ssim - rate_search["target_ssim"], 5),
+    })
+    return report
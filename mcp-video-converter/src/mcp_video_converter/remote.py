@@ -0,0 +1,327 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path, PurePosixPath
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import quote, unquote, urlsplit
+
+import httpx
+
+REMOTE_CACHE_DIR = os.path.expanduser(os.environ.get("MCP_REMOTE_CACHE_DIR", "~/.mcp-video-converter/remote_cache"))
+# Disk budget of the block cache; 0 keeps only the in-memory blocks
+REMOTE_CACHE_BYTES = int(os.environ.get("MCP_REMOTE_CACHE_BYTES", str(2 << 30)))
+REMOTE_BLOCK_BYTES = int(os.environ.get("MCP_REMOTE_BLOCK_BYTES", str(1 << 20)))
+# Outputs of remote inputs have no local directory to go next to
+REMOTE_OUTPUT_DIR = os.path.expanduser(os.environ.get("MCP_REMOTE_OUTPUT_DIR", "~/.mcp-video-converter/converted_videos"))
+REMOTE_TIMEOUT_SECONDS = 30.0
+# Recently used blocks kept in memory, so sequential readers rarely touch the disk cache
+MEMORY_BLOCKS = 16
+
+
+class RemoteInputError(Exception):
+    """A remote input is unreachable, unsuitable for ranged reads, or changed while being read."""
+
+
+def is_remote_url(value: str) -> bool:
+    return urlsplit(value).scheme in ("http", "https")
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single-range Range header into inclusive (start, end) offsets.
+    Returns None for a missing or multi-range header (served in full).
+
+    Raises:
+        ValueError: If the range is malformed or not satisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(0, size - int(last)), size - 1
+    if start > end or start >= size:
+        raise ValueError(f"Range not satisfiable: {header}")
+    return start, end
+
+
+class BlockCache:
+    """
+    Read-through cache of remote files in fixed-size blocks, served to FFmpeg by a
+    loopback HTTP server.
+
+    FFmpeg reads http://127.0.0.1:<port>/<key>/<name> with ordinary ranged requests.
+    Blocks missing from memory and disk are fetched from the origin with Range
+    requests over one keep-alive client, and the block after each one read is
+    prefetched. The key covers the URL and the origin's ETag or Last-Modified and
+    size, so a changed remote file never reuses stale blocks. Files whose origin
+    sends neither validator are cached in memory only.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = REMOTE_CACHE_DIR,
+        block_bytes: int = REMOTE_BLOCK_BYTES,
+        max_bytes: int = REMOTE_CACHE_BYTES
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.block_bytes = block_bytes
+        self.max_bytes = max_bytes
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "origin_fetches": 0, "origin_bytes": 0}
+        self.port: Optional[int] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._memory: "OrderedDict[Tuple[str, int], bytes]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, int], asyncio.Future] = {}
+        self._cached_bytes: Optional[int] = None
+
+    async def start(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self._client = httpx.AsyncClient(follow_redirects=True, timeout=REMOTE_TIMEOUT_SECONDS)
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._client is not None:
+            await self._client.aclose()
+
+    async def open(self, url: str) -> Dict[str, Any]:
+        """
+        Checks that the origin serves byte ranges and registers the file.
+
+        Returns:
+            The local 'url' for FFmpeg, the file 'stem' and 'size', and the cache 'key'.
+
+        Raises:
+            RemoteInputError: If the origin is unreachable or does not support ranges.
+        """
+        try:
+            response = await self._client.get(url, headers={"Range": "bytes=0-0"})
+        except httpx.HTTPError as e:
+            raise RemoteInputError(f"Could not reach {url}: {e}")
+        if response.status_code != 206 or "content-range" not in response.headers:
+            raise RemoteInputError(
+                f"{url} does not support HTTP range requests (status {response.status_code})"
+            )
+        try:
+            size = int(response.headers["content-range"].rpartition("/")[2])
+        except ValueError:
+            raise RemoteInputError(f"{url} did not report its size")
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        validator = etag or last_modified or ""
+        key = hashlib.sha256(f"{url}\0{validator}\0{size}".encode()).hexdigest()[:24]
+        name = PurePosixPath(unquote(urlsplit(url).path)).name or "input"
+        self.sources[key] = {
+            "url": url,
+            "size": size,
+            "key": key,
+            # If-Range only matches strong ETags, so a weak one falls back to the date
+            "if_range": etag if etag and not etag.startswith("W/") else last_modified,
+            # Without a validator a changed file would keep the same key, so its blocks stay in memory
+            "persist": bool(validator),
+        }
+        return {
+            "url": f"http://127.0.0.1:{self.port}/{key}/{quote(name)}",
+            "stem": PurePosixPath(name).stem,
+            "size": size,
+            "key": key,
+        }
+
+    def _block_path(self, key: str, index: int) -> Path:
+        return self.cache_dir / key / f"{index:08d}.blk"
+
+    async def block(self, source: Dict[str, Any], index: int) -> bytes:
+        """Returns one block from memory, the disk cache, or the origin; concurrent reads share a fetch."""
+        slot = (source["key"], index)
+        data = self._memory.get(slot)
+        if data is not None:
+            self._memory.move_to_end(slot)
+            self.stats["memory_hits"] += 1
+            return data
+        pending = self._inflight.get(slot)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = self.loop.create_future()
+        self._inflight[slot] = future
+        try:
+            data = await self._load(source, index)
+            future.set_result(data)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters get the exception; nobody else needs to retrieve it
+            future.exception()
+            raise
+        finally:
+            del self._inflight[slot]
+        self._memory[slot] = data
+        while len(self._memory) > MEMORY_BLOCKS:
+            self._memory.popitem(last=False)
+        return data
+
+    async def _load(self, source: Dict[str, Any], index: int) -> bytes:
+        path = self._block_path(source["key"], index)
+        persist = self.max_bytes > 0 and source["persist"]
+        if persist:
+            try:
+                data = await self.loop.run_in_executor(None, path.read_bytes)
+                self.stats["disk_hits"] += 1
+                return data
+            except OSError:
+                pass
+        start = index * self.block_bytes
+        end = min(source["size"], start + self.block_bytes) - 1
+        headers = {"Range": f"bytes={start}-{end}"}
+        if source["if_range"]:
+            # The origin answers with the whole file instead of a range if it changed
+            headers["If-Range"] = source["if_range"]
+        try:
+            response = await self._client.get(source["url"], headers=headers)
+        except httpx.HTTPError as e:
+            raise RemoteInputError(f"Reading {source['url']} failed: {e}")
+        if response.status_code != 206 or len(response.content) != end - start + 1:
+            raise RemoteInputError(f"{source['url']} changed or returned a bad range (status {response.status_code})")
+        data = response.content
+        self.stats["origin_fetches"] += 1
+        self.stats["origin_bytes"] += len(data)
+        if persist:
+            await self.loop.run_in_executor(None, self._store, path, data)
+        return data
+
+    def _store(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        if self._cached_bytes is None:
+            self._cached_bytes = sum(p.stat().st_size for p in self.cache_dir.glob("*/*.blk"))
+        else:
+            self._cached_bytes += len(data)
+        if self._cached_bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Removes the least recently written blocks until the cache is at 90% of its budget."""
+        blocks = []
+        for path in self.cache_dir.glob("*/*.blk"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            blocks.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in blocks)
+        for _, size, path in sorted(blocks):
+            if total <= self.max_bytes * 0.9:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._cached_bytes = total
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serves GET and HEAD with single byte ranges, keeping the connection open between requests."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                source = self.sources.get(target.lstrip("/").split("/", 1)[0])
+                if source is None or method not in ("GET", "HEAD"):
+                    status = "404 Not Found" if source is None else "405 Method Not Allowed"
+                    writer.write(f"HTTP/1.1 {status}\r\nContent-Length: 0\r\n\r\n".encode())
+                    await writer.drain()
+                    if not keep_alive:
+                        break
+                    continue
+                size = source["size"]
+                try:
+                    byte_range = parse_range(headers.get("range"), size)
+                except ValueError:
+                    writer.write(f"HTTP/1.1 416 Range Not Satisfiable\r\nContent-Range: bytes */{size}\r\nContent-Length: 0\r\n\r\n".encode())
+                    await writer.drain()
+                    continue
+                start, end = byte_range or (0, size - 1)
+                lines = [
+                    "HTTP/1.1 206 Partial Content" if byte_range else "HTTP/1.1 200 OK",
+                    "Content-Type: application/octet-stream",
+                    "Accept-Ranges: bytes",
+                    f"Content-Length: {end - start + 1}",
+                ]
+                if byte_range:
+                    lines.append(f"Content-Range: bytes {start}-{end}/{size}")
+                lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+                if method == "GET":
+                    await self._send_range(writer, source, start, end)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError, RemoteInputError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send_range(self, writer: asyncio.StreamWriter, source: Dict[str, Any], start: int, end: int) -> None:
+        position = start
+        last_block = end // self.block_bytes
+        while position <= end:
+            index = position // self.block_bytes
+            if index < last_block:
+                # Read ahead one block while this one is written out
+                asyncio.ensure_future(self.block(source, index + 1)).add_done_callback(_ignore_result)
+            data = await self.block(source, index)
+            offset = position - index * self.block_bytes
+            piece = memoryview(data)[offset:offset + end - position + 1]
+            writer.write(piece)
+            await writer.drain()
+            position += len(piece)
+
+
+def _ignore_result(task: asyncio.Future) -> None:
+    if not task.cancelled():
+        task.exception()
+
+
+_CACHE: Optional[BlockCache] = None
+
+
+async def open_remote(url: str) -> Dict[str, Any]:
+    """
+    Registers a remote input with the block cache, starting it on first use in
+    this event loop.
+
+    Raises:
+        RemoteInputError: If the origin is unreachable or does not support ranges.
+    """
+    global _CACHE
+    if _CACHE is None or _CACHE.loop is not asyncio.get_running_loop():
+        _CACHE = BlockCache(REMOTE_CACHE_DIR, REMOTE_BLOCK_BYTES, REMOTE_CACHE_BYTES)
+        await _CACHE.start()
+    return await _CACHE.open(url)
+
+
+def get_remote_cache_stats() -> Dict[str, Any]:
+    if _CACHE is None:
+        return {"active": False}
+    return {"active": True, "port": _CACHE.port, "sources": len(_CACHE.sources), **_CACHE.stats}
@@ -0,0 +1,286 @@
+import asyncio
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import platform
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator, Callable, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+CPU_COUNT = os.cpu_count() or 1
+
+
+def _max_concurrent_jobs() -> int:
+    """Reads MCP_MAX_CONCURRENT_JOBS, falling back to half the cores when unset or invalid."""
+    default = max(1, CPU_COUNT // 2)
+    value = os.environ.get("MCP_MAX_CONCURRENT_JOBS")
+    if not value:
+        return default
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logger.warning(f"Ignoring invalid MCP_MAX_CONCURRENT_JOBS={value!r}; using {default}")
+        return default
+
+# Number of FFmpeg jobs allowed to run at once; each gets an equal share of the cores
+MAX_CONCURRENT_JOBS = _max_concurrent_jobs()
+
+# Per quality tier resource policies. "threads": None derives the thread cap from the
+# concurrency level; limits of None leave the corresponding rlimit untouched.
+DEFAULT_RESOURCE_POLICIES: Dict[str, Dict[str, Any]] = {
+    "high": {"threads": None, "nice": 0, "ionice_class": "best-effort", "ionice_level": 4,
+             "memory_limit_mb": None, "cpu_time_limit_s": None, "pin_cpus": False},
+    "medium": {"threads": None, "nice": 5, "ionice_class": "best-effort", "ionice_level": 4,
+               "memory_limit_mb": None, "cpu_time_limit_s": None, "pin_cpus": False},
+    "low": {"threads": None, "nice": 10, "ionice_class": "best-effort", "ionice_level": 7,
+            "memory_limit_mb": None, "cpu_time_limit_s": None, "pin_cpus": False},
+    "default": {"threads": None, "nice": 5, "ionice_class": "best-effort", "ionice_level": 4,
+                "memory_limit_mb": None, "cpu_time_limit_s": None, "pin_cpus": False},
+}
+
+# I/O scheduling classes for ioprio_set (see ioprio_set(2))
+IOPRIO_CLASSES = {"realtime": 1, "best-effort": 2, "idle": 3}
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_WHO_PROCESS = 1
+SYS_IOPRIO_SET = {"x86_64": 251, "aarch64": 30, "arm64": 30, "i386": 289, "i686": 289}
+
+# Interval between /proc samples of a running job
+USAGE_SAMPLE_INTERVAL = 0.5
+
+_job_slots: Optional[asyncio.Semaphore] = None
+_free_cpus: List[int] = []
+
+
+def load_resource_policies() -> Dict[str, Dict[str, Any]]:
+    """
+    Returns the per-tier resource policies, merged with overrides from the
+    MCP_RESOURCE_POLICIES environment variable (a JSON object keyed by tier).
+    """
+    policies = {tier: dict(policy) for tier, policy in DEFAULT_RESOURCE_POLICIES.items()}
+    overrides = os.environ.get("MCP_RESOURCE_POLICIES")
+    if not overrides:
+        return policies
+    try:
+        parsed = json.loads(overrides)
+        if not isinstance(parsed, dict) or not all(isinstance(p, dict) for p in parsed.values()):
+            raise ValueError("expected a JSON object of objects keyed by tier")
+    except ValueError as e:
+        logger.warning(f"Ignoring invalid MCP_RESOURCE_POLICIES: {e}")
+        return policies
+    for tier, policy in parsed.items():
+        policies.setdefault(tier, dict(DEFAULT_RESOURCE_POLICIES["default"])).update(policy)
+    return policies
+
+RESOURCE_POLICIES = load_resource_policies()
+
+
+def get_resource_policy(quality: Optional[str]) -> Dict[str, Any]:
+    """Returns the resource policy for a quality tier, falling back to 'default'."""
+    return RESOURCE_POLICIES.get(quality or "default", RESOURCE_POLICIES["default"])
+
+
+def threads_per_job(policy: Optional[Dict[str, Any]] = None) -> int:
+    """Returns the encoder thread cap for one job given the concurrency level."""
+    if policy and policy.get("threads"):
+        return int(policy["threads"])
+    return max(1, CPU_COUNT // MAX_CONCURRENT_JOBS)
+
+
+@asynccontextmanager
+async def job_slot(policy: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Holds one of the MAX_CONCURRENT_JOBS job slots for the duration of an FFmpeg run.
+
+    Yields a dictionary with the thread cap and, for policies with pin_cpus, the set of
+    CPUs reserved for the job.
+    """
+    global _job_slots
+    if _job_slots is None:
+        _job_slots = asyncio.Semaphore(MAX_CONCURRENT_JOBS)
+        _free_cpus.extend(range(CPU_COUNT))
+
+    threads = threads_per_job(policy)
+    async with _job_slots:
+        cpus: List[int] = []
+        if policy.get("pin_cpus") and hasattr(os, "sched_setaffinity"):
+            count = min(threads, len(_free_cpus))
+            cpus = [_free_cpus.pop(0) for _ in range(count)]
+        try:
+            yield {"threads": threads, "cpus": cpus}
+        finally:
+            _free_cpus.extend(cpus)
+            _free_cpus.sort()
+
+
+def _ioprio_setter() -> Optional[Callable[[int, int, int], None]]:
+    """Builds an ioprio_set call for the current architecture, if supported."""
+    number = SYS_IOPRIO_SET.get(platform.machine())
+    libc_name = ctypes.util.find_library("c")
+    if number is None or not libc_name or platform.system() != "Linux":
+        return None
+    syscall = ctypes.CDLL(libc_name, use_errno=True).syscall
+
+    def set_ioprio(tid: int, io_class: int, level: int) -> None:
+        syscall(number, IOPRIO_WHO_PROCESS, tid, (io_class << IOPRIO_CLASS_SHIFT) | level)
+
+    return set_ioprio
+
+
+def _thread_ids(pid: int) -> List[int]:
+    """Lists the threads of a process (Linux), or just the process elsewhere."""
+    try:
+        return [int(tid) for tid in os.listdir(f"/proc/{pid}/task")]
+    except (OSError, ValueError):
+        return [pid]
+
+
+def make_policy_applier(policy: Dict[str, Any], cpus: Optional[List[int]] = None) -> Optional[Callable[[int], None]]:
+    """
+    Builds the function that applies a resource policy to a freshly spawned FFmpeg
+    child, given its pid.
+
+    Sets the nice value, I/O class, RLIMIT_AS and RLIMIT_CPU, and CPU affinity from
+    the parent right after the spawn. A preexec_fn would run Python in the forked
+    child, which can deadlock once the server has other threads. Nice value, I/O
+    priority and affinity are per thread on Linux, so they are set on the child's
+    main thread first and then on any thread it already started; later threads
+    inherit them. Rlimits apply to the whole process.
+
+    Args:
+        policy: The resource policy for the job.
+        cpus: Optional CPUs to pin the child to.
+
+    Returns:
+        A callable taking the child's pid, or None on platforms without POSIX process control.
+    """
+    if os.name != "posix":
+        return None
+
+    # The child inherits the server's niceness; the policy's value is added to it, as os.nice would
+    nice = int(policy.get("nice") or 0)
+    niceness = min(19, os.getpriority(os.PRIO_PROCESS, 0) + nice) if nice else None
+    io_class = IOPRIO_CLASSES.get(policy.get("ionice_class") or "")
+    io_level = int(policy.get("ionice_level") or 0)
+    set_ioprio = _ioprio_setter() if io_class else None
+    memory_limit = policy.get("memory_limit_mb")
+    cpu_limit = policy.get("cpu_time_limit_s")
+    prlimit = getattr(resource, "prlimit", None)
+    affinity = set(cpus) if cpus and hasattr(os, "sched_setaffinity") else None
+
+    def apply_to_thread(tid: int) -> None:
+        if niceness is not None:
+            os.setpriority(os.PRIO_PROCESS, tid, niceness)
+        if set_ioprio:
+            set_ioprio(tid, io_class, io_level)
+        if affinity:
+            os.sched_setaffinity(tid, affinity)
+
+    def apply(pid: int) -> None:
+        if prlimit is not None and memory_limit:
+            limit = int(memory_limit) * 1024 * 1024
+            prlimit(pid, resource.RLIMIT_AS, (limit, limit))
+        if prlimit is not None and cpu_limit:
+            # Soft limit sends SIGXCPU; the hard limit a little later kills the child
+            prlimit(pid, resource.RLIMIT_CPU, (int(cpu_limit), int(cpu_limit) + 5))
+        apply_to_thread(pid)
+        for tid in _thread_ids(pid):
+            if tid != pid:
+                apply_to_thread(tid)
+
+    return apply
+
+
+def _read_proc_usage(pid: int) -> Optional[Dict[str, float]]:
+    """Reads peak RSS and CPU time of a live process from /proc."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            status = f.read()
+        with open(f"/proc/{pid}/stat", "r") as f:
+            stat = f.read()
+    except (OSError, TypeError, ValueError):
+        return None
+
+    peak_rss_kb = 0
+    for line in status.splitlines():
+        if line.startswith("VmHWM:"):
+            peak_rss_kb = int(line.split()[1])
+            break
+    # Fields after the parenthesised command name; utime and stime are fields 14 and 15
+    fields = stat.rsplit(")", 1)[-1].split()
+    ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / ticks
+    return {"peak_rss_bytes": peak_rss_kb * 1024, "cpu_seconds": cpu_seconds}
+
+
+class UsageMonitor:
+    """
+    Samples a child's peak memory and CPU time from /proc while it runs; the final
+    figures come from the child's rusage when it is reaped.
+    """
+
+    def __init__(self, pid: Any):
+        self.pid = pid
+        self.peak_rss_bytes = 0
+        self.cpu_seconds = 0.0
+        self.samples = 0
+        self._started = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    def _sample(self) -> None:
+        usage = _read_proc_usage(self.pid)
+        if usage:
+            self.samples += 1
+            self.peak_rss_bytes = max(self.peak_rss_bytes, usage["peak_rss_bytes"])
+            self.cpu_seconds = max(self.cpu_seconds, usage["cpu_seconds"])
+
+    async def _run(self) -> None:
+        while True:
+            self._sample()
+            await asyncio.sleep(USAGE_SAMPLE_INTERVAL)
+
+    def start(self) -> "UsageMonitor":
+        if isinstance(self.pid, int) and os.path.isdir("/proc"):
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def stop(self, rusage: Any = None) -> Dict[str, Any]:
+        """
+        Stops sampling and returns the job's usage.
+
+        Args:
+            rusage: The child's resource usage from os.wait4. When given it supplies
+                the final numbers, since /proc/<pid> is gone once the child is reaped.
+        """
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if rusage is not None:
+            self.samples += 1
+            # ru_maxrss is in kilobytes on Linux
+            self.peak_rss_bytes = max(self.peak_rss_bytes, int(rusage.ru_maxrss) * 1024)
+            self.cpu_seconds = rusage.ru_utime + rusage.ru_stime
+        wall = time.monotonic() - self._started
+        return {
+            "peak_rss_bytes": self.peak_rss_bytes or None,
+            "cpu_seconds": round(self.cpu_seconds, 2) if self.samples else None,
+            "wall_seconds": round(wall, 2),
+            "avg_cores": round(self.cpu_seconds / wall, 2) if self.samples and wall > 0 else None,
+        }
+
+
+def accumulate_usage(totals: Dict[str, Any], usage: Dict[str, Any]) -> Dict[str, Any]:
+    """Adds one job's resource usage into running totals for a multi-run operation."""
+    totals["jobs"] = totals.get("jobs", 0) + 1
+    totals["cpu_seconds"] = round(totals.get("cpu_seconds", 0.0) + (usage.get("cpu_seconds") or 0.0), 2)
+    totals["wall_seconds"] = round(totals.get("wall_seconds", 0.0) + (usage.get("wall_seconds") or 0.0), 2)
+    totals["peak_rss_bytes"] = max(totals.get("peak_rss_bytes") or 0, usage.get("peak_rss_bytes") or 0) or None
+    return totals
@@ -1,9 +1,38 @@
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional
 
 from fastmcp import FastMCP, Context
-from .tools import check_ffmpeg_installed_impl, convert_video_impl, get_supported_formats_impl
+from starlette.requests import Request
+from starlette.responses import FileResponse, PlainTextResponse, Response
+
+from .cluster import start_coordinator
+from .outputs import OUTPUT_HTTP_PATH, content_etag, describe_output, get_output, read_output_chunk, read_output_range
+from .tools import (
+    check_ffmpeg_installed_impl,
+    convert_images_impl,
+    convert_video_impl,
+    estimate_conversion_impl,
+    concat_videos_impl,
+    extract_frames_impl,
+    generate_waveform_impl,
+    get_job_status_impl,
+    index_keyframes_impl,
+    package_streaming_impl,
+    run_pipeline_impl,
+    get_server_diagnostics_impl,
+    get_supported_formats_impl,
+    set_profiling_impl,
+)
+from .profiling import profiled
+
+
+@asynccontextmanager
+async def server_lifespan(server: FastMCP) -> AsyncIterator[Dict[str, Any]]:
+    """Starts the cluster coordinator with the first session when MCP_CLUSTER_PORT is set."""
+    await start_coordinator()
+    yield {}
 
 # Create server instance with lazy_tool_config=True to support lazy loading of configurations
 mcp_video_server = FastMCP(
@@ -11,11 +40,13 @@ mcp_video_server = FastMCP(
     instructions="A server for checking FFmpeg and converting videos between formats.",
     lazy_tool_config=True,  # Enable lazy loading of configurations for tool scanning
     # This helps Smithery to load faster by avoiding initialization tasks
-    skip_initialization=os.environ.get("MCP_SKIP_FFMPEG_CHECK_ON_INIT", "").lower() in ("true", "1", "yes")
+    skip_initialization=os.environ.get("MCP_SKIP_FFMPEG_CHECK_ON_INIT", "").lower() in ("true", "1", "yes"),
+    lifespan=server_lifespan
 )
 
 # Register the FFmpeg check tool
 @mcp_video_server.tool()
+@profiled
 async def check_ffmpeg_installed(ctx: Optional[Context] = None) -> Dict[str, Any]:
     """
     Checks if FFmpeg is installed and accessible.
@@ -28,30 +59,119 @@ async def check_ffmpeg_installed(ctx: Optional[Context] = None) -> Dict[str, Any
 
 # Register the video conversion tool
 @mcp_video_server.tool()
+@profiled
 async def convert_video(
     input_file_path: str,
     output_format: str,
     quality: Optional[str] = None,
     framerate: Optional[int] = None,
+    target_size_bytes: Optional[int] = None,
+    target_ssim: Optional[float] = None,
+    follow: bool = False,
+    streaming: Optional[str] = None,
+    job_id: Optional[str] = None,
+    preview: bool = False,
+    preview_seconds: Optional[float] = None,
+    resumable: bool = False,
+    verify: Optional[str] = None,
     ctx: Optional[Context] = None
 ) -> Dict[str, Any]:
     """
     Converts a video file to the specified output format using FFmpeg.
 
     Args:
-        input_file_path: The absolute path to the input video file.
+        input_file_path: The absolute path to the input video file, or an http(s) URL read with ranged requests.
         output_format: The desired output format (e.g., "mp4", "webm", "mov").
         quality: Optional quality setting ("low", "medium", "high").
         framerate: Optional framerate for video output.
+        target_size_bytes: Optional maximum output size in bytes (video formats only).
+            The CRF is chosen from short sample encodes before the single full encode.
+        target_ssim: Optional minimum SSIM between 0 and 1 (video formats only).
+        follow: Set for inputs still being recorded (webm, mkv, ts, flv, ogg). Newly
+            appended media is encoded in segments as it arrives and the output is
+            finalized once the file stops growing.
+        streaming: Optional progressive output: "fragmented" writes fragmented MP4/MOV
+            or cluster-flushed WebM/MKV that can be played while it is written;
+            "faststart" moves the MP4/MOV index to the front after encoding.
+        job_id: Optional id for polling this conversion with get_job_status.
+        preview: Also encode a low-resolution fragmented MP4 preview in a separate
+            fast FFmpeg process, and return as soon as it is playable while the full
+            conversion continues in the background (video outputs only).
+        preview_seconds: Optional preview length from the start of the input.
+        resumable: Encode mp4/mkv/webm/mov outputs in checkpointed time segments. If the
+            conversion is interrupted, calling again with the same input and settings
+            skips the segments already finished.
+        verify: Optional output check: "none", "fast" (container header and stream
+            count), "standard" (also stream layout and duration against the input) or
+            "full" (also a low-priority decode pass in the background, reported in
+            get_job_status). Defaults to MCP_VERIFY_LEVEL.
         ctx: Context for progress reporting.
 
     Returns:
         A dictionary with conversion status, output file path, or an error message.
+        With a preview, a conversion still running returns 'status' "running", its
+        'job_id' and the 'preview_file_path'. Verified outputs include a
+        'verification' record with the outcome and cost of each check.
+    """
+    return await convert_video_impl(
+        input_file_path, output_format, ctx, quality, framerate,
+        target_size_bytes=target_size_bytes, target_ssim=target_ssim, follow=follow,
+        streaming=streaming, job_id=job_id, preview=preview, preview_seconds=preview_seconds,
+        resumable=resumable, verify=verify
+    )
+
+# Register the batch image conversion tool
+@mcp_video_server.tool()
+@profiled
+async def convert_images(
+    output_format: str,
+    input_paths: Optional[List[str]] = None,
+    input_directory: Optional[str] = None,
+    quality: Optional[str] = None,
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Converts a batch of still images (e.g. a folder of PNG screenshots to WebP).
+
+    Args:
+        output_format: The image output format ("webp", "jpg", "png", "bmp", "tiff").
+        input_paths: Optional list of absolute image paths.
+        input_directory: Optional directory; every image in it is converted.
+        quality: Optional quality setting ("low", "medium", "high").
+        ctx: Context for logging.
+
+    Returns:
+        A dictionary with per-image results, counts and images per second.
     """
-    return await convert_video_impl(input_file_path, output_format, ctx, quality, framerate)
+    return await convert_images_impl(output_format, input_paths, input_directory, quality, ctx)
+
+# Register the pre-flight estimator tool
+@mcp_video_server.tool()
+@profiled
+async def estimate_conversion(
+    input_file_path: str,
+    output_format: str,
+    quality: Optional[str] = None,
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Estimates output size and encode time for a conversion without running it.
+    Estimates improve as the server completes more conversions.
+
+    Args:
+        input_file_path: The absolute path to the input file, or an http(s) URL.
+        output_format: The desired output format (e.g., "mp4", "webm").
+        quality: Optional quality setting ("low", "medium", "high").
+        ctx: Context for logging.
+
+    Returns:
+        A dictionary with expected, low and high output bytes and wall seconds.
+    """
+    return await estimate_conversion_impl(input_file_path, output_format, quality, ctx)
 
 # Register the get supported formats tool
 @mcp_video_server.tool()
+@profiled
 async def get_supported_formats(ctx: Optional[Context] = None) -> Dict[str, Any]:
     """
     Returns a list of supported formats for conversion.
@@ -64,15 +184,312 @@ async def get_supported_formats(ctx: Optional[Context] = None) -> Dict[str, Any]
     """
     return await get_supported_formats_impl(ctx)
 
+# Register the streaming packaging tool
+@mcp_video_server.tool()
+@profiled
+async def package_streaming(
+    input_file_path: str,
+    protocol: str = "hls",
+    renditions: Optional[List[str]] = None,
+    segment_type: str = "ts",
+    copy: bool = False,
+    segment_seconds: Optional[float] = None,
+    quality: Optional[str] = None,
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Packages a video for adaptive streaming as HLS and/or DASH segment sets.
+
+    All renditions are encoded from one decode of the input, with aligned segments.
+    Segments and playlists are renamed into place when complete, so a web server can
+    serve the package while it is being written.
+
+    Args:
+        input_file_path: The absolute path to the input video file.
+        protocol: "hls", "dash", or "both" (shared fMP4 segments with both manifests).
+        renditions: Optional ladder entries: "1080p", "720p", "480p", "360p".
+        segment_type: HLS segments as "ts" or "fmp4".
+        copy: Segment the input as-is without re-encoding (H.264/HEVC inputs).
+        segment_seconds: Optional target segment length (default 4).
+        quality: Optional quality tier for the job's resource policy.
+        ctx: Context for progress reporting.
+
+    Returns:
+        A dictionary with the package directory, master playlist/manifest paths and segment count.
+    """
+    return await package_streaming_impl(
+        input_file_path, protocol, renditions, segment_type, copy, segment_seconds, quality, ctx
+    )
+
+# Register the pipeline tool
+@mcp_video_server.tool()
+@profiled
+async def run_pipeline(
+    input_file_path: str,
+    operations: List[Dict[str, Any]],
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Runs an ordered list of editing operations in a single FFmpeg pass, with no
+    intermediate files. Available operations:
+      {"op": "trim", "start": s, "end": s}
+      {"op": "scale", "width": w, "height": h}   (either side may be omitted)
+      {"op": "crop", "width": w, "height": h, "x": x, "y": y}   (x/y optional)
+      {"op": "fps", "fps": n}
+      {"op": "rotate", "degrees": 90 | 180 | 270}
+      {"op": "audio_resample", "sample_rate": hz}
+      {"op": "format", "format": "mp4", "quality": "medium"}   (required, last)
+
+    Args:
+        input_file_path: The absolute path to the input file, or an http(s) URL.
+        operations: The operations to apply, in order.
+        ctx: Context for progress reporting.
+
+    Returns:
+        A dictionary with the output file path and the FFmpeg command that ran.
+    """
+    return await run_pipeline_impl(input_file_path, operations, ctx)
+
+# Register the frame export tool
+@mcp_video_server.tool()
+@profiled
+async def extract_frames(
+    input_file_path: str,
+    pixel_format: str = "rgb24",
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fps: Optional[float] = None,
+    stride: Optional[int] = None,
+    max_frames: Optional[int] = None,
+    target: str = "npy",
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Exports decoded video frames as a uint8 NumPy array for ML preprocessing.
+    Frames are sampled and resized inside FFmpeg and streamed straight into a .npy
+    file, or into a /dev/shm shared-memory segment with target="shm". Load them
+    zero-copy with numpy.load(path, mmap_mode="r").
+
+    Args:
+        input_file_path: The absolute path to the input video file, or an http(s) URL.
+        pixel_format: "rgb24" or "gray".
+        width: Optional output width (height follows the aspect ratio if omitted).
+        height: Optional output height.
+        fps: Optional sampling rate in frames per second.
+        stride: Optional: keep every Nth frame.
+        max_frames: Optional maximum number of frames.
+        target: "npy" or "shm".
+        ctx: Context for progress reporting.
+
+    Returns:
+        A dictionary with the file path or shared-memory name, shape, dtype and header size.
+    """
+    return await extract_frames_impl(
+        input_file_path, pixel_format, width, height, fps, stride, max_frames, target, ctx
+    )
+
+# Register the waveform tool
+@mcp_video_server.tool()
+@profiled
+async def generate_waveform(
+    input_file_path: str,
+    levels: int = 4,
+    output_format: str = "json",
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Generates waveform overview peaks (min, max and RMS per bucket) for a file's
+    audio at several zoom levels. Results are cached per input file.
+
+    Args:
+        input_file_path: The absolute path to the input audio or video file.
+        levels: Number of zoom levels (1-8); level 0 has 128 samples at 8 kHz per
+            bucket and each further level is 4x coarser.
+        output_format: "json" or "binary".
+        ctx: Context for progress reporting.
+
+    Returns:
+        A dictionary with the peaks file path and whether it came from the cache.
+    """
+    return await generate_waveform_impl(input_file_path, levels, output_format, ctx)
+
+# Register the keyframe index tool
+@mcp_video_server.tool()
+@profiled
+async def index_keyframes(
+    input_file_path: str,
+    seek_to: Optional[float] = None,
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Indexes a video's keyframe times and byte offsets, GOP sizes and packet sizes
+    once, and answers nearest-keyframe lookups from the saved index. A file that has
+    grown since it was indexed is extended by scanning only the new part.
+
+    Args:
+        input_file_path: The absolute path to the input video file.
+        seek_to: Optional time in seconds; returns the keyframes around it.
+        ctx: Context for progress reporting.
+
+    Returns:
+        A dictionary with index statistics and the optional keyframe lookup.
+    """
+    return await index_keyframes_impl(input_file_path, seek_to, ctx)
+
+# Register the concatenation tool
+@mcp_video_server.tool()
+@profiled
+async def concat_videos(
+    input_file_paths: List[str],
+    output_format: Optional[str] = None,
+    quality: Optional[str] = None,
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Joins videos end to end. Compatible inputs are joined by stream copy without
+    re-encoding; inputs whose codec, resolution, frame rate, time base or audio
+    format differ from the first input are re-encoded to match it (in parallel)
+    and then joined the same way.
+
+    Args:
+        input_file_paths: The absolute paths of the videos, in order.
+        output_format: Optional "mp4", "mov", "mkv" or "webm" (default: first input's).
+        quality: Optional quality for re-encoded inputs ("low", "medium", "high").
+        ctx: Context for progress reporting.
+
+    Returns:
+        A dictionary with the output path, the normalized inputs and per-phase timings.
+    """
+    return await concat_videos_impl(input_file_paths, output_format, quality, ctx)
+
+# Register the job status tool
+@mcp_video_server.tool()
+@profiled
+async def get_job_status(job_id: Optional[str] = None, ctx: Optional[Context] = None) -> Dict[str, Any]:
+    """
+    Returns the status of a conversion job, or all known jobs when job_id is omitted.
+    Fragmented outputs report their in-progress path and completed fragment count.
+    Conversions with a preview report its path and how long it took to become playable.
+
+    Args:
+        job_id: Optional job id passed to or returned by convert_video.
+        ctx: Context for logging.
+
+    Returns:
+        A dictionary with the job status record(s).
+    """
+    return await get_job_status_impl(job_id, ctx)
+
+# Register the diagnostics tool
+@mcp_video_server.tool()
+@profiled
+async def get_server_diagnostics(ctx: Optional[Context] = None) -> Dict[str, Any]:
+    """
+    Returns runtime diagnostics for the conversion workers, including running FFmpeg
+    jobs, jobs killed for stalling or cancellation, and orphaned-process counts.
+
+    Args:
+        ctx: Context for logging.
+
+    Returns:
+        A dictionary with supervisor, concurrency and profiling diagnostics, including
+        slow event-loop callbacks when the lag monitor is on, and the cluster's workers
+        and queue in cluster mode.
+    """
+    return await get_server_diagnostics_impl(ctx)
+
+# Register the profiling switch
+@mcp_video_server.tool()
+@profiled
+async def set_profiling(
+    mode: str,
+    every: int = 1,
+    directory: Optional[str] = None,
+    loop_lag_ms: Optional[float] = None,
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Turns per-invocation profiling of tool calls on or off.
+
+    Args:
+        mode: "cprofile" writes a pstats file per profiled call, "sample" a collapsed-stack
+            file (for flame graphs) from sampling the event-loop thread; "off" disables.
+        every: Profile every Nth tool call (default every call).
+        directory: Optional directory for profile files (default MCP_PROFILE_DIR).
+        loop_lag_ms: Optional threshold in milliseconds for recording event-loop callbacks
+            that block longer than it, with their stack; 0 turns the monitor off.
+        ctx: Context for logging.
+
+    Returns:
+        A dictionary with the profiling status, including recently written profiles.
+    """
+    return await set_profiling_impl(mode, every, directory, loop_lag_ms, ctx)
+
+# Converted outputs as resources: metadata, then the bytes in chunks or ranges
+@mcp_video_server.resource("video-output://{output_id}", mime_type="application/json")
+async def output_resource(output_id: str) -> Dict[str, Any]:
+    """
+    Describes a converted output: size, MIME type, content-hash ETag, chunk count
+    and the URIs to read its bytes from.
+    """
+    return await describe_output(output_id)
+
+@mcp_video_server.resource("video-output://{output_id}/chunks/{index}", mime_type="application/octet-stream")
+async def output_chunk_resource(output_id: str, index: int) -> bytes:
+    """Returns chunk `index` of a converted output (MCP_RESOURCE_CHUNK_BYTES each)."""
+    return await read_output_chunk(output_id, index)
+
+@mcp_video_server.resource("video-output://{output_id}/bytes/{start}/{length}", mime_type="application/octet-stream")
+async def output_range_resource(output_id: str, start: int, length: int) -> bytes:
+    """Returns up to `length` bytes of a converted output from offset `start`, at most one chunk."""
+    return await read_output_range(output_id, start, length)
+
+# In HTTP mode, outputs are also served with Range, ETag and conditional requests
+@mcp_video_server.custom_route(OUTPUT_HTTP_PATH + "/{output_id}", methods=["GET", "HEAD"])
+async def serve_output(request: Request) -> Response:
+    try:
+        output = get_output(request.path_params["output_id"])
+    except ValueError as e:
+        return PlainTextResponse(str(e), status_code=404)
+    etag = await content_etag(output)
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers={"etag": etag})
+    # FileResponse answers single and multiple byte ranges, honors If-Range against
+    # the ETag, and hands the path to the server (http.response.pathsend) when supported
+    return FileResponse(output["path"], headers={"etag": etag, "cache-control": "private, max-age=3600"})
+
 def main_cli():
     """Entry point for running the server via command line."""
     import sys
     
-    # Check if --http flag is passed
+    # Watch-folder daemon mode: --watch <config.json> (or MCP_WATCH_CONFIG)
+    if "--watch" in sys.argv or os.environ.get("MCP_WATCH_CONFIG"):
+        from .watcher import run_watch_daemon
+        index = sys.argv.index("--watch") if "--watch" in sys.argv else -1
+        config_path = sys.argv[index + 1] if 0 <= index < len(sys.argv) - 1 else os.environ.get("MCP_WATCH_CONFIG")
+        if not config_path:
+            print("Usage: mcp-video-converter --watch <config.json>")
+            sys.exit(2)
+        run_watch_daemon(config_path)
+        return
+
+    # Offline encoder calibration: times short lavfi encodes and stores the best settings
+    if "--calibrate" in sys.argv:
+        import asyncio
+        from .tuning import calibrate
+        result = asyncio.run(calibrate())
+        print(f"Stored {len(result['settings'])} calibrated settings in {result['tuning_file']}")
+        return
+
+    # HTTP (SSE) mode: --http, listening on MCP_HTTP_HOST:MCP_HTTP_PORT
     if "--http" in sys.argv:
-        print("HTTP mode is not supported in this version of the server")
-        print("Running in stdio mode instead")
-    
+        mcp_video_server.run(
+            transport="sse",
+            host=os.environ.get("MCP_HTTP_HOST", "127.0.0.1"),
+            port=int(os.environ.get("MCP_HTTP_PORT", "8000"))
+        )
+        return
+
     # Run in stdio mode
     mcp_video_server.run()
 
@@ -0,0 +1,263 @@
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple, Union
+
+# Bytes inspected at each end of the file
+HEAD_BYTES = 64 * 1024
+TAIL_BYTES = 64 * 1024
+
+# Container -> kind of media it normally holds
+MEDIA_KINDS = {
+    "mp4": "video", "mov": "video", "webm": "video", "matroska": "video", "avi": "video",
+    "flv": "video", "mpegts": "video", "mpegps": "video", "asf": "video", "y4m": "video",
+    "ogg": "audio", "wav": "audio", "mp3": "audio", "flac": "audio", "aac": "audio", "aiff": "audio",
+    "gif": "image", "png": "image", "jpg": "image", "bmp": "image", "tiff": "image", "webp": "image",
+}
+
+# Output format -> input containers it can take by stream copy, assuming the codecs
+# that container family normally carries
+REMUX_FAMILIES = {
+    "mp4": {"mp4", "mov"},
+    "mov": {"mp4", "mov"},
+    "mkv": {"mp4", "mov", "webm", "matroska"},
+    "webm": {"webm"},
+}
+
+_ISO_MOV_BRANDS = (b"qt  ",)
+
+# Signatures of files that are certainly not media. Only these (or a detected
+# truncation) reject an input up front; anything unrecognized goes to FFmpeg.
+NON_MEDIA_SIGNATURES = {
+    b"%PDF-": "pdf",
+    b"PK\x03\x04": "zip",
+    b"\x1f\x8b": "gzip",
+    b"7z\xbc\xaf\x27\x1c": "7z",
+    b"Rar!\x1a\x07": "rar",
+    b"\x7fELF": "elf",
+    b"MZ": "exe",
+    b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1": "ole",
+    b"SQLite format 3\x00": "sqlite",
+}
+# Bytes of the head inspected when deciding whether a file is plain text
+TEXT_SAMPLE_BYTES = 4096
+
+
+def read_vint(data: bytes, offset: int) -> Tuple[Optional[int], int]:
+    """Reads an EBML variable-length integer; returns (value or None for unknown size, length)."""
+    if offset >= len(data):
+        raise ValueError("EBML data ends early")
+    first = data[offset]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8 or offset + length > len(data):
+        raise ValueError("Invalid EBML length")
+    value = first & (mask - 1)
+    for byte in data[offset + 1:offset + length]:
+        value = (value << 8) | byte
+    unknown = value == (1 << (7 * length)) - 1
+    return (None if unknown else value), length
+
+
+def identify(head: bytes) -> Optional[str]:
+    """Identifies a container from its first bytes by magic numbers, or returns None."""
+    if head[4:8] == b"ftyp":
+        return "mov" if head[8:12] in _ISO_MOV_BRANDS else "mp4"
+    if head[4:8] in (b"moov", b"mdat", b"free", b"wide", b"skip"):
+        return "mov"  # Old QuickTime files without ftyp
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "webm" if b"\x42\x82\x84webm" in head[:64] else "matroska"
+    if head.startswith(b"RIFF") and len(head) >= 12:
+        return {b"AVI ": "avi", b"WAVE": "wav", b"WEBP": "webp"}.get(head[8:12])
+    if head.startswith(b"OggS"):
+        return "ogg"
+    if head.startswith(b"FLV\x01"):
+        return "flv"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head.startswith(b"BM") and len(head) >= 14:
+        return "bmp"
+    if head.startswith((b"II*\x00", b"MM\x00*")):
+        return "tiff"
+    if head.startswith(b"fLaC"):
+        return "flac"
+    if head.startswith(b"FORM") and head[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff"
+    if head.startswith(b"\x30\x26\xb2\x75\x8e\x66\xcf\x11"):
+        return "asf"
+    if head.startswith(b"\x00\x00\x01\xba"):
+        return "mpegps"
+    if len(head) > 376 and head[0] == 0x47 and head[188] == 0x47 and head[376] == 0x47:
+        return "mpegts"
+    if head.startswith(b"YUV4MPEG2 "):
+        return "y4m"
+    if len(head) > 388 and head[4] == 0x47 and head[196] == 0x47 and head[388] == 0x47:
+        return "mpegts"  # M2TS/MTS: 192-byte packets with a 4-byte timestamp prefix
+    # MPEG audio layers I-III share one frame sync; FFmpeg's mp3 demuxer reads them all
+    if head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0 and head[1] & 0x06):
+        return "mp3"
+    if len(head) > 1 and head[0] == 0xFF and head[1] & 0xF6 == 0xF0:
+        return "aac"  # ADTS
+    return None
+
+
+def identify_non_media(head: bytes) -> Optional[str]:
+    """Returns the kind of a file that is positively not media (an archive, a document, text), or None."""
+    for signature, kind in NON_MEDIA_SIGNATURES.items():
+        if head.startswith(signature):
+            return kind
+    sample = head[:TEXT_SAMPLE_BYTES]
+    try:
+        text = sample.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample still counts as text
+        if e.start < len(sample) - 3:
+            return None
+        text = sample[:e.start].decode("utf-8")
+    if text and all(c.isprintable() or c in "\t\r\n\f" for c in text):
+        return "text"
+    return None
+
+
+def plausible_media(sniffed: Dict[str, Any], kinds: Optional[Tuple[str, ...]] = None) -> bool:
+    """
+    Whether an input is worth handing to FFmpeg: false for known non-media files,
+    true for unrecognized containers (ffprobe decides), else whether the container's
+    media kind is one of `kinds`.
+    """
+    if sniffed.get("non_media"):
+        return False
+    if sniffed.get("media_kind") is None or kinds is None:
+        return True
+    return sniffed["media_kind"] in kinds
+
+
+def _check_iso_bmff(mm: Union[mmap.mmap, bytes], size: int) -> Dict[str, Any]:
+    """
+    Walks the top-level boxes. Only the 8-16 byte headers are read, so the walk
+    touches a handful of pages even on multi-GB files.
+    """
+    offset = 0
+    boxes = []
+    while offset + 8 <= size:
+        box_size, box_type = struct.unpack(">I4s", mm[offset:offset + 8])
+        header = 8
+        if box_size == 1:
+            if offset + 16 > size:
+                return {"truncated": True, "reason": "box header cut off"}
+            box_size = struct.unpack(">Q", mm[offset + 8:offset + 16])[0]
+            header = 16
+        elif box_size == 0:
+            box_size = size - offset  # Box extends to end of file
+        if box_size < header:
+            return {"truncated": True, "reason": f"invalid size for box {box_type!r}"}
+        boxes.append(box_type)
+        if offset + box_size > size:
+            return {
+                "truncated": True,
+                "reason": f"'{box_type.decode(errors='replace')}' box extends past end of file",
+                "boxes": [b.decode(errors="replace") for b in boxes],
+            }
+        offset += box_size
+    names = [b.decode(errors="replace") for b in boxes]
+    if "moov" not in names:
+        return {"truncated": True, "reason": "missing moov atom", "boxes": names}
+    faststart = "mdat" not in names or names.index("moov") < names.index("mdat")
+    return {"truncated": False, "boxes": names, "faststart": faststart, "fragmented": "moof" in names}
+
+
+def _check_ebml(head: bytes, size: int) -> Dict[str, Any]:
+    header_size, length = read_vint(head, 4)
+    offset = 4 + length + (header_size or 0)
+    if head[offset:offset + 4] != b"\x18\x53\x80\x67":
+        return {"truncated": True, "reason": "no Segment element after the EBML header"}
+    segment_size, length = read_vint(head, offset + 4)
+    if segment_size is None:
+        return {"truncated": False, "live": True}  # Unknown-size segment, still being written
+    if offset + 4 + length + segment_size > size:
+        return {"truncated": True, "reason": "Segment extends past end of file"}
+    return {"truncated": False}
+
+
+def _check_tail(container: str, mm: Union[mmap.mmap, bytes], head: bytes, tail: bytes, size: int) -> Dict[str, Any]:
+    if container in ("avi", "wav", "webp"):
+        declared = struct.unpack("<I", head[4:8])[0] + 8
+        if declared > size:
+            return {"truncated": True, "reason": f"RIFF declares {declared} bytes, file has {size}"}
+    elif container == "ogg":
+        last = tail.rfind(b"OggS")
+        if last < 0 or len(tail) < last + 6 or not tail[last + 5] & 0x04:
+            return {"truncated": True, "reason": "last Ogg page lacks the end-of-stream flag"}
+    elif container == "flv":
+        previous_tag_size = struct.unpack(">I", tail[-4:])[0]
+        tag_start = len(tail) - 4 - previous_tag_size
+        if previous_tag_size + 4 > size or (tag_start >= 0 and tail[tag_start] & 0x1F not in (8, 9, 18)):
+            return {"truncated": True, "reason": "last FLV tag is incomplete"}
+    # Still images may carry data after their trailer (motion photos append an MP4
+    # to the JPEG), so look for the trailer anywhere rather than at end of file
+    elif container == "gif":
+        if mm.rfind(b"\x00\x3b") < 0:
+            return {"truncated": True, "reason": "missing GIF trailer"}
+    elif container == "png":
+        if mm.rfind(b"IEND\xaeB`\x82") < 0:
+            return {"truncated": True, "reason": "missing PNG IEND chunk"}
+    elif container == "jpg":
+        if mm.rfind(b"\xff\xd9") < 0:
+            return {"truncated": True, "reason": "missing JPEG end-of-image marker"}
+    elif container == "bmp":
+        declared = struct.unpack("<I", head[2:6])[0]
+        if declared > size:
+            return {"truncated": True, "reason": f"BMP declares {declared} bytes, file has {size}"}
+    return {"truncated": False}
+
+
+def sniff_file(path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Identifies a file's container from magic bytes and checks for obvious truncation,
+    without spawning a process. The file is memory-mapped and only its head, tail and
+    (for MP4/MOV) top-level box headers are read.
+
+    Returns:
+        A dictionary with 'container' (None if unrecognized), 'media_kind', 'size',
+        'truncated' and a 'reason' when truncated, plus container details such as
+        'boxes', 'faststart' and 'fragmented' for ISO BMFF files. Unrecognized
+        containers carry 'non_media': the kind of a recognizably non-media file
+        ('pdf', 'zip', 'text', ...) or None when it may still be media.
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return {"container": None, "media_kind": None, "size": 0, "truncated": True, "reason": "empty file"}
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            head = mm[:HEAD_BYTES]
+            tail = mm[max(0, size - TAIL_BYTES):]
+            container = identify(head)
+            result: Dict[str, Any] = {"container": container, "media_kind": MEDIA_KINDS.get(container), "size": size}
+            if container is None:
+                return {**result, "truncated": False, "non_media": identify_non_media(head)}
+            try:
+                if container in ("mp4", "mov"):
+                    details = _check_iso_bmff(mm, size)
+                elif container in ("webm", "matroska"):
+                    details = _check_ebml(head, size)
+                else:
+                    details = _check_tail(container, mm, head, tail, size)
+            except (ValueError, struct.error, IndexError) as e:
+                details = {"truncated": True, "reason": f"malformed header: {e}"}
+    return {**result, **details}
+
+
+def remux_eligible(sniffed: Dict[str, Any], output_format: str) -> bool:
+    """Whether the input's container family can be rewrapped into output_format by stream copy."""
+    family = REMUX_FAMILIES.get(output_format)
+    return bool(family and sniffed.get("container") in family and not sniffed.get("truncated"))
+
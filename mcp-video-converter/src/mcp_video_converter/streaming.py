@@ -0,0 +1,123 @@
+import os
+import struct
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .sniff import read_vint
+
+# Target media duration of each fragment (fMP4) or cluster (WebM/Matroska)
+FRAGMENT_SECONDS = float(os.environ.get("MCP_FRAGMENT_SECONDS", "2"))
+
+STREAMING_MODES = ["fragmented", "faststart"]
+FRAGMENTED_FORMATS = ["mp4", "mov", "webm", "mkv"]
+FASTSTART_FORMATS = ["mp4", "mov"]
+
+_EBML_SEGMENT = 0x18538067
+_EBML_CLUSTER = 0x1F43B675
+
+
+def streaming_args(output_format: str, mode: str, fragment_seconds: float = FRAGMENT_SECONDS) -> List[str]:
+    """
+    FFmpeg output options for progressive delivery.
+
+    'fragmented' writes an empty moov followed by self-contained moof/mdat fragments
+    (MP4/MOV), or flushes a Matroska cluster every fragment (WebM/MKV), so a reader
+    can play the file while it is being written. Keyframes are forced on fragment
+    boundaries so fragments are evenly sized. 'faststart' runs FFmpeg's post-pass
+    that moves the moov atom to the front of a regular MP4/MOV after encoding.
+
+    Raises:
+        ValueError: If the mode is unknown or unsupported for the format.
+    """
+    if mode == "faststart":
+        if output_format not in FASTSTART_FORMATS:
+            raise ValueError(f"faststart is only available for {', '.join(FASTSTART_FORMATS)}")
+        return ["-movflags", "+faststart"]
+    if mode != "fragmented":
+        raise ValueError(f"Unknown streaming mode: {mode}. Use one of: {', '.join(STREAMING_MODES)}")
+    if output_format not in FRAGMENTED_FORMATS:
+        raise ValueError(f"Fragmented output is only available for {', '.join(FRAGMENTED_FORMATS)}")
+    keyframes = ["-force_key_frames", f"expr:gte(t,n_forced*{fragment_seconds:g})"]
+    if output_format in ("mp4", "mov"):
+        return keyframes + [
+            "-movflags", "+frag_keyframe+empty_moov+default_base_moof",
+            "-frag_duration", str(int(fragment_seconds * 1_000_000)),
+        ]
+    return keyframes + ["-cluster_time_limit", str(int(fragment_seconds * 1000)), "-flush_packets", "1"]
+
+
+def _read_ebml_id(data: bytes, offset: int) -> Tuple[int, int]:
+    first = data[offset]
+    length = 1
+    mask = 0x80
+    while length <= 4 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 4 or offset + length > len(data):
+        raise ValueError("Invalid EBML id")
+    return int.from_bytes(data[offset:offset + length], "big"), length
+
+
+class FragmentCounter:
+    """
+    Counts the fragments of an output that are completely written, following the file
+    incrementally: only element headers past the last complete fragment are read.
+    """
+
+    def __init__(self, path: Path, output_format: str):
+        self.path = Path(path)
+        self.iso = output_format in ("mp4", "mov")
+        self.offset = 0
+        self.fragments = 0
+        self._in_segment = False
+        self._pending_moof = False
+
+    def poll(self) -> int:
+        try:
+            with open(self.path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if self.iso:
+                    self._walk_iso(f, size)
+                else:
+                    self._walk_ebml(f, size)
+        except (OSError, ValueError, struct.error):
+            pass
+        return self.fragments
+
+    def _walk_iso(self, f, size: int) -> None:
+        while self.offset + 8 <= size:
+            f.seek(self.offset)
+            header = f.read(16)
+            box_size, box_type = struct.unpack(">I4s", header[:8])
+            if box_size == 1:
+                if len(header) < 16:
+                    return
+                box_size = struct.unpack(">Q", header[8:16])[0]
+            if box_size < 8 or self.offset + box_size > size:
+                return  # Box still being written
+            if box_type == b"moof":
+                self._pending_moof = True
+            elif box_type == b"mdat" and self._pending_moof:
+                self._pending_moof = False
+                self.fragments += 1
+            self.offset += box_size
+
+    def _walk_ebml(self, f, size: int) -> None:
+        while self.offset < size:
+            f.seek(self.offset)
+            header = f.read(12)
+            if len(header) < 2:
+                return
+            element_id, id_length = _read_ebml_id(header, 0)
+            element_size, size_length = read_vint(header, id_length)
+            header_length = id_length + size_length
+            if element_id == _EBML_SEGMENT and not self._in_segment:
+                # Descend into the Segment; its children are the clusters
+                self._in_segment = True
+                self.offset += header_length
+                continue
+            if element_size is None or self.offset + header_length + element_size > size:
+                return  # Element still being written
+            if element_id == _EBML_CLUSTER:
+                self.fragments += 1
+            self.offset += header_length + element_size
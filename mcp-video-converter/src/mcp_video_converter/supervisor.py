@@ -0,0 +1,316 @@
+import asyncio
+import logging
+import os
+import signal
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, BinaryIO, Callable, List, Optional
+
+from .resources import UsageMonitor
+
+logger = logging.getLogger(__name__)
+
+# Kill a job whose -progress output has not advanced for this many seconds
+STALL_TIMEOUT_SECONDS = float(os.environ.get("MCP_STALL_TIMEOUT_SECONDS", "120"))
+# Time between SIGTERM and SIGKILL when tearing a job down
+TERM_GRACE_SECONDS = float(os.environ.get("MCP_TERM_GRACE_SECONDS", "5"))
+WATCHDOG_INTERVAL = 1.0
+# How long to wait for killed orphans to disappear before counting them as unreaped
+ORPHAN_REAP_TIMEOUT = 2.0
+
+# Progress keys whose change means FFmpeg is still making headway
+PROGRESS_KEYS = ("frame", "out_time_us", "total_size")
+
+# Counters reported by the diagnostics tool
+SUPERVISOR_STATS = {
+    "started": 0,
+    "completed": 0,
+    "stalled_killed": 0,
+    "cancelled_killed": 0,
+    "orphans_reaped": 0,
+    "orphans_unreaped": 0,
+}
+# pid -> details of the FFmpeg jobs currently supervised
+ACTIVE_PROCESSES: Dict[int, Dict[str, Any]] = {}
+
+# Threads blocked in wait4 for supervised children; one per running job
+_REAPER_POOL = ThreadPoolExecutor(max_workers=64, thread_name_prefix="mcp-reaper")
+
+
+class SupervisedProcess:
+    """
+    A child process reaped with os.wait4 rather than by asyncio's child watcher,
+    so its exact peak RSS and CPU time are available from the kernel's rusage.
+
+    Output goes to temporary files instead of pipes, so orphans that inherit them
+    can never keep the job from finishing. A caller-supplied stdout file receives
+    the output directly instead and is left open. The resource policy is applied
+    to the child by pid right after it starts.
+    """
+
+    def __init__(
+        self,
+        command: List[str],
+        apply_policy: Optional[Callable[[int], None]] = None,
+        stdout: Optional[BinaryIO] = None
+    ):
+        self._own_stdout = stdout is None
+        self._stdout = tempfile.TemporaryFile() if stdout is None else stdout
+        self._stderr = tempfile.TemporaryFile()
+        self.popen = subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=self._stdout,
+            stderr=self._stderr,
+            start_new_session=True
+        )
+        self.pid = self.popen.pid
+        if apply_policy:
+            try:
+                apply_policy(self.pid)
+            except ProcessLookupError:
+                pass  # The child already exited
+            except OSError as e:
+                logger.warning(f"Could not apply the resource policy to pid {self.pid}: {e}")
+        self.rusage: Any = None
+        self._waiter = asyncio.get_running_loop().run_in_executor(_REAPER_POOL, self._reap)
+
+    def _reap(self) -> int:
+        if hasattr(os, "wait4"):
+            _, status, self.rusage = os.wait4(self.pid, 0)
+            self.popen.returncode = os.waitstatus_to_exitcode(status)
+        else:
+            self.popen.wait()
+        return self.popen.returncode
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.popen.returncode
+
+    async def wait(self) -> int:
+        return await asyncio.shield(self._waiter)
+
+    def send_signal(self, sig: int) -> None:
+        # Popen.send_signal polls (and could reap) the child; signal it directly
+        if self.popen.returncode is None:
+            os.kill(self.pid, sig)
+
+    def read_output(self) -> tuple:
+        output = []
+        for f in (self._stdout, self._stderr):
+            if f is self._stdout and not self._own_stdout:
+                output.append(b"")
+                continue
+            f.seek(0)
+            output.append(f.read())
+            f.close()
+        return output[0], output[1]
+
+
+def parse_progress(text: str) -> Dict[str, str]:
+    """Parses FFmpeg -progress key=value lines; later values win."""
+    progress: Dict[str, str] = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition("=")
+        if sep:
+            progress[key.strip()] = value.strip()
+    return progress
+
+
+class ProgressReader:
+    """
+    Follows an FFmpeg -progress file, reading only the bytes appended since the
+    last poll so long encodes don't re-parse the whole file every interval.
+    """
+
+    def __init__(self, progress_path: str):
+        self.progress_path = progress_path
+        self.offset = 0
+        self.partial = ""
+        self.progress: Dict[str, str] = {}
+
+    def poll(self) -> Dict[str, str]:
+        """Returns the latest progress values, updated with any new complete lines."""
+        try:
+            with open(self.progress_path, "r", errors="replace") as f:
+                f.seek(self.offset)
+                data = f.read()
+                self.offset = f.tell()
+        except OSError:
+            return self.progress
+        if data:
+            text = self.partial + data
+            complete, _, self.partial = text.rpartition("\n")
+            self.progress = {**self.progress, **parse_progress(complete)}
+        return self.progress
+
+
+def _group_alive(pgid: int) -> bool:
+    try:
+        os.killpg(pgid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _signal_group(pgid: Optional[int], process: Any, sig: int) -> None:
+    try:
+        if pgid is not None:
+            os.killpg(pgid, sig)
+        else:
+            process.send_signal(sig)
+    except (ProcessLookupError, OSError):
+        pass
+
+
+async def terminate_process_group(process: Any, pgid: Optional[int], grace: float = TERM_GRACE_SECONDS) -> None:
+    """
+    Stops a supervised job: SIGTERM to its process group, then SIGKILL if anything
+    is still running after the grace period. Always reaps the leader.
+    """
+    _signal_group(pgid, process, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(process.wait(), timeout=grace)
+    except asyncio.TimeoutError:
+        pass
+    if process.returncode is None or (pgid is not None and _group_alive(pgid)):
+        _signal_group(pgid, process, signal.SIGKILL)
+    await process.wait()
+
+
+async def _reap_orphans(pgid: Optional[int]) -> None:
+    """Kills anything left in a finished job's process group and counts it."""
+    if pgid is None or not _group_alive(pgid):
+        return
+    _signal_group(pgid, None, signal.SIGKILL)
+    # killpg(pgid, 0) still succeeds until init has reaped the killed orphans
+    deadline = time.monotonic() + ORPHAN_REAP_TIMEOUT
+    while _group_alive(pgid) and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    if _group_alive(pgid):
+        SUPERVISOR_STATS["orphans_unreaped"] += 1
+    else:
+        SUPERVISOR_STATS["orphans_reaped"] += 1
+
+
+async def run_supervised(
+    command: List[str],
+    apply_policy: Optional[Callable[[int], None]] = None,
+    stall_timeout: Optional[float] = None,
+    on_progress: Optional[Callable[[Dict[str, str]], Any]] = None,
+    stdout: Optional[BinaryIO] = None
+) -> Dict[str, Any]:
+    """
+    Runs an FFmpeg command in its own process group under a stall watchdog.
+
+    The child is reaped with os.wait4 so the reported resource usage comes from the
+    kernel's rusage. FFmpeg writes -progress output to a temporary file. A job whose progress stops
+    advancing for stall_timeout seconds is killed (SIGTERM, then SIGKILL, across the
+    whole process group). If the awaiting task is cancelled, the group is torn down
+    the same way before the cancellation propagates, so a slot is never held by a
+    child nobody is waiting for.
+
+    Args:
+        command: The FFmpeg command; "-progress" is inserted after the executable.
+        apply_policy: Optional function applying the resource policy to the child's pid.
+        stall_timeout: Seconds without progress before the job is killed.
+        on_progress: Optional callback (sync or async) with each new progress block.
+        stdout: Optional open file that receives the child's stdout directly, for
+            commands that write media to "pipe:1"; 'stdout' is then returned empty.
+
+    Returns:
+        A dictionary with 'returncode', 'stdout', 'stderr', 'stalled', the last
+        'progress' block and the job's 'resource_usage'.
+    """
+    stall_timeout = STALL_TIMEOUT_SECONDS if stall_timeout is None else stall_timeout
+    fd, progress_path = tempfile.mkstemp(prefix="mcp_progress_", suffix=".txt")
+    os.close(fd)
+    full_command = command[:1] + ["-progress", progress_path, "-nostats"] + command[1:]
+
+    try:
+        process = SupervisedProcess(full_command, apply_policy=apply_policy, stdout=stdout)
+    except BaseException:
+        # Nothing will read the progress file if the child never started
+        os.unlink(progress_path)
+        raise
+    pid = process.pid if isinstance(process.pid, int) else None
+    pgid = pid if pid is not None and os.name == "posix" else None
+    SUPERVISOR_STATS["started"] += 1
+    if pid is not None:
+        ACTIVE_PROCESSES[pid] = {"command": " ".join(command), "started_at": time.time(), "progress": {}}
+    monitor = UsageMonitor(process.pid).start()
+    reader = ProgressReader(progress_path)
+    stalled = False
+    last_progress: Dict[str, str] = {}
+
+    async def watchdog() -> None:
+        nonlocal stalled, last_progress
+        last_marker = None
+        last_change = time.monotonic()
+        while True:
+            await asyncio.sleep(WATCHDOG_INTERVAL)
+            progress = reader.poll()
+            marker = tuple(progress.get(key) for key in PROGRESS_KEYS)
+            if marker != last_marker:
+                last_marker = marker
+                last_change = time.monotonic()
+                last_progress = progress
+                if pid is not None:
+                    ACTIVE_PROCESSES[pid]["progress"] = progress
+                if on_progress:
+                    outcome = on_progress(progress)
+                    if asyncio.iscoroutine(outcome):
+                        await outcome
+            elif time.monotonic() - last_change > stall_timeout:
+                stalled = True
+                SUPERVISOR_STATS["stalled_killed"] += 1
+                await terminate_process_group(process, pgid)
+                return
+
+    watchdog_task = asyncio.create_task(watchdog())
+    try:
+        await process.wait()
+    except asyncio.CancelledError:
+        SUPERVISOR_STATS["cancelled_killed"] += 1
+        await terminate_process_group(process, pgid)
+        raise
+    finally:
+        watchdog_task.cancel()
+        await asyncio.gather(watchdog_task, return_exceptions=True)
+        resource_usage = await monitor.stop(process.rusage)
+        stdout, stderr = process.read_output()
+        await _reap_orphans(pgid)
+        if pid is not None:
+            ACTIVE_PROCESSES.pop(pid, None)
+        last_progress = reader.poll() or last_progress
+        try:
+            os.unlink(progress_path)
+        except OSError:
+            pass
+
+    if not stalled:
+        SUPERVISOR_STATS["completed"] += 1
+    return {
+        "returncode": process.returncode,
+        "stdout": stdout,
+        "stderr": stderr,
+        "stalled": stalled,
+        "progress": last_progress,
+        "resource_usage": resource_usage,
+    }
+
+
+def get_supervisor_diagnostics() -> Dict[str, Any]:
+    """Returns supervisor counters and the FFmpeg jobs currently running."""
+    return {
+        **SUPERVISOR_STATS,
+        "active": len(ACTIVE_PROCESSES),
+        "active_processes": [
+            {"pid": pid, **details} for pid, details in ACTIVE_PROCESSES.items()
+        ],
+        "stall_timeout_seconds": STALL_TIMEOUT_SECONDS,
+    }
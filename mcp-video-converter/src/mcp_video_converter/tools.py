@@ -4,10 +4,92 @@ import subprocess
 import os
 import time
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Set, Union
 
 from fastmcp import Context
 
+from .checkpoint import CHECKPOINT_OUTPUT_FORMATS, resumable_convert
+from .cluster import CLUSTER_ENGINE, cluster_can_place, get_cluster_status
+from .concat import CONCAT_PROFILES, concat_media, stream_signature
+from .encoding import CRF_VIDEO_FORMATS, build_encoding_args
+from .engines import SUBPROCESS_ENGINE, build_ffmpeg_command, select_engine
+from .follow import FOLLOW_OUTPUT_FORMATS, FOLLOWABLE_CONTAINERS, follow_convert
+from .frames import FRAME_PIXEL_FORMATS, FRAME_TARGETS, SHM_DIR, display_size, extract_frames_to, new_shm_path
+from .history import estimate, record_conversion
+from .images import (
+    IMAGE_OUTPUT_FORMATS,
+    Image,
+    collect_images,
+    convert_image_single,
+    convert_images_batch,
+    summarize_batch,
+)
+from .jobs import create_job, finish_job, get_job, list_jobs, update_job
+from .keyindex import build_index, index_path_for
+from .outputs import register_output
+from .packaging import (
+    HLS_SEGMENT_TYPES,
+    PACKAGE_PROTOCOLS,
+    PACKAGE_SEGMENT_SECONDS,
+    copy_compatible,
+    package_media,
+    plan_renditions,
+)
+from .pipeline import plan_pipeline, run_pipeline_command
+from .preview import PREVIEW_OUTPUT_FORMATS, PREVIEW_WAIT_SECONDS, build_preview_command, preview_path_for
+from .probe import get_duration, get_stream, get_video_geometry, probe_media
+from .profiling import PROFILER
+from .rate_control import search_crf, report_rate_search
+from .remote import REMOTE_OUTPUT_DIR, RemoteInputError, get_remote_cache_stats, is_remote_url, open_remote
+from .resources import MAX_CONCURRENT_JOBS, get_resource_policy, make_policy_applier, threads_per_job
+from .sniff import plausible_media, sniff_file
+from .streaming import FragmentCounter, streaming_args
+from .supervisor import STALL_TIMEOUT_SECONDS, get_supervisor_diagnostics, run_supervised
+from .tuning import FORMAT_ENCODERS
+from .verify import DEFAULT_VERIFY_LEVEL, VERIFY_LEVELS, get_verification_stats, verify_output
+from .waveform import (
+    WAVEFORM_FORMATS,
+    WAVEFORM_MAX_LEVELS,
+    compute_waveform,
+    input_fingerprint,
+    np,
+    waveform_cache_path,
+)
+
+# Output paths claimed by conversions that are still running
+RESERVED_OUTPUTS: Set[str] = set()
+# Conversions that continue after convert_video returned with their preview
+BACKGROUND_TASKS: Set[asyncio.Task] = set()
+
+async def resolve_input(input_file_path_str: str) -> Dict[str, Any]:
+    """
+    Resolves a tool's input to the 'source' FFmpeg reads: the local file, or for
+    http(s) URLs the block cache's local URL. Also returns the 'output_dir' and 'stem'
+    outputs are named after, and whether the input is 'remote'.
+    """
+    if is_remote_url(input_file_path_str):
+        try:
+            remote = await open_remote(input_file_path_str)
+        except RemoteInputError as e:
+            return {"success": False, "error": str(e)}
+        return {
+            "success": True,
+            "source": remote["url"],
+            "output_dir": Path(REMOTE_OUTPUT_DIR),
+            "stem": remote["stem"],
+            "remote": True,
+        }
+    path = Path(input_file_path_str).resolve()
+    if not path.is_file():
+        return {"success": False, "error": f"Input file not found: {input_file_path_str}"}
+    return {"success": True, "source": path, "output_dir": path.parent / "converted_videos", "stem": path.stem, "remote": False}
+
+def publish_output(result: Dict[str, Any]) -> None:
+    """Adds the resource URI of a successful result's output file, so remote clients can read it."""
+    path = result.get("output_file_path")
+    if result.get("success") and path and Path(path).is_file():
+        result.update(register_output(Path(path)))
+
 # Global cache to avoid repeatedly checking FFmpeg
 FFMPEG_CHECK_CACHE = {
     "checked": False,
@@ -112,24 +194,153 @@ async def convert_video_impl(
     output_format: str,
     ctx: Optional[Context] = None,
     quality: Optional[str] = None,
-    framerate: Optional[int] = None
+    framerate: Optional[int] = None,
+    target_size_bytes: Optional[int] = None,
+    target_ssim: Optional[float] = None,
+    follow: bool = False,
+    streaming: Optional[str] = None,
+    job_id: Optional[str] = None,
+    preview: bool = False,
+    preview_seconds: Optional[float] = None,
+    resumable: bool = False,
+    verify: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Converts a video file to the specified output format using FFmpeg.
 
     Args:
-        input_file_path_str: The absolute path to the input video file.
+        input_file_path_str: The absolute path to the input video file, or an http(s) URL.
         output_format: The desired output format (e.g., "mp4", "webm", "mov").
         ctx: Optional Context for reporting progress.
         quality: Optional quality setting ("low", "medium", "high").
         framerate: Optional framerate for video output.
+        target_size_bytes: Optional output size budget; picks the CRF by sample encodes.
+        target_ssim: Optional minimum SSIM (0-1); picks the CRF by sample encodes.
+        follow: Follow an input that is still being recorded, encoding it in segments
+            as it grows and finalizing once the writer stops.
+        streaming: Optional progressive output mode: "fragmented" (fragmented MP4 or
+            cluster-flushed WebM, readable while it is written) or "faststart".
+        job_id: Optional id for the job, so its status can be polled while it runs.
+        preview: Also encode a quick low-resolution preview in a separate fast FFmpeg
+            process and return as soon as it is playable, leaving the full conversion running.
+        preview_seconds: Optional length of the preview from the start of the input.
+        resumable: Encode in checkpointed time segments, reusing the segments a previous
+            interrupted conversion of the same input and parameters finished.
+        verify: Optional output verification level: "none", "fast" (container header
+            and stream count), "standard" (also stream layout and duration against the
+            input) or "full" (also a background decode pass). Defaults to MCP_VERIFY_LEVEL.
 
     Returns:
-        A dictionary with the conversion status and output file path if successful.
+        A dictionary with the conversion status, output file path if successful, and
+        the 'job_id'. With a preview, the result of a conversion still running has
+        'status' "running" and the 'preview_file_path'. Verified outputs carry a
+        'verification' record with each check's outcome and cost.
     """
-    input_file_path = Path(input_file_path_str).resolve()
-    if not input_file_path.is_file():
-        return {"success": False, "error": f"Input file not found: {input_file_path_str}"}
+    if preview_seconds is not None and (not preview or preview_seconds <= 0):
+        return {"success": False, "error": "preview_seconds needs preview and must be positive"}
+    verify = (verify or DEFAULT_VERIFY_LEVEL).lower()
+    if verify not in VERIFY_LEVELS:
+        return {"success": False, "error": f"verify must be one of: {', '.join(VERIFY_LEVELS)}"}
+    try:
+        job = create_job("convert", input_file_path_str, output_format, job_id)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+
+    async def run(run_ctx: Optional[Context]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"success": False, "error": "Conversion was interrupted"}
+        try:
+            result = await _convert_video(
+                job, input_file_path_str, output_format, run_ctx, quality, framerate,
+                target_size_bytes, target_ssim, follow, streaming, preview, preview_seconds, resumable, verify
+            )
+        finally:
+            publish_output(result)
+            finish_job(job, result)
+        result["job_id"] = job["job_id"]
+        return result
+
+    if not preview:
+        return await run(ctx)
+
+    # The request context ends when this call returns, so the conversion reports
+    # only through its job once it runs in the background
+    task = asyncio.create_task(run(None))
+    BACKGROUND_TASKS.add(task)
+    task.add_done_callback(BACKGROUND_TASKS.discard)
+    deadline = time.monotonic() + PREVIEW_WAIT_SECONDS
+    while not task.done() and not job.get("preview_ready") and time.monotonic() < deadline:
+        await asyncio.wait({task}, timeout=0.25)
+    if task.done():
+        return task.result()
+    if ctx:
+        await ctx.info(f"Job {job['job_id']}: preview at {job.get('preview_file_path')}, conversion continues")
+    return {
+        "success": True,
+        "status": "running",
+        "job_id": job["job_id"],
+        "output_file_path": job.get("output_file_path"),
+        "preview_file_path": job.get("preview_file_path"),
+        "preview_ready": bool(job.get("preview_ready")),
+        "preview_ready_seconds": job.get("preview_ready_seconds"),
+        "message": "Preview ready; the full conversion continues. Poll get_job_status with the job_id.",
+    }
+
+async def _convert_video(
+    job: Dict[str, Any],
+    input_file_path_str: str,
+    output_format: str,
+    ctx: Optional[Context],
+    quality: Optional[str],
+    framerate: Optional[int],
+    target_size_bytes: Optional[int],
+    target_ssim: Optional[float],
+    follow: bool,
+    streaming: Optional[str],
+    preview: bool = False,
+    preview_seconds: Optional[float] = None,
+    resumable: bool = False,
+    verify: str = "none"
+) -> Dict[str, Any]:
+    """Runs one conversion for convert_video_impl, recording its progress on the job."""
+    if is_remote_url(input_file_path_str) and (follow or resumable):
+        return {"success": False, "error": "Follow mode and resumable conversion need a local input file"}
+    resolved = await resolve_input(input_file_path_str)
+    if not resolved["success"]:
+        return resolved
+    input_file_path = resolved["source"]
+
+    if resolved["remote"]:
+        # Remote inputs are checked by ffprobe through the block cache instead
+        sniffed = {"container": None, "media_kind": None, "truncated": False}
+    else:
+        # Reject non-media and truncated inputs before spawning anything
+        try:
+            sniffed = sniff_file(input_file_path)
+        except OSError as e:
+            return {"success": False, "error": f"Could not read input file: {str(e)}"}
+        # Unrecognized containers (y4m, raw streams, rarer muxers) are left to FFmpeg
+        if not plausible_media(sniffed):
+            return {
+                "success": False,
+                "error": f"Input is not a recognized media file ({sniffed['non_media']}): {input_file_path_str}",
+            }
+    if follow:
+        if sniffed["container"] not in FOLLOWABLE_CONTAINERS:
+            return {
+                "success": False,
+                "error": f"Follow mode needs a streamable input ({', '.join(FOLLOWABLE_CONTAINERS)}), got {sniffed['container']}",
+            }
+        if output_format.lower() not in FOLLOW_OUTPUT_FORMATS or target_size_bytes is not None or target_ssim is not None:
+            return {
+                "success": False,
+                "error": f"Follow mode supports {', '.join(FOLLOW_OUTPUT_FORMATS)} outputs without size or quality targets",
+            }
+    # A growing input looks truncated until the recorder finishes
+    elif sniffed["truncated"]:
+        return {
+            "success": False,
+            "error": f"Input file appears truncated or corrupt ({sniffed['reason']}): {input_file_path_str}",
+        }
 
     # Basic check for supported output format (can be expanded)
     supported_video_formats = [
@@ -143,53 +354,155 @@ async def convert_video_impl(
             "error": f"Unsupported output format: {output_format}. Supported formats: {', '.join(supported_video_formats)}",
         }
 
-    output_dir = input_file_path.parent / "converted_videos"
+    # Progressive output options are validated before any work starts
+    output_args: List[str] = []
+    if streaming:
+        if follow:
+            return {"success": False, "error": "streaming output is not available in follow mode"}
+        try:
+            output_args = streaming_args(output_format.lower(), streaming)
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+    if preview and (follow or output_format.lower() not in PREVIEW_OUTPUT_FORMATS):
+        return {
+            "success": False,
+            "error": f"Previews are available for {', '.join(PREVIEW_OUTPUT_FORMATS)} outputs outside follow mode",
+        }
+    if resumable and (follow or streaming or preview or output_format.lower() not in CHECKPOINT_OUTPUT_FORMATS):
+        return {
+            "success": False,
+            "error": f"Resumable conversion supports {', '.join(CHECKPOINT_OUTPUT_FORMATS)} outputs without follow, streaming or preview",
+        }
+
+    # Pick the CRF from short sample encodes when a size or quality target is given
+    crf = None
+    rate_search = None
+    if target_size_bytes is not None or target_ssim is not None:
+        if target_size_bytes is not None and target_ssim is not None:
+            return {"success": False, "error": "Specify only one of target_size_bytes or target_ssim."}
+        if output_format.lower() not in CRF_VIDEO_FORMATS:
+            return {
+                "success": False,
+                "error": f"Target size/quality encoding is only supported for: {', '.join(CRF_VIDEO_FORMATS)}",
+            }
+        if ctx:
+            await ctx.info("Searching for a CRF that meets the target using sample encodes")
+        rate_search = await search_crf(
+            input_file_path,
+            output_format.lower(),
+            framerate=framerate,
+            target_size_bytes=target_size_bytes,
+            target_ssim=target_ssim,
+            policy=get_resource_policy(quality),
+        )
+        if not rate_search["success"]:
+            if ctx:
+                await ctx.error(rate_search["error"])
+            return rate_search
+        crf = rate_search["crf"]
+        if ctx:
+            await ctx.info(f"Selected CRF {crf} after {rate_search['sample_encodes']} sample encodes")
+
+    output_dir = resolved["output_dir"]
     output_dir.mkdir(parents=True, exist_ok=True)
     
     # Construct output filename, ensuring it's unique if input has same name
-    base_name = input_file_path.stem
+    base_name = resolved["stem"]
     output_file_name = f"{base_name}_converted.{output_format.lower()}"
     output_file_path = output_dir / output_file_name
     
     # Handle potential filename collision (simple approach)
     counter = 1
-    while output_file_path.exists():
+    while output_file_path.exists() or str(output_file_path) in RESERVED_OUTPUTS:
         output_file_name = f"{base_name}_converted_{counter}.{output_format.lower()}"
         output_file_path = output_dir / output_file_name
         counter += 1
+    # Concurrent conversions of the same input must not pick the same name before
+    # either output exists on disk
+    RESERVED_OUTPUTS.add(str(output_file_path))
 
-    # FFmpeg command base
-    ffmpeg_command = ["ffmpeg", "-y", "-i", str(input_file_path)]
-    
-    # Add quality settings if provided
-    if quality:
-        if quality == "high":
-            # High quality settings
-            if output_format in ["mp4", "mkv", "webm", "mov"]:
-                ffmpeg_command.extend(["-crf", "18"])  # Lower CRF means higher quality
-            elif output_format in ["mp3", "ogg", "m4a"]:
-                ffmpeg_command.extend(["-b:a", "320k"])  # Higher bitrate for audio
-        elif quality == "medium":
-            # Medium quality settings
-            if output_format in ["mp4", "mkv", "webm", "mov"]:
-                ffmpeg_command.extend(["-crf", "23"])  # Default for x264
-            elif output_format in ["mp3", "ogg", "m4a"]:
-                ffmpeg_command.extend(["-b:a", "192k"])
-        elif quality == "low":
-            # Low quality settings
-            if output_format in ["mp4", "mkv", "webm", "mov"]:
-                ffmpeg_command.extend(["-crf", "28"])  # Higher CRF means lower quality
-            elif output_format in ["mp3", "ogg", "m4a"]:
-                ffmpeg_command.extend(["-b:a", "128k"])  # Lower bitrate for audio
-    
-    # Add framerate settings if provided
-    if framerate and output_format in ["mp4", "mkv", "webm", "mov", "avi", "flv"]:
-        ffmpeg_command.extend(["-r", str(framerate)])
-    
-    # Add output file path
-    ffmpeg_command.append(str(output_file_path))
+    if follow:
+        try:
+            result = await follow_convert(
+                input_file_path, output_file_path, output_format.lower(), quality, framerate, ctx
+            )
+            return await _verify_result(job, result, output_format.lower(), verify, None, ctx)
+        finally:
+            RESERVED_OUTPUTS.discard(str(output_file_path))
+
+    if resumable:
+        try:
+            probe = await probe_media(input_file_path)
+            duration = get_duration(probe) if probe["success"] else None
+            if not duration:
+                return {"success": False, "error": "Resumable conversion needs an input with a known duration"}
+            update_job(job, output_file_path=str(output_file_path), segments_completed=0)
+
+            def on_segment(completed: int, total: int) -> None:
+                update_job(job, segments_completed=completed, segments_total=total)
+
+            if ctx:
+                await ctx.info(f"Converting {input_file_path_str} in checkpointed segments")
+            result = await resumable_convert(
+                input_file_path, output_file_path, output_format.lower(),
+                build_encoding_args(output_format.lower(), quality, framerate, crf), duration, quality,
+                on_progress=lambda progress: update_job(job, progress=progress), on_segment=on_segment
+            )
+            return await _verify_result(job, result, output_format.lower(), verify, probe, ctx)
+        except FileNotFoundError:
+            error_msg = "FFmpeg not found. Please ensure it's installed and in PATH."
+            if ctx:
+                await ctx.error(error_msg)
+            return {"success": False, "error": error_msg}
+        finally:
+            RESERVED_OUTPUTS.discard(str(output_file_path))
+
+    # Still images are decoded and encoded in-process when Pillow is available
+    if Image is not None and output_format.lower() in IMAGE_OUTPUT_FORMATS and sniffed["media_kind"] == "image":
+        image_result = await convert_image_single(input_file_path, output_file_path, output_format.lower(), quality)
+        if image_result["success"]:
+            RESERVED_OUTPUTS.discard(str(output_file_path))
+            if ctx:
+                await ctx.info(f"Image converted in-process: {output_file_path}")
+            result = {
+                "success": True,
+                "output_file_path": str(output_file_path),
+                "message": "Image converted successfully.",
+                "engine": "image",
+            }
+            return await _verify_result(job, result, output_format.lower(), verify, None, ctx)
+        # Animated or unusual images fall through to FFmpeg
+
+    encoding_args = build_encoding_args(output_format.lower(), quality, framerate, crf) + output_args
+    ffmpeg_command = build_ffmpeg_command(input_file_path, encoding_args, output_file_path)
+
+    policy = get_resource_policy(quality)
+    # Small jobs run in-process when PyAV is available; the rest spawn FFmpeg
+    engine = SUBPROCESS_ENGINE if resolved["remote"] else select_engine(
+        input_file_path, output_format.lower(), encoding_args
+    )
+    if engine is SUBPROCESS_ENGINE and not resolved["remote"] and cluster_can_place(
+        output_format.lower(), encoding_args
+    ):
+        # In cluster mode FFmpeg runs on a worker agent that has the job's encoders. Jobs
+        # small enough for the in-process engine stay here on purpose: they finish faster
+        # than a round trip through the coordinator
+        engine = CLUSTER_ENGINE
+    preview_path = preview_path_for(output_file_path) if preview else None
 
     try:
+        # The probe feeds encoder tuning (by resolution) and the conversion history
+        probe = await probe_media(input_file_path)
+        if not probe["success"]:
+            if resolved["remote"]:
+                return {"success": False, "error": f"Input is not a recognized media file: {probe['error']}"}
+            probe = None
+        video = None
+        if probe and engine.name in ("subprocess", "cluster") and output_format.lower() in FORMAT_ENCODERS:
+            video = get_video_geometry(probe)
+        if preview and probe and get_stream(probe, "video") is None:
+            return {"success": False, "error": "A preview needs an input with a video stream"}
+
         if ctx:
             await ctx.info(f"Converting file: {input_file_path_str} to {output_format}")
             await ctx.report_progress(progress=10, total=100)
@@ -202,23 +515,76 @@ async def convert_video_impl(
             await ctx.info(f"Command: {' '.join(ffmpeg_command)}")
             await ctx.report_progress(progress=20, total=100)
 
-        process = await asyncio.create_subprocess_exec(
-            *ffmpeg_command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-
         if ctx:
-            await ctx.info("FFmpeg process started")
+            await ctx.info(f"FFmpeg process started ({engine.name} engine)")
             await ctx.report_progress(progress=30, total=100)
 
-        stdout, stderr = await process.communicate()
+        # Fragmented outputs are readable while they are written; report how far along
+        fragments = FragmentCounter(output_file_path, output_format.lower()) if streaming == "fragmented" else None
+        update_job(job, output_file_path=str(output_file_path), engine=engine.name, streaming=streaming)
+        if fragments:
+            update_job(job, in_progress_path=str(output_file_path), fragments_completed=0)
+            if ctx:
+                await ctx.info(f"Job {job['job_id']}: streaming output to {output_file_path}")
+        preview_fragments = FragmentCounter(preview_path, "mp4") if preview else None
+        if preview:
+            update_job(job, preview_file_path=str(preview_path), preview_ready=False, preview_ready_seconds=None)
+        started = time.monotonic()
+
+        def mark_preview_ready() -> None:
+            update_job(job, preview_ready=True, preview_ready_seconds=round(time.monotonic() - started, 3))
+
+        def on_progress(progress: Dict[str, str]) -> None:
+            update_job(job, progress=progress)
+            if fragments:
+                update_job(job, fragments_completed=fragments.poll())
+
+        def on_preview_progress(progress: Dict[str, str]) -> None:
+            # The preview is playable once its first fragment is complete
+            if not job["preview_ready"] and preview_fragments.poll():
+                mark_preview_ready()
+
+        preview_task = None
+        if preview:
+            # The preview is its own ultrafast FFmpeg process with a small thread cap,
+            # outside the job slots so a queue of full conversions can't delay it
+            preview_task = asyncio.create_task(run_supervised(
+                build_preview_command(input_file_path, preview_path, preview_seconds),
+                apply_policy=make_policy_applier(policy), on_progress=on_preview_progress
+            ))
+        try:
+            run = await engine.run(
+                input_file_path, output_file_path, output_format.lower(), encoding_args, policy, video,
+                on_progress=on_progress
+            )
+            preview_run = await preview_task if preview_task and run["returncode"] == 0 else None
+        finally:
+            if preview_task and not preview_task.done():
+                preview_task.cancel()
+                await asyncio.gather(preview_task, return_exceptions=True)
+        if preview_run and preview_run["returncode"] == 0 and not job["preview_ready"] and preview_fragments.poll():
+            # Short inputs finish before the first progress report
+            mark_preview_ready()
+        resource_usage = run["resource_usage"]
+        ffmpeg_command_str = run.get("command", " ".join(ffmpeg_command))
+        returncode, stderr = run["returncode"], run["stderr"]
+
+        if run["stalled"]:
+            error_msg = f"FFmpeg stalled (no progress for {STALL_TIMEOUT_SECONDS:.0f} seconds) and was killed"
+            if ctx:
+                await ctx.error(error_msg)
+            return {
+                "success": False,
+                "error": error_msg,
+                "command": ffmpeg_command_str,
+                "resource_usage": resource_usage
+            }
 
         if ctx:
             await ctx.info("FFmpeg process completed")
             await ctx.report_progress(progress=90, total=100)
 
-        if process.returncode == 0:
+        if returncode == 0:
             if ctx:
                 await ctx.info(f"Conversion successful: {output_file_path}")
                 await ctx.report_progress(progress=100, total=100)
@@ -242,11 +608,34 @@ async def convert_video_impl(
                     "error": error_msg,
                 }
 
-            return {
+            # A CRF picked for a size or SSIM target says nothing about the quality preset's output
+            if probe and resource_usage.get("wall_seconds") and not rate_search:
+                record_conversion(
+                    probe, output_format.lower(), quality,
+                    output_file_path.stat().st_size, resource_usage["wall_seconds"]
+                )
+
+            result = {
                 "success": True,
                 "output_file_path": str(output_file_path),
-                "message": "Video converted successfully."
+                "message": "Video converted successfully.",
+                "engine": engine.name,
+                "input_container": sniffed["container"],
+                "streaming": streaming,
+                "resource_usage": resource_usage
             }
+            if fragments:
+                result["fragments"] = fragments.poll()
+            if preview:
+                result["preview_file_path"] = str(preview_path)
+                result["preview_ready_seconds"] = job["preview_ready_seconds"]
+                if preview_run["returncode"] != 0:
+                    result["preview_error"] = preview_run["stderr"].decode(errors="replace").strip()
+            if rate_search:
+                result["rate_search"] = await report_rate_search(
+                    rate_search, input_file_path, output_file_path, framerate, policy
+                )
+            return await _verify_result(job, result, output_format.lower(), verify, probe, ctx)
         else:
             error_message = stderr.decode(errors='replace').strip()
             if ctx:
@@ -254,8 +643,9 @@ async def convert_video_impl(
 
             return {
                 "success": False,
-                "error": f"FFmpeg conversion failed. Return code: {process.returncode}. Error: {error_message}",
-                "command": " ".join(ffmpeg_command)  # For debugging
+                "error": f"FFmpeg conversion failed. Return code: {returncode}. Error: {error_message}",
+                "command": ffmpeg_command_str,  # For debugging
+                "resource_usage": resource_usage
             }
     except FileNotFoundError:
         error_msg = "FFmpeg not found. Please ensure it's installed and in PATH."
@@ -267,6 +657,579 @@ async def convert_video_impl(
         if ctx:
             await ctx.error(error_msg)
         return {"success": False, "error": error_msg}
+    finally:
+        RESERVED_OUTPUTS.discard(str(output_file_path))
+
+async def _verify_result(
+    job: Dict[str, Any],
+    result: Dict[str, Any],
+    output_format: str,
+    level: str,
+    input_probe: Optional[Dict[str, Any]],
+    ctx: Optional[Context]
+) -> Dict[str, Any]:
+    """Verifies a successful conversion's output at `level`, failing the result when a check fails."""
+    if level == "none" or not result.get("success"):
+        return result
+    verification = await verify_output(Path(result["output_file_path"]), output_format, level, input_probe)
+    # A full decode pass fills in the same record, so get_job_status shows its outcome
+    update_job(job, verification=verification)
+    result["verification"] = verification
+    if not verification["passed"]:
+        result.update(success=False, error=f"Output verification failed: {verification['error']}")
+        if ctx:
+            await ctx.error(result["error"])
+    return result
+
+# Tool to convert a batch of still images
+async def convert_images_impl(
+    output_format: str,
+    input_paths: Optional[List[str]] = None,
+    input_directory: Optional[str] = None,
+    quality: Optional[str] = None,
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Converts many still images at once, in-process on a thread pool.
+
+    Inputs are identified as images by their header bytes; other files in the
+    directory are skipped. Without Pillow each image goes through convert_video_impl.
+
+    Args:
+        output_format: The image output format ("webp", "jpg", "png", "bmp", "tiff").
+        input_paths: Optional list of image paths.
+        input_directory: Optional directory whose images are all converted.
+        quality: Optional quality setting ("low", "medium", "high").
+        ctx: Optional Context for logging.
+
+    Returns:
+        A dictionary with per-image 'results', counts and 'images_per_second'.
+    """
+    output_format = output_format.lower()
+    if output_format not in IMAGE_OUTPUT_FORMATS:
+        return {
+            "success": False,
+            "error": f"Unsupported image format: {output_format}. Supported formats: {', '.join(IMAGE_OUTPUT_FORMATS)}",
+        }
+    if not input_paths and not input_directory:
+        return {"success": False, "error": "Specify input_paths or input_directory."}
+    try:
+        images = collect_images(input_paths or [], input_directory)
+    except OSError as e:
+        return {"success": False, "error": f"Could not read inputs: {e}"}
+
+    if ctx:
+        await ctx.info(f"Converting {len(images)} images to {output_format}")
+    started = time.monotonic()
+    if Image is not None:
+        results = await convert_images_batch(images, output_format, quality)
+    else:
+        converted = await asyncio.gather(*(
+            convert_video_impl(str(path), output_format, quality=quality) for path in images
+        ))
+        results = [{"input_file_path": str(path), **result} for path, result in zip(images, converted)]
+    return summarize_batch(results, started)
+
+# Tool to estimate a conversion before running it
+async def estimate_conversion_impl(
+    input_file_path_str: str,
+    output_format: str,
+    quality: Optional[str] = None,
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Predicts the output size and encode time of a conversion without running it.
+
+    Starts from rule-of-thumb bitrates and encoder speeds, and leans on the history
+    of completed conversions for the same format, quality and resolution bucket as
+    it accumulates.
+
+    Args:
+        input_file_path_str: The absolute path to the input file, or an http(s) URL.
+        output_format: The desired output format.
+        quality: Optional quality setting ("low", "medium", "high").
+        ctx: Optional Context for logging.
+
+    Returns:
+        A dictionary with 'output_bytes' and 'wall_seconds' estimates, each with
+        'expected', 'low' and 'high' (90% bounds), and the number of history samples.
+    """
+    resolved = await resolve_input(input_file_path_str)
+    if not resolved["success"]:
+        return resolved
+    if ctx:
+        await ctx.info(f"Estimating conversion of {input_file_path_str} to {output_format}")
+    probe = await probe_media(resolved["source"])
+    if not probe["success"]:
+        return probe
+    policy = get_resource_policy(quality)
+    try:
+        prediction = estimate(probe, output_format.lower(), quality, threads_per_job(policy))
+    except ValueError as e:
+        return {"success": False, "error": f"Cannot estimate conversion: {e}"}
+    return {"success": True, **prediction}
+
+# Tool to package an input for adaptive streaming
+async def package_streaming_impl(
+    input_file_path_str: str,
+    protocol: str = "hls",
+    renditions: Optional[List[str]] = None,
+    segment_type: str = "ts",
+    copy: bool = False,
+    segment_seconds: Optional[float] = None,
+    quality: Optional[str] = None,
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Packages a video as HLS and/or DASH segments with a master playlist or manifest.
+
+    Args:
+        input_file_path_str: The absolute path to the input video file.
+        protocol: "hls", "dash", or "both" (DASH with HLS playlists over the same segments).
+        renditions: Optional rendition names from the ladder (e.g. ["720p", "360p"]);
+            defaults to the top renditions that fit the source height.
+        segment_type: HLS segment container, "ts" or "fmp4". DASH always uses fMP4.
+        copy: Package the input streams as they are, without re-encoding.
+        segment_seconds: Optional target segment duration.
+        quality: Optional quality tier, used for the job's resource policy.
+        ctx: Optional Context for logging.
+
+    Returns:
+        A dictionary with the package 'output_dir', its playlist paths, the
+        'renditions', the number of 'segments', and the 'job_id'.
+    """
+    input_file_path = Path(input_file_path_str).resolve()
+    if not input_file_path.is_file():
+        return {"success": False, "error": f"Input file not found: {input_file_path_str}"}
+    protocol = protocol.lower()
+    if protocol not in PACKAGE_PROTOCOLS:
+        return {"success": False, "error": f"Unsupported protocol: {protocol}. Use one of: {', '.join(PACKAGE_PROTOCOLS)}"}
+    segment_type = "fmp4" if protocol != "hls" else segment_type.lower()
+    if segment_type not in HLS_SEGMENT_TYPES:
+        return {"success": False, "error": f"Unsupported segment type: {segment_type}. Use one of: {', '.join(HLS_SEGMENT_TYPES)}"}
+    if copy and renditions and len(renditions) > 1:
+        return {"success": False, "error": "Packaging by stream copy produces a single rendition."}
+    if not plausible_media(sniff_file(input_file_path), ("video",)):
+        return {"success": False, "error": f"Input is not a video: {input_file_path_str}"}
+
+    probe = await probe_media(input_file_path)
+    if not probe["success"]:
+        return probe
+    geometry = get_video_geometry(probe)
+    if geometry is None:
+        return {"success": False, "error": f"No video stream found in {input_file_path_str}"}
+    if copy:
+        reason = copy_compatible(probe, segment_type)
+        if reason:
+            return {"success": False, "error": f"Cannot package by stream copy: {reason}. Omit copy to re-encode."}
+        planned = [{"name": "source", "height": geometry["height"]}]
+    else:
+        try:
+            planned = plan_renditions(geometry["height"], renditions)
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+
+    base_dir = input_file_path.parent / "converted_videos"
+    output_dir = base_dir / f"{input_file_path.stem}_{protocol}"
+    counter = 1
+    while output_dir.exists() or str(output_dir) in RESERVED_OUTPUTS:
+        output_dir = base_dir / f"{input_file_path.stem}_{protocol}_{counter}"
+        counter += 1
+    RESERVED_OUTPUTS.add(str(output_dir))
+
+    job = create_job("package", input_file_path_str, protocol)
+    update_job(job, output_dir=str(output_dir), renditions=[r["name"] for r in planned])
+    result: Dict[str, Any] = {"success": False, "error": "Packaging was interrupted"}
+    try:
+        if ctx:
+            mode = "stream copy" if copy else f"{len(planned)} renditions"
+            await ctx.info(f"Packaging {input_file_path_str} as {protocol} ({mode}) into {output_dir}")
+        result = await package_media(
+            input_file_path, output_dir, protocol, planned, get_stream(probe, "audio") is not None,
+            segment_type, copy, quality, segment_seconds or PACKAGE_SEGMENT_SECONDS,
+            on_progress=lambda progress: update_job(job, progress=progress)
+        )
+        if result["success"]:
+            result["renditions"] = [r["name"] for r in planned]
+            result["mode"] = "copy" if copy else "encode"
+        elif ctx:
+            await ctx.error(result["error"])
+    except FileNotFoundError:
+        result = {"success": False, "error": "FFmpeg not found. Please ensure it's installed and in PATH."}
+    finally:
+        RESERVED_OUTPUTS.discard(str(output_dir))
+        finish_job(job, result)
+    result["job_id"] = job["job_id"]
+    return result
+
+# Tool to run a pipeline of operations in one FFmpeg pass
+async def run_pipeline_impl(
+    input_file_path_str: str,
+    operations: List[Dict[str, Any]],
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Applies an ordered list of operations (trim, scale, crop, fps, rotate,
+    audio_resample, format) in a single FFmpeg invocation.
+
+    Args:
+        input_file_path_str: The absolute path to the input file, or an http(s) URL.
+        operations: Operation dicts with an 'op' key, ending with
+            {"op": "format", "format": ..., "quality": ...}.
+        ctx: Optional Context for logging.
+
+    Returns:
+        A dictionary with the 'output_file_path', the FFmpeg 'command', whether the
+        plan was reused from the cache ('plan_cached'), and the 'job_id'.
+    """
+    resolved = await resolve_input(input_file_path_str)
+    if not resolved["success"]:
+        return resolved
+    input_file_path = resolved["source"]
+    if not resolved["remote"] and not plausible_media(sniff_file(input_file_path)):
+        return {"success": False, "error": f"Input is not a recognised media file: {input_file_path_str}"}
+    try:
+        plan, cached = plan_pipeline(operations)
+    except ValueError as e:
+        return {"success": False, "error": f"Invalid pipeline: {e}"}
+
+    output_dir = resolved["output_dir"]
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_file_path = output_dir / f"{resolved['stem']}_pipeline.{plan['format']}"
+    counter = 1
+    while output_file_path.exists() or str(output_file_path) in RESERVED_OUTPUTS:
+        output_file_path = output_dir / f"{resolved['stem']}_pipeline_{counter}.{plan['format']}"
+        counter += 1
+    RESERVED_OUTPUTS.add(str(output_file_path))
+
+    job = create_job("pipeline", input_file_path_str, plan["format"])
+    update_job(job, output_file_path=str(output_file_path))
+    result: Dict[str, Any] = {"success": False, "error": "Pipeline was interrupted"}
+    try:
+        if ctx:
+            await ctx.info(f"Running {len(operations)} operations on {input_file_path_str} in one pass")
+        run = await run_pipeline_command(
+            plan, input_file_path, output_file_path, on_progress=lambda progress: update_job(job, progress=progress)
+        )
+        if run["stalled"] or run["returncode"] != 0:
+            error = "stalled" if run["stalled"] else run["stderr"].decode(errors="replace").strip()
+            result = {"success": False, "error": f"Pipeline failed: {error}", "command": run["command"]}
+            if ctx:
+                await ctx.error(result["error"])
+        else:
+            result = {
+                "success": True,
+                "output_file_path": str(output_file_path),
+                "message": "Pipeline completed successfully.",
+                "command": run["command"],
+                "plan_cached": cached,
+                "resource_usage": run["resource_usage"],
+            }
+    except FileNotFoundError:
+        result = {"success": False, "error": "FFmpeg not found. Please ensure it's installed and in PATH."}
+    finally:
+        RESERVED_OUTPUTS.discard(str(output_file_path))
+        publish_output(result)
+        finish_job(job, result)
+    result["job_id"] = job["job_id"]
+    return result
+
+# Tool to export raw frames for ML consumers
+async def extract_frames_impl(
+    input_file_path_str: str,
+    pixel_format: str = "rgb24",
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fps: Optional[float] = None,
+    stride: Optional[int] = None,
+    max_frames: Optional[int] = None,
+    target: str = "npy",
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Decodes video frames into a uint8 .npy array file or a shared-memory segment.
+
+    Args:
+        input_file_path_str: The absolute path to the input video file, or an http(s) URL.
+        pixel_format: "rgb24" (frames x height x width x 3) or "gray" (frames x height x width).
+        width: Optional output width; with only one side given the aspect ratio is kept.
+        height: Optional output height.
+        fps: Optional sampling rate in frames per second.
+        stride: Optional sampling stride: keep every Nth decoded frame.
+        max_frames: Optional cap on the number of frames written.
+        target: "npy" for a file under converted_videos, or "shm" for /dev/shm.
+        ctx: Optional Context for logging.
+
+    Returns:
+        A dictionary with the 'output_file_path' (npy) or 'shm_name' (shm), the array
+        'shape' and 'dtype', 'header_bytes' before the frame data, and the 'job_id'.
+    """
+    if pixel_format not in FRAME_PIXEL_FORMATS:
+        return {"success": False, "error": f"Unsupported pixel format: {pixel_format}. Use one of: {', '.join(FRAME_PIXEL_FORMATS)}"}
+    if target not in FRAME_TARGETS:
+        return {"success": False, "error": f"Unsupported target: {target}. Use one of: {', '.join(FRAME_TARGETS)}"}
+    if target == "shm" and not SHM_DIR.is_dir():
+        return {"success": False, "error": f"Shared-memory output needs {SHM_DIR}; use target='npy'."}
+    if (fps is not None and fps <= 0) or (stride is not None and stride < 1) or (max_frames is not None and max_frames < 1):
+        return {"success": False, "error": "fps must be positive, and stride and max_frames at least 1."}
+    if (width is not None and width < 2) or (height is not None and height < 2):
+        return {"success": False, "error": "width and height must be at least 2."}
+    resolved = await resolve_input(input_file_path_str)
+    if not resolved["success"]:
+        return resolved
+    input_file_path = resolved["source"]
+
+    probe = await probe_media(input_file_path)
+    if not probe["success"]:
+        return probe
+    stream = get_stream(probe, "video")
+    if not stream or not stream.get("width") or not stream.get("height"):
+        return {"success": False, "error": f"No video stream found in {input_file_path_str}"}
+
+    if target == "shm":
+        target_path = new_shm_path()
+    else:
+        output_dir = resolved["output_dir"]
+        output_dir.mkdir(parents=True, exist_ok=True)
+        target_path = output_dir / f"{resolved['stem']}_frames.npy"
+        counter = 1
+        while target_path.exists():
+            target_path = output_dir / f"{resolved['stem']}_frames_{counter}.npy"
+            counter += 1
+
+    job = create_job("frames", input_file_path_str, target)
+    result: Dict[str, Any] = {"success": False, "error": "Frame extraction was interrupted"}
+    try:
+        if ctx:
+            await ctx.info(f"Extracting {pixel_format} frames from {input_file_path_str} to {target_path}")
+        result = await extract_frames_to(
+            input_file_path, target_path, display_size(stream), pixel_format, width, height, fps, stride, max_frames,
+            on_progress=lambda progress: update_job(job, progress=progress)
+        )
+        if result["success"]:
+            if target == "shm":
+                result.update({"shm_name": target_path.name, "shm_path": str(target_path)})
+            else:
+                result["output_file_path"] = str(target_path)
+        elif ctx:
+            await ctx.error(result["error"])
+    except FileExistsError:
+        result = {"success": False, "error": f"Output already exists: {target_path}"}
+    except FileNotFoundError:
+        result = {"success": False, "error": "FFmpeg not found. Please ensure it's installed and in PATH."}
+    finally:
+        finish_job(job, result)
+    result["job_id"] = job["job_id"]
+    return result
+
+# Tool to compute waveform peaks
+async def generate_waveform_impl(
+    input_file_path_str: str,
+    levels: int = 4,
+    output_format: str = "json",
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Computes min/max/RMS waveform peaks of a file's audio at several zoom levels.
+
+    Results are cached by a fingerprint of the input's contents, so asking again
+    for the same file returns the existing peaks file without running FFmpeg.
+
+    Args:
+        input_file_path_str: The absolute path to the input audio or video file.
+        levels: Number of zoom levels, each 4x coarser than the previous.
+        output_format: "json" or "binary" (compact float32 triples).
+        ctx: Optional Context for logging.
+
+    Returns:
+        A dictionary with the peaks 'output_file_path' and whether it was 'cached'.
+    """
+    if np is None:
+        return {"success": False, "error": "generate_waveform needs NumPy. Install it with: pip install -e \".[waveform]\""}
+    input_file_path = Path(input_file_path_str).resolve()
+    if not input_file_path.is_file():
+        return {"success": False, "error": f"Input file not found: {input_file_path_str}"}
+    if output_format not in WAVEFORM_FORMATS:
+        return {"success": False, "error": f"Unsupported peaks format: {output_format}. Use one of: {', '.join(WAVEFORM_FORMATS)}"}
+    if not 1 <= levels <= WAVEFORM_MAX_LEVELS:
+        return {"success": False, "error": f"levels must be between 1 and {WAVEFORM_MAX_LEVELS}."}
+    if not plausible_media(sniff_file(input_file_path), ("audio", "video")):
+        return {"success": False, "error": f"Input is not an audio or video file: {input_file_path_str}"}
+
+    output_path = waveform_cache_path(input_fingerprint(input_file_path), levels, output_format)
+    if output_path.is_file():
+        if ctx:
+            await ctx.info(f"Using cached waveform for {input_file_path_str}")
+        return {"success": True, "output_file_path": str(output_path), "cached": True}
+
+    job = create_job("waveform", input_file_path_str, output_format)
+    result: Dict[str, Any] = {"success": False, "error": "Waveform extraction was interrupted"}
+    try:
+        if ctx:
+            await ctx.info(f"Computing {levels} waveform levels for {input_file_path_str}")
+        result = await compute_waveform(
+            input_file_path, output_path, levels, output_format,
+            on_progress=lambda progress: update_job(job, progress=progress)
+        )
+        if result["success"]:
+            result.update({"output_file_path": str(output_path), "cached": False})
+        elif ctx:
+            await ctx.error(result["error"])
+    except FileNotFoundError:
+        result = {"success": False, "error": "FFmpeg not found. Please ensure it's installed and in PATH."}
+    finally:
+        finish_job(job, result)
+    result["job_id"] = job["job_id"]
+    return result
+
+# Tool to build or query the keyframe index of a file
+async def index_keyframes_impl(
+    input_file_path_str: str,
+    seek_to: Optional[float] = None,
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Builds, extends or reuses the keyframe/packet index of a video file.
+
+    Args:
+        input_file_path_str: The absolute path to the input video file.
+        seek_to: Optional time in seconds to look up the nearest keyframes for.
+        ctx: Optional Context for logging.
+
+    Returns:
+        A dictionary with the 'index_path', how it was obtained ('status': built,
+        extended or cached), keyframe/packet/GOP statistics and, with seek_to, the
+        'keyframe_before' and 'keyframe_after' as {"time", "byte_offset"}.
+    """
+    input_file_path = Path(input_file_path_str).resolve()
+    if not input_file_path.is_file():
+        return {"success": False, "error": f"Input file not found: {input_file_path_str}"}
+    if not plausible_media(sniff_file(input_file_path), ("video",)):
+        return {"success": False, "error": f"Input is not a video: {input_file_path_str}"}
+    index_path = index_path_for(input_file_path)
+    try:
+        index, status = await build_index(input_file_path, index_path)
+    except FileNotFoundError:
+        return {"success": False, "error": "ffprobe not found. Please ensure FFmpeg is installed and in PATH."}
+    except (RuntimeError, asyncio.TimeoutError) as e:
+        return {"success": False, "error": f"Could not index {input_file_path_str}: {e}"}
+    try:
+        result = {"success": True, "index_path": str(index_path), "status": status, **index.summary()}
+        if seek_to is not None:
+            for key, found in (
+                ("keyframe_before", index.keyframe_at_or_before(seek_to)),
+                ("keyframe_after", index.keyframe_at_or_after(seek_to)),
+            ):
+                result[key] = {"time": found[0], "byte_offset": found[1]} if found else None
+    finally:
+        index.close()
+    if ctx:
+        await ctx.info(f"Keyframe index {status}: {result['keyframes']} keyframes, {result['packets']} packets")
+    return result
+
+# Tool to join videos end to end
+async def concat_videos_impl(
+    input_file_paths: List[str],
+    output_format: Optional[str] = None,
+    quality: Optional[str] = None,
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Joins videos in order, by stream copy when their streams are compatible.
+
+    Inputs that differ from the first input in codec, frame size, pixel format, frame
+    rate, time base or audio layout are re-encoded to match it first, in parallel.
+
+    Args:
+        input_file_paths: The absolute paths of the inputs, in playback order.
+        output_format: Optional output container ("mp4", "mov", "mkv", "webm");
+            defaults to the first input's extension, or mp4.
+        quality: Optional quality setting for inputs that need re-encoding.
+        ctx: Optional Context for logging.
+
+    Returns:
+        A dictionary with the 'output_file_path', which inputs were 'normalized' and
+        why, which were 'stream_copied', and the time spent in each phase.
+    """
+    if len(input_file_paths) < 2:
+        return {"success": False, "error": "concat_videos needs at least two inputs."}
+    inputs = [Path(p).resolve() for p in input_file_paths]
+    missing = [str(p) for p in inputs if not p.is_file()]
+    if missing:
+        return {"success": False, "error": f"Input files not found: {', '.join(missing)}"}
+    if output_format is None:
+        suffix = inputs[0].suffix.lower().lstrip(".")
+        output_format = suffix if suffix in CONCAT_PROFILES else "mp4"
+    output_format = output_format.lower()
+    if output_format not in CONCAT_PROFILES:
+        return {"success": False, "error": f"Unsupported output format: {output_format}. Use one of: {', '.join(CONCAT_PROFILES)}"}
+
+    started = time.monotonic()
+    probes = await asyncio.gather(*(probe_media(p) for p in inputs))
+    probe_seconds = time.monotonic() - started
+    for path, probe in zip(inputs, probes):
+        if not probe["success"]:
+            return {"success": False, "error": f"Could not probe {path}: {probe['error']}"}
+        if get_stream(probe, "video") is None:
+            return {"success": False, "error": f"No video stream found in {path}"}
+    signatures = [stream_signature(probe) for probe in probes]
+
+    output_dir = inputs[0].parent / "converted_videos"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_file_path = output_dir / f"{inputs[0].stem}_joined.{output_format}"
+    counter = 1
+    while output_file_path.exists() or str(output_file_path) in RESERVED_OUTPUTS:
+        output_file_path = output_dir / f"{inputs[0].stem}_joined_{counter}.{output_format}"
+        counter += 1
+    RESERVED_OUTPUTS.add(str(output_file_path))
+
+    job = create_job("concat", input_file_paths[0], output_format)
+    update_job(job, output_file_path=str(output_file_path), inputs=len(inputs))
+    result: Dict[str, Any] = {"success": False, "error": "Joining was interrupted"}
+    try:
+        if ctx:
+            await ctx.info(f"Joining {len(inputs)} inputs into {output_file_path}")
+        result = await concat_media(inputs, signatures, output_file_path, output_format, quality)
+        if result["success"]:
+            result["probe_seconds"] = round(probe_seconds, 3)
+            if ctx and result["normalized"]:
+                await ctx.info(f"Re-encoded {len(result['normalized'])} incompatible inputs before joining")
+        elif ctx:
+            await ctx.error(result["error"])
+    except FileNotFoundError:
+        result = {"success": False, "error": "FFmpeg not found. Please ensure it's installed and in PATH."}
+    finally:
+        RESERVED_OUTPUTS.discard(str(output_file_path))
+        publish_output(result)
+        finish_job(job, result)
+    result["job_id"] = job["job_id"]
+    return result
+
+# Job status
+async def get_job_status_impl(job_id: Optional[str] = None, ctx: Optional[Context] = None) -> Dict[str, Any]:
+    """
+    Returns the status of a conversion job, or of all known jobs when no id is given.
+
+    Running jobs include their latest FFmpeg progress and, for fragmented outputs, the
+    'in_progress_path' and 'fragments_completed' so consumers can start reading early.
+    Conversions with a preview include 'preview_file_path', 'preview_ready' and
+    'preview_ready_seconds'; resumable ones 'segments_completed' and 'segments_total'.
+    Verified conversions include their 'verification' record, which a "full" decode
+    pass completes after the conversion returns.
+
+    Args:
+        job_id: Optional job id returned by (or passed to) convert_video.
+        ctx: Optional Context for logging.
+
+    Returns:
+        A dictionary with 'job' or 'jobs'.
+    """
+    if job_id is None:
+        return {"success": True, "jobs": list_jobs()}
+    job = get_job(job_id)
+    if job is None:
+        return {"success": False, "error": f"Unknown job: {job_id}"}
+    return {"success": True, "job": dict(job)}
 
 # Get list of supported formats
 async def get_supported_formats_impl(ctx: Optional[Context] = None) -> Dict[str, Any]:
@@ -288,4 +1251,59 @@ async def get_supported_formats_impl(ctx: Optional[Context] = None) -> Dict[str,
             "audio": ["mp3", "wav", "ogg", "aac", "m4a"],
             "image": ["webp", "jpg", "png", "bmp", "tiff"],
         }
-    }
\ No newline at end of file
+    }
+
+
+# Server diagnostics
+async def get_server_diagnostics_impl(ctx: Optional[Context] = None) -> Dict[str, Any]:
+    """
+    Returns runtime diagnostics: running FFmpeg jobs, stall/cancel kills and orphaned
+    process counts.
+
+    Args:
+        ctx: Optional Context for logging.
+
+    Returns:
+        A dictionary with supervisor and concurrency diagnostics.
+    """
+    if ctx:
+        await ctx.info("Collecting server diagnostics...")
+    return {
+        "success": True,
+        "max_concurrent_jobs": MAX_CONCURRENT_JOBS,
+        "supervisor": get_supervisor_diagnostics(),
+        "profiling": PROFILER.status(),
+        "remote_cache": get_remote_cache_stats(),
+        "cluster": get_cluster_status(),
+        "verification": get_verification_stats(),
+    }
+
+# Tool to switch per-invocation profiling on or off
+async def set_profiling_impl(
+    mode: str,
+    every: int = 1,
+    directory: Optional[str] = None,
+    loop_lag_ms: Optional[float] = None,
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Enables or disables profiling of tool invocations and the event-loop lag monitor.
+
+    Args:
+        mode: "cprofile" (pstats files), "sample" (collapsed-stack files) or "off".
+        every: Profile every Nth tool invocation.
+        directory: Optional directory for profile files (default MCP_PROFILE_DIR).
+        loop_lag_ms: Optional threshold for recording slow event-loop callbacks;
+            0 turns the monitor off, None leaves it as it is.
+        ctx: Optional Context for logging.
+
+    Returns:
+        A dictionary with the resulting profiling status.
+    """
+    try:
+        PROFILER.configure(None if mode == "off" else mode, every, directory, loop_lag_ms)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+    if ctx:
+        await ctx.info(f"Profiling: {mode}")
+    return {"success": True, "profiling": PROFILER.status()}
@@ -0,0 +1,189 @@
+import json
+import logging
+import math
+import os
+import time
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from .resources import threads_per_job
+from .supervisor import run_supervised
+
+logger = logging.getLogger(__name__)
+
+# Calibrated settings written by `mcp-video-converter --calibrate`
+TUNING_FILE = os.path.expanduser(os.environ.get("MCP_TUNING_FILE", "~/.mcp-video-converter/encoder_tuning.json"))
+
+# Default video encoder the ffmpeg CLI picks per output format
+FORMAT_ENCODERS = {"mp4": "libx264", "mov": "libx264", "mkv": "libx264", "webm": "libvpx-vp9"}
+
+# Resolution buckets by frame height, with a representative size used for calibration
+RESOLUTION_BUCKETS = [
+    ("sd", 576, (854, 480)),
+    ("hd", 720, (1280, 720)),
+    ("fhd", 1080, (1920, 1080)),
+    ("qhd", 1440, (2560, 1440)),
+    ("uhd", 10 ** 9, (3840, 2160)),
+]
+
+# Parallelism settings tried by the calibration run, per encoder and core budget.
+# Only settings that don't change the encoder's quality/speed preset are compared.
+CALIBRATION_CANDIDATES: Dict[str, Callable[[int], List[List[str]]]] = {
+    "libvpx-vp9": lambda threads: [["-tile-columns", str(t)] for t in range(4)],
+    "libx264": lambda threads: [
+        ["-x264-params", f"threads={t}"] for t in sorted({max(1, threads // 2), threads, max(1, threads * 3 // 2)})
+    ],
+}
+CALIBRATION_SECONDS = 2
+CALIBRATION_FPS = 30
+# Frame rate assumed when the input's is unknown
+DEFAULT_FPS = 30.0
+
+# (encoder, width, height, fps, threads) -> encoder args; filled from heuristics or calibration
+_TUNING_CACHE: Dict[Tuple[str, int, int, int, int], List[str]] = {}
+_calibrated: Optional[Dict[str, List[str]]] = None
+
+
+def resolution_bucket(width: int, height: int) -> str:
+    """Maps a frame size to a resolution bucket name, by its shorter side."""
+    short_side = min(width, height)
+    for name, max_height, _ in RESOLUTION_BUCKETS:
+        if short_side <= max_height:
+            return name
+    return RESOLUTION_BUCKETS[-1][0]
+
+
+def _bucket_size(bucket: str) -> Tuple[int, int]:
+    return next(size for name, _, size in RESOLUTION_BUCKETS if name == bucket)
+
+
+def heuristic_encoder_args(encoder: str, width: int, height: int, threads: int, fps: Optional[float] = None) -> List[str]:
+    """
+    Encoder parallelism settings derived from the frame size, frame rate and core budget.
+
+    - libvpx-vp9: row-based multithreading plus one tile column per 256 pixels of
+      width (the VP9 minimum), limited to what the threads can use; -cpu-used rises
+      as the per-core pixel rate grows so large or high-frame-rate video on few
+      cores stays real-time-ish.
+    - libx264: frame threads capped at half the macroblock rows, beyond which x264
+      gains nothing and loses quality.
+    """
+    threads = max(1, threads)
+    if encoder == "libvpx-vp9":
+        max_tiles = max(1, width // 256)
+        tile_columns = int(math.log2(min(max_tiles, threads))) if threads > 1 else 0
+        pixel_rate_per_thread = width * height * (fps or DEFAULT_FPS) / threads
+        cpu_used = 2 if pixel_rate_per_thread <= 9_000_000 else 4 if pixel_rate_per_thread <= 30_000_000 else 5
+        return ["-row-mt", "1", "-tile-columns", str(tile_columns), "-frame-parallel", "0", "-cpu-used", str(cpu_used)]
+    if encoder == "libx264":
+        mb_rows = math.ceil(height / 16)
+        return ["-x264-params", f"threads={min(threads, max(1, mb_rows // 2))}"]
+    return []
+
+
+def _load_calibration() -> Dict[str, List[str]]:
+    global _calibrated
+    if _calibrated is None:
+        try:
+            with open(TUNING_FILE, "r", encoding="utf-8") as f:
+                _calibrated = json.load(f).get("settings", {})
+        except FileNotFoundError:
+            _calibrated = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable tuning file {TUNING_FILE}: {e}")
+            _calibrated = {}
+    return _calibrated
+
+
+def _calibration_key(encoder: str, bucket: str, threads: int) -> str:
+    return f"{encoder}/{bucket}/{threads}"
+
+
+def tuned_encoder_args(
+    output_format: str,
+    width: int,
+    height: int,
+    threads: int,
+    fps: Optional[float] = None
+) -> List[str]:
+    """
+    Returns the encoder parallelism arguments for a job, or an empty list when the
+    format's encoder has no tuning. The heuristics use the input's frame size and
+    rate; calibrated settings, stored per (encoder, resolution bucket, core budget),
+    take precedence over them.
+    """
+    encoder = FORMAT_ENCODERS.get(output_format)
+    if encoder is None:
+        return []
+    key = (encoder, width, height, round(fps or DEFAULT_FPS), threads)
+    if key not in _TUNING_CACHE:
+        calibrated = _load_calibration().get(_calibration_key(encoder, resolution_bucket(width, height), threads))
+        base = heuristic_encoder_args(encoder, width, height, threads, fps)
+        _TUNING_CACHE[key] = _merge_args(base, calibrated) if calibrated else base
+    return list(_TUNING_CACHE[key])
+
+
+def _merge_args(base: List[str], override: List[str]) -> List[str]:
+    """Overlays flag/value pairs from override onto base."""
+    merged = dict(zip(base[::2], base[1::2]))
+    merged.update(zip(override[::2], override[1::2]))
+    return [item for pair in merged.items() for item in pair]
+
+
+async def _time_candidate(encoder: str, size: Tuple[int, int], threads: int, args: List[str]) -> Optional[float]:
+    width, height = size
+    command = [
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={CALIBRATION_FPS}:duration={CALIBRATION_SECONDS}",
+        "-c:v", encoder, "-threads", str(threads), *args,
+        "-f", "null", "-",
+    ]
+    started = time.monotonic()
+    run = await run_supervised(command)
+    if run["returncode"] != 0:
+        return None
+    return time.monotonic() - started
+
+
+async def calibrate(
+    encoders: Optional[List[str]] = None,
+    buckets: Optional[List[str]] = None,
+    thread_budgets: Optional[List[int]] = None
+) -> Dict[str, Any]:
+    """
+    Times short lavfi encodes on this host and stores the fastest parallelism
+    settings per (encoder, resolution bucket, core budget) in TUNING_FILE.
+
+    Returns:
+        A dictionary with 'success', the chosen 'settings' and the 'tuning_file' path.
+    """
+    encoders = encoders or list(CALIBRATION_CANDIDATES)
+    buckets = buckets or [name for name, _, _ in RESOLUTION_BUCKETS]
+    thread_budgets = thread_budgets or sorted({threads_per_job(), os.cpu_count() or 1})
+    settings: Dict[str, List[str]] = {}
+    timings: Dict[str, Dict[str, float]] = {}
+    for encoder in encoders:
+        for bucket in buckets:
+            for threads in thread_budgets:
+                key = _calibration_key(encoder, bucket, threads)
+                best = None
+                for candidate in CALIBRATION_CANDIDATES[encoder](threads):
+                    base = heuristic_encoder_args(encoder, *_bucket_size(bucket), threads, CALIBRATION_FPS)
+                    args = _merge_args(base, candidate)
+                    elapsed = await _time_candidate(encoder, _bucket_size(bucket), threads, args)
+                    if elapsed is None:
+                        continue
+                    timings.setdefault(key, {})[" ".join(candidate)] = round(elapsed, 3)
+                    if best is None or elapsed < best[0]:
+                        best = (elapsed, candidate)
+                if best:
+                    settings[key] = best[1]
+                logger.info(f"Calibrated {key}: {settings.get(key)}")
+
+    Path(TUNING_FILE).parent.mkdir(parents=True, exist_ok=True)
+    with open(TUNING_FILE, "w", encoding="utf-8") as f:
+        json.dump({"calibrated_at": time.time(), "settings": settings, "timings": timings}, f, indent=2)
+    global _calibrated
+    _calibrated = settings
+    _TUNING_CACHE.clear()
+    return {"success": True, "settings": settings, "tuning_file": TUNING_FILE}
@@ -0,0 +1,226 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Set
+
+from .probe import get_duration, probe_media
+from .resources import make_policy_applier
+from .sniff import sniff_file
+from .supervisor import run_supervised
+
+# "fast" checks the container header and stream count, "standard" also compares the
+# stream layout and duration with the input, "full" adds a background decode pass
+VERIFY_LEVELS = ["none", "fast", "standard", "full"]
+DEFAULT_VERIFY_LEVEL = os.environ.get("MCP_VERIFY_LEVEL", "none").lower()
+# Allowed output/input duration difference: this many seconds plus a fraction of the
+# input duration, which absorbs frame-rate changes and audio priming
+DURATION_TOLERANCE_SECONDS = float(os.environ.get("MCP_VERIFY_DURATION_TOLERANCE", "0.5"))
+DURATION_TOLERANCE_RATIO = 0.01
+# The decode pass runs single-threaded, niced and in the idle I/O class so it only uses spare capacity
+FULL_DECODE_POLICY: Dict[str, Any] = {"nice": 19, "ionice_class": "idle", "ionice_level": 7}
+MAX_FULL_DECODES = 1
+# Decode errors kept in the verification record
+MAX_DECODE_ERRORS = 10
+
+# Output format -> containers sniff_file may identify it as
+OUTPUT_CONTAINERS: Dict[str, Set[str]] = {
+    "mp4": {"mp4", "mov"}, "mov": {"mov", "mp4"}, "m4a": {"mp4", "mov"},
+    "mkv": {"matroska", "webm"}, "webm": {"webm"}, "avi": {"avi"}, "flv": {"flv"},
+    "gif": {"gif"}, "mp3": {"mp3"}, "wav": {"wav"}, "ogg": {"ogg"}, "aac": {"aac"},
+    "png": {"png"}, "jpg": {"jpg"}, "webp": {"webp"}, "bmp": {"bmp"}, "tiff": {"tiff"},
+}
+AUDIO_OUTPUT_FORMATS = ["mp3", "wav", "ogg", "aac", "m4a"]
+VIDEO_ONLY_OUTPUT_FORMATS = ["gif", "webp", "jpg", "png", "bmp", "tiff"]
+# Single-frame outputs have no meaningful duration
+STILL_OUTPUT_FORMATS = ["webp", "jpg", "png", "bmp", "tiff"]
+
+# level -> runs, failures and total seconds, reported by the diagnostics tool
+VERIFY_STATS: Dict[str, Dict[str, Any]] = {
+    level: {"runs": 0, "failures": 0, "seconds": 0.0} for level in VERIFY_LEVELS[1:] + ["decode"]
+}
+# Background decode passes, kept referenced until they finish
+DECODE_TASKS: Set[asyncio.Task] = set()
+
+_DECODE_SLOTS: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+
+def stream_layout(probe: Dict[str, Any]) -> List[str]:
+    """Returns the probe's video and audio stream types, video first; cover art is left out."""
+    kinds = [
+        stream.get("codec_type") for stream in probe.get("streams", [])
+        if not (stream.get("disposition") or {}).get("attached_pic")
+    ]
+    return [kind for wanted in ("video", "audio") for kind in kinds if kind == wanted]
+
+
+def expected_layout(input_probe: Dict[str, Any], output_format: str) -> List[str]:
+    """The streams FFmpeg's default mapping keeps: at most one video and one audio the format can hold."""
+    kinds = set(stream_layout(input_probe))
+    layout = []
+    if "video" in kinds and output_format not in AUDIO_OUTPUT_FORMATS:
+        layout.append("video")
+    if "audio" in kinds and output_format not in VIDEO_ONLY_OUTPUT_FORMATS:
+        layout.append("audio")
+    return layout
+
+
+def check_header(output_path: Path, output_format: str) -> Dict[str, Any]:
+    """Checks the output's container magic and structure without spawning a process."""
+    try:
+        sniffed = sniff_file(output_path)
+    except OSError as e:
+        return {"passed": False, "error": f"Could not read output: {e}"}
+    expected = OUTPUT_CONTAINERS.get(output_format, {output_format})
+    check = {"passed": True, "container": sniffed["container"]}
+    if sniffed["container"] not in expected:
+        check.update(passed=False, error=f"Output container is {sniffed['container']}, expected {output_format}")
+    elif sniffed["truncated"]:
+        check.update(passed=False, error=f"Output appears truncated ({sniffed['reason']})")
+    return check
+
+
+def check_streams(output_probe: Dict[str, Any], expected: Optional[List[str]], compare_layout: bool) -> Dict[str, Any]:
+    """Compares the output's stream count (and with compare_layout, its stream types) with the expected layout."""
+    layout = stream_layout(output_probe)
+    check = {"passed": True, "streams": layout, "expected": expected}
+    if not layout:
+        check.update(passed=False, error="Output has no audio or video streams")
+    elif expected is not None and len(layout) != len(expected):
+        check.update(passed=False, error=f"Output has {len(layout)} streams, expected {len(expected)}")
+    elif expected is not None and compare_layout and layout != expected:
+        check.update(passed=False, error=f"Output streams are {layout}, expected {expected}")
+    return check
+
+
+def check_duration(output_probe: Dict[str, Any], input_probe: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compares the probed output duration with the input's within the tolerance."""
+    output_duration = get_duration(output_probe)
+    input_duration = get_duration(input_probe) if input_probe else None
+    check = {"passed": True, "duration": output_duration, "input_duration": input_duration}
+    if input_duration is None:
+        check["skipped"] = "input duration unknown"
+    elif output_duration is None:
+        check.update(passed=False, error="Output duration is unknown")
+    else:
+        tolerance = DURATION_TOLERANCE_SECONDS + DURATION_TOLERANCE_RATIO * input_duration
+        check["tolerance"] = round(tolerance, 3)
+        if abs(output_duration - input_duration) > tolerance:
+            check.update(
+                passed=False,
+                error=f"Output lasts {output_duration:.2f}s, input {input_duration:.2f}s (tolerance {tolerance:.2f}s)",
+            )
+    return check
+
+
+async def verify_output(
+    output_path: Path,
+    output_format: str,
+    level: str,
+    input_probe: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Verifies a finished output at the given level. For "full" the decode pass is
+    started in the background and fills in the record's 'decode' entry when done.
+
+    Args:
+        output_path: The converted file.
+        output_format: The requested output format.
+        level: "fast", "standard" or "full".
+        input_probe: Optional ffprobe result of the input, for the stream count and
+            the "standard" comparisons.
+
+    Returns:
+        A dictionary with 'level', 'passed', an 'error' for the first failed check,
+        the individual 'checks' with their cost in seconds, and the total 'seconds'.
+    """
+    started = time.monotonic()
+    checks: Dict[str, Dict[str, Any]] = {}
+
+    def timed(name: str, check_started: float, check: Dict[str, Any]) -> bool:
+        check["seconds"] = round(time.monotonic() - check_started, 4)
+        checks[name] = check
+        return check["passed"]
+
+    expected = expected_layout(input_probe, output_format) if input_probe else None
+    passed = timed("header", time.monotonic(), check_header(output_path, output_format))
+    if passed:
+        probe_started = time.monotonic()
+        output_probe = await probe_media(output_path)
+        if not output_probe["success"]:
+            passed = timed("streams", probe_started, {"passed": False, "error": output_probe["error"]})
+        else:
+            standard = level in ("standard", "full")
+            passed = timed("streams", probe_started, check_streams(output_probe, expected, standard))
+            if passed and standard and output_format not in STILL_OUTPUT_FORMATS:
+                passed = timed("duration", time.monotonic(), check_duration(output_probe, input_probe))
+
+    verification = {
+        "level": level,
+        "passed": passed,
+        "error": next((c["error"] for c in checks.values() if not c["passed"]), None),
+        "checks": checks,
+        "seconds": round(time.monotonic() - started, 4),
+    }
+    _record(level, passed, verification["seconds"])
+    if passed and level == "full":
+        start_full_decode(output_path, verification)
+    return verification
+
+
+def _record(level: str, passed: bool, seconds: float) -> None:
+    stats = VERIFY_STATS[level]
+    stats["runs"] += 1
+    stats["failures"] += 0 if passed else 1
+    stats["seconds"] = round(stats["seconds"] + seconds, 4)
+
+
+def _decode_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in _DECODE_SLOTS:
+        _DECODE_SLOTS.clear()
+        _DECODE_SLOTS[loop] = asyncio.Semaphore(MAX_FULL_DECODES)
+    return _DECODE_SLOTS[loop]
+
+
+async def decode_to_null(output_path: Path) -> Dict[str, Any]:
+    """
+    Decodes every stream of the output and discards the frames; any decoder error
+    fails the pass. Runs under FULL_DECODE_POLICY, MAX_FULL_DECODES at a time.
+    """
+    command = ["ffmpeg", "-v", "error", "-threads", "1", "-i", str(output_path), "-f", "null", "-"]
+    async with _decode_slots():
+        started = time.monotonic()
+        run = await run_supervised(command, apply_policy=make_policy_applier(FULL_DECODE_POLICY))
+    errors = run["stderr"].decode(errors="replace").strip().splitlines()
+    return {
+        "status": "passed" if run["returncode"] == 0 and not errors and not run["stalled"] else "failed",
+        "errors": errors[:MAX_DECODE_ERRORS],
+        "seconds": round(time.monotonic() - started, 3),
+        "cpu_seconds": run["resource_usage"].get("cpu_seconds"),
+    }
+
+
+def start_full_decode(output_path: Path, verification: Dict[str, Any]) -> asyncio.Task:
+    """Runs decode_to_null in the background, updating `verification` in place when it ends."""
+    verification["decode"] = {"status": "running"}
+
+    async def decode() -> None:
+        try:
+            result = await decode_to_null(output_path)
+        except FileNotFoundError:
+            result = {"status": "failed", "errors": ["FFmpeg not found"]}
+        verification["decode"] = result
+        _record("decode", result["status"] == "passed", result.get("seconds", 0.0))
+        if result["status"] != "passed":
+            verification["passed"] = False
+            verification["error"] = f"Decode pass failed: {'; '.join(result['errors']) or 'FFmpeg error'}"
+
+    task = asyncio.create_task(decode())
+    DECODE_TASKS.add(task)
+    task.add_done_callback(DECODE_TASKS.discard)
+    return task
+
+
+def get_verification_stats() -> Dict[str, Dict[str, Any]]:
+    return {level: dict(stats) for level, stats in VERIFY_STATS.items()}
@@ -0,0 +1,355 @@
+import asyncio
+import ctypes
+import ctypes.util
+import fnmatch
+import json
+import logging
+import os
+import signal
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Tuple
+
+from .tools import convert_video_impl
+
+logger = logging.getLogger(__name__)
+
+# Defaults for the watch daemon configuration file
+DEFAULT_WATCH_CONFIG = {
+    "ledger_path": "~/.mcp-video-converter/processed.jsonl",
+    "workers": 2,
+    "queue_size": 64,
+    "settle_seconds": 5.0,
+    "poll_interval": 2.0,
+    "use_inotify": True,
+    "directories": [],
+}
+
+DEFAULT_PROFILE = {
+    "patterns": ["*.webm"],
+    "output_format": "mp4",
+    "quality": None,
+    "framerate": None,
+}
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def load_watch_config(config_path: str) -> Dict[str, Any]:
+    """
+    Loads a watch daemon configuration file and fills in defaults.
+
+    Args:
+        config_path: Path to a JSON file with a 'directories' list of profiles.
+
+    Returns:
+        The merged configuration dictionary.
+    """
+    with open(os.path.expanduser(config_path), "r", encoding="utf-8") as f:
+        user_config = json.load(f)
+
+    config = {**DEFAULT_WATCH_CONFIG, **user_config}
+    directories = []
+    for entry in config["directories"]:
+        if isinstance(entry, str):
+            entry = {"path": entry}
+        profile = {**DEFAULT_PROFILE, **entry}
+        profile["path"] = str(Path(os.path.expanduser(profile["path"])).resolve())
+        directories.append(profile)
+    config["directories"] = directories
+    config["ledger_path"] = os.path.expanduser(config["ledger_path"])
+    return config
+
+
+class ProcessedLedger:
+    """
+    Append-only record of converted files so restarts don't reconvert them.
+
+    Entries are keyed on path, size and mtime; a file that changes after it was
+    processed is picked up again.
+    """
+
+    def __init__(self, ledger_path: str):
+        self.path = Path(ledger_path)
+        self.entries: Dict[str, Tuple[int, int]] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self.entries[record["path"]] = (record["size"], record["mtime_ns"])
+                    except (json.JSONDecodeError, KeyError):
+                        continue
+
+    def is_processed(self, path: str, stat: os.stat_result) -> bool:
+        return self.entries.get(path) == (stat.st_size, stat.st_mtime_ns)
+
+    def record(self, path: str, stat: os.stat_result, result: Dict[str, Any]) -> None:
+        self.entries[path] = (stat.st_size, stat.st_mtime_ns)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "path": path,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "success": result.get("success", False),
+                "output_file_path": result.get("output_file_path"),
+                "error": result.get("error"),
+                "processed_at": time.time(),
+            }) + "\n")
+
+
+class _Inotify:
+    """Minimal ctypes binding for Linux inotify, readable from the asyncio loop."""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches: Dict[int, str] = {}
+
+    def add_watch(self, directory: str) -> None:
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+        wd = self._libc.inotify_add_watch(self.fd, directory.encode(), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.watches[wd] = directory
+
+    def read_paths(self) -> Tuple[List[str], bool]:
+        """Returns the paths named by pending events and whether the kernel queue overflowed."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False
+        paths = []
+        overflowed = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                overflowed = True
+            elif name and wd in self.watches:
+                paths.append(os.path.join(self.watches[wd], name))
+        return paths, overflowed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class WatchDaemon:
+    """
+    Watches directories for new media files and converts them with a bounded worker pool.
+
+    Candidate files are discovered by inotify (or periodic directory scans when inotify
+    is unavailable), held until their size and mtime stop changing for settle_seconds,
+    then fed through a bounded queue to a fixed number of workers. A full queue stops
+    the settle loop from handing out more work, so bursts of files only ever cost a
+    small per-path record rather than a task each.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        convert: Callable[..., Awaitable[Dict[str, Any]]] = convert_video_impl
+    ):
+        self.config = config
+        self.convert = convert
+        self.profiles = {p["path"]: p for p in config["directories"]}
+        self.ledger = ProcessedLedger(config["ledger_path"])
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, int(config["queue_size"])))
+        # path -> (size, mtime_ns, monotonic time the values were first seen)
+        self.pending: Dict[str, Tuple[int, int, float]] = {}
+        self.in_flight: set = set()
+        self.stats = {"discovered": 0, "converted": 0, "failed": 0}
+        self._stop = asyncio.Event()
+        self._inotify: Optional[_Inotify] = None
+
+    def _profile_for(self, path: str) -> Optional[Dict[str, Any]]:
+        profile = self.profiles.get(os.path.dirname(path))
+        if profile is None:
+            return None
+        name = os.path.basename(path)
+        if any(fnmatch.fnmatch(name, pattern) for pattern in profile["patterns"]):
+            return profile
+        return None
+
+    def _consider(self, path: str) -> None:
+        if path in self.pending or path in self.in_flight or self._profile_for(path) is None:
+            return
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        if not os.path.isfile(path) or self.ledger.is_processed(path, stat):
+            return
+        self.pending[path] = (stat.st_size, stat.st_mtime_ns, time.monotonic())
+        self.stats["discovered"] += 1
+
+    def scan(self) -> None:
+        """Adds every matching, unprocessed file in the watched directories to pending."""
+        for directory in self.profiles:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_file(follow_symlinks=False):
+                            self._consider(entry.path)
+            except FileNotFoundError:
+                logger.warning(f"Watched directory does not exist: {directory}")
+
+    def _start_inotify(self) -> bool:
+        if not self.config.get("use_inotify", True):
+            return False
+        try:
+            self._inotify = _Inotify()
+            for directory in self.profiles:
+                self._inotify.add_watch(directory)
+        except (OSError, AttributeError) as e:
+            logger.info(f"inotify unavailable, falling back to polling: {e}")
+            if self._inotify:
+                self._inotify.close()
+            self._inotify = None
+            return False
+        asyncio.get_running_loop().add_reader(self._inotify.fd, self._on_inotify)
+        return True
+
+    def _on_inotify(self) -> None:
+        paths, overflowed = self._inotify.read_paths()
+        if overflowed:
+            # Events were dropped by the kernel; rescan so no new file is lost
+            logger.warning("inotify queue overflowed, rescanning watched directories")
+            self.scan()
+        for path in paths:
+            self._consider(path)
+
+    async def _settle_loop(self) -> None:
+        """Moves files whose size and mtime have been stable long enough onto the queue."""
+        settle = float(self.config["settle_seconds"])
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for path, (size, mtime_ns, since) in list(self.pending.items()):
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    del self.pending[path]
+                    continue
+                if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                    self.pending[path] = (stat.st_size, stat.st_mtime_ns, now)
+                    continue
+                if now - since < settle:
+                    continue
+                del self.pending[path]
+                self.in_flight.add(path)
+                # Blocks while the workers are saturated, bounding queued work
+                await self.queue.put(path)
+            await asyncio.sleep(min(1.0, max(settle / 2, 0.05)))
+
+    async def _poll_loop(self) -> None:
+        interval = float(self.config["poll_interval"])
+        while not self._stop.is_set():
+            self.scan()
+            await asyncio.sleep(interval)
+
+    async def _worker(self) -> None:
+        while True:
+            path = await self.queue.get()
+            try:
+                profile = self._profile_for(path)
+                stat = os.stat(path)
+                logger.info(f"Converting {path} to {profile['output_format']}")
+                result = await self.convert(
+                    path, profile["output_format"], None, profile.get("quality"), profile.get("framerate")
+                )
+                self.ledger.record(path, stat, result)
+                if result.get("success"):
+                    self.stats["converted"] += 1
+                    logger.info(f"Converted {path} -> {result.get('output_file_path')}")
+                else:
+                    self.stats["failed"] += 1
+                    logger.error(f"Conversion failed for {path}: {result.get('error')}")
+            except FileNotFoundError:
+                logger.warning(f"File disappeared before conversion: {path}")
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Unexpected error converting {path}: {e}")
+            finally:
+                self.in_flight.discard(path)
+                self.queue.task_done()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _drain_queue(self) -> int:
+        """Drops queued (not yet started) work; it stays out of the ledger for the next run."""
+        dropped = 0
+        while True:
+            try:
+                path = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return dropped
+            self.in_flight.discard(path)
+            self.queue.task_done()
+            dropped += 1
+
+    async def run(self) -> None:
+        """Runs until stop() is called, then lets in-flight conversions finish."""
+        self.scan()
+        workers = [asyncio.create_task(self._worker()) for _ in range(max(1, int(self.config["workers"])))]
+        feeders = [asyncio.create_task(self._settle_loop())]
+        if not self._start_inotify():
+            feeders.append(asyncio.create_task(self._poll_loop()))
+        logger.info(
+            f"Watching {len(self.profiles)} directories "
+            f"({'inotify' if self._inotify else 'polling'}), {len(workers)} workers"
+        )
+        try:
+            await self._stop.wait()
+        finally:
+            if self._inotify:
+                asyncio.get_running_loop().remove_reader(self._inotify.fd)
+                self._inotify.close()
+            # Stop discovering and queueing first, then discard what never started
+            for task in feeders:
+                task.cancel()
+            await asyncio.gather(*feeders, return_exceptions=True)
+            dropped = self._drain_queue()
+            if dropped:
+                logger.info(f"Left {dropped} queued files for the next run")
+            # Only conversions already picked up by a worker remain unfinished
+            await self.queue.join()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+def run_watch_daemon(config_path: str) -> None:
+    """Entry point for the watch-folder daemon mode."""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    config = load_watch_config(config_path)
+
+    async def main() -> None:
+        daemon = WatchDaemon(config)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, daemon.stop)
+            except NotImplementedError:
+                pass
+        await daemon.run()
+
+    asyncio.run(main())
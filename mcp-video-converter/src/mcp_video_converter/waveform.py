@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, BinaryIO, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only generate_waveform needs it
+    np = None
+
+from .resources import get_resource_policy, job_slot, make_policy_applier
+from .supervisor import run_supervised
+
+WAVEFORM_CACHE_DIR = os.path.expanduser(os.environ.get("MCP_WAVEFORM_CACHE_DIR", "~/.mcp-video-converter/waveforms"))
+
+# Mono PCM rate the peaks are computed at; plenty for an overview
+WAVEFORM_SAMPLE_RATE = 8000
+# Samples per bucket at the finest zoom level; each further level is LEVEL_FACTOR coarser
+WAVEFORM_BASE_BUCKET = 128
+WAVEFORM_LEVEL_FACTOR = 4
+WAVEFORM_MAX_LEVELS = 8
+WAVEFORM_FORMATS = ["json", "binary"]
+# Samples read from FFmpeg per chunk; the only PCM ever held in memory
+PCM_CHUNK_SAMPLES = 1 << 16
+
+PEAKS_MAGIC = b"MCPPEAKS"
+FINGERPRINT_SPAN = 1 << 16
+
+
+def input_fingerprint(path: Path) -> str:
+    """
+    Fingerprints a file by its size, mtime and first and last 64 KiB, so an edit
+    anywhere in the file, even one that keeps its size, gets a new fingerprint.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        size = stat.st_size
+        digest.update(f"{size}:{stat.st_mtime_ns}".encode())
+        digest.update(f.read(FINGERPRINT_SPAN))
+        if size > FINGERPRINT_SPAN:
+            f.seek(max(FINGERPRINT_SPAN, size - FINGERPRINT_SPAN))
+            digest.update(f.read(FINGERPRINT_SPAN))
+    return digest.hexdigest()[:32]
+
+
+class PeakAccumulator:
+    """
+    Reduces a stream of PCM chunks to per-bucket min, max and sum of squares at the
+    finest zoom level. Only the samples of one incomplete bucket carry over between
+    chunks.
+    """
+
+    def __init__(self, samples_per_bucket: int = WAVEFORM_BASE_BUCKET):
+        self.samples_per_bucket = samples_per_bucket
+        self.samples = 0
+        self._mins: List[Any] = []
+        self._maxs: List[Any] = []
+        self._sumsq: List[Any] = []
+        self._counts: List[Any] = []
+        self._pending = np.empty(0, dtype=np.float32)
+
+    def add(self, samples: Any) -> None:
+        self.samples += len(samples)
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+        full = len(samples) - len(samples) % self.samples_per_bucket
+        if full:
+            blocks = samples[:full].reshape(-1, self.samples_per_bucket)
+            self._reduce(blocks, self.samples_per_bucket)
+        self._pending = samples[full:].copy()
+
+    def _reduce(self, blocks: Any, count: int) -> None:
+        self._mins.append(blocks.min(axis=1))
+        self._maxs.append(blocks.max(axis=1))
+        self._sumsq.append(np.square(blocks, dtype=np.float64).sum(axis=1))
+        self._counts.append(np.full(len(blocks), count, dtype=np.int64))
+
+    def levels(self, count: int, factor: int = WAVEFORM_LEVEL_FACTOR) -> List[Dict[str, Any]]:
+        """Returns min/max/rms arrays for `count` zoom levels, finest first."""
+        if len(self._pending):
+            self._reduce(self._pending.reshape(1, -1), len(self._pending))
+            self._pending = self._pending[:0]
+        if not self._mins:
+            return []
+        mins, maxs = np.concatenate(self._mins), np.concatenate(self._maxs)
+        sumsq, counts = np.concatenate(self._sumsq), np.concatenate(self._counts)
+        levels = []
+        for level in range(count):
+            group = factor ** level
+            starts = np.arange(0, len(mins), group)
+            levels.append({
+                "samples_per_bucket": self.samples_per_bucket * group,
+                "min": np.minimum.reduceat(mins, starts),
+                "max": np.maximum.reduceat(maxs, starts),
+                "rms": np.sqrt(np.add.reduceat(sumsq, starts) / np.add.reduceat(counts, starts)),
+            })
+        return levels
+
+
+def read_pcm(reader: BinaryIO, accumulator: PeakAccumulator, chunk_samples: int = PCM_CHUNK_SAMPLES) -> None:
+    """Feeds f32le PCM from a pipe to the accumulator one fixed-size buffer at a time."""
+    buffer = bytearray(chunk_samples * 4)
+    view = memoryview(buffer)
+    try:
+        while True:
+            filled = 0
+            while filled < len(buffer):
+                count = reader.readinto(view[filled:])
+                if not count:
+                    break
+                filled += count
+            if filled >= 4:
+                accumulator.add(np.frombuffer(buffer, dtype="<f4", count=filled // 4))
+            if filled < len(buffer):
+                return
+    except BaseException:
+        # Closing the read end makes FFmpeg fail on its next write instead of blocking
+        reader.close()
+        raise
+
+
+def build_waveform_command(input_path: Path) -> List[str]:
+    return [
+        "ffmpeg", "-y", "-i", str(input_path), "-vn", "-sn",
+        "-ac", "1", "-ar", str(WAVEFORM_SAMPLE_RATE), "-f", "f32le", "pipe:1",
+    ]
+
+
+def encode_peaks(levels: List[Dict[str, Any]], samples: int, output_format: str) -> bytes:
+    """
+    Serializes peaks as JSON, or as the compact binary layout: the PEAKS_MAGIC,
+    then <u32 version, u32 sample rate, f64 duration, u32 level count>, then per level
+    <u32 samples per bucket, u32 bucket count> and bucket-count (min, max, rms) f32 triples.
+    """
+    duration = samples / WAVEFORM_SAMPLE_RATE
+    if output_format == "json":
+        return json.dumps({
+            "version": 1,
+            "sample_rate": WAVEFORM_SAMPLE_RATE,
+            "duration": round(duration, 3),
+            "levels": [
+                {
+                    "samples_per_bucket": level["samples_per_bucket"],
+                    **{key: np.round(level[key].astype(np.float64), 4).tolist() for key in ("min", "max", "rms")},
+                }
+                for level in levels
+            ],
+        }, separators=(",", ":")).encode()
+    parts = [PEAKS_MAGIC, struct.pack("<IIdI", 1, WAVEFORM_SAMPLE_RATE, duration, len(levels))]
+    for level in levels:
+        triples = np.stack([level["min"], level["max"], level["rms"]], axis=1).astype("<f4")
+        parts.append(struct.pack("<II", level["samples_per_bucket"], len(triples)))
+        parts.append(triples.tobytes())
+    return b"".join(parts)
+
+
+def waveform_cache_path(fingerprint: str, levels: int, output_format: str) -> Path:
+    extension = "json" if output_format == "json" else "peaks"
+    key = f"{fingerprint}_{WAVEFORM_SAMPLE_RATE}_{WAVEFORM_BASE_BUCKET}x{WAVEFORM_LEVEL_FACTOR}_{levels}"
+    return Path(WAVEFORM_CACHE_DIR) / f"{key}.{extension}"
+
+
+async def compute_waveform(
+    input_path: Path,
+    output_path: Path,
+    levels: int,
+    output_format: str,
+    on_progress: Optional[Any] = None
+) -> Dict[str, Any]:
+    """
+    Streams mono f32le PCM from FFmpeg through a pipe and reduces it to peaks.
+
+    PCM is consumed in PCM_CHUNK_SAMPLES buffers on a worker thread while FFmpeg
+    runs, so at most one chunk of samples is held however long the input is; only
+    the peaks themselves grow with duration. The peaks file is written atomically
+    to output_path.
+
+    Returns:
+        A dictionary with 'success', 'duration' and the bucket counts per level.
+    """
+    accumulator = PeakAccumulator()
+    command = build_waveform_command(input_path)
+    policy = get_resource_policy(None)
+    loop = asyncio.get_running_loop()
+    read_fd, write_fd = os.pipe()
+    with os.fdopen(read_fd, "rb", buffering=0) as reader:
+        reading = loop.run_in_executor(None, read_pcm, reader, accumulator)
+        writer = os.fdopen(write_fd, "wb")
+        try:
+            async with job_slot(policy) as slot:
+                command[-1:-1] = ["-threads", str(slot["threads"])]
+                run = await run_supervised(
+                    command, apply_policy=make_policy_applier(policy, slot["cpus"]), on_progress=on_progress, stdout=writer
+                )
+        finally:
+            # The reader sees end of file once both FFmpeg's and this copy are closed
+            writer.close()
+            await reading
+
+    if run["stalled"] or run["returncode"] != 0:
+        error = "stalled" if run["stalled"] else run["stderr"].decode(errors="replace").strip()
+        return {"success": False, "error": f"Waveform extraction failed: {error}", "command": " ".join(command)}
+    if not accumulator.samples:
+        return {"success": False, "error": "The input has no audio samples."}
+
+    peaks = accumulator.levels(levels)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=output_path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(encode_peaks(peaks, accumulator.samples, output_format))
+    os.replace(temp_path, output_path)
+    return {
+        "success": True,
+        "duration": round(accumulator.samples / WAVEFORM_SAMPLE_RATE, 3),
+        "levels": [{"samples_per_bucket": p["samples_per_bucket"], "buckets": len(p["min"])} for p in peaks],
+        "resource_usage": run["resource_usage"],
+    }
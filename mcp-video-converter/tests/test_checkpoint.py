@@ -0,0 +1,113 @@
+import json
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from mcp_video_converter import checkpoint
+from mcp_video_converter.checkpoint import (
+    MANIFEST_NAME,
+    checkpoint_dir_for,
+    plan_segments,
+    resumable_convert,
+)
+
+ARGS = ["-c:v", "libx264", "-crf", "23"]
+
+
+@pytest.fixture
+def source(tmp_path: Path) -> Path:
+    path = tmp_path / "long.mkv"
+    path.write_bytes(b"\x1a\x45\xdf\xa3" + os.urandom(4096))
+    return path
+
+class FakeFFmpeg:
+    """Writes each command's output path; fails the segment encodes listed in fail_at."""
+
+    def __init__(self, fail_at=()):
+        self.commands = []
+        self.fail_at = set(fail_at)
+
+    async def __call__(self, command, apply_policy=None, on_progress=None):
+        self.commands.append(command)
+        start = command[command.index("-ss") + 1] if "-ss" in command else None
+        if start is not None and float(start) in self.fail_at:
+            return {"returncode": 1, "stdout": b"", "stderr": b"Killed", "stalled": False, "resource_usage": {}}
+        Path(command[-1]).write_bytes(f"encoded {start}".encode())
+        return {"returncode": 0, "stdout": b"", "stderr": b"", "stalled": False, "resource_usage": {}}
+
+    def segment_starts(self):
+        return [float(c[c.index("-ss") + 1]) for c in self.commands if "-ss" in c]
+
+def test_plan_segments_covers_duration():
+    assert plan_segments(250, 100) == [(0, 100), (100, 200), (200, 250)]
+    assert plan_segments(100, 100) == [(0, 100)]
+    assert plan_segments(0.5, 100) == [(0, 0.5)]
+
+@pytest.mark.asyncio
+async def test_interrupted_conversion_resumes_from_finished_segments(tmp_path: Path, source: Path):
+    output = tmp_path / "out" / "long_converted.mp4"
+    output.parent.mkdir()
+    checkpoint_dir = checkpoint_dir_for(output.parent, source, "mp4")
+
+    failing = FakeFFmpeg(fail_at=[200.0])
+    with patch.object(checkpoint, "run_supervised", failing):
+        first = await resumable_convert(source, output, "mp4", ARGS, 350, segment_seconds=100)
+    assert first["success"] is False
+    assert first["segments_completed"] == 2
+    manifest = json.loads((checkpoint_dir / MANIFEST_NAME).read_text())
+    assert [s["done"] for s in manifest["segments"]] == [True, True, False, False]
+
+    fake = FakeFFmpeg()
+    progress = []
+    with patch.object(checkpoint, "run_supervised", fake):
+        second = await resumable_convert(
+            source, output, "mp4", ARGS, 350, segment_seconds=100, on_segment=lambda done, total: progress.append(done)
+        )
+    assert second["success"] is True
+    assert second["checkpoint"] == "resumed"
+    assert (second["segments_reused"], second["segments_encoded"]) == (2, 2)
+    assert fake.segment_starts() == [200.0, 300.0]
+    assert progress == [2, 3, 4]
+    join = fake.commands[-1]
+    assert join[join.index("-c") + 1] == "copy"
+    assert output.exists()
+    assert not checkpoint_dir.exists()
+
+@pytest.mark.asyncio
+async def test_stale_checkpoint_is_never_reused(tmp_path: Path, source: Path):
+    output = tmp_path / "long_converted.mp4"
+    with patch.object(checkpoint, "run_supervised", FakeFFmpeg(fail_at=[100.0])):
+        await resumable_convert(source, output, "mp4", ARGS, 200, segment_seconds=100)
+
+    # Other encoding parameters
+    fake = FakeFFmpeg()
+    with patch.object(checkpoint, "run_supervised", fake):
+        result = await resumable_convert(source, output, "mp4", ["-c:v", "libx264", "-crf", "30"], 200, segment_seconds=100)
+    assert result["checkpoint"] == "discarded"
+    assert fake.segment_starts() == [0.0, 100.0]
+
+    # A changed input
+    with patch.object(checkpoint, "run_supervised", FakeFFmpeg(fail_at=[100.0])):
+        await resumable_convert(source, output, "mp4", ARGS, 200, segment_seconds=100)
+    source.write_bytes(b"\x1a\x45\xdf\xa3" + os.urandom(4096))
+    fake = FakeFFmpeg()
+    with patch.object(checkpoint, "run_supervised", fake):
+        result = await resumable_convert(source, output, "mp4", ARGS, 200, segment_seconds=100)
+    assert result["checkpoint"] == "discarded"
+    assert fake.segment_starts() == [0.0, 100.0]
+
+@pytest.mark.asyncio
+async def test_damaged_segment_is_encoded_again(tmp_path: Path, source: Path):
+    output = tmp_path / "long_converted.webm"
+    with patch.object(checkpoint, "run_supervised", FakeFFmpeg(fail_at=[100.0])):
+        await resumable_convert(source, output, "webm", ARGS, 200, segment_seconds=100)
+    checkpoint_dir = checkpoint_dir_for(tmp_path, source, "webm")
+    (checkpoint_dir / "segment_00000.webm").write_bytes(b"truncated")
+
+    fake = FakeFFmpeg()
+    with patch.object(checkpoint, "run_supervised", fake):
+        result = await resumable_convert(source, output, "webm", ARGS, 200, segment_seconds=100)
+    assert result["checkpoint"] == "resumed"
+    assert fake.segment_starts() == [0.0, 100.0]
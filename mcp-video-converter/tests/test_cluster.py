@@ -0,0 +1,269 @@
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from mcp_video_converter import cluster, tools
+from mcp_video_converter.cluster import ClusterEngine, Coordinator, WorkerAgent, required_encoders, run_worker
+from mcp_video_converter.tools import convert_video_impl
+
+POLICY = {"threads": None, "nice": None}
+TOKEN = "test-cluster-token"
+
+
+class FakeEngine:
+    """Stands in for the worker's subprocess engine: writes the output, optionally after `release`."""
+
+    name = "subprocess"
+
+    def __init__(self, payload: bytes = b"converted", release: asyncio.Event = None):
+        self.payload = payload
+        self.release = release
+        self.started = asyncio.Event()
+        self.calls = []
+        self.inputs = []
+
+    async def run(self, input_path, output_path, output_format, encoding_args, policy, video=None, on_progress=None):
+        self.calls.append(Path(output_path))
+        self.inputs.append((Path(input_path), Path(input_path).read_bytes() if Path(input_path).is_file() else None))
+        self.started.set()
+        on_progress({"out_time_us": "500000", "progress": "continue"})
+        if self.release:
+            await self.release.wait()
+        Path(output_path).write_bytes(self.payload)
+        return {"returncode": 0, "stdout": b"", "stderr": b"", "stalled": False, "progress": {},
+                "resource_usage": {"wall_seconds": 0.1}, "command": "ffmpeg ..."}
+
+
+@pytest.fixture
+async def coordinator():
+    coordinator = Coordinator(token=TOKEN, heartbeat_seconds=0.1)
+    await coordinator.start("127.0.0.1", 0)
+    yield coordinator
+    await coordinator.close()
+
+
+async def start_worker(coordinator: Coordinator, worker_id: str, encoders=("libx264", "aac"), **kwargs) -> asyncio.Task:
+    agent = WorkerAgent(worker_id=worker_id, encoders=list(encoders), slots=1, token=TOKEN, **kwargs)
+    task = asyncio.create_task(run_worker(*coordinator.address, agent, reconnect=False))
+    for _ in range(100):
+        worker = coordinator.workers.get(worker_id)
+        if worker and worker["pulls"]:
+            return task
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"{worker_id} did not register")
+
+
+async def stop(*tasks: asyncio.Task) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def spec(tmp_path: Path, output_format: str = "mp4") -> dict:
+    return {
+        "input": str(tmp_path / "in.mkv"),
+        "output": str(tmp_path / f"out.{output_format}"),
+        "output_format": output_format,
+        "encoding_args": ["-crf", "23"],
+        "policy": POLICY,
+        "video": None,
+    }
+
+def test_required_encoders():
+    assert required_encoders("webm", ["-crf", "30"]) == {"libvpx-vp9", "libopus"}
+    assert required_encoders("mp4", ["-c:v", "h264_nvenc", "-c:a", "copy"]) == {"h264_nvenc"}
+    assert required_encoders("mp4", ["-an"]) == {"libx264"}
+    assert required_encoders("mp3", []) == {"libmp3lame"}
+    assert required_encoders("ogg", ["-b:a", "192k"]) == {"libvorbis"}
+    assert required_encoders("gif", []) == set()
+
+@pytest.mark.asyncio
+async def test_job_runs_on_worker_and_streams_progress(coordinator: Coordinator, tmp_path: Path):
+    engine = FakeEngine()
+    progress = []
+    with patch.object(cluster, "SUBPROCESS_ENGINE", engine):
+        worker = await start_worker(coordinator, "w1")
+        run = await coordinator.submit(spec(tmp_path), {"libx264"}, progress.append)
+        await stop(worker)
+    assert run["returncode"] == 0
+    assert run["resource_usage"]["worker_id"] == "w1"
+    assert progress == [{"out_time_us": "500000", "progress": "continue"}]
+    # The worker wrote an attempt file on shared storage that was renamed into place
+    assert engine.calls[0].parent == tmp_path and engine.calls[0].name.startswith(".out.")
+    assert (tmp_path / "out.mp4").read_bytes() == b"converted"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.mp4"]
+
+@pytest.mark.asyncio
+async def test_placement_follows_encoders(coordinator: Coordinator, tmp_path: Path):
+    with patch.object(cluster, "SUBPROCESS_ENGINE", FakeEngine()):
+        h264 = await start_worker(coordinator, "h264-only")
+        vp9 = await start_worker(coordinator, "vp9", encoders=("libx264", "libvpx-vp9"))
+        run = await coordinator.submit(spec(tmp_path, "webm"), {"libvpx-vp9"})
+        assert run["resource_usage"]["worker_id"] == "vp9"
+        assert not coordinator.can_place({"libaom-av1"})
+        missing = await coordinator.submit(spec(tmp_path), {"libaom-av1"})
+        assert missing["returncode"] == 1
+        await stop(h264, vp9)
+
+@pytest.mark.asyncio
+async def test_files_stream_both_ways_without_shared_storage(coordinator: Coordinator, tmp_path: Path):
+    payload = os.urandom(cluster.TRANSFER_CHUNK_BYTES * 2 + 1000)
+    source = os.urandom(cluster.TRANSFER_CHUNK_BYTES + 10)
+    scratch = tmp_path / "scratch"
+    scratch.mkdir()
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    (out_dir / "in.mkv").write_bytes(source)
+    engine = FakeEngine(payload)
+    with patch.object(cluster, "SUBPROCESS_ENGINE", engine):
+        worker = await start_worker(coordinator, "remote", shared_storage=False, scratch_dir=str(scratch))
+        run = await coordinator.submit(spec(out_dir), {"libx264"})
+        # An unreadable input fails the job instead of leaving it running
+        missing = await coordinator.submit({**spec(out_dir), "input": str(tmp_path / "gone.mkv")}, {"libx264"})
+        await stop(worker)
+    assert run["returncode"] == 0
+    # The worker only touched its scratch copy of the input
+    input_path, input_bytes = engine.inputs[0]
+    assert input_path.is_relative_to(scratch) and input_path.suffix == ".mkv"
+    assert input_bytes == source
+    assert engine.calls[0].is_relative_to(scratch)
+    assert (out_dir / "out.mp4").read_bytes() == payload
+    assert missing["returncode"] == 1
+    assert b"could not read the input" in missing["stderr"]
+    assert len(engine.calls) == 1
+    assert list(scratch.iterdir()) == []
+
+@pytest.mark.asyncio
+async def test_registration_needs_the_token(coordinator: Coordinator):
+    agent = WorkerAgent(worker_id="intruder", encoders=["libx264"], slots=1, token="guess")
+    with pytest.raises(ConnectionError, match="invalid cluster token"):
+        await agent.serve(*coordinator.address)
+    assert coordinator.workers == {}
+    assert coordinator.stats["registrations_rejected"] == 1
+    with pytest.raises(ValueError):
+        Coordinator(token=None)
+
+@pytest.mark.asyncio
+async def test_chunk_past_received_bytes_drops_worker(coordinator: Coordinator, tmp_path: Path):
+    reader, writer = await asyncio.open_connection(*coordinator.address)
+    writer.write(json.dumps({"type": "register", "token": TOKEN, "worker_id": "rogue", "cores": 1, "slots": 1,
+                             "shared_storage": False, "encoders": ["libx264"]}).encode() + b"\n")
+    writer.write(b'{"type": "pull"}\n')
+    await reader.readline()
+    submitted = asyncio.create_task(coordinator.submit(spec(tmp_path), {"libx264"}))
+    job = json.loads(await reader.readline())
+    writer.write(json.dumps({"type": "chunk", "job_id": job["job_id"], "offset": 1 << 40, "data": "AAAA"}).encode()
+                 + b"\n")
+    await writer.drain()
+    for _ in range(100):
+        if "rogue" not in coordinator.workers:
+            break
+        await asyncio.sleep(0.01)
+    writer.close()
+    assert "rogue" not in coordinator.workers
+    assert not Path(job["output"]).exists()
+    # The job was taken back; with no other worker left it fails instead of completing
+    run = await submitted
+    assert run["returncode"] == 1
+    assert b"No cluster worker" in run["stderr"]
+
+@pytest.mark.asyncio
+async def test_job_moves_to_another_worker_when_one_dies(coordinator: Coordinator, tmp_path: Path):
+    stuck = FakeEngine(release=asyncio.Event())
+    with patch.object(cluster, "SUBPROCESS_ENGINE", stuck):
+        doomed = await start_worker(coordinator, "doomed")
+        submitted = asyncio.create_task(coordinator.submit(spec(tmp_path), {"libx264"}))
+        await stuck.started.wait()
+    with patch.object(cluster, "SUBPROCESS_ENGINE", FakeEngine()):
+        survivor = await start_worker(coordinator, "survivor")
+        await stop(doomed)
+        run = await asyncio.wait_for(submitted, 5)
+        await stop(survivor)
+    assert run["returncode"] == 0
+    assert run["resource_usage"]["worker_id"] == "survivor"
+    assert run["resource_usage"]["attempts"] == 2
+    assert coordinator.stats["reassigned"] == 1
+
+@pytest.mark.asyncio
+async def test_silent_worker_is_dropped_after_missed_heartbeats(coordinator: Coordinator, tmp_path: Path):
+    # A hung worker: registers and takes a job, then never speaks again
+    reader, writer = await asyncio.open_connection(*coordinator.address)
+    writer.write(json.dumps({"type": "register", "token": TOKEN, "worker_id": "hung", "cores": 64, "slots": 1,
+                             "encoders": ["libx264"]}).encode() + b"\n")
+    writer.write(b'{"type": "pull"}\n')
+    await reader.readline()
+    submitted = asyncio.create_task(coordinator.submit(spec(tmp_path), {"libx264"}))
+    job = json.loads(await reader.readline())
+    assert job["type"] == "job"
+
+    with patch.object(cluster, "SUBPROCESS_ENGINE", FakeEngine()):
+        worker = await start_worker(coordinator, "healthy")
+        run = await asyncio.wait_for(submitted, 5)
+        await stop(worker)
+    writer.close()
+    assert run["resource_usage"]["worker_id"] == "healthy"
+    assert "hung" not in coordinator.workers
+    assert not Path(job["output"]).exists()
+
+@pytest.mark.asyncio
+async def test_convert_video_runs_on_cluster(coordinator: Coordinator, tmp_path: Path):
+    source = tmp_path / "clip.webm"
+    source.write_bytes(
+        b"\x1a\x45\xdf\xa3\x87\x42\x82\x84webm" + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff"
+        + b"x" * 1000
+    )
+    probe = {"success": True, "format": {"duration": "3"}, "streams": []}
+    in_process = FakeEngine(b"in-process")
+    in_process.name = "pyav"
+    with patch.object(cluster, "_COORDINATOR", coordinator), patch.object(cluster, "SUBPROCESS_ENGINE", FakeEngine()), \
+            patch("mcp_video_converter.tools.probe_media", AsyncMock(return_value=probe)):
+        worker = await start_worker(coordinator, "w1")
+        # Only jobs routed to the FFmpeg subprocess go to the cluster
+        with patch("mcp_video_converter.tools.select_engine", lambda *args: tools.SUBPROCESS_ENGINE):
+            result = await convert_video_impl(str(source), "mp4")
+        # Jobs small enough for the in-process engine stay on the server
+        with patch("mcp_video_converter.tools.select_engine", lambda *args: in_process):
+            local = await convert_video_impl(str(source), "mov")
+        await stop(worker)
+    assert result["success"] is True
+    assert result["engine"] == "cluster"
+    assert result["resource_usage"]["worker_id"] == "w1"
+    assert Path(result["output_file_path"]).read_bytes() == b"converted"
+    assert local["engine"] == "pyav"
+    assert coordinator.stats["dispatched"] == 1
+
+@pytest.mark.asyncio
+async def test_cluster_engine_without_coordinator():
+    with patch.object(cluster, "_COORDINATOR", None):
+        run = await ClusterEngine().run("in.mkv", Path("out.mp4"), "mp4", [], POLICY)
+    assert run["returncode"] == 1
+
+@pytest.mark.asyncio
+async def test_worker_process_registers_and_is_dropped_when_killed(coordinator: Coordinator):
+    host, port = coordinator.address
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "mcp_video_converter.cluster", "--coordinator", f"{host}:{port}",
+        "--worker-id", "proc-1", "--encoders", "libx264,libvpx-vp9", "--slots", "2",
+        stderr=asyncio.subprocess.DEVNULL, env={**os.environ, "MCP_CLUSTER_TOKEN": TOKEN}
+    )
+    try:
+        for _ in range(200):
+            if "proc-1" in coordinator.workers:
+                break
+            await asyncio.sleep(0.05)
+        (status,) = coordinator.status()["workers"]
+        assert status["worker_id"] == "proc-1"
+        assert status["slots"] == 2 and status["encoders"] == 2
+    finally:
+        process.kill()
+        await process.wait()
+    for _ in range(100):
+        if not coordinator.workers:
+            break
+        await asyncio.sleep(0.02)
+    assert coordinator.workers == {}
@@ -0,0 +1,109 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from mcp_video_converter.concat import build_normalize_command, plan_concat, stream_signature, write_concat_list
+from mcp_video_converter.tools import concat_videos_impl
+
+
+def make_probe(codec="h264", width=1280, height=720, rate="30/1", audio="aac", sample_rate="48000"):
+    streams = [{
+        "codec_type": "video", "codec_name": codec, "width": width, "height": height,
+        "pix_fmt": "yuv420p", "r_frame_rate": rate, "time_base": "1/15360",
+    }]
+    if audio:
+        streams.append({"codec_type": "audio", "codec_name": audio, "sample_rate": sample_rate, "channels": 2})
+    return {"success": True, "format": {}, "streams": streams}
+
+
+def test_compatible_inputs_need_no_normalization():
+    signatures = [stream_signature(make_probe()) for _ in range(3)]
+    reference, mismatches = plan_concat(signatures, "mp4")
+    assert reference == signatures[0]
+    assert mismatches == {}
+
+def test_only_differing_inputs_are_normalized():
+    signatures = [
+        stream_signature(make_probe()),
+        stream_signature(make_probe(width=1920, height=1080)),
+        stream_signature(make_probe()),
+        stream_signature(make_probe(sample_rate="44100")),
+    ]
+    _, mismatches = plan_concat(signatures, "mp4")
+    assert mismatches == {1: ["width", "height"], 3: ["sample_rate"]}
+
+def test_reference_in_foreign_codec_normalizes_everything():
+    signatures = [stream_signature(make_probe(codec="vp9", audio="opus"))] * 2
+    reference, mismatches = plan_concat(signatures, "mp4")
+    assert reference["video_codec"] == "h264" and reference["audio_codec"] == "aac"
+    assert sorted(mismatches) == [0, 1]
+    assert mismatches[0] == ["video_codec", "audio_codec"]
+
+def test_silent_first_input_does_not_drop_audio():
+    signatures = [
+        stream_signature(make_probe(audio=None)),
+        stream_signature(make_probe()),
+        stream_signature(make_probe()),
+    ]
+    reference, mismatches = plan_concat(signatures, "mp4")
+    # The first input with audio is the reference; only the silent one is re-encoded
+    assert reference is signatures[1]
+    assert mismatches == {0: ["audio_codec", "sample_rate", "channels"]}
+
+    signatures = [stream_signature(make_probe(codec="vp9", audio=None)), stream_signature(make_probe(sample_rate="44100"))]
+    reference, mismatches = plan_concat(signatures, "webm")
+    assert (reference["audio_codec"], reference["sample_rate"], reference["channels"]) == ("opus", "48000", 2)
+    assert sorted(mismatches) == [0, 1]
+
+def test_normalize_command_matches_reference_profile(tmp_path: Path):
+    reference = stream_signature(make_probe())
+    command = build_normalize_command(tmp_path / "b.mov", tmp_path / "part.mp4", reference, "mp4", has_audio=False)
+    joined = " ".join(command)
+    assert "scale=1280:720:force_original_aspect_ratio=decrease,pad=1280:720" in joined
+    assert "fps=30/1" in joined
+    assert "anullsrc=r=48000:cl=stereo" in joined and "-shortest" in command
+    assert command[command.index("-video_track_timescale") + 1] == "15360"
+    assert command[command.index("-c:v") + 1] == "libx264"
+
+def test_concat_list_escapes_quotes(tmp_path: Path):
+    write_concat_list(tmp_path / "list.txt", [Path("/clips/it's.mp4")])
+    assert "file '/clips/it'\\''s.mp4'" in (tmp_path / "list.txt").read_text()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("probes, normalized", [
+    ([make_probe(), make_probe(), make_probe()], 0),
+    ([make_probe(), make_probe(width=640, height=360), make_probe(audio=None)], 2),
+])
+async def test_concat_videos_joins_by_stream_copy(tmp_path: Path, probes, normalized):
+    inputs = []
+    for i in range(len(probes)):
+        path = tmp_path / f"chunk_{i}.mp4"
+        path.write_bytes(b"media")
+        inputs.append(str(path))
+    probe_by_path = dict(zip(inputs, probes))
+    commands, listings = [], []
+
+    async def fake_probe(path, timeout=30.0):
+        return probe_by_path[str(path)]
+
+    async def fake_run(command, apply_policy=None, stall_timeout=None, on_progress=None):
+        commands.append(command)
+        if "concat" in command:
+            listings.append(Path(command[command.index("-i") + 1]).read_text())
+        Path(command[-1]).write_bytes(b"out")
+        return {"returncode": 0, "stderr": b"", "stalled": False, "progress": {}, "resource_usage": {}}
+
+    with patch("mcp_video_converter.tools.probe_media", side_effect=fake_probe), \
+            patch("mcp_video_converter.concat.run_supervised", side_effect=fake_run):
+        result = await concat_videos_impl(inputs)
+
+    assert result["success"] is True
+    assert result["output_file_path"].endswith("converted_videos/chunk_0_joined.mp4")
+    assert len(result["normalized"]) == normalized
+    assert len(commands) == normalized + 1
+    join = commands[-1]
+    assert join[join.index("-c") + 1] == "copy"
+    assert listings[0].count("file ") == 3
+    assert f"file '{inputs[0]}'" in listings[0]
+    assert not list((tmp_path / "converted_videos").glob("*_parts"))
@@ -0,0 +1,137 @@
+import shutil
+import subprocess
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from mcp_video_converter import engines
+from mcp_video_converter.encoding import build_encoding_args
+from mcp_video_converter.engines import (
+    PYAV_ENGINE, SUBPROCESS_ENGINE, nearest_sample_rate, pyav_options, select_engine
+)
+from mcp_video_converter.tools import convert_video_impl
+
+
+@pytest.fixture
+def small_input(tmp_path: Path) -> Path:
+    path = tmp_path / "clip.webm"
+    # EBML header with a webm doctype, then an unknown-size Segment as recorders write it
+    path.write_bytes(
+        b"\x1a\x45\xdf\xa3\x87\x42\x82\x84webm" + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff"
+        + b"x" * 1000
+    )
+    return path
+
+def test_pyav_options_follow_cli_profile():
+    assert pyav_options(build_encoding_args("webm", None, crf=40)) == {
+        "video_options": {"crf": "40"},
+        "audio_options": {},
+        "video_bit_rate": 0,
+        "audio_bit_rate": None,
+        "framerate": None,
+    }
+    assert pyav_options(build_encoding_args("mp3", "low"))["audio_bit_rate"] == 128000
+    with pytest.raises(ValueError):
+        pyav_options(["-vf", "scale=2:2"])
+
+def test_select_engine_routes_by_size_and_format(monkeypatch, small_input: Path):
+    monkeypatch.setattr(engines, "av", object())
+    monkeypatch.setattr(engines, "ENGINE_MODE", "auto")
+    monkeypatch.setattr(engines, "INPROCESS_MAX_BYTES", 4096)
+    assert select_engine(small_input, "mp4", []) is PYAV_ENGINE
+    # Formats PyAV doesn't handle and framerate changes stay on the CLI
+    assert select_engine(small_input, "mp3", []) is SUBPROCESS_ENGINE
+    assert select_engine(small_input, "mp4", ["-r", "30"]) is SUBPROCESS_ENGINE
+
+    small_input.write_bytes(small_input.read_bytes() + b"x" * 8192)
+    assert select_engine(small_input, "mp4", []) is SUBPROCESS_ENGINE
+    monkeypatch.setattr(engines, "ENGINE_MODE", "pyav")
+    assert select_engine(small_input, "mp4", []) is PYAV_ENGINE
+
+def test_nearest_sample_rate():
+    opus_rates = [48000, 24000, 16000, 12000, 8000]
+    assert nearest_sample_rate(44100, opus_rates) == 48000
+    assert nearest_sample_rate(22050, opus_rates) == 24000
+    assert nearest_sample_rate(16000, opus_rates) == 16000
+    assert nearest_sample_rate(44100, None) == 44100
+    assert nearest_sample_rate(None, []) == 48000
+
+@pytest.mark.asyncio
+async def test_pyav_failure_falls_back_to_subprocess(monkeypatch, small_input: Path):
+    monkeypatch.setattr(engines, "av", SimpleNamespace(error=SimpleNamespace(FFmpegError=RuntimeError)))
+
+    def failing_transcode(*args):
+        raise RuntimeError("Invalid argument: avcodec_open2(libopus)")
+
+    fallback = AsyncMock(return_value={"returncode": 0, "stderr": b"", "resource_usage": {}})
+    monkeypatch.setattr(engines, "_transcode", failing_transcode)
+    monkeypatch.setattr(engines, "SUBPROCESS_ENGINE", SimpleNamespace(run=fallback))
+    run = await PYAV_ENGINE.run(small_input, small_input.with_suffix(".mp4"), "mp4", ["-crf", "23"], {})
+    assert run["returncode"] == 0
+    assert run["resource_usage"]["fallback_from"] == "pyav"
+    assert "libopus" in run["resource_usage"]["fallback_reason"]
+    assert fallback.await_args.args[2:4] == ("mp4", ["-crf", "23"])
+
+def test_select_engine_without_pyav(monkeypatch, small_input: Path):
+    monkeypatch.setattr(engines, "av", None)
+    assert select_engine(small_input, "png", []) is SUBPROCESS_ENGINE
+
+@pytest.mark.asyncio
+async def test_convert_video_reports_engine(monkeypatch, small_input: Path):
+    fake_engine = AsyncMock()
+    fake_engine.name = "pyav"
+
+    async def fake_run(input_path, output_path, output_format, encoding_args, policy, video=None, on_progress=None):
+        output_path.write_bytes(b"converted")
+        return {"returncode": 0, "stderr": b"", "stalled": False, "resource_usage": {}}
+
+    fake_engine.run = fake_run
+    with patch("mcp_video_converter.tools.select_engine", return_value=fake_engine):
+        result = await convert_video_impl(str(small_input), "mp4", quality="high")
+
+    assert result["success"] is True
+    assert result["engine"] == "pyav"
+
+@pytest.mark.asyncio
+async def test_engines_produce_equivalent_streams(tmp_path: Path):
+    av = pytest.importorskip("av")
+    if not shutil.which("ffmpeg"):
+        pytest.skip("ffmpeg not installed")
+    source = tmp_path / "source.mp4"
+    subprocess.run(
+        ["ffmpeg", "-y", "-v", "error", "-f", "lavfi", "-i", "testsrc2=size=320x240:rate=25:duration=1",
+         "-c:v", "libx264", str(source)],
+        check=True,
+    )
+    encoding_args = build_encoding_args("webm", "medium")
+    outputs = {}
+    for engine in (SUBPROCESS_ENGINE, PYAV_ENGINE):
+        output = tmp_path / f"{engine.name}.webm"
+        run = await engine.run(source, output, "webm", encoding_args, {})
+        assert run["returncode"] == 0, run["stderr"]
+        with av.open(str(output)) as container:
+            stream = container.streams.video[0]
+            outputs[engine.name] = (stream.codec_context.name, stream.codec_context.width, stream.codec_context.height)
+    assert outputs["subprocess"] == outputs["pyav"] == ("vp9", 320, 240)
+
+@pytest.mark.asyncio
+async def test_pyav_encodes_44100_hz_audio_to_opus(tmp_path: Path):
+    av = pytest.importorskip("av")
+    if not shutil.which("ffmpeg"):
+        pytest.skip("ffmpeg not installed")
+    source = tmp_path / "source.mp4"
+    subprocess.run(
+        ["ffmpeg", "-y", "-v", "error", "-f", "lavfi", "-i", "testsrc2=size=160x120:rate=25:duration=1",
+         "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100:duration=1",
+         "-c:v", "libx264", "-c:a", "aac", str(source)],
+        check=True,
+    )
+    output = tmp_path / "out.webm"
+    run = await PYAV_ENGINE.run(source, output, "webm", build_encoding_args("webm", "medium"), {})
+    assert run["returncode"] == 0, run["stderr"]
+    assert "fallback_from" not in run["resource_usage"]
+    with av.open(str(output)) as container:
+        audio = container.streams.audio[0].codec_context
+        assert (audio.name, audio.sample_rate) == ("opus", 48000)
@@ -0,0 +1,72 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from mcp_video_converter.follow import build_follow_command, follow_convert, read_segment_list
+from mcp_video_converter.tools import convert_video_impl
+
+LIVE_WEBM = b"\x1a\x45\xdf\xa3\x87\x42\x82\x84webm" + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff"
+
+
+def test_follow_command_tails_input_and_segments_output(tmp_path: Path):
+    command = build_follow_command(
+        tmp_path / "rec.webm", tmp_path / "segs", tmp_path / "segs" / "list.ffconcat", "mp4", ["-crf", "23"], 10, 15
+    )
+    joined = " ".join(command)
+    assert command[command.index("-follow") + 1] == "1"
+    assert command[command.index("-rw_timeout") + 1] == "15000000"
+    assert f"-i file:{tmp_path / 'rec.webm'}" in joined
+    assert "-f segment -segment_time 10 -segment_format mp4" in joined
+    assert "expr:gte(t,n_forced*10)" in joined
+    assert command[-1].endswith("segment_%05d.mp4")
+
+@pytest.mark.asyncio
+async def test_follow_convert_joins_segments_when_writer_stops(tmp_path: Path):
+    output = tmp_path / "converted_videos" / "rec_converted.mp4"
+    output.parent.mkdir()
+    commands = []
+
+    async def fake_run(command, apply_policy=None, stall_timeout=None, on_progress=None):
+        commands.append(command)
+        if "segment" in command:
+            segment_dir = Path(command[-1]).parent
+            listing = []
+            for i in range(3):
+                (segment_dir / f"segment_{i:05d}.mp4").write_bytes(b"seg")
+                listing.append(f"file segment_{i:05d}.mp4")
+            Path(command[command.index("-segment_list") + 1]).write_text("ffconcat version 1.0\n" + "\n".join(listing))
+            assert stall_timeout >= 30  # waiting on the recorder must not count as a stall
+        else:
+            Path(command[-1]).write_bytes(b"joined")
+        return {"returncode": 0, "stderr": b"", "stalled": False, "progress": {}, "resource_usage": {}}
+
+    with patch("mcp_video_converter.follow.run_supervised", side_effect=fake_run):
+        result = await follow_convert(tmp_path / "rec.webm", output, "mp4", idle_seconds=15)
+
+    assert result["success"] is True
+    assert result["segments"] == 3
+    assert output.read_bytes() == b"joined"
+    concat = commands[1]
+    assert concat[concat.index("-f") + 1] == "concat"
+    assert concat[concat.index("-c") + 1] == "copy"
+    assert not (output.parent / "rec_converted_segments").exists()
+
+def test_read_segment_list(tmp_path: Path):
+    listing = tmp_path / "list.ffconcat"
+    listing.write_text("ffconcat version 1.0\nfile segment_00000.webm\nfile 'segment_00001.webm'\n")
+    assert read_segment_list(listing) == ["segment_00000.webm", "segment_00001.webm"]
+    assert read_segment_list(tmp_path / "missing") == []
+
+@pytest.mark.asyncio
+async def test_follow_mode_input_checks(tmp_path: Path):
+    recording = tmp_path / "rec.webm"
+    recording.write_bytes(LIVE_WEBM)
+    result = await convert_video_impl(str(recording), "gif", follow=True)
+    assert result["success"] is False
+    assert "Follow mode supports" in result["error"]
+
+    png = tmp_path / "still.png"
+    png.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\x00" * 8)
+    result = await convert_video_impl(str(png), "mp4", follow=True)
+    assert "streamable input" in result["error"]
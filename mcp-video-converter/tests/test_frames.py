@@ -0,0 +1,85 @@
+import os
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from mcp_video_converter.frames import (
+    NPY_HEADER_SIZE,
+    build_frames_command,
+    display_size,
+    npy_header,
+    output_size,
+    read_npy_header,
+)
+from mcp_video_converter.tools import extract_frames_impl
+
+WEBM = b"\x1a\x45\xdf\xa3\x87\x42\x82\x84webm" + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff"
+PROBE = {"success": True, "format": {}, "streams": [{"codec_type": "video", "width": 64, "height": 48}]}
+
+
+def test_npy_header_is_fixed_size_and_parseable():
+    header = npy_header((12, 48, 64, 3))
+    assert len(header) == NPY_HEADER_SIZE
+    assert read_npy_header(header) == {"descr": "|u1", "fortran_order": False, "shape": (12, 48, 64, 3)}
+
+def test_output_size_keeps_aspect_ratio():
+    assert output_size((1920, 1080), width=224) == (224, 126)
+    assert output_size((1920, 1080), height=224) == (398, 224)
+    assert output_size((1920, 1080), 224, 224) == (224, 224)
+    assert display_size({"width": 1920, "height": 1080, "side_data_list": [{"rotation": -90}]}) == (1080, 1920)
+
+def test_frames_command_samples_and_resizes_in_one_filtergraph(tmp_path: Path):
+    command = build_frames_command(tmp_path / "in.mp4", (224, 126), "gray", fps=2, stride=3, max_frames=10)
+    assert command[command.index("-vf") + 1] == "fps=2,select=not(mod(n\\,3)),scale=224:126"
+    assert command[command.index("-frames:v") + 1] == "10"
+    assert command[-5:] == ["-pix_fmt", "gray", "-f", "rawvideo", "pipe:1"]
+
+async def fake_frames(count: int, frame_bytes: int, partial: int = 0):
+    async def fake_run(command, apply_policy=None, stall_timeout=None, on_progress=None, stdout=None):
+        # FFmpeg writes through the inherited descriptor, after the header
+        os.write(stdout.fileno(), b"\x7f" * (count * frame_bytes + partial))
+        return {"returncode": 0, "stdout": b"", "stderr": b"", "stalled": False, "progress": {}, "resource_usage": {}}
+    return fake_run
+
+@pytest.mark.asyncio
+async def test_extract_frames_streams_into_npy(tmp_path: Path):
+    source = tmp_path / "in.webm"
+    source.write_bytes(WEBM)
+    with patch("mcp_video_converter.tools.probe_media", AsyncMock(return_value=PROBE)), \
+            patch("mcp_video_converter.frames.run_supervised", side_effect=await fake_frames(5, 32 * 24 * 3, partial=7)):
+        result = await extract_frames_impl(str(source), width=32)
+
+    assert result["success"] is True
+    assert result["shape"] == [5, 24, 32, 3]
+    output = Path(result["output_file_path"])
+    data = output.read_bytes()
+    assert read_npy_header(data[:NPY_HEADER_SIZE])["shape"] == (5, 24, 32, 3)
+    assert len(data) == NPY_HEADER_SIZE + 5 * 24 * 32 * 3
+
+    np = pytest.importorskip("numpy")
+    frames = np.load(output, mmap_mode="r")
+    assert frames.shape == (5, 24, 32, 3) and frames[4, 23, 31, 2] == 0x7F
+
+@pytest.mark.asyncio
+async def test_extract_frames_to_shared_memory(tmp_path: Path):
+    source = tmp_path / "in.webm"
+    source.write_bytes(WEBM)
+    with patch("mcp_video_converter.tools.probe_media", AsyncMock(return_value=PROBE)), \
+            patch("mcp_video_converter.tools.SHM_DIR", tmp_path), \
+            patch("mcp_video_converter.frames.SHM_DIR", tmp_path), \
+            patch("mcp_video_converter.frames.run_supervised", side_effect=await fake_frames(2, 64 * 48)):
+        result = await extract_frames_impl(str(source), pixel_format="gray", target="shm")
+
+    assert result["success"] is True
+    assert result["shape"] == [2, 48, 64]
+    assert result["shm_name"].startswith("mcp_frames_")
+    assert (tmp_path / result["shm_name"]).stat().st_size == NPY_HEADER_SIZE + 2 * 64 * 48
+
+@pytest.mark.asyncio
+async def test_extract_frames_validates_arguments(tmp_path: Path):
+    source = tmp_path / "in.webm"
+    source.write_bytes(WEBM)
+    assert (await extract_frames_impl(str(source), pixel_format="yuv420p"))["success"] is False
+    assert (await extract_frames_impl(str(source), stride=0))["success"] is False
+    assert (await extract_frames_impl(str(source), target="gpu"))["success"] is False
@@ -0,0 +1,90 @@
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from mcp_video_converter import history
+from mcp_video_converter.history import ConversionHistory, estimate, record_conversion
+from mcp_video_converter.tools import convert_video_impl, estimate_conversion_impl
+
+PROBE = {
+    "success": True,
+    "format": {"duration": "60.0"},
+    "streams": [{"codec_type": "video", "width": 1920, "height": 1080, "avg_frame_rate": "30/1"}],
+}
+
+
+@pytest.fixture(autouse=True)
+def isolated_history(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(history, "HISTORY_FILE", str(tmp_path / "history.json"))
+    monkeypatch.setattr(history, "_history", None)
+
+def test_prior_estimate_without_history():
+    prediction = estimate(PROBE, "mp4", "medium", threads=4)
+    assert prediction["history_samples"] == 0
+    assert prediction["history_key"] == "mp4/medium/fhd"
+    size = prediction["output_bytes"]
+    assert size["low"] < size["expected"] < size["high"]
+    # 1080p30 at 0.08 bits per pixel for a minute
+    assert size["expected"] == pytest.approx(1920 * 1080 * 30 * 0.08 / 8 * 60, rel=0.01)
+
+def test_estimates_converge_on_history():
+    prior = estimate(PROBE, "mp4", "medium", threads=4)
+    for observed in (19_000_000, 21_000_000, 20_000_000, 20_500_000, 19_500_000, 20_000_000, 20_200_000, 19_800_000):
+        record_conversion(PROBE, "mp4", "medium", observed, wall_seconds=30.0)
+    informed = estimate(PROBE, "mp4", "medium", threads=4)
+
+    assert informed["history_samples"] == 8
+    assert abs(informed["output_bytes"]["expected"] - 20_000_000) < abs(prior["output_bytes"]["expected"] - 20_000_000)
+    prior_width = prior["output_bytes"]["high"] / prior["output_bytes"]["low"]
+    informed_width = informed["output_bytes"]["high"] / informed["output_bytes"]["low"]
+    assert informed_width < prior_width
+    assert informed["wall_seconds"]["low"] < 30.0 < informed["wall_seconds"]["high"] * 1.5
+
+def test_history_is_persisted_incrementally(tmp_path: Path):
+    record_conversion(PROBE, "webm", None, 5_000_000, 10.0)
+    reloaded = ConversionHistory(str(tmp_path / "history.json"))
+    stat = reloaded.get("webm/default/fhd", "bytes")
+    assert stat["n"] == 1
+
+@pytest.mark.asyncio
+async def test_estimate_conversion_impl(tmp_path: Path):
+    media = tmp_path / "in.mkv"
+    media.write_bytes(b"x")
+    with patch("mcp_video_converter.tools.probe_media", AsyncMock(return_value=PROBE)):
+        result = await estimate_conversion_impl(str(media), "webm", "low")
+    assert result["success"] is True
+    assert result["input_duration"] == 60.0
+    assert set(result["wall_seconds"]) == {"expected", "low", "high"}
+
+    no_duration = {**PROBE, "format": {}}
+    with patch("mcp_video_converter.tools.probe_media", AsyncMock(return_value=no_duration)):
+        result = await estimate_conversion_impl(str(media), "webm")
+    assert result["success"] is False
+
+@pytest.mark.asyncio
+async def test_targeted_conversions_are_not_recorded(tmp_path: Path):
+    source = tmp_path / "clip.webm"
+    source.write_bytes(
+        b"\x1a\x45\xdf\xa3\x87\x42\x82\x84webm" + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff"
+        + b"x" * 1000
+    )
+
+    async def fake_run(input_path, output_path, output_format, encoding_args, policy, video=None, on_progress=None):
+        output_path.write_bytes(b"\0" * 4096)
+        return {"returncode": 0, "stderr": b"", "stalled": False, "resource_usage": {"wall_seconds": 12.0}}
+
+    fake_engine = AsyncMock()
+    fake_engine.name = "subprocess"
+    fake_engine.run = fake_run
+    search = AsyncMock(return_value={"success": True, "crf": 40, "sample_encodes": 2})
+    with patch("mcp_video_converter.tools.select_engine", lambda *args: fake_engine), \
+            patch("mcp_video_converter.tools.probe_media", AsyncMock(return_value=PROBE)), \
+            patch("mcp_video_converter.tools.search_crf", search), \
+            patch("mcp_video_converter.tools.report_rate_search", AsyncMock(return_value={})):
+        targeted = await convert_video_impl(str(source), "mp4", quality="medium", target_size_bytes=1_000_000)
+        assert targeted["success"] is True
+        assert history.get_history().get("mp4/medium/fhd", "bytes") is None
+
+        assert (await convert_video_impl(str(source), "mp4", quality="medium"))["success"] is True
+    assert history.get_history().get("mp4/medium/fhd", "bytes")["n"] == 1
@@ -0,0 +1,67 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from mcp_video_converter import tools
+from mcp_video_converter.images import _plan_outputs, collect_images, image_save_options, sniff_image
+from mcp_video_converter.tools import convert_images_impl
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n" + b"\x00" * 8
+
+
+def test_sniff_image_signatures():
+    assert sniff_image(PNG_HEADER) == "png"
+    assert sniff_image(b"\xff\xd8\xff\xe0rest") == "jpg"
+    assert sniff_image(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "webp"
+    assert sniff_image(b"RIFF\x00\x00\x00\x00WAVEfmt ") is None
+    assert sniff_image(b"\x1a\x45\xdf\xa3") is None
+
+def test_image_save_options_follow_quality():
+    assert image_save_options("webp", "low") == {"quality": 60, "method": 2}
+    assert image_save_options("jpg") == {"quality": 85}
+
+def test_collect_images_and_plan_unique_outputs(tmp_path: Path):
+    (tmp_path / "a.png").write_bytes(PNG_HEADER)
+    (tmp_path / "b.dat").write_bytes(PNG_HEADER)  # sniffed, not judged by extension
+    (tmp_path / "notes.txt").write_text("not an image")
+    output_dir = tmp_path / "converted_videos"
+    output_dir.mkdir()
+    (output_dir / "a_converted.webp").write_bytes(b"old")
+
+    images = collect_images(input_directory=str(tmp_path))
+    assert [p.name for p in images] == ["a.png", "b.dat"]
+    jobs = _plan_outputs(images + [images[0]], "webp")
+    assert [job["output"].name for job in jobs] == ["a_converted_1.webp", "b_converted.webp", "a_converted_2.webp"]
+
+@pytest.mark.asyncio
+async def test_convert_images_batch_with_pillow(tmp_path: Path):
+    Image = pytest.importorskip("PIL.Image")
+    for i in range(20):
+        Image.new("RGBA", (32, 16), (i, 0, 0, 128)).save(tmp_path / f"shot{i}.png")
+
+    result = await convert_images_impl("jpg", input_directory=str(tmp_path), quality="high")
+    assert result["success"] is True
+    assert result["converted"] == 20
+    with Image.open(result["results"][0]["output_file_path"]) as converted:
+        assert converted.format == "JPEG"
+        assert converted.size == (32, 16)
+
+@pytest.mark.asyncio
+async def test_convert_images_falls_back_to_ffmpeg_without_pillow(tmp_path: Path, monkeypatch):
+    (tmp_path / "a.png").write_bytes(PNG_HEADER)
+    monkeypatch.setattr(tools, "Image", None)
+
+    async def fake_convert(path, output_format, ctx=None, quality=None, **kwargs):
+        return {"success": True, "output_file_path": path + ".webp"}
+
+    with patch("mcp_video_converter.tools.convert_video_impl", side_effect=fake_convert) as convert:
+        result = await convert_images_impl("webp", input_paths=[str(tmp_path / "a.png")])
+    assert convert.call_count == 1
+    assert result["converted"] == 1
+
+@pytest.mark.asyncio
+async def test_convert_images_rejects_video_formats():
+    result = await convert_images_impl("mp4", input_paths=["/tmp/x.png"])
+    assert result["success"] is False
+    assert "Unsupported image format" in result["error"]
@@ -0,0 +1,119 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+from mcp_video_converter import keyindex
+from mcp_video_converter.keyindex import KeyframeIndex, build_index, parse_packet_line
+from mcp_video_converter.tools import index_keyframes_impl
+
+WEBM = b"\x1a\x45\xdf\xa3\x87\x42\x82\x84webm" + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff"
+
+FAKE_FFPROBE = """#!{python}
+import os, sys
+with open(os.environ["FAKE_PACKETS"]) as f:
+    sys.stdout.write(f.read())
+with open(os.environ["FAKE_PACKETS"] + ".calls", "a") as f:
+    f.write(" ".join(sys.argv[1:]) + "\\n")
+"""
+
+
+def packet_lines(count: int, gop: int = 5, fps: float = 10.0) -> str:
+    return "".join(
+        f"pts_time={i / fps:.6f}|dts_time={i / fps:.6f}|size={1000 + i}|pos={i * 2000}|flags={'K' if i % gop == 0 else '_'}_\n"
+        for i in range(count)
+    )
+
+
+@pytest.fixture
+def fake_ffprobe(tmp_path: Path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "ffprobe"
+    script.write_text(FAKE_FFPROBE.format(python=sys.executable))
+    script.chmod(0o755)
+    packets = tmp_path / "packets.txt"
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_PACKETS", str(packets))
+    monkeypatch.setattr(keyindex, "INDEX_DIR", str(tmp_path / "index"))
+    return packets
+
+
+def test_parse_packet_line():
+    assert parse_packet_line("pts_time=1.500000|dts_time=1.400000|size=812|pos=4096|flags=K__") == (1.5, 4096, 812, True)
+    assert parse_packet_line("pts_time=N/A|dts_time=2.000000|size=10|pos=N/A|flags=___") == (2.0, -1, 10, False)
+    assert parse_packet_line("garbage") is None
+
+def test_index_round_trips_through_mmap(tmp_path: Path):
+    index = KeyframeIndex(10, 20).extend(
+        keyindex.array("d", [0.0, 0.1, 0.2, 0.3]), keyindex.array("I", [5, 6, 7, 8]),
+        {"times": keyindex.array("d", [0.0, 0.2]), "offsets": keyindex.array("q", [0, 500]), "packets": keyindex.array("q", [0, 2])},
+    )
+    index.save(tmp_path / "a.kidx")
+    loaded = KeyframeIndex.load(tmp_path / "a.kidx")
+    assert (loaded.indexed_size, loaded.keyframe_count, loaded.packet_count) == (10, 2, 4)
+    assert loaded.keyframe_at_or_before(0.15) == (0.0, 0)
+    assert loaded.keyframe_at_or_before(0.2) == (0.2, 500)
+    assert loaded.keyframe_at_or_after(0.05) == (0.2, 500)
+    assert loaded.keyframe_at_or_after(0.3) is None
+    assert list(loaded.gop_sizes()) == [2, 2]
+    loaded.close()
+    (tmp_path / "bad.kidx").write_bytes(b"MCPKIDX1" + b"\0" * 10)
+    assert KeyframeIndex.load(tmp_path / "bad.kidx") is None
+
+@pytest.mark.asyncio
+async def test_growing_file_is_extended_from_last_keyframe(tmp_path: Path, fake_ffprobe: Path):
+    source = tmp_path / "rec.webm"
+    # Larger than the fingerprinted head, so appending keeps the index key
+    source.write_bytes(WEBM + b"\0" * keyindex.HEAD_FINGERPRINT_BYTES)
+    fake_ffprobe.write_text(packet_lines(12))
+    index, status = await build_index(source)
+    assert status == "built"
+    assert (index.keyframe_count, index.packet_count) == (3, 12)
+
+    index, status = await build_index(source)
+    assert status == "cached"
+    index.close()
+
+    # The recording grows: ffprobe seeks back to the last keyframe (t=1.0) and rereads
+    with open(source, "ab") as f:
+        f.write(b"\0" * 100)
+    fake_ffprobe.write_text(packet_lines(23)[len(packet_lines(10)):])
+    index, status = await build_index(source)
+    assert status == "extended"
+    assert (index.keyframe_count, index.packet_count) == (5, 23)
+    assert list(index.keyframe_packets) == [0, 5, 10, 15, 20]
+    assert list(index.gop_sizes()) == [5, 5, 5, 5, 3]
+    calls = Path(str(fake_ffprobe) + ".calls").read_text().splitlines()
+    assert "-read_intervals 0.999999%" in calls[-1]
+
+@pytest.mark.asyncio
+async def test_rewritten_file_with_same_head_is_rebuilt(tmp_path: Path, fake_ffprobe: Path):
+    source = tmp_path / "rec.webm"
+    head = WEBM + b"\0" * keyindex.HEAD_FINGERPRINT_BYTES
+    source.write_bytes(head + b"\1" * 1000)
+    fake_ffprobe.write_text(packet_lines(12))
+    index, status = await build_index(source)
+    assert status == "built"
+    index.close()
+
+    # Same first 64 KiB and a larger size, but the indexed bytes were replaced
+    source.write_bytes(head + b"\2" * 2000)
+    fake_ffprobe.write_text(packet_lines(20))
+    index, status = await build_index(source)
+    assert status == "built"
+    assert index.packet_count == 20
+    assert "-read_intervals" not in Path(str(fake_ffprobe) + ".calls").read_text().splitlines()[-1]
+    index.close()
+
+@pytest.mark.asyncio
+async def test_index_keyframes_tool_looks_up_nearest_keyframes(tmp_path: Path, fake_ffprobe: Path):
+    source = tmp_path / "rec.webm"
+    source.write_bytes(WEBM)
+    fake_ffprobe.write_text(packet_lines(30, gop=10))
+    result = await index_keyframes_impl(str(source), seek_to=1.5)
+    assert result["success"] is True
+    assert result["keyframes"] == 3 and result["gop_max"] == 10
+    assert result["keyframe_before"] == {"time": 1.0, "byte_offset": 20000}
+    assert result["keyframe_after"] == {"time": 2.0, "byte_offset": 40000}
@@ -0,0 +1,61 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from mcp_video_converter.loadtest import parse_mix, percentile, run_load
+
+
+class FakeClient:
+    """Stands in for fastmcp.Client: fast lookups, plus a conversion that blocks the loop."""
+
+    calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def call_tool(self, tool, arguments):
+        FakeClient.calls.append((tool, arguments))
+        if tool == "convert_video":
+            time.sleep(0.03)  # Synchronous work on the loop, like a blocking handler
+            return [SimpleNamespace(text=json.dumps({"success": False, "error": "boom"}))]
+        await asyncio.sleep(0.001)
+        return [SimpleNamespace(text=json.dumps({"success": True}))]
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) is None
+
+def test_parse_mix():
+    assert parse_mix("convert_video=1,get_supported_formats=3") == {"convert_video": 1.0, "get_supported_formats": 3.0}
+    with pytest.raises(ValueError):
+        parse_mix("convert_video=0")
+
+@pytest.mark.asyncio
+async def test_run_load_reports_latency_errors_and_lag(tmp_path):
+    FakeClient.calls = []
+    media = [tmp_path / "a.webm"]
+    report = await run_load(
+        FakeClient, {"convert_video": 1, "get_supported_formats": 3}, concurrency=8, calls=80, media=media
+    )
+
+    assert report["calls"] == 80 == len(FakeClient.calls)
+    convert = report["tools"]["convert_video"]
+    lookups = report["tools"]["get_supported_formats"]
+    assert convert["error_rate"] == 1.0
+    assert lookups["errors"] == 0
+    assert convert["count"] + lookups["count"] == 80
+    assert lookups["p50_ms"] <= lookups["p95_ms"] <= lookups["p99_ms"] <= lookups["max_ms"]
+    # The blocking conversions show up as event-loop lag
+    assert report["loop_lag"]["max_ms"] >= 20
+    assert all(args == {"input_file_path": str(media[0]), "output_format": "mp4", "quality": "low"}
+               for tool, args in FakeClient.calls if tool == "convert_video")
@@ -0,0 +1,93 @@
+import base64
+import hashlib
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastmcp import Client
+from starlette.testclient import TestClient
+
+from mcp_video_converter import outputs
+from mcp_video_converter.outputs import (
+    describe_output,
+    prune_outputs,
+    read_output_chunk,
+    read_output_range,
+    register_output,
+)
+from mcp_video_converter.server import mcp_video_server
+
+
+@pytest.fixture
+def output_file(tmp_path: Path) -> Path:
+    path = tmp_path / "clip_converted.mp4"
+    path.write_bytes(os.urandom(10_000))
+    return path
+
+@pytest.fixture(autouse=True)
+def registry():
+    with patch.object(outputs, "OUTPUTS", {}), patch.object(outputs, "RESOURCE_CHUNK_BYTES", 4096):
+        yield
+
+@pytest.mark.asyncio
+async def test_describe_and_read_chunks(output_file: Path):
+    registered = register_output(output_file)
+    assert registered["resource_uri"] == f"video-output://{registered['output_id']}"
+    info = await describe_output(registered["output_id"])
+    assert info["size"] == 10_000
+    assert info["chunks"] == 3
+    assert info["mime_type"] == "video/mp4"
+    assert info["etag"] == f'"{hashlib.sha256(output_file.read_bytes()).hexdigest()[:32]}"'
+
+    chunks = [await read_output_chunk(registered["output_id"], i) for i in range(4)]
+    assert [len(c) for c in chunks] == [4096, 4096, 1808, 0]
+    assert b"".join(chunks) == output_file.read_bytes()
+    assert await read_output_range(registered["output_id"], 9_990, 100) == output_file.read_bytes()[9_990:]
+
+@pytest.mark.asyncio
+async def test_changed_file_gets_new_etag(output_file: Path):
+    output_id = register_output(output_file)["output_id"]
+    before = (await describe_output(output_id))["etag"]
+    output_file.write_bytes(os.urandom(5_000))
+    info = await describe_output(output_id)
+    assert info["size"] == 5_000
+    assert info["etag"] != before
+
+def test_retention_expires_and_optionally_deletes(output_file: Path):
+    output_id = register_output(output_file)["output_id"]
+    expires_at = outputs.OUTPUTS[output_id]["expires_at"]
+    prune_outputs(now=expires_at - 1)
+    assert output_id in outputs.OUTPUTS
+    with patch.object(outputs, "OUTPUT_RETENTION_DELETE", True):
+        prune_outputs(now=expires_at + 1)
+    assert output_id not in outputs.OUTPUTS
+    assert not output_file.exists()
+    with pytest.raises(ValueError):
+        outputs.get_output(output_id)
+
+@pytest.mark.asyncio
+async def test_outputs_readable_as_mcp_resources(output_file: Path):
+    output_id = register_output(output_file)["output_id"]
+    async with Client(mcp_video_server) as client:
+        (chunk,) = await client.read_resource(f"video-output://{output_id}/chunks/1")
+        assert base64.b64decode(chunk.blob) == output_file.read_bytes()[4096:8192]
+        (part,) = await client.read_resource(f"video-output://{output_id}/bytes/10/20")
+        assert base64.b64decode(part.blob) == output_file.read_bytes()[10:30]
+
+def test_http_route_serves_ranges_and_etags(output_file: Path):
+    output_id = register_output(output_file)["output_id"]
+    data = output_file.read_bytes()
+    with TestClient(mcp_video_server.sse_app()) as client:
+        full = client.get(f"/outputs/{output_id}")
+        assert full.status_code == 200
+        assert full.content == data
+        etag = full.headers["etag"]
+
+        ranged = client.get(f"/outputs/{output_id}", headers={"Range": "bytes=100-199"})
+        assert ranged.status_code == 206
+        assert ranged.content == data[100:200]
+        assert ranged.headers["content-range"] == "bytes 100-199/10000"
+
+        assert client.get(f"/outputs/{output_id}", headers={"If-None-Match": etag}).status_code == 304
+        assert client.get("/outputs/unknown").status_code == 404
@@ -0,0 +1,90 @@
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from mcp_video_converter.packaging import build_package_command, copy_compatible, plan_renditions
+from mcp_video_converter.tools import package_streaming_impl
+
+WEBM = b"\x1a\x45\xdf\xa3\x87\x42\x82\x84webm" + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff"
+
+
+def make_probe(video_codec="h264", audio_codec="aac", height=720):
+    streams = [{"codec_type": "video", "codec_name": video_codec, "width": height * 16 // 9, "height": height}]
+    if audio_codec:
+        streams.append({"codec_type": "audio", "codec_name": audio_codec})
+    return {"success": True, "format": {"duration": "10.0"}, "streams": streams}
+
+
+def test_plan_renditions_never_upscales():
+    assert [r["name"] for r in plan_renditions(720)] == ["720p", "480p", "360p"]
+    assert [r["name"] for r in plan_renditions(1080, ["360p", "1080p"])] == ["1080p", "360p"]
+    assert [r["name"] for r in plan_renditions(240)] == ["240p"]
+    with pytest.raises(ValueError):
+        plan_renditions(720, ["4k"])
+
+def test_copy_compatible_checks_segment_container():
+    assert copy_compatible(make_probe(), "ts") is None
+    assert "vp9" in copy_compatible(make_probe("vp9", "opus"), "ts")
+    assert copy_compatible(make_probe("vp9", "opus"), "fmp4") is None
+
+def test_hls_command_encodes_all_renditions_from_one_decode(tmp_path: Path):
+    renditions = plan_renditions(720)
+    command = build_package_command(tmp_path / "in.mp4", tmp_path / "out", "hls", renditions, True, "ts")
+    joined = " ".join(command)
+    assert command.count("-i") == 1
+    assert "[0:v]split=3[s0][s1][s2]" in command[command.index("-filter_complex") + 1]
+    assert "-b:v:1 1400k" in joined
+    assert "independent_segments+temp_file" in command
+    assert command[command.index("-var_stream_map") + 1] == "a:0,agroup:audio v:0,agroup:audio v:1,agroup:audio v:2,agroup:audio"
+    assert command[-1] == str(tmp_path / "out" / "stream_%v" / "playlist.m3u8")
+
+def test_dash_and_both_commands(tmp_path: Path):
+    renditions = plan_renditions(480)
+    dash = build_package_command(tmp_path / "in.mp4", tmp_path / "out", "dash", renditions, False)
+    assert dash[dash.index("-f") + 1] == "dash"
+    assert dash[dash.index("-adaptation_sets") + 1] == "id=0,streams=v"
+    assert "-hls_playlist" not in dash
+    both = build_package_command(tmp_path / "in.mp4", tmp_path / "out", "both", renditions, True)
+    assert both[both.index("-hls_playlist") + 1] == "1"
+    assert both[-1].endswith("manifest.mpd")
+
+def test_copy_command_skips_encoding(tmp_path: Path):
+    command = build_package_command(tmp_path / "in.mp4", tmp_path / "out", "hls", [{"name": "source"}], True, copy=True)
+    assert "-filter_complex" not in command
+    assert command[command.index("-c") + 1] == "copy"
+    assert command[command.index("-var_stream_map") + 1] == "a:0,agroup:audio v:0,agroup:audio"
+
+@pytest.mark.asyncio
+async def test_package_streaming_runs_one_ffmpeg_job(tmp_path: Path):
+    source = tmp_path / "in.webm"
+    source.write_bytes(WEBM)
+    commands = []
+
+    async def fake_run(command, apply_policy=None, stall_timeout=None, on_progress=None):
+        commands.append(command)
+        for i in range(2):
+            segment_dir = tmp_path / "converted_videos" / "in_hls" / f"stream_{i}"
+            segment_dir.mkdir(parents=True, exist_ok=True)
+            (segment_dir / "segment_00000.ts").write_bytes(b"ts")
+        return {"returncode": 0, "stderr": b"", "stalled": False, "progress": {}, "resource_usage": {}}
+
+    with patch("mcp_video_converter.tools.probe_media", AsyncMock(return_value=make_probe(height=480))), \
+            patch("mcp_video_converter.packaging.run_supervised", side_effect=fake_run):
+        result = await package_streaming_impl(str(source), "hls")
+
+    assert result["success"] is True
+    assert result["renditions"] == ["480p", "360p"]
+    assert result["segments"] == 2
+    assert result["hls_master_playlist"].endswith("in_hls/master.m3u8")
+    assert len(commands) == 1
+    assert "-threads" in commands[0]
+
+@pytest.mark.asyncio
+async def test_package_streaming_rejects_copy_of_incompatible_codecs(tmp_path: Path):
+    source = tmp_path / "in.webm"
+    source.write_bytes(WEBM)
+    with patch("mcp_video_converter.tools.probe_media", AsyncMock(return_value=make_probe("vp9", "opus"))):
+        result = await package_streaming_impl(str(source), "hls", copy=True)
+    assert result["success"] is False
+    assert "stream copy" in result["error"]
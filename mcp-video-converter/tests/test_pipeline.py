@@ -0,0 +1,90 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from mcp_video_converter import pipeline
+from mcp_video_converter.pipeline import build_pipeline_command, plan_pipeline, validate_pipeline
+from mcp_video_converter.tools import run_pipeline_impl
+
+WEBM = b"\x1a\x45\xdf\xa3\x87\x42\x82\x84webm" + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff"
+
+PIPELINE = [
+    {"op": "trim", "start": 2, "end": 12.5},
+    {"op": "crop", "width": 640, "height": 360},
+    {"op": "scale", "height": 240},
+    {"op": "fps", "fps": 15},
+    {"op": "rotate", "degrees": 90},
+    {"op": "audio_resample", "sample_rate": 22050},
+    {"op": "format", "format": "mp4", "quality": "low"},
+]
+
+
+def test_pipeline_compiles_to_one_command(tmp_path: Path):
+    with patch.object(pipeline, "_PLAN_CACHE", {}):
+        plan, cached = plan_pipeline(PIPELINE)
+    assert cached is False
+    command = build_pipeline_command(plan, tmp_path / "in.webm", tmp_path / "out.mp4")
+    assert command[:6] == ["ffmpeg", "-y", "-ss", "2", "-to", "12.5"]
+    assert command.count("-i") == 1
+    assert command[command.index("-vf") + 1] == "crop=640:360,scale=-2:240,fps=15,transpose=1"
+    assert command[command.index("-af") + 1] == "aresample=22050"
+    assert command[command.index("-crf") + 1] == "28"
+    assert command[-1] == str(tmp_path / "out.mp4")
+
+def test_audio_only_output_drops_video_filters(tmp_path: Path):
+    with patch.object(pipeline, "_PLAN_CACHE", {}):
+        plan, _ = plan_pipeline([{"op": "scale", "width": 320}, {"op": "format", "format": "mp3", "quality": "high"}])
+    assert "-vn" in plan["output_args"]
+    assert "-vf" not in plan["output_args"]
+
+def test_repeated_pipeline_reuses_plan():
+    with patch.object(pipeline, "_PLAN_CACHE", {}):
+        first, cached = plan_pipeline(PIPELINE)
+        second, cached_again = plan_pipeline(PIPELINE)
+    assert cached is False and cached_again is True
+    assert first is second
+
+def test_opus_outputs_accept_only_opus_sample_rates():
+    plan = validate_pipeline([{"op": "audio_resample", "sample_rate": 24000}, {"op": "format", "format": "webm"}])
+    assert plan[0]["sample_rate"] == 24000
+    # Vorbis in Ogg takes any rate
+    validate_pipeline([{"op": "audio_resample", "sample_rate": 44100}, {"op": "format", "format": "ogg"}])
+
+@pytest.mark.parametrize("operations, message", [
+    ([], "no operations"),
+    ([{"op": "blur"}, {"op": "format", "format": "mp4"}], "unknown op"),
+    ([{"op": "format", "format": "mp4"}, {"op": "fps", "fps": 30}], "format must be the last"),
+    ([{"op": "fps", "fps": 30}], "must end with a format"),
+    ([{"op": "trim", "start": 5, "end": 2}, {"op": "format", "format": "mp4"}], "'end' must be after"),
+    ([{"op": "rotate", "degrees": 45}, {"op": "format", "format": "mp4"}], "degrees"),
+    ([{"op": "crop", "width": 10, "height": 10, "x": 3}, {"op": "format", "format": "mp4"}], "both 'x' and 'y'"),
+    ([{"op": "scale", "width": "wide"}, {"op": "format", "format": "mp4"}], "must be a number"),
+    ([{"op": "fps", "fps": 30, "speed": 2}, {"op": "format", "format": "mp4"}], "unexpected"),
+    ([{"op": "audio_resample", "sample_rate": 44100}, {"op": "format", "format": "webm"}], "only encodes at"),
+])
+def test_invalid_pipelines_are_rejected(operations, message):
+    with pytest.raises(ValueError, match=message):
+        validate_pipeline(operations)
+
+@pytest.mark.asyncio
+async def test_run_pipeline_writes_only_the_final_output(tmp_path: Path):
+    source = tmp_path / "in.webm"
+    source.write_bytes(WEBM)
+    commands = []
+
+    async def fake_run(command, apply_policy=None, stall_timeout=None, on_progress=None):
+        commands.append(command)
+        Path(command[-1]).write_bytes(b"out")
+        return {"returncode": 0, "stderr": b"", "stalled": False, "progress": {}, "resource_usage": {}}
+
+    with patch("mcp_video_converter.pipeline.run_supervised", side_effect=fake_run):
+        result = await run_pipeline_impl(str(source), PIPELINE)
+        invalid = await run_pipeline_impl(str(source), [{"op": "fps", "fps": 30}])
+
+    assert result["success"] is True
+    assert result["output_file_path"].endswith("converted_videos/in_pipeline.mp4")
+    assert len(commands) == 1
+    assert [p.name for p in (tmp_path / "converted_videos").iterdir()] == ["in_pipeline.mp4"]
+    assert invalid["success"] is False
+    assert "Invalid pipeline" in invalid["error"]
@@ -0,0 +1,96 @@
+import asyncio
+import struct
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from mcp_video_converter.preview import PREVIEW_THREADS, build_preview_command, preview_output_args, preview_path_for
+from mcp_video_converter.tools import convert_video_impl, get_job_status_impl
+
+PROBE = {
+    "success": True,
+    "format": {"duration": "60"},
+    "streams": [{"codec_type": "video", "width": 1920, "height": 1080, "avg_frame_rate": "30/1"}],
+}
+
+
+def box(kind: bytes, payload: bytes = b"") -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+@pytest.fixture
+def source(tmp_path: Path) -> Path:
+    path = tmp_path / "clip.webm"
+    path.write_bytes(
+        b"\x1a\x45\xdf\xa3\x87\x42\x82\x84webm" + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff"
+        + b"x" * 1000
+    )
+    return path
+
+def test_preview_output_args_fragmented_and_cut():
+    path = Path("/out/clip_converted_preview.mp4")
+    args = preview_output_args(path, 10)
+    assert args[-1] == str(path)
+    assert args[args.index("-preset") + 1] == "ultrafast"
+    assert args[args.index("-t") + 1] == "10"
+    assert args[args.index("-movflags") + 1] == "+frag_keyframe+empty_moov+default_base_moof"
+    assert "-t" not in preview_output_args(path)
+    assert preview_path_for(Path("/out/clip_converted.webm")) == Path("/out/clip_converted_preview.mp4")
+
+def test_preview_runs_as_its_own_command():
+    preview = Path("/out/clip_converted_preview.mp4")
+    command = build_preview_command(Path("/in/clip.mkv"), preview, 5)
+    assert command[:4] == ["ffmpeg", "-y", "-i", "/in/clip.mkv"]
+    assert command.count("-i") == 1
+    assert command[command.index("-threads") + 1] == str(PREVIEW_THREADS)
+    assert command[-1] == str(preview)
+
+@pytest.mark.asyncio
+async def test_convert_video_returns_with_preview_and_finishes_in_background(source: Path):
+    release = asyncio.Event()
+    preview_commands = []
+
+    async def fake_run_supervised(command, apply_policy=None, on_progress=None):
+        # The preview process finishes on its own while the main encode is still running
+        preview_commands.append(command)
+        Path(command[-1]).write_bytes(box(b"ftyp", b"isom") + box(b"moov") + box(b"moof") + box(b"mdat", b"\1" * 32))
+        on_progress({"out_time_us": "1000000"})
+        return {"returncode": 0, "stdout": b"", "stderr": b"", "stalled": False, "resource_usage": {}}
+
+    async def fake_run(input_path, output_path, output_format, encoding_args, policy, video=None, on_progress=None):
+        await release.wait()
+        output_path.write_bytes(b"converted")
+        return {"returncode": 0, "stderr": b"", "stalled": False, "resource_usage": {}}
+
+    fake_engine = AsyncMock()
+    fake_engine.name = "subprocess"
+    fake_engine.run = fake_run
+    with patch("mcp_video_converter.tools.select_engine", lambda *args: fake_engine), \
+            patch("mcp_video_converter.tools.run_supervised", fake_run_supervised), \
+            patch("mcp_video_converter.tools.probe_media", AsyncMock(return_value=PROBE)):
+        result = await convert_video_impl(str(source), "webm", preview=True, preview_seconds=5, job_id="preview-1")
+        assert result["status"] == "running"
+        assert result["preview_ready"] is True
+        assert result["preview_file_path"].endswith("clip_converted_preview.mp4")
+        status = (await get_job_status_impl("preview-1"))["job"]
+        assert status["status"] == "running"
+        assert status["preview_ready_seconds"] is not None
+
+        release.set()
+        for _ in range(100):
+            if (await get_job_status_impl("preview-1"))["job"]["status"] != "running":
+                break
+            await asyncio.sleep(0.01)
+    status = (await get_job_status_impl("preview-1"))["job"]
+    assert status["status"] == "succeeded"
+    assert preview_commands[0][-1] == result["preview_file_path"]
+    assert Path(status["output_file_path"]).read_bytes() == b"converted"
+
+@pytest.mark.asyncio
+async def test_convert_video_preview_rejects_audio_outputs(source: Path):
+    result = await convert_video_impl(str(source), "mp3", preview=True)
+    assert result["success"] is False
+    assert "Previews" in result["error"]
+    result = await convert_video_impl(str(source), "mp4", preview_seconds=5)
+    assert result["success"] is False
@@ -0,0 +1,83 @@
+import asyncio
+import inspect
+import pstats
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from mcp_video_converter import profiling
+from mcp_video_converter.profiling import LoopLagMonitor, Profiler, profiled
+from mcp_video_converter.tools import set_profiling_impl
+
+
+async def sample_tool(path: str, quality: str = "high") -> dict:
+    time.sleep(0.03)
+    return {"path": path, "quality": quality}
+
+
+def block_loop() -> None:
+    time.sleep(0.15)
+
+@pytest.mark.asyncio
+async def test_profiled_passes_through_when_off(tmp_path: Path):
+    profiler = Profiler()
+    profiler.configure(None, directory=str(tmp_path))
+    wrapped = profiled(sample_tool)
+    assert inspect.signature(wrapped) == inspect.signature(sample_tool)
+    with patch.object(profiling, "PROFILER", profiler):
+        assert await wrapped("a.mp4", quality="low") == {"path": "a.mp4", "quality": "low"}
+    assert profiler.calls == 0
+    assert list(tmp_path.iterdir()) == []
+
+@pytest.mark.asyncio
+async def test_cprofile_every_nth_call(tmp_path: Path):
+    profiler = Profiler()
+    profiler.configure("cprofile", every=2, directory=str(tmp_path))
+    wrapped = profiled(sample_tool)
+    with patch.object(profiling, "PROFILER", profiler):
+        for _ in range(4):
+            await wrapped("a.mp4")
+    files = sorted(tmp_path.glob("*.pstats"))
+    assert len(files) == 2
+    assert profiler.status()["profiled"] == 2
+    stats = pstats.Stats(str(files[0]))
+    assert any(func[2] == "sample_tool" for func in stats.stats)
+
+@pytest.mark.asyncio
+async def test_sample_mode_writes_collapsed_stacks(tmp_path: Path):
+    profiler = Profiler()
+    profiler.configure("sample", directory=str(tmp_path))
+    with patch.object(profiling, "PROFILER", profiler):
+        await profiled(sample_tool)("a.mp4")
+    (path,) = tmp_path.glob("*.collapsed")
+    lines = path.read_text().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert "sample_tool" in stack and int(count) > 0
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor_records_blocking_callback():
+    monitor = LoopLagMonitor(0.05)
+    monitor.start(asyncio.get_running_loop())
+    try:
+        await asyncio.sleep(0.06)
+        asyncio.get_running_loop().call_soon(block_loop)
+        await asyncio.sleep(0.2)
+    finally:
+        monitor.stop()
+    assert monitor.events
+    event = monitor.events[0]
+    assert event["lag_ms"] >= 50
+    assert "block_loop" in event["stack"]
+
+@pytest.mark.asyncio
+async def test_set_profiling_validates_mode(tmp_path: Path):
+    with patch.object(profiling, "PROFILER", Profiler()), \
+            patch("mcp_video_converter.tools.PROFILER", profiling.PROFILER):
+        result = await set_profiling_impl("tracing")
+        assert result["success"] is False
+        result = await set_profiling_impl("sample", every=5, directory=str(tmp_path))
+        assert result["profiling"]["mode"] == "sample"
+        assert (await set_profiling_impl("off"))["profiling"]["mode"] == "off"
@@ -0,0 +1,47 @@
+import math
+
+import pytest
+
+from mcp_video_converter.encoding import build_encoding_args
+from mcp_video_converter.rate_control import (
+    interpolate_crf,
+    interpolate_value,
+    sample_windows,
+    SAMPLE_SECONDS,
+    SAMPLE_WINDOWS,
+)
+
+
+def test_interpolate_crf_size_in_log_space():
+    # Size halves every 6 CRF steps, so log(size) is linear in CRF
+    points = [(20, 8_000_000), (26, 4_000_000), (32, 2_000_000)]
+    crf = interpolate_crf(points, 3_000_000, log_scale=True)
+    assert 26 < crf < 32
+    assert math.isclose(interpolate_value(points, crf, log_scale=True), 3_000_000, rel_tol=1e-6)
+
+def test_interpolate_crf_extrapolates_beyond_samples():
+    points = [(20, 8_000_000), (26, 4_000_000)]
+    assert interpolate_crf(points, 1_000_000, log_scale=True) == pytest.approx(38)
+    assert interpolate_crf(points, 16_000_000, log_scale=True) == pytest.approx(14)
+
+def test_interpolate_crf_ssim():
+    points = [(20, 0.98), (28, 0.95), (36, 0.90)]
+    assert interpolate_crf(points, 0.95) == pytest.approx(28)
+    assert 28 < interpolate_crf(points, 0.93) < 36
+
+def test_sample_windows_short_input_uses_whole_file():
+    assert sample_windows(3.0) == [(0.0, 3.0)]
+
+def test_sample_windows_spread_through_input():
+    windows = sample_windows(100.0)
+    assert len(windows) == SAMPLE_WINDOWS
+    assert all(length == SAMPLE_SECONDS for _, length in windows)
+    starts = [start for start, _ in windows]
+    assert starts == sorted(starts)
+    assert starts[-1] + SAMPLE_SECONDS <= 100.0
+
+def test_build_encoding_args_crf_overrides_quality():
+    assert build_encoding_args("mp4", "high") == ["-crf", "18"]
+    assert build_encoding_args("mp4", "high", crf=30) == ["-crf", "30"]
+    assert build_encoding_args("webm", None, 24, crf=40) == ["-crf", "40", "-b:v", "0", "-r", "24"]
+    assert build_encoding_args("mp3", "low") == ["-b:a", "128k"]
@@ -0,0 +1,212 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from mcp_video_converter import remote
+from mcp_video_converter.remote import BlockCache, RemoteInputError, parse_range
+from mcp_video_converter.tools import convert_video_impl
+
+BLOCK = 4096
+
+
+class Origin:
+    """Stand-in object store: serves one payload with single-range support and counts requests."""
+
+    def __init__(self, data: bytes, ranges: bool = True):
+        self.data = data
+        self.etag = '"v1"'
+        self.last_modified = None
+        self.ranges = ranges
+        self.requests = []
+        self.if_ranges = []
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                origin.requests.append(self.headers.get("Range"))
+                data = origin.data
+                byte_range = parse_range(self.headers.get("Range"), len(data)) if origin.ranges else None
+                if_range = self.headers.get("If-Range")
+                origin.if_ranges.append(if_range)
+                if if_range is not None and if_range not in (origin.etag, origin.last_modified):
+                    byte_range = None
+                if byte_range:
+                    start, end = byte_range
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+                else:
+                    start, end = 0, len(data) - 1
+                    self.send_response(200)
+                if origin.etag:
+                    self.send_header("ETag", origin.etag)
+                if origin.last_modified:
+                    self.send_header("Last-Modified", origin.last_modified)
+                self.send_header("Content-Length", str(end - start + 1))
+                self.end_headers()
+                self.wfile.write(data[start:end + 1])
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/media/clip.mp4"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def origin():
+    server = Origin(os.urandom(BLOCK * 5 + 123))
+    yield server
+    server.close()
+
+async def read(url: str, headers=None) -> httpx.Response:
+    async with httpx.AsyncClient() as client:
+        return await client.get(url, headers=headers or {})
+
+def test_parse_range():
+    assert parse_range("bytes=10-19", 100) == (10, 19)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-5", 100) == (95, 99)
+    assert parse_range(None, 100) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=100-", 100)
+
+@pytest.mark.asyncio
+async def test_ranged_reads_go_through_the_block_cache(tmp_path: Path, origin: Origin):
+    cache = BlockCache(str(tmp_path), block_bytes=BLOCK, max_bytes=1 << 20)
+    await cache.start()
+    try:
+        source = await cache.open(origin.url)
+        assert source["stem"] == "clip"
+        assert source["size"] == len(origin.data)
+
+        response = await read(source["url"], {"Range": "bytes=5000-9000"})
+        assert response.status_code == 206
+        assert response.content == origin.data[5000:9001]
+        assert response.headers["content-range"] == f"bytes 5000-9000/{len(origin.data)}"
+        full = await read(source["url"])
+        assert full.content == origin.data
+        fetched = cache.stats["origin_fetches"]
+        assert fetched == 6
+
+        # Repeated reads, and a new cache over the same directory, never refetch
+        assert (await read(source["url"], {"Range": "bytes=0-99"})).content == origin.data[:100]
+        assert cache.stats["origin_fetches"] == fetched
+    finally:
+        await cache.close()
+
+    origin.requests.clear()
+    second = BlockCache(str(tmp_path), block_bytes=BLOCK, max_bytes=1 << 20)
+    await second.start()
+    try:
+        source = await second.open(origin.url)
+        assert (await read(source["url"])).content == origin.data
+        assert second.stats["origin_fetches"] == 0
+        assert second.stats["disk_hits"] == 6
+        # Only the size check went to the origin
+        assert origin.requests == ["bytes=0-0"]
+    finally:
+        await second.close()
+
+@pytest.mark.asyncio
+async def test_changed_origin_gets_a_new_cache_key(tmp_path: Path, origin: Origin):
+    cache = BlockCache(str(tmp_path), block_bytes=BLOCK, max_bytes=1 << 20)
+    await cache.start()
+    try:
+        first = await cache.open(origin.url)
+        await read(first["url"])
+        origin.data, origin.etag = os.urandom(len(origin.data)), '"v2"'
+        second = await cache.open(origin.url)
+        assert second["key"] != first["key"]
+        assert (await read(second["url"])).content == origin.data
+    finally:
+        await cache.close()
+
+@pytest.mark.asyncio
+async def test_if_range_falls_back_to_last_modified(tmp_path: Path, origin: Origin):
+    origin.etag, origin.last_modified = 'W/"v1"', "Mon, 19 Oct 2026 08:00:00 GMT"
+    cache = BlockCache(str(tmp_path), block_bytes=BLOCK, max_bytes=1 << 20)
+    await cache.start()
+    try:
+        source = await cache.open(origin.url)
+        assert (await read(source["url"])).content == origin.data
+    finally:
+        await cache.close()
+    # The weak ETag can't be used in If-Range, so every block fetch sends the date
+    assert origin.if_ranges[1:] == [origin.last_modified] * 6
+
+@pytest.mark.asyncio
+async def test_origin_without_validators_is_not_cached_on_disk(tmp_path: Path, origin: Origin):
+    origin.etag = None
+    for _ in range(2):
+        cache = BlockCache(str(tmp_path), block_bytes=BLOCK, max_bytes=1 << 20)
+        await cache.start()
+        try:
+            source = await cache.open(origin.url)
+            assert (await read(source["url"])).content == origin.data
+            assert cache.stats["origin_fetches"] == 6
+            assert cache.stats["disk_hits"] == 0
+        finally:
+            await cache.close()
+    assert not list(tmp_path.glob("*/*.blk"))
+
+@pytest.mark.asyncio
+async def test_origin_without_ranges_is_rejected(tmp_path: Path):
+    server = Origin(b"x" * 100, ranges=False)
+    cache = BlockCache(str(tmp_path), block_bytes=BLOCK)
+    await cache.start()
+    try:
+        with pytest.raises(RemoteInputError):
+            await cache.open(server.url)
+    finally:
+        await cache.close()
+        server.close()
+
+@pytest.mark.asyncio
+async def test_cache_evicts_down_to_budget(tmp_path: Path, origin: Origin):
+    cache = BlockCache(str(tmp_path), block_bytes=BLOCK, max_bytes=BLOCK * 3)
+    await cache.start()
+    try:
+        source = await cache.open(origin.url)
+        assert (await read(source["url"])).content == origin.data
+        stored = sum(p.stat().st_size for p in tmp_path.glob("*/*.blk"))
+        assert stored <= BLOCK * 3
+    finally:
+        await cache.close()
+
+@pytest.mark.asyncio
+async def test_convert_video_reads_remote_input_through_cache(tmp_path: Path, origin: Origin):
+    seen = {}
+
+    async def fake_run(input_path, output_path, output_format, encoding_args, policy, video=None, on_progress=None):
+        seen["input"] = input_path
+        output_path.write_bytes(b"converted")
+        return {"returncode": 0, "stderr": b"", "stalled": False, "resource_usage": {}}
+
+    fake_engine = AsyncMock()
+    fake_engine.name = "subprocess"
+    fake_engine.run = fake_run
+    probe = {"success": True, "format": {"duration": "3"}, "streams": []}
+    with patch.object(remote, "_CACHE", None), patch.object(remote, "REMOTE_CACHE_DIR", str(tmp_path / "cache")), \
+            patch("mcp_video_converter.tools.REMOTE_OUTPUT_DIR", str(tmp_path / "out")), \
+            patch("mcp_video_converter.tools.SUBPROCESS_ENGINE", fake_engine), \
+            patch("mcp_video_converter.tools.probe_media", AsyncMock(return_value=probe)):
+        result = await convert_video_impl(origin.url, "webm")
+        await remote._CACHE.close()
+    assert result["success"] is True
+    assert result["output_file_path"] == str(tmp_path / "out" / "clip_converted.webm")
+    assert seen["input"].startswith("http://127.0.0.1:")
+    assert seen["input"].endswith("/clip.mp4")
+
+    result = await convert_video_impl(origin.url, "webm", resumable=True)
+    assert result["success"] is False
@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+
+from mcp_video_converter import resources
+from mcp_video_converter.resources import accumulate_usage, job_slot, make_policy_applier, threads_per_job
+from mcp_video_converter.supervisor import run_supervised
+
+
+def test_threads_per_job_uses_policy_override():
+    assert threads_per_job({"threads": 3}) == 3
+    assert threads_per_job({"threads": None}) == max(1, resources.CPU_COUNT // resources.MAX_CONCURRENT_JOBS)
+
+def test_policy_overrides_from_environment(monkeypatch):
+    monkeypatch.setenv("MCP_RESOURCE_POLICIES", '{"low": {"nice": 19, "memory_limit_mb": 512}}')
+    policies = resources.load_resource_policies()
+    assert policies["low"]["nice"] == 19
+    assert policies["low"]["memory_limit_mb"] == 512
+    assert policies["high"]["nice"] == resources.DEFAULT_RESOURCE_POLICIES["high"]["nice"]
+
+def test_invalid_environment_falls_back_to_defaults(monkeypatch, caplog):
+    monkeypatch.setenv("MCP_RESOURCE_POLICIES", "bad")
+    monkeypatch.setenv("MCP_MAX_CONCURRENT_JOBS", "auto")
+    assert resources.load_resource_policies() == resources.DEFAULT_RESOURCE_POLICIES
+    assert resources._max_concurrent_jobs() == max(1, resources.CPU_COUNT // 2)
+    assert "MCP_RESOURCE_POLICIES" in caplog.text
+    assert "MCP_MAX_CONCURRENT_JOBS" in caplog.text
+
+def test_accumulate_usage_sums_runs():
+    totals = {}
+    accumulate_usage(totals, {"cpu_seconds": 1.5, "wall_seconds": 2.0, "peak_rss_bytes": 100})
+    accumulate_usage(totals, {"cpu_seconds": 0.5, "wall_seconds": 1.0, "peak_rss_bytes": 300})
+    assert totals == {"jobs": 2, "cpu_seconds": 2.0, "wall_seconds": 3.0, "peak_rss_bytes": 300}
+
+# Accepts the "-progress <path> -nostats" options run_supervised adds, then burns memory and CPU
+FAKE_JOB = """
+import os, resource, time
+data = bytearray(64 * 1024 * 1024)
+end = time.process_time() + 0.3
+while time.process_time() < end:
+    pass
+print(os.nice(0), resource.getrlimit(resource.RLIMIT_AS)[0], resource.getrlimit(resource.RLIMIT_CPU)[0])
+"""
+
+@pytest.mark.skipif(os.name != "posix" or not hasattr(os, "wait4"), reason="needs POSIX and wait4")
+@pytest.mark.asyncio
+async def test_policy_applies_limits_and_usage_comes_from_rusage(tmp_path):
+    script = tmp_path / "fake_job"
+    script.write_text(f"#!{sys.executable}\n{FAKE_JOB}")
+    script.chmod(0o755)
+
+    policy = {"nice": 7, "memory_limit_mb": 2048, "cpu_time_limit_s": 30, "ionice_class": "idle"}
+    async with job_slot(policy) as slot:
+        run = await run_supervised([str(script)], apply_policy=make_policy_applier(policy, slot["cpus"]))
+
+    nice, address_space, cpu = run["stdout"].decode().split()
+    assert int(nice) >= 7
+    assert int(address_space) == 2048 * 1024 * 1024
+    assert int(cpu) == 30
+    usage = run["resource_usage"]
+    # Exact figures from wait4 rusage, not a stale /proc sample
+    assert usage["peak_rss_bytes"] >= 64 * 1024 * 1024
+    assert usage["cpu_seconds"] >= 0.3
+    assert usage["wall_seconds"] > 0
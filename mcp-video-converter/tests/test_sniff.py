@@ -0,0 +1,128 @@
+import struct
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from mcp_video_converter.sniff import identify, identify_non_media, plausible_media, remux_eligible, sniff_file
+from mcp_video_converter.tools import convert_video_impl
+
+
+def box(box_type: bytes, payload: bytes = b"") -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+FTYP = box(b"ftyp", b"isom\x00\x00\x02\x00isomiso2")
+
+
+@pytest.mark.parametrize("head, container", [
+    (FTYP, "mp4"),
+    (box(b"ftyp", b"qt  \x00\x00\x00\x00"), "mov"),
+    (b"\x1a\x45\xdf\xa3\x87\x42\x82\x84webm", "webm"),
+    (b"\x1a\x45\xdf\xa3\x8b\x42\x82\x88matroska", "matroska"),
+    (b"RIFF\x00\x00\x00\x00AVI LIST", "avi"),
+    (b"RIFF\x00\x00\x00\x00WAVEfmt ", "wav"),
+    (b"OggS\x00\x02", "ogg"),
+    (b"FLV\x01\x05", "flv"),
+    (b"GIF89a", "gif"),
+    (b"ID3\x04", "mp3"),
+    (b"\xff\xfd\x90\x04", "mp3"),  # MPEG-1 layer II
+    (b"YUV4MPEG2 W320 H240 F25:1", "y4m"),
+    ((b"\x00\x00\x00\x00\x47" + b"\x00" * 187) * 3, "mpegts"),  # M2TS
+    (b"%PDF-1.7", None),
+    (b"hello world", None),
+])
+def test_identify_magic_bytes(head: bytes, container):
+    assert identify(head) == container
+
+def test_mp4_with_moov_is_complete_and_reports_faststart(tmp_path: Path):
+    path = tmp_path / "ok.mp4"
+    path.write_bytes(FTYP + box(b"moov", b"\x00" * 32) + box(b"mdat", b"\x00" * 100))
+    result = sniff_file(path)
+    assert result["container"] == "mp4"
+    assert result["truncated"] is False
+    assert result["faststart"] is True
+    assert result["boxes"] == ["ftyp", "moov", "mdat"]
+
+def test_mp4_missing_moov_is_truncated(tmp_path: Path):
+    path = tmp_path / "cut.mp4"
+    # An interrupted recording: mdat declared larger than what was written, no moov
+    path.write_bytes(FTYP + struct.pack(">I4s", 10_000, b"mdat") + b"\x00" * 100)
+    result = sniff_file(path)
+    assert result["truncated"] is True
+    assert "past end of file" in result["reason"]
+
+    path.write_bytes(FTYP + box(b"mdat", b"\x00" * 100))
+    assert sniff_file(path)["reason"] == "missing moov atom"
+
+def test_webm_segment_size_checked(tmp_path: Path):
+    header = b"\x1a\x45\xdf\xa3\x87\x42\x82\x84webm"
+    path = tmp_path / "rec.webm"
+    path.write_bytes(header + b"\x18\x53\x80\x67\x84" + b"\x00" * 4)
+    assert sniff_file(path)["truncated"] is False
+    path.write_bytes(header + b"\x18\x53\x80\x67\x90" + b"\x00" * 4)
+    assert sniff_file(path)["truncated"] is True
+    # Unknown-size segments are live recordings, not truncation
+    path.write_bytes(header + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff" + b"\x00" * 4)
+    assert sniff_file(path) == {"container": "webm", "media_kind": "video", "size": 28, "truncated": False, "live": True}
+
+def test_image_trailers(tmp_path: Path):
+    png = tmp_path / "a.png"
+    png.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\x00" * 20 + b"\x00\x00\x00\x00IEND\xaeB`\x82")
+    assert sniff_file(png)["truncated"] is False
+    png.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\x00" * 20)
+    assert sniff_file(png)["truncated"] is True
+
+def test_jpeg_with_appended_video_is_complete(tmp_path: Path):
+    motion_photo = tmp_path / "PXL_0001.MP.jpg"
+    jpeg = b"\xff\xd8\xff\xe1" + b"\x00" * 100 + b"\xff\xd9"
+    motion_photo.write_bytes(jpeg + FTYP + box(b"moov") + box(b"mdat", b"\x01" * 100_000))
+    assert sniff_file(motion_photo)["truncated"] is False
+    motion_photo.write_bytes(jpeg[:-2])
+    assert sniff_file(motion_photo)["truncated"] is True
+
+def test_only_known_non_media_is_rejected():
+    assert identify_non_media(b"%PDF-1.7\n") == "pdf"
+    assert identify_non_media("plain text, caf\u00e9".encode()) == "text"
+    assert identify_non_media(b"\x00\x01\x02 raw stream \xfe") is None
+    assert not plausible_media({"container": None, "media_kind": None, "non_media": "zip"})
+    assert plausible_media({"container": None, "media_kind": None, "non_media": None}, ("video",))
+    assert not plausible_media({"container": "mp3", "media_kind": "audio"}, ("video",))
+
+def test_remux_eligibility():
+    assert remux_eligible({"container": "mov", "truncated": False}, "mp4")
+    assert not remux_eligible({"container": "avi", "truncated": False}, "mp4")
+    assert not remux_eligible({"container": "mp4", "truncated": True}, "mp4")
+
+@pytest.mark.asyncio
+async def test_convert_video_rejects_before_spawning(tmp_path: Path):
+    text = tmp_path / "notes.mp4"
+    text.write_text("definitely not a video")
+    result = await convert_video_impl(str(text), "webm")
+    assert result["success"] is False
+    assert "not a recognized media file" in result["error"]
+
+    pdf = tmp_path / "scan.mp4"
+    pdf.write_bytes(b"%PDF-1.7\n" + bytes(range(256)))
+    assert "(pdf)" in (await convert_video_impl(str(pdf), "webm"))["error"]
+
+    cut = tmp_path / "cut.mp4"
+    cut.write_bytes(FTYP + box(b"mdat", b"\x00" * 10))
+    result = await convert_video_impl(str(cut), "webm")
+    assert "missing moov atom" in result["error"]
+
+@pytest.mark.asyncio
+async def test_unrecognized_container_is_left_to_ffmpeg(tmp_path: Path):
+    raw = tmp_path / "capture.h264"
+    raw.write_bytes(b"\x00\x00\x00\x01\x67\x64\x00\x1f" + bytes(range(256)) * 4)
+
+    async def fake_run(input_path, output_path, output_format, encoding_args, policy, video=None, on_progress=None):
+        output_path.write_bytes(b"converted")
+        return {"returncode": 0, "stderr": b"", "stalled": False, "resource_usage": {}}
+
+    engine = AsyncMock()
+    engine.name = "subprocess"
+    engine.run = fake_run
+    with patch("mcp_video_converter.tools.select_engine", return_value=engine), \
+            patch("mcp_video_converter.tools.SUBPROCESS_ENGINE", engine):
+        result = await convert_video_impl(str(raw), "mp4")
+    assert result["success"] is True, result
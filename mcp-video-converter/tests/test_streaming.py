@@ -0,0 +1,96 @@
+import struct
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from mcp_video_converter import jobs
+from mcp_video_converter.jobs import create_job, finish_job, get_job, list_jobs
+from mcp_video_converter.streaming import FragmentCounter, streaming_args
+from mcp_video_converter.tools import convert_video_impl, get_job_status_impl
+
+
+def box(kind: bytes, payload: bytes = b"") -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def ebml_element(element_id: bytes, payload: bytes) -> bytes:
+    return element_id + bytes([0x80 | len(payload)]) + payload
+
+
+def test_streaming_args_fragmented_mp4_and_webm():
+    mp4 = streaming_args("mp4", "fragmented", 2)
+    assert mp4[mp4.index("-movflags") + 1] == "+frag_keyframe+empty_moov+default_base_moof"
+    assert mp4[mp4.index("-frag_duration") + 1] == "2000000"
+    assert "expr:gte(t,n_forced*2)" in mp4
+    webm = streaming_args("webm", "fragmented", 2)
+    assert webm[webm.index("-cluster_time_limit") + 1] == "2000"
+    assert streaming_args("mp4", "faststart") == ["-movflags", "+faststart"]
+
+def test_streaming_args_rejects_unsupported_combinations():
+    with pytest.raises(ValueError):
+        streaming_args("webm", "faststart")
+    with pytest.raises(ValueError):
+        streaming_args("avi", "fragmented")
+    with pytest.raises(ValueError):
+        streaming_args("mp4", "chunked")
+
+def test_fragment_counter_counts_complete_iso_fragments(tmp_path: Path):
+    output = tmp_path / "out.mp4"
+    fragment = box(b"moof", b"\0" * 16) + box(b"mdat", b"\1" * 64)
+    output.write_bytes(box(b"ftyp", b"isom") + box(b"moov") + fragment)
+    counter = FragmentCounter(output, "mp4")
+    assert counter.poll() == 1
+
+    # A fragment whose mdat is still being written does not count yet
+    partial = box(b"moof", b"\0" * 16) + box(b"mdat", b"\1" * 64)
+    with open(output, "ab") as f:
+        f.write(partial[:-10])
+    assert counter.poll() == 1
+    with open(output, "ab") as f:
+        f.write(partial[-10:] + fragment)
+    assert counter.poll() == 3
+
+def test_fragment_counter_counts_complete_webm_clusters(tmp_path: Path):
+    output = tmp_path / "out.webm"
+    header = ebml_element(b"\x1a\x45\xdf\xa3", b"\x42\x82\x84webm")
+    # Live Segment of unknown size, as written while the muxer is still running
+    segment = b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff"
+    cluster = ebml_element(b"\x1f\x43\xb6\x75", b"\xe7\x81\x00" + b"\xa3" * 20)
+    output.write_bytes(header + segment + ebml_element(b"\x16\x54\xae\x6b", b"\0" * 4) + cluster + cluster[:5])
+    counter = FragmentCounter(output, "webm")
+    assert counter.poll() == 1
+    with open(output, "ab") as f:
+        f.write(cluster[5:] + cluster)
+    assert counter.poll() == 3
+
+def test_fragment_counter_missing_file(tmp_path: Path):
+    assert FragmentCounter(tmp_path / "missing.mp4", "mp4").poll() == 0
+
+def test_job_registry_lifecycle_and_pruning():
+    with patch.object(jobs, "JOBS", {}), patch.object(jobs, "MAX_FINISHED_JOBS", 2):
+        job = create_job("convert", "/in.webm", "mp4", job_id="first")
+        with pytest.raises(ValueError):
+            create_job("convert", "/in.webm", "mp4", job_id="first")
+        assert [j["job_id"] for j in list_jobs("running")] == ["first"]
+        finish_job(job, {"success": True, "output_file_path": "/out.mp4"})
+        assert get_job("first")["status"] == "succeeded"
+        assert get_job("first")["output_file_path"] == "/out.mp4"
+
+        for i in range(3):
+            finish_job(create_job("convert", "/in.webm", "mp4"), {"success": False, "error": "boom"})
+        assert get_job("first") is None
+        assert len(list_jobs()) == 2
+
+@pytest.mark.asyncio
+async def test_convert_video_streaming_requires_supported_format(tmp_path: Path):
+    source = tmp_path / "in.webm"
+    source.write_bytes(
+        b"\x1a\x45\xdf\xa3\x87\x42\x82\x84webm" + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff"
+    )
+    result = await convert_video_impl(str(source), "avi", streaming="fragmented", job_id="stream-avi")
+    assert result["success"] is False
+    assert "Fragmented output" in result["error"]
+    status = await get_job_status_impl("stream-avi")
+    assert status["job"]["status"] == "failed"
+    assert (await get_job_status_impl("nope"))["success"] is False
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+from mcp_video_converter import supervisor
+from mcp_video_converter.supervisor import run_supervised, SUPERVISOR_STATS, ACTIVE_PROCESSES, ProgressReader
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="process groups need POSIX")
+
+# Stands in for ffmpeg: accepts "-progress <path> -nostats" and writes progress blocks
+FAKE_FFMPEG = r"""
+import sys, time, subprocess
+path = sys.argv[sys.argv.index("-progress") + 1]
+mode = sys.argv[-1]
+if mode == "child":
+    subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+for frame in range(3):
+    with open(path, "a") as f:
+        f.write(f"frame={frame}\nout_time_us={frame * 1000}\nprogress=continue\n")
+    time.sleep(0.1)
+if mode in ("stall", "child"):
+    time.sleep(60)
+print("done")
+"""
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    """Returns a command builder for an executable script, so -progress lands in its argv."""
+    script = tmp_path / "fake_ffmpeg"
+    script.write_text(f"#!{sys.executable}\n{FAKE_FFMPEG}")
+    script.chmod(0o755)
+    return lambda mode: [str(script), mode]
+
+@pytest.fixture(autouse=True)
+def fast_watchdog(monkeypatch):
+    monkeypatch.setattr(supervisor, "WATCHDOG_INTERVAL", 0.1)
+    monkeypatch.setattr(supervisor, "TERM_GRACE_SECONDS", 0.5)
+
+@pytest.mark.asyncio
+async def test_completed_job_reports_progress(fake_ffmpeg):
+    result = await run_supervised(fake_ffmpeg("ok"), stall_timeout=5)
+    assert result["returncode"] == 0
+    assert result["stalled"] is False
+    assert result["progress"]["frame"] == "2"
+    assert b"done" in result["stdout"]
+    assert not ACTIVE_PROCESSES
+
+@pytest.mark.asyncio
+async def test_stalled_job_is_killed(fake_ffmpeg):
+    before = SUPERVISOR_STATS["stalled_killed"]
+    completed = SUPERVISOR_STATS["completed"]
+    result = await asyncio.wait_for(run_supervised(fake_ffmpeg("stall"), stall_timeout=0.5), timeout=10)
+    assert result["stalled"] is True
+    assert result["returncode"] != 0
+    assert SUPERVISOR_STATS["stalled_killed"] == before + 1
+    assert SUPERVISOR_STATS["completed"] == completed
+
+@pytest.mark.asyncio
+async def test_cancellation_kills_whole_process_group(fake_ffmpeg):
+    task = asyncio.create_task(run_supervised(fake_ffmpeg("child"), stall_timeout=30))
+    deadline = asyncio.get_running_loop().time() + 5
+    while not ACTIVE_PROCESSES:
+        assert asyncio.get_running_loop().time() < deadline, "supervised process never started"
+        await asyncio.sleep(0.05)
+    pid = next(iter(ACTIVE_PROCESSES))
+    await asyncio.sleep(0.3)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(task, timeout=10)
+    assert not ACTIVE_PROCESSES
+    with pytest.raises(ProcessLookupError):
+        os.killpg(pid, 0)
+
+def test_progress_reader_only_reads_appended_data(tmp_path):
+    path = tmp_path / "progress.txt"
+    path.write_text("frame=1\nprogress=continue\nframe=5\nprogress=end\n")
+    reader = ProgressReader(str(path))
+    assert reader.poll() == {"frame": "5", "progress": "end"}
+    offset = reader.offset
+
+    with open(path, "a") as f:
+        f.write("frame=9\nout_time_us=12")
+    assert reader.poll()["frame"] == "9"
+    assert "out_time_us" not in reader.progress  # incomplete line is held back
+    assert reader.offset > offset
+
+    with open(path, "a") as f:
+        f.write("00\n")
+    assert reader.poll()["out_time_us"] == "1200"
+
+@pytest.mark.asyncio
+async def test_failed_spawn_removes_progress_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(supervisor.tempfile, "tempdir", str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        await run_supervised([str(tmp_path / "no-such-ffmpeg"), "-i", "in.mkv", "out.mp4"])
+    assert list(tmp_path.iterdir()) == []
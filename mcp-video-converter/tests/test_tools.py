@@ -1,5 +1,6 @@
 import asyncio
 import shutil
+import struct
 from pathlib import Path
 from unittest.mock import AsyncMock, patch
 
@@ -62,14 +63,20 @@ async def test_check_ffmpeg_command_fails(mcp_client: Client):
 def sample_video_file(tmp_path: Path) -> Path:
     """Creates a dummy video file for testing."""
     video_file = tmp_path / "sample.mp4"
-    video_file.write_text("dummy video content")  # Not a real video, but fine for mocking FFmpeg
+    # Not a real video, but a well-formed MP4 box layout so header sniffing accepts it
+    video_file.write_bytes(
+        struct.pack(">I4s4sI4s", 20, b"ftyp", b"isom", 512, b"isom")
+        + struct.pack(">I4s", 16, b"moov") + b"\x00" * 8
+        + struct.pack(">I4s", 16, b"mdat") + b"dummy" + b"\x00" * 3
+    )
     return video_file
 
 @pytest.mark.asyncio
 async def test_convert_video_successful(mcp_client: Client, sample_video_file: Path, tmp_path: Path):
-    mock_process = AsyncMock()
-    mock_process.returncode = 0
-    mock_process.communicate.return_value = (b"ffmpeg output", b"")
+    mock_run = AsyncMock(return_value={
+        "returncode": 0, "stdout": b"ffmpeg output", "stderr": b"", "stalled": False,
+        "progress": {}, "resource_usage": {},
+    })
 
     output_format = "webm"
     expected_output_dir = sample_video_file.parent / "converted_videos"
@@ -80,7 +87,7 @@ async def test_convert_video_successful(mcp_client: Client, sample_video_file: P
          patch("pathlib.Path.is_file", return_value=True), \
          patch("pathlib.Path.exists", return_value=False), \
          patch("pathlib.Path.mkdir"), \
-         patch("asyncio.create_subprocess_exec", return_value=mock_process) as mock_create_subprocess:
+         patch("mcp_video_converter.engines.run_supervised", mock_run):
         result = await mcp_client.call_tool(
             "convert_video",
             {"input_file_path": str(sample_video_file), "output_format": output_format}
@@ -93,10 +100,11 @@ async def test_convert_video_successful(mcp_client: Client, sample_video_file: P
 
 @pytest.mark.asyncio
 async def test_convert_video_ffmpeg_fails(mcp_client: Client, sample_video_file: Path, tmp_path: Path):
-    mock_process = AsyncMock()
-    mock_process.returncode = 1
-    mock_process.communicate.return_value = (b"", b"FFmpeg specific error")
-    
+    mock_run = AsyncMock(return_value={
+        "returncode": 1, "stdout": b"", "stderr": b"FFmpeg specific error", "stalled": False,
+        "progress": {}, "resource_usage": {},
+    })
+
     output_format = "mov"
 
     # Mock Path methods
@@ -104,7 +112,7 @@ async def test_convert_video_ffmpeg_fails(mcp_client: Client, sample_video_file:
          patch("pathlib.Path.is_file", return_value=True), \
          patch("pathlib.Path.exists", return_value=False), \
          patch("pathlib.Path.mkdir"), \
-         patch("asyncio.create_subprocess_exec", return_value=mock_process):
+         patch("mcp_video_converter.engines.run_supervised", mock_run):
         result = await mcp_client.call_tool(
             "convert_video",
             {"input_file_path": str(sample_video_file), "output_format": output_format}
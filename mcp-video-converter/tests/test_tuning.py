@@ -0,0 +1,76 @@
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from mcp_video_converter import tuning
+from mcp_video_converter.probe import get_video_geometry
+from mcp_video_converter.tuning import heuristic_encoder_args, resolution_bucket, tuned_encoder_args
+
+
+@pytest.fixture(autouse=True)
+def isolated_tuning(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(tuning, "TUNING_FILE", str(tmp_path / "tuning.json"))
+    monkeypatch.setattr(tuning, "_calibrated", None)
+    monkeypatch.setattr(tuning, "_TUNING_CACHE", {})
+
+def test_resolution_bucket_uses_short_side():
+    assert resolution_bucket(640, 360) == "sd"
+    assert resolution_bucket(1920, 1080) == "fhd"
+    assert resolution_bucket(1080, 1920) == "fhd"  # portrait
+    assert resolution_bucket(7680, 4320) == "uhd"
+
+def vp9_args(*args) -> dict:
+    return dict(zip(*[iter(heuristic_encoder_args("libvpx-vp9", *args))] * 2))
+
+def test_vp9_tiles_scale_with_width_and_threads():
+    args = vp9_args(3840, 2160, 8)
+    assert args["-row-mt"] == "1"
+    assert args["-tile-columns"] == "3"
+    # One thread: no tiling and the slowest, highest-quality speed setting is not affordable
+    single = vp9_args(3840, 2160, 1)
+    assert single["-tile-columns"] == "0"
+    assert single["-cpu-used"] == "5"
+    assert vp9_args(854, 480, 4)["-cpu-used"] == "2"
+
+def test_vp9_speed_follows_frame_rate():
+    assert vp9_args(1920, 1080, 4, 24)["-cpu-used"] == "4"
+    assert vp9_args(1920, 1080, 4, 60)["-cpu-used"] == "5"
+    assert vp9_args(1920, 1080, 4) == vp9_args(1920, 1080, 4, 30)
+
+def test_x264_threads_capped_by_macroblock_rows():
+    assert heuristic_encoder_args("libx264", 1920, 1080, 8) == ["-x264-params", "threads=8"]
+    assert heuristic_encoder_args("libx264", 854, 480, 64) == ["-x264-params", "threads=15"]
+    # The actual frame height counts, not the bucket's
+    assert heuristic_encoder_args("libx264", 640, 272, 64) == ["-x264-params", "threads=8"]
+
+def test_tuned_args_cached_and_overridden_by_calibration(tmp_path: Path):
+    assert tuned_encoder_args("mp3", 1920, 1080, 4) == []
+    Path(tuning.TUNING_FILE).write_text(json.dumps({"settings": {"libvpx-vp9/fhd/4": ["-tile-columns", "1"]}}))
+    args = tuned_encoder_args("webm", 1920, 1080, 4)
+    assert args[args.index("-tile-columns") + 1] == "1"
+    assert ("libvpx-vp9", 1920, 1080, 30, 4) in tuning._TUNING_CACHE
+    # Calibration is stored per bucket, so any 1080p frame rate picks it up
+    fast = tuned_encoder_args("webm", 1920, 1080, 4, 60)
+    assert fast[fast.index("-tile-columns") + 1] == "1"
+    assert fast[fast.index("-cpu-used") + 1] == "5"
+
+@pytest.mark.asyncio
+async def test_calibrate_stores_fastest_candidate(tmp_path: Path):
+    timings = {"0": 3.0, "1": 1.0, "2": 2.0, "3": 2.5}
+
+    async def fake_time(encoder, size, threads, args):
+        return timings[args[args.index("-tile-columns") + 1]]
+
+    with patch("mcp_video_converter.tuning._time_candidate", side_effect=fake_time):
+        result = await tuning.calibrate(encoders=["libvpx-vp9"], buckets=["hd"], thread_budgets=[4])
+
+    assert result["settings"] == {"libvpx-vp9/hd/4": ["-tile-columns", "1"]}
+    stored = json.loads(Path(tuning.TUNING_FILE).read_text())
+    assert stored["settings"] == result["settings"]
+
+def test_get_video_geometry_parses_frame_rate():
+    probe = {"streams": [{"codec_type": "video", "width": 1280, "height": 720, "avg_frame_rate": "30000/1001"}]}
+    assert get_video_geometry(probe) == {"width": 1280, "height": 720, "fps": pytest.approx(29.97, rel=1e-3)}
+    assert get_video_geometry({"streams": [{"codec_type": "audio"}]}) is None
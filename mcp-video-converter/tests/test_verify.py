@@ -0,0 +1,123 @@
+import struct
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from mcp_video_converter import verify
+from mcp_video_converter.tools import convert_video_impl, get_job_status_impl
+from mcp_video_converter.verify import expected_layout, verify_output
+
+INPUT_PROBE = {
+    "success": True,
+    "format": {"duration": "60.0"},
+    "streams": [
+        {"codec_type": "video", "width": 1280, "height": 720},
+        {"codec_type": "audio"},
+        {"codec_type": "video", "disposition": {"attached_pic": 1}},
+    ],
+}
+
+
+def box(kind: bytes, payload: bytes = b"") -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def output_probe(duration: str = "60.02", kinds=("video", "audio")) -> dict:
+    return {"success": True, "format": {"duration": duration}, "streams": [{"codec_type": k} for k in kinds]}
+
+
+@pytest.fixture
+def mp4_output(tmp_path: Path) -> Path:
+    path = tmp_path / "clip_converted.mp4"
+    path.write_bytes(box(b"ftyp", b"isom") + box(b"moov", b"\0" * 16) + box(b"mdat", b"\1" * 64))
+    return path
+
+def test_expected_layout_follows_output_format():
+    assert expected_layout(INPUT_PROBE, "mp4") == ["video", "audio"]
+    assert expected_layout(INPUT_PROBE, "mp3") == ["audio"]
+    assert expected_layout(INPUT_PROBE, "gif") == ["video"]
+
+@pytest.mark.asyncio
+async def test_fast_checks_header_and_stream_count(mp4_output: Path):
+    with patch.object(verify, "probe_media", AsyncMock(return_value=output_probe())):
+        result = await verify_output(mp4_output, "mp4", "fast", INPUT_PROBE)
+    assert result["passed"] is True
+    assert set(result["checks"]) == {"header", "streams"}
+    assert all("seconds" in check for check in result["checks"].values())
+
+    # Wrong container and a cut-off file fail before ffprobe is spawned
+    probe = AsyncMock(return_value=output_probe())
+    with patch.object(verify, "probe_media", probe):
+        assert (await verify_output(mp4_output, "webm", "fast"))["passed"] is False
+        mp4_output.write_bytes(mp4_output.read_bytes()[:30])
+        truncated = await verify_output(mp4_output, "mp4", "fast")
+    assert truncated["passed"] is False
+    assert "truncated" in truncated["error"]
+    probe.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_standard_compares_duration_and_layout(mp4_output: Path):
+    with patch.object(verify, "probe_media", AsyncMock(return_value=output_probe(duration="41.5"))):
+        short = await verify_output(mp4_output, "mp4", "standard", INPUT_PROBE)
+    assert short["passed"] is False
+    assert short["checks"]["duration"]["input_duration"] == 60.0
+
+    with patch.object(verify, "probe_media", AsyncMock(return_value=output_probe(kinds=("audio", "audio")))):
+        assert (await verify_output(mp4_output, "mp4", "fast", INPUT_PROBE))["passed"] is True
+        wrong_kinds = await verify_output(mp4_output, "mp4", "standard", INPUT_PROBE)
+    # Same count, wrong kinds: only standard compares the layout
+    assert wrong_kinds["passed"] is False
+    assert "streams" in wrong_kinds["error"]
+
+@pytest.mark.asyncio
+async def test_full_decodes_in_background(mp4_output: Path):
+    commands = []
+
+    async def fake_run_supervised(command, apply_policy=None):
+        commands.append(command)
+        return {"returncode": 0, "stderr": b"[h264] error while decoding MB 3 7\n", "stalled": False,
+                "resource_usage": {"cpu_seconds": 0.4}}
+
+    with patch.object(verify, "probe_media", AsyncMock(return_value=output_probe())), \
+            patch.object(verify, "run_supervised", fake_run_supervised):
+        result = await verify_output(mp4_output, "mp4", "full", INPUT_PROBE)
+        assert result["passed"] is True
+        assert result["decode"] == {"status": "running"}
+        await next(iter(verify.DECODE_TASKS))
+    assert commands[0][-3:] == ["-f", "null", "-"]
+    assert result["decode"]["status"] == "failed"
+    assert result["decode"]["cpu_seconds"] == 0.4
+    assert result["passed"] is False
+    assert "error while decoding" in result["error"]
+
+@pytest.mark.asyncio
+async def test_convert_video_fails_unverified_output(tmp_path: Path):
+    source = tmp_path / "clip.webm"
+    source.write_bytes(
+        b"\x1a\x45\xdf\xa3\x87\x42\x82\x84webm" + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff"
+        + b"x" * 1000
+    )
+
+    async def fake_run(input_path, output_path, output_format, encoding_args, policy, video=None, on_progress=None):
+        output_path.write_bytes(box(b"ftyp", b"isom") + box(b"moov") + box(b"mdat", b"\1" * 8))
+        return {"returncode": 0, "stderr": b"", "stalled": False, "resource_usage": {}}
+
+    fake_engine = AsyncMock()
+    fake_engine.name = "subprocess"
+    fake_engine.run = fake_run
+    with patch("mcp_video_converter.tools.SUBPROCESS_ENGINE", fake_engine), \
+            patch("mcp_video_converter.tools.select_engine", lambda *args: fake_engine), \
+            patch("mcp_video_converter.tools.probe_media", AsyncMock(return_value=INPUT_PROBE)), \
+            patch.object(verify, "probe_media", AsyncMock(return_value=output_probe(kinds=("video",)))):
+        unverified = await convert_video_impl(str(source), "mp4", verify="none")
+        assert unverified["success"] is True
+        assert "verification" not in unverified
+
+        result = await convert_video_impl(str(source), "mp4", verify="standard", job_id="verify-1")
+        assert (await convert_video_impl(str(source), "mp4", verify="paranoid"))["success"] is False
+    assert result["success"] is False
+    assert result["error"].startswith("Output verification failed")
+    assert result["verification"]["checks"]["streams"]["expected"] == ["video", "audio"]
+    status = await get_job_status_impl("verify-1")
+    assert status["job"]["verification"]["passed"] is False
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from mcp_video_converter.watcher import WatchDaemon, ProcessedLedger, load_watch_config
+
+
+def make_config(tmp_path: Path, watch_dir: Path, **overrides) -> dict:
+    config_file = tmp_path / "watch.json"
+    config_file.write_text(json.dumps({
+        "ledger_path": str(tmp_path / "ledger.jsonl"),
+        "settle_seconds": 0.1,
+        "poll_interval": 0.05,
+        "workers": 2,
+        "queue_size": 2,
+        "directories": [{"path": str(watch_dir), "patterns": ["*.webm"], "output_format": "mp4"}],
+        **overrides,
+    }))
+    return load_watch_config(str(config_file))
+
+async def run_until(daemon: WatchDaemon, predicate, timeout: float = 5.0, linger: float = 0.0) -> None:
+    """Runs the daemon until predicate holds, keeps it running for linger seconds, then stops it."""
+    task = asyncio.create_task(daemon.run())
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "daemon did not finish in time"
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(linger)
+    daemon.stop()
+    await asyncio.wait_for(task, timeout=timeout)
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_inotify", [True, False])
+async def test_watch_daemon_converts_settled_files_once(tmp_path: Path, use_inotify: bool):
+    watch_dir = tmp_path / "incoming"
+    watch_dir.mkdir()
+    for i in range(5):
+        (watch_dir / f"rec{i}.webm").write_bytes(b"x" * 10)
+    (watch_dir / "notes.txt").write_text("ignored")
+
+    converted = []
+
+    async def fake_convert(path, output_format, ctx, quality, framerate):
+        converted.append((path, output_format))
+        await asyncio.sleep(0.01)
+        return {"success": True, "output_file_path": path + ".mp4"}
+
+    config = make_config(tmp_path, watch_dir, use_inotify=use_inotify)
+    daemon = WatchDaemon(config, convert=fake_convert)
+    await run_until(daemon, lambda: len(converted) == 5)
+    assert sorted(os.path.basename(p) for p, _ in converted) == [f"rec{i}.webm" for i in range(5)]
+    assert all(fmt == "mp4" for _, fmt in converted)
+
+    # A restarted daemon consults the ledger and converts only new files
+    (watch_dir / "rec5.webm").write_bytes(b"y" * 10)
+    converted.clear()
+    daemon = WatchDaemon(config, convert=fake_convert)
+    # Linger past several settle and poll intervals so a duplicate conversion would show up
+    await run_until(daemon, lambda: len(converted) == 1, linger=0.5)
+    assert [os.path.basename(p) for p, _ in converted] == ["rec5.webm"]
+
+@pytest.mark.asyncio
+async def test_stop_leaves_queued_files_for_next_run(tmp_path: Path):
+    watch_dir = tmp_path / "incoming"
+    watch_dir.mkdir()
+    for i in range(6):
+        (watch_dir / f"rec{i}.webm").write_bytes(b"x")
+
+    started = []
+    release = asyncio.Event()
+
+    async def slow_convert(path, output_format, ctx, quality, framerate):
+        started.append(path)
+        await release.wait()
+        return {"success": True}
+
+    config = make_config(tmp_path, watch_dir, use_inotify=False, workers=1, queue_size=10)
+    daemon = WatchDaemon(config, convert=slow_convert)
+    task = asyncio.create_task(daemon.run())
+    deadline = asyncio.get_running_loop().time() + 5
+    while not (started and daemon.queue.qsize() >= 1):
+        assert asyncio.get_running_loop().time() < deadline, "work was never queued"
+        await asyncio.sleep(0.02)
+    daemon.stop()
+    await asyncio.sleep(0.1)
+    release.set()
+    await asyncio.wait_for(task, timeout=5)
+
+    # Only the conversion already running finished; queued files were not converted
+    assert len(started) == 1
+    assert len(ProcessedLedger(config["ledger_path"]).entries) == 1
+
+@pytest.mark.asyncio
+async def test_inotify_overflow_triggers_rescan(tmp_path: Path):
+    watch_dir = tmp_path / "incoming"
+    watch_dir.mkdir()
+    config = make_config(tmp_path, watch_dir)
+    daemon = WatchDaemon(config)
+    (watch_dir / "missed.webm").write_bytes(b"x")
+
+    class OverflowedInotify:
+        def read_paths(self):
+            return [], True
+
+    daemon._inotify = OverflowedInotify()
+    daemon._on_inotify()
+    assert str(watch_dir / "missed.webm") in daemon.pending
+
+def test_ledger_reprocesses_changed_files(tmp_path: Path):
+    media = tmp_path / "a.webm"
+    media.write_bytes(b"abc")
+    ledger = ProcessedLedger(str(tmp_path / "ledger.jsonl"))
+    ledger.record(str(media), media.stat(), {"success": True})
+
+    reloaded = ProcessedLedger(str(tmp_path / "ledger.jsonl"))
+    assert reloaded.is_processed(str(media), media.stat())
+
+    media.write_bytes(b"abcdef")
+    assert not reloaded.is_processed(str(media), media.stat())
@@ -0,0 +1,85 @@
+import json
+import math
+import os
+import struct
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from mcp_video_converter import waveform
+from mcp_video_converter.tools import generate_waveform_impl
+from mcp_video_converter.waveform import build_waveform_command, input_fingerprint, waveform_cache_path
+
+WEBM = b"\x1a\x45\xdf\xa3\x87\x42\x82\x84webm" + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff"
+
+
+def test_waveform_command_streams_mono_float_pcm(tmp_path: Path):
+    command = build_waveform_command(tmp_path / "in.mp4")
+    assert command[command.index("-ac") + 1] == "1"
+    assert command[-3:] == ["-f", "f32le", "pipe:1"]
+
+def test_fingerprint_follows_content_not_path(tmp_path: Path):
+    first, second = tmp_path / "a.webm", tmp_path / "b.webm"
+    first.write_bytes(WEBM * 10000)
+    second.write_bytes(WEBM * 10000)
+    mtime_ns = first.stat().st_mtime_ns
+    os.utime(second, ns=(mtime_ns, mtime_ns))
+    assert input_fingerprint(first) == input_fingerprint(second)
+    second.write_bytes(WEBM * 10000 + b"x")
+    assert input_fingerprint(first) != input_fingerprint(second)
+
+    # A same-size edit between the sampled ends is caught by the mtime
+    middle = bytearray(WEBM * 10000)
+    middle[len(middle) // 2] ^= 0xFF
+    second.write_bytes(bytes(middle))
+    os.utime(second, ns=(mtime_ns, mtime_ns + 1))
+    assert input_fingerprint(first) != input_fingerprint(second)
+    assert waveform_cache_path("abc", 4, "binary").suffix == ".peaks"
+
+@pytest.mark.asyncio
+async def test_generate_waveform_requires_numpy(tmp_path: Path):
+    source = tmp_path / "in.webm"
+    source.write_bytes(WEBM)
+    with patch("mcp_video_converter.tools.np", None):
+        result = await generate_waveform_impl(str(source))
+    assert result["success"] is False
+    assert "NumPy" in result["error"]
+
+def test_peak_accumulator_matches_direct_computation():
+    np = pytest.importorskip("numpy")
+    signal = np.sin(np.linspace(0, 40, 1000, dtype=np.float32)) * np.linspace(0, 1, 1000, dtype=np.float32)
+    accumulator = waveform.PeakAccumulator(samples_per_bucket=10)
+    for start in range(0, 1000, 97):  # chunks that don't line up with buckets
+        accumulator.add(signal[start:start + 97])
+    fine, coarse = accumulator.levels(2, factor=4)
+    assert len(fine["min"]) == 100 and len(coarse["min"]) == 25
+    assert np.allclose(fine["max"], signal.reshape(100, 10).max(axis=1))
+    assert np.allclose(coarse["min"], signal.reshape(25, 40).min(axis=1))
+    assert np.allclose(coarse["rms"], np.sqrt((signal.reshape(25, 40).astype(np.float64) ** 2).mean(axis=1)))
+
+@pytest.mark.asyncio
+async def test_generate_waveform_streams_pcm_and_caches(tmp_path: Path):
+    pytest.importorskip("numpy")
+    source = tmp_path / "in.webm"
+    source.write_bytes(WEBM)
+    samples = [math.sin(i / 10) for i in range(8000 * 3)]
+    calls = []
+
+    async def fake_run(command, apply_policy=None, stall_timeout=None, on_progress=None, stdout=None):
+        calls.append(command)
+        os.write(stdout.fileno(), struct.pack(f"<{len(samples)}f", *samples))
+        return {"returncode": 0, "stdout": b"", "stderr": b"", "stalled": False, "progress": {}, "resource_usage": {}}
+
+    with patch.object(waveform, "WAVEFORM_CACHE_DIR", str(tmp_path / "cache")), \
+            patch("mcp_video_converter.waveform.run_supervised", side_effect=fake_run):
+        result = await generate_waveform_impl(str(source), levels=2)
+        again = await generate_waveform_impl(str(source), levels=2)
+
+    assert result["success"] is True and result["cached"] is False
+    assert result["duration"] == 3.0
+    assert [level["buckets"] for level in result["levels"]] == [188, 47]
+    peaks = json.loads(Path(result["output_file_path"]).read_text())
+    assert peaks["levels"][0]["samples_per_bucket"] == 128
+    assert max(peaks["levels"][1]["max"]) == pytest.approx(1.0, abs=1e-3)
+    assert again["cached"] is True and len(calls) == 1